@@ -132,6 +132,7 @@ clinicid, xraylist))
             for x in xraylist:
                 y = GetImage(sess.getHost(), sess.getPort(), sess.getToken())
                 y.setId(x)
+                y.setRendition("thumb")     # the grid only shows thumbnails
                 ret = y.send(timeout=30)
                 if ret[0] == 200:
                     xrays.append(ret[1])
@@ -194,56 +195,41 @@ class Registrations():
             count = len(ret[1])
         return count
 
-    def getAllRegistrations(self, sess, clinicid):
+    def getRegisteredPatients(self, sess, clinicid, pattern=None):
+        # one request, returning the summaries of the patients registered
+        # at the clinic
+
         patients = []
-        x = GetAllRegistrations(sess.getHost(), sess.getPort(), sess.getToken())
+        x = GetPatient(sess.getHost(), sess.getPort(), sess.getToken())
         x.setClinic(clinicid)
+        x.setRegistered("any")
+        x.setSummary(True)
+        if pattern:
+            x.setPaternalLast(pattern)
         ret = x.send(timeout=30)
         if ret[0] == 200:
-            registrations = ret[1]
-            for x in registrations:
-                y = self.getPatient(sess, x["patient"])
-                if y:
-                    p = {}
-                    p["id"] = y["id"]
-                    p["first"] = y["first"]
-                    p["middle"] = y["middle"]
-                    p["paternal_last"] = y["paternal_last"]
-                    p["maternal_last"] = y["maternal_last"]
-                    p["dob"] = self.orderByYearMonthDay(y["dob"])
-                    p["gender"] = y["gender"]
-                    p["curp"] = y["curp"]
-                    patients.append(p)
+            for y in ret[1]:
+                p = {}
+                p["id"] = y["id"]
+                p["first"] = y["first"]
+                p["middle"] = y["middle"]
+                p["paternal_last"] = y["paternal_last"]
+                p["maternal_last"] = y["maternal_last"]
+                p["dob"] = self.orderByYearMonthDay(y["dob"])
+                p["gender"] = y["gender"]
+                p["curp"] = y["curp"]
+                patients.append(p)
         return patients
 
+    def getAllRegistrations(self, sess, clinicid):
+        return self.getRegisteredPatients(sess, clinicid)
+
     def orderByYearMonthDay(self, dob):
         y = dob.split("/")
         return "{}/{}/{}".format(y[2], y[0], y[1]) 
 
     def searchAllRegistrations(self, sess, clinicid, pattern):
-        patients = []
-        matches = self.searchPatient(sess, pattern)
-        #print("matches: {}", matches)
-        x = GetAllRegistrations(sess.getHost(), sess.getPort(), sess.getToken())
-        x.setClinic(clinicid)
-        ret = x.send(timeout=30)
-        if ret[0] == 200:
-            registrations = ret[1]
-            for x in registrations:
-                if x["patient"] in matches:
-                    y = self.getPatient(sess, x["patient"])
-                    if y:
-                        p = {}
-                        p["id"] = y["id"]
-                        p["first"] = y["first"]
-                        p["middle"] = y["middle"]
-                        p["paternal_last"] = y["paternal_last"]
-                        p["maternal_last"] = y["maternal_last"]
-                        p["dob"] = self.orderByYearMonthDay(y["dob"])
-                        p["gender"] = y["gender"]
-                        p["curp"] = y["curp"]
-                        patients.append(p)
-        return patients
+        return self.getRegisteredPatients(sess, clinicid, pattern)
 
 def usage():
     print("tsdashboard [-v] [-h host] [-p port] -u username -w password") 
@@ -33,6 +33,7 @@ class Headshot():
         image.setPatient(patient)
         image.setType("Headshot")
         image.setNewest("true")
+        image.setSize(240)
         ret = image.send(timeout=30)
         if ret[0] == 200: 
             filename = "patient_headshot_{}".format(patient)
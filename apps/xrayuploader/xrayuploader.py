@@ -29,10 +29,9 @@ from pubsub import pub
 
 from tschartslib.service.serviceapi import ServiceAPI
 from tschartslib.tscharts.tscharts import Login, Logout
-from tschartslib.register.register import GetAllRegistrations
 from tschartslib.patient.patient import GetPatient
 from tschartslib.clinic.clinic import GetAllClinics
-from tschartslib.image.image import GetImage, CreateImage, DeleteImage
+from tschartslib.image.image import GetImage, DeleteImage, ImageUploader
 from collections import OrderedDict
 
 class TSSession():
@@ -116,20 +115,21 @@ clinicid, xraylist))
             for x in xraylist:
                 y = GetImage(sess.getHost(), sess.getPort(), sess.getToken())
                 y.setId(x)
+                y.setRendition("thumb")     # the grid only shows thumbnails
                 ret = y.send(timeout=30)
                 if ret[0] == 200:
                     xrays.append(ret[1])
         return xrays
 
     def uploadXRay(self, sess, imagegrid, clinicid, patientid, path):
-        x = CreateImage(sess.getHost(), sess.getPort(), sess.getToken())
+        # sent in chunks, so that a large X-ray need not be held in memory
+        # as base64, and a dropped connection only costs a chunk
+
+        x = ImageUploader(sess.getHost(), sess.getPort(), sess.getToken())
         x.setClinic(clinicid)
         x.setPatient(patientid)
-        with open(path, "rb") as image_file:
-            encoded_string = base64.b64encode(image_file.read())
-        x.setData(str(encoded_string, 'utf-8'))
         x.setType("Xray")
-        ret = x.send(timeout=30)
+        ret = x.upload(path, timeout=30)
         if ret[0] == 200:
             print("uploadXRay success id is {}".format(ret[1]["id"]))
             imagegrid.toggleDeleteButtonState()
@@ -170,54 +170,40 @@ class Registrations():
             ret = None
         return ret
 
-    def getAllRegistrations(self, sess, clinicid):
+    def getRegisteredPatients(self, sess, clinicid, pattern=None):
+        # one request, returning the summaries of the patients registered
+        # at the clinic
+
         patients = []
-        x = GetAllRegistrations(sess.getHost(), sess.getPort(), sess.getToken())
+        x = GetPatient(sess.getHost(), sess.getPort(), sess.getToken())
         x.setClinic(clinicid)
+        x.setRegistered("any")
+        x.setSummary(True)
+        if pattern:
+            x.setPaternalLast(pattern)
         ret = x.send(timeout=30)
         if ret[0] == 200:
-            registrations = ret[1]
-            for x in registrations:
-                y = self.getPatient(sess, x["patient"])
-                if y:
-                    p = {}
-                    p["id"] = y["id"]
-                    p["first"] = y["first"]
-                    p["middle"] = y["middle"]
-                    p["paternal_last"] = y["paternal_last"]
-                    p["maternal_last"] = y["maternal_last"]
-                    p["dob"] = self.orderByYearMonthDay(y["dob"])
-                    p["gender"] = y["gender"]
-                    patients.append(p)
+            for y in ret[1]:
+                p = {}
+                p["id"] = y["id"]
+                p["first"] = y["first"]
+                p["middle"] = y["middle"]
+                p["paternal_last"] = y["paternal_last"]
+                p["maternal_last"] = y["maternal_last"]
+                p["dob"] = self.orderByYearMonthDay(y["dob"])
+                p["gender"] = y["gender"]
+                patients.append(p)
         return patients
 
+    def getAllRegistrations(self, sess, clinicid):
+        return self.getRegisteredPatients(sess, clinicid)
+
     def orderByYearMonthDay(self, dob):
         y = dob.split("/")
         return "{}/{}/{}".format(y[2], y[0], y[1]) 
 
     def searchAllRegistrations(self, sess, clinicid, pattern):
-        patients = []
-        matches = self.searchPatient(sess, pattern)
-        print("matches: {}", matches)
-        x = GetAllRegistrations(sess.getHost(), sess.getPort(), sess.getToken())
-        x.setClinic(clinicid)
-        ret = x.send(timeout=30)
-        if ret[0] == 200:
-            registrations = ret[1]
-            for x in registrations:
-                if x["patient"] in matches:
-                    y = self.getPatient(sess, x["patient"])
-                    if y:
-                        p = {}
-                        p["id"] = y["id"]
-                        p["first"] = y["first"]
-                        p["middle"] = y["middle"]
-                        p["paternal_last"] = y["paternal_last"]
-                        p["maternal_last"] = y["maternal_last"]
-                        p["dob"] = self.orderByYearMonthDay(y["dob"])
-                        p["gender"] = y["gender"]
-                        patients.append(p)
-        return patients
+        return self.getRegisteredPatients(sess, clinicid, pattern)
 
 def usage():
     print("xrayuploader [-h host] [-p port] -u username -w password") 
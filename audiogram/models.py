@@ -29,3 +29,6 @@ class Audiogram(models.Model):
     image = models.ForeignKey(Image)
     comment = models.TextField()
     time = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        index_together = [["patient", "clinic"]]
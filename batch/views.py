@@ -0,0 +1,221 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+run several API requests with one HTTP request. Each sub-request is 
+dispatched in-process to the view its path resolves to, as the same user,
+and runs on the connection to the database of the batch request. GETs 
+that follow each other can instead be run in parallel, see runRequests().
+'''
+
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAuthenticated
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.urlresolvers import resolve, Resolver404
+from django.db import connections
+from django.http import HttpResponseBadRequest
+
+from common.decorators import *
+
+from io import BytesIO
+import json
+import sys
+import threading
+
+import logging
+
+LOG = logging.getLogger("tscharts")
+
+MAX_BATCH_REQUESTS = 50
+
+# most threads a batch runs GETs on. Each opens a database connection of
+# its own, as a connection cannot be used by two threads at once.
+
+MAX_BATCH_THREADS = 4
+
+METHODS = ["GET", "POST", "PUT", "DELETE"]
+
+# headers of the batch request not passed on to sub-requests
+
+SKIP_HEADERS = ["HTTP_IF_NONE_MATCH", "HTTP_IF_MODIFIED_SINCE", "HTTP_ACCEPT_ENCODING"]
+
+def getSubRequest(request, method, path, body):
+    '''
+    returns a Django request for a sub-request, with the headers of the 
+    batch request and authenticated as its user
+    '''
+
+    path, sep, query = path.partition("?")
+    if not path.startswith("/"):
+        path = "/" + path
+    if body == None:
+        body = "{}"
+    else:
+        body = json.dumps(body)
+    body = body.encode("utf-8")
+
+    environ = {}
+    for k, v in request.META.items():
+        if not k in SKIP_HEADERS:
+            environ[k] = v
+    environ["REQUEST_METHOD"] = method
+    environ["PATH_INFO"] = path
+    environ["QUERY_STRING"] = query
+    environ["CONTENT_TYPE"] = "application/json"
+    environ["HTTP_ACCEPT"] = "application/json"
+    environ["CONTENT_LENGTH"] = str(len(body))
+    environ["wsgi.input"] = BytesIO(body)
+    ret = WSGIRequest(environ)
+
+    # the token was checked for the batch, the views take the user as is
+
+    ret._force_auth_user = request.user
+    ret._force_auth_token = request.auth
+    return ret
+
+def getResponseBody(response):
+    '''
+    returns the body of a response, decoded if it is JSON or text. Streamed
+    responses (e.g., image files) are not returned, those must be fetched 
+    on their own.
+    '''
+
+    ret = None
+    if response.streaming:
+        return ret
+    contentType = response.get("Content-Type", "")
+    try:
+        if contentType.startswith("application/json"):
+            if len(response.content):
+                ret = json.loads(response.content)
+        elif contentType.startswith("text/"):
+            ret = response.content.decode("utf-8")
+    except:
+        LOG.warning("getResponseBody unable to decode {} body: {}".format(contentType, sys.exc_info()[0]))
+    return ret
+
+def runRequest(request, item):
+    '''
+    run the sub-request item and return its {"status", "body"}
+    '''
+
+    try:
+        method = item["method"].upper()
+        path = item["path"]
+        if not method in METHODS:
+            return {"status": 400, "body": None}
+        subrequest = getSubRequest(request, method, path, item.get("body", None))
+    except:
+        return {"status": 400, "body": None}
+
+    try:
+        match = resolve(subrequest.path_info)
+    except Resolver404:
+        return {"status": 404, "body": None}
+    if getattr(match.func, "cls", None) == BatchView:
+        return {"status": 400, "body": None}
+
+    try:
+        response = match.func(subrequest, *match.args, **match.kwargs)
+        if hasattr(response, "render"):
+            response.render()
+        ret = {"status": response.status_code, "body": getResponseBody(response)}
+    except:
+        LOG.error("runRequest {} {} failed: {}".format(method, path, sys.exc_info()[0]))
+        ret = {"status": 500, "body": None}
+    return ret
+
+def runParallel(request, items, results):
+    '''
+    run the GETs in items, a list of (index, item), on up to 
+    MAX_BATCH_THREADS threads, storing each result in results[index] 
+    '''
+
+    def run(work):
+        try:
+            for index, item in work:
+                results[index] = runRequest(request, item)
+        finally:
+            connections.close_all()
+
+    count = min(MAX_BATCH_THREADS, len(items))
+    threads = []
+    for i in range(count):
+        t = threading.Thread(target=run, args=(items[i::count],))
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join()
+
+def runRequests(request, items, parallel):
+    '''
+    run the sub-requests in order, returning their results. If parallel, 
+    each run of consecutive GETs is spread over threads instead; other 
+    methods still run one at a time, after the GETs before them and 
+    before those after them.
+    '''
+
+    results = [None] * len(items)
+    gets = []
+    for index, item in enumerate(items):
+        isGet = False
+        try:
+            isGet = item["method"].upper() == "GET"
+        except:
+            pass
+        if parallel and isGet:
+            gets.append((index, item))
+            continue
+        if len(gets):
+            runParallel(request, gets, results)
+            gets = []
+        results[index] = runRequest(request, item)
+    if len(gets):
+        runParallel(request, gets, results)
+    return results
+
+class BatchView(APIView):
+
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    @log_request
+    def post(self, request, format=None):
+        badRequest = False
+        items = None
+        parallel = False
+
+        try:
+            data = json.loads(request.body)
+            items = data["requests"]
+            if not type(items) == list or len(items) == 0 or len(items) > MAX_BATCH_REQUESTS:
+                badRequest = True
+            else:
+                for x in items:
+                    if not type(x) == dict:
+                        badRequest = True
+                        break
+            if "parallel" in data:
+                parallel = data["parallel"]
+                if not (parallel == True or parallel == False):
+                    badRequest = True
+        except:
+            badRequest = True
+
+        if badRequest:
+            return HttpResponseBadRequest()
+        return Response({"responses": runRequests(request, items, parallel)})
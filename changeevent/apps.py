@@ -0,0 +1,29 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+from __future__ import unicode_literals
+
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+class ChangeeventConfig(AppConfig):
+    name = 'changeevent'
+
+    def ready(self):
+        # the change event table stays on MyISAM (see engine.py)
+
+        from changeevent.engine import keepMyISAM
+        post_migrate.connect(keepMyISAM, sender=self)
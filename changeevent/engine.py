@@ -0,0 +1,70 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+Keeps the change event table on MyISAM, whatever DATABASE_STORAGE_ENGINE
+(tscharts/settings.py) the other tables are created with.
+
+Subscribers fetch events with ids greater than the last one they saw. 
+With InnoDB, ids are handed out when a row is inserted but become 
+visible when its transaction commits, so an event with a lower id can 
+show up after one with a higher id, and a subscriber that has already 
+moved past it never sees it. MyISAM has no transactions, an id is 
+visible as soon as it is handed out.
+
+keepMyISAM() runs after every migrate (see apps.py), so a new database
+never has the table on InnoDB, and converts it back if it was converted.
+'''
+
+import sys
+
+from django.db import connections, DEFAULT_DB_ALIAS
+
+from changeevent.models import ChangeEvent
+
+import logging
+
+LOG = logging.getLogger("tscharts")
+
+ENGINE = "MyISAM"
+
+def getEngine(connection, table):
+    ret = None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT ENGINE FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", [table])
+        row = cursor.fetchone()
+        if row:
+            ret = row[0]
+    return ret
+
+def keepMyISAM(sender, using=DEFAULT_DB_ALIAS, verbosity=1, **kwargs):
+    '''
+    post_migrate receiver, converts the change event table to MyISAM if 
+    it is on another engine
+    '''
+
+    connection = connections[using]
+    if connection.vendor != "mysql":
+        return
+    table = ChangeEvent._meta.db_table
+    try:
+        current = getEngine(connection, table)
+        if current and current.lower() != ENGINE.lower():
+            if verbosity > 0:
+                print("Converting {} from {} to {}".format(table, current, ENGINE))
+            with connection.cursor() as cursor:
+                cursor.execute("ALTER TABLE {} ENGINE={}".format(connection.ops.quote_name(table), ENGINE))
+    except:
+        LOG.error("keepMyISAM exception: {} unable to convert {} to {}".format(sys.exc_info()[0], table, ENGINE))
@@ -0,0 +1,60 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+from __future__ import unicode_literals
+
+from django.db import models
+
+'''
+A change event records that a resource the scheduler cares about was
+created, updated or deleted. Views append a row for each change, and the
+scheduler (when run in event mode) reads rows newer than the last one it
+saw, so that it only has to process the routing slips that were affected
+instead of walking every slip of the clinic on each cycle.
+
+The id of the row doubles as a monotonically increasing sequence number.
+Tablets and the dashboard subscribe to the same rows (see views.py) to 
+learn of queue and clinicstation changes without polling. For those, data
+holds the new state of the resource as JSON, so that a subscriber can 
+apply the change without reading the resource back.
+
+clinic, patient and routingslip are stored as plain integers rather than
+foreign keys so that an event outlives the object it describes (e.g., the
+delete of a routing slip).
+
+wake is False for changes the scheduler made itself (see notifyChange()
+in notify.py), which the scheduler skips when reading events back.
+'''
+
+class ChangeEvent(models.Model):
+    resource = models.CharField(max_length=32)  # e.g., "routingslip", "clinicstation"
+    resourceid = models.IntegerField()
+    CREATE = 'c'
+    UPDATE = 'u'
+    DELETE = 'd'
+    ACTION_CHOICES = ((CREATE, "create"),
+                      (UPDATE, "update"),
+                      (DELETE, "delete"))
+    action = models.CharField(
+        max_length = 1,
+        choices = ACTION_CHOICES,
+        default = UPDATE,
+    )
+    clinic = models.IntegerField(null=True)
+    patient = models.IntegerField(null=True)
+    routingslip = models.IntegerField(null=True)
+    timestamp = models.DateTimeField(auto_now_add=True)
+    data = models.TextField(null=True)  # JSON, or null if not published
+    wake = models.BooleanField(default=True)
@@ -0,0 +1,125 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+import json
+import socket
+import sys
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from changeevent.models import ChangeEvent
+
+import logging
+
+LOG = logging.getLogger("tscharts")
+
+# id of the newest change event, lets waiting subscribers see that there
+# is something new without querying the database (see views.py)
+
+CHANGE_SEQ_KEY = "tscharts.changeevent.seq"
+
+def getChangeSeq():
+    ret = None
+    try:
+        ret = cache.get(CHANGE_SEQ_KEY)
+    except:
+        pass
+    return ret
+
+def wakeScheduler():
+    '''
+    poke the scheduler so that it reads the change event table right away.
+    The datagram carries no data, the table is the source of truth. If the
+    scheduler is not running (or not in event mode) the send fails and is
+    ignored, the scheduler will pick the event up the next time it runs.
+    '''
+
+    path = getattr(settings, "SCHEDULER_EVENT_SOCKET", None)
+    if not path:
+        return
+    s = None
+    try:
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        s.setblocking(0)
+        s.sendto(b"e", path)
+    except:
+        pass
+    if s:
+        s.close()
+
+def recordChange(resource, resourceid, action, clinic, patient, routingslip, data, wake):
+    ret = True
+    try:
+        if data != None:
+            data = json.dumps(data, cls=DjangoJSONEncoder)
+        event = ChangeEvent(resource=resource,
+                            resourceid=resourceid,
+                            action=action,
+                            clinic=clinic,
+                            patient=patient,
+                            routingslip=routingslip,
+                            data=data,
+                            wake=wake)
+        event.save()
+    except:
+        LOG.error("notifyChange unable to record {} {} {}: {}".format(resource, resourceid, action, sys.exc_info()[0]))
+        ret = False
+    if ret:
+        try:
+            cache.set(CHANGE_SEQ_KEY, event.id, None)
+        except:
+            pass
+        if wake:
+            wakeScheduler()
+    return ret
+
+def notifyChange(resource, resourceid, action, clinic=None, patient=None, routingslip=None, data=None, wake=True):
+    '''
+    record a change event. data, if given, is the new state of the resource
+    for subscribers and must be serializable to JSON. wake is False when 
+    the change is made by the scheduler itself, the scheduler is then not
+    woken, and skips the event when it reads events back.
+
+    Inside an atomic block the event is recorded when the transaction 
+    commits, and not at all if it rolls back, so subscribers never see a 
+    change before it can be read. Subscribers page through events by id,
+    which is why the change event table stays on MyISAM (see 
+    engine.py): an id there is visible as soon as it is handed
+    out, so a later id can never show up ahead of an earlier one.
+    '''
+
+    args = (resource, resourceid, action, clinic, patient, routingslip, data, wake)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: recordChange(*args))
+        return True
+    return recordChange(*args)
+
+def pruneChangeEvents(before):
+    '''
+    delete change events recorded before the datetime before. Subscribers
+    that ask for events older than the oldest remaining one are told to 
+    reload (see views.py).
+    '''
+
+    ret = True
+    try:
+        ChangeEvent.objects.filter(timestamp__lt=before).delete()
+    except:
+        LOG.error("pruneChangeEvents unable to delete events: {}".format(sys.exc_info()[0]))
+        ret = False
+    return ret
@@ -0,0 +1,242 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAuthenticated
+from changeevent.models import ChangeEvent
+from changeevent.notify import getChangeSeq
+from clinic.models import Clinic
+from django.db.models import Q
+from django.http import HttpResponseBadRequest, HttpResponseNotFound, HttpResponseServerError, StreamingHttpResponse
+
+import json
+import sys
+import time
+
+import logging
+
+LOG = logging.getLogger("tscharts")
+
+'''
+Subscription to change events. A client loads the resources it displays
+(e.g., GET /tscharts/v1/queue/), asks for the current sequence number, 
+and from then on asks for the events that follow the last sequence number
+it has seen. If there are none the request waits (long-poll) until one 
+arrives or wait seconds pass. With format=sse (or Accept: 
+text/event-stream) the events are streamed as Server-Sent Events instead,
+resuming from Last-Event-ID when the client reconnects.
+
+Waiting requests check the sequence number kept in the cache by 
+notifyChange() and only query the database when it moved, or every 
+DB_CHECK_INTERVAL seconds in case the cache missed an update. 
+'''
+
+POLL_INTERVAL = 0.5         # seconds between checks of the cache
+DB_CHECK_INTERVAL = 5       # seconds between checks of the database
+MAX_WAIT = 55               # long-poll, keep below proxy timeouts
+MAX_STREAM = 600            # SSE, clients reconnect after this
+KEEPALIVE_INTERVAL = 15     # SSE
+MAX_EVENTS = 500
+
+class EventStreamRenderer(BaseRenderer):
+    media_type = "text/event-stream"
+    format = "sse"
+    charset = "utf-8"
+
+    def render(self, data, media_type=None, renderer_context=None):
+        return json.dumps(data)
+
+class ChangeEventView(APIView):
+
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    renderer_classes = (JSONRenderer, EventStreamRenderer)
+
+    def getHighWater(self):
+        ret = 0
+        last = ChangeEvent.objects.order_by("-id")[:1]
+        if len(last):
+            ret = last[0].id
+        return ret
+
+    def isPruned(self, since):
+        '''
+        True if events following since may have been deleted by the 
+        scheduler (see pruneChangeEvents()), in which case the client
+        must reload
+        '''
+
+        ret = False
+        first = ChangeEvent.objects.order_by("id")[:1]
+        if len(first) and since + 1 < first[0].id:
+            ret = True
+        return ret
+
+    def getEvents(self, clinicid, resources, since, high):
+        kwargs = {}
+        kwargs["id__gt"] = since
+        kwargs["id__lte"] = high
+        if resources:
+            kwargs["resource__in"] = resources
+        return list(ChangeEvent.objects.filter(Q(clinic=clinicid) | Q(clinic__isnull=True), **kwargs).order_by("id")[:MAX_EVENTS])
+
+    def getEventData(self, x):
+        m = {}
+        m["seq"] = x.id
+        m["resource"] = x.resource
+        m["id"] = x.resourceid
+        m["action"] = x.get_action_display()
+        m["patient"] = x.patient
+        m["routingslip"] = x.routingslip
+        m["timestamp"] = x.timestamp
+        if x.data == None:
+            m["data"] = None
+        else:
+            m["data"] = json.loads(x.data)
+        return m
+
+    def waitForEvents(self, clinicid, resources, since, wait):
+        '''
+        returns (seq, events), seq is where the next request should resume,
+        it passes events that were filtered out
+        '''
+
+        events = []
+        deadline = time.time() + wait
+        lastCheck = None
+        while True:
+            now = time.time()
+            cached = getChangeSeq()
+            if cached == None or cached > since or lastCheck == None or now - lastCheck >= DB_CHECK_INTERVAL:
+                lastCheck = now
+                high = self.getHighWater()
+                if high > since:
+                    events = self.getEvents(clinicid, resources, since, high)
+                    if len(events) == MAX_EVENTS:
+                        since = events[-1].id
+                    else:
+                        since = high
+                    if len(events):
+                        break
+            if now >= deadline:
+                break
+            time.sleep(POLL_INTERVAL)
+        return (since, events)
+
+    def streamEvents(self, clinicid, resources, since, wait):
+        deadline = time.time() + wait
+        try:
+            if self.isPruned(since):
+                yield "event: reset\ndata: {}\n\n".format(json.dumps({"seq": self.getHighWater()}))
+                return
+            while time.time() < deadline:
+                timeout = min(KEEPALIVE_INTERVAL, deadline - time.time())
+                since, events = self.waitForEvents(clinicid, resources, since, timeout)
+                if len(events) == 0:
+                    # lets the client (and proxies) know the connection
+                    # is alive, and records where to resume
+
+                    yield "id: {}\n: keepalive\n\n".format(since)
+                for x in events:
+                    data = json.dumps(self.getEventData(x), default=str)
+                    yield "id: {}\nevent: {}\ndata: {}\n\n".format(x.id, x.resource, data)
+        except:
+            LOG.error("ChangeEventView stream exception: {}".format(sys.exc_info()[0]))
+
+    def get(self, request, format=None):
+        badRequest = False
+        notFound = False
+        internalError = False
+        since = None
+        wait = 25
+        resources = None
+        ret = {}
+
+        sse = request.accepted_renderer.format == "sse"
+
+        clinicid = request.GET.get('clinic', '')
+        if clinicid == '':
+            badRequest = True
+        else:
+            try:
+                clinicid = int(clinicid)
+                if not Clinic.objects.filter(id=clinicid).exists():
+                    notFound = True
+            except:
+                badRequest = True
+
+        val = request.GET.get('since', '')
+        if val == '' and sse:
+            val = request.META.get("HTTP_LAST_EVENT_ID", '')
+        if not val == '':
+            try:
+                since = int(val)
+                if since < 0:
+                    badRequest = True
+            except:
+                badRequest = True
+
+        val = request.GET.get('wait', '')
+        if sse:
+            wait = MAX_STREAM
+        if not val == '':
+            try:
+                wait = int(val)
+                if wait < 0:
+                    badRequest = True
+                elif sse:
+                    wait = min(wait, MAX_STREAM)
+                else:
+                    wait = min(wait, MAX_WAIT)
+            except:
+                badRequest = True
+
+        val = request.GET.get('resource', '')
+        if not val == '':
+            resources = val.split(",")
+
+        if badRequest:
+            return HttpResponseBadRequest()
+        if notFound:
+            return HttpResponseNotFound()
+
+        try:
+            if since == None:
+                # start of a subscription
+
+                since = self.getHighWater()
+                if not sse:
+                    ret = {"seq": since, "reset": False, "events": []}
+            elif not sse and self.isPruned(since):
+                ret = {"seq": self.getHighWater(), "reset": True, "events": []}
+            elif not sse:
+                since, events = self.waitForEvents(clinicid, resources, since, wait)
+                ret = {"seq": since, "reset": False, "events": [self.getEventData(x) for x in events]}
+        except:
+            LOG.error("ChangeEventView exception: {}".format(sys.exc_info()[0]))
+            internalError = True
+
+        if internalError:
+            return HttpResponseServerError()
+        if sse:
+            response = StreamingHttpResponse(self.streamEvents(clinicid, resources, since, wait), content_type="text/event-stream")
+            response["Cache-Control"] = "no-cache"
+            # nginx, otherwise it buffers the stream
+            response["X-Accel-Buffering"] = "no"
+            return response
+        return Response(ret)
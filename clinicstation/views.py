@@ -26,10 +26,29 @@ from django.core import serializers
 from django.http import HttpResponse, HttpResponseForbidden, HttpResponseBadRequest, HttpResponseServerError, HttpResponseNotFound
 
 from common.decorators import *
+from changeevent.models import ChangeEvent
+from changeevent.notify import notifyChange
 
 import json
 import sys
 
+def getClinicStationData(x):
+    m = {}
+    m["id"] = x.id  
+    m["name"] = x.name
+    m["name_es"] = x.name_es
+    m["clinic"] = x.clinic_id
+    m["station"] = x.station_id
+    m["active"] = x.active
+    m["level"] = x.level
+    m["away"] = x.away
+    m["awaytime"] = x.awaytime
+    m["willreturn"] = x.willreturn
+    m["activepatient"] = x.activepatient_id
+    m["nextpatient"] = x.nextpatient_id
+    m["finished"] = x.finished
+    return m
+
 class ClinicStationView(APIView):
 
     authentication_classes = (TokenAuthentication,)
@@ -99,39 +118,11 @@ class ClinicStationView(APIView):
             return HttpResponseNotFound()
         else:
             if clinic_station_id:
-                m = {}
-                m["id"] = clinic_station.id  
-                m["name"] = clinic_station.name
-                m["name_es"] = clinic_station.name_es
-                m["clinic"] = clinic_station.clinic_id
-                m["station"] = clinic_station.station_id
-                m["active"] = clinic_station.active
-                m["level"] = clinic_station.level
-                m["away"] = clinic_station.away
-                m["awaytime"] = clinic_station.awaytime
-                m["willreturn"] = clinic_station.willreturn
-                m["activepatient"] = clinic_station.activepatient_id
-                m["nextpatient"] = clinic_station.nextpatient_id
-                m["finished"] = clinic_station.finished
-                ret = m
+                ret = getClinicStationData(clinic_station)
             else: 
                 ret = []
                 for x in clinic_station:
-                    m = {}
-                    m["id"] = x.id  
-                    m["name"] = x.name
-                    m["name_es"] = x.name_es
-                    m["clinic"] = x.clinic_id
-                    m["station"] = x.station_id
-                    m["active"] = x.active
-                    m["level"] = x.level
-                    m["away"] = x.away
-                    m["awaytime"] = x.awaytime
-                    m["willreturn"] = x.willreturn
-                    m["activepatient"] = x.activepatient_id
-                    m["nextpatient"] = x.nextpatient_id
-                    m["finished"] = x.finished
-                    ret.append(m)
+                    ret.append(getClinicStationData(x))
                 # sort by station type
                 
                 ret = sorted(ret, key = lambda i: (i['station'], i['id']))
@@ -262,6 +253,9 @@ class ClinicStationView(APIView):
         if implError:
             return HttpResponseServerError(implMsg) 
         else:
+            notifyChange("clinicstation", clinic_station.id,
+                         ChangeEvent.CREATE, clinic=clinic_station.clinic_id,
+                         data=getClinicStationData(clinic_station))
             return Response({'id': clinic_station.id})
 
     @log_request
@@ -369,6 +363,10 @@ class ClinicStationView(APIView):
                     if hasNextPatient:
                         clinic_station.nextpatient_id = nextpatient
                     clinic_station.save()
+                    notifyChange("clinicstation", clinic_station.id,
+                                 ChangeEvent.UPDATE,
+                                 clinic=clinic_station.clinic_id,
+                                 data=getClinicStationData(clinic_station))
                 except:
                     implError = True
                     implMsg = sys.exc_info()[0] 
@@ -401,6 +399,8 @@ class ClinicStationView(APIView):
         if not clinic_station:
             raise NotFound
         else:
+            notifyChange("clinicstation", clinic_station.id,
+                         ChangeEvent.DELETE, clinic=clinic_station.clinic_id)
             clinic_station.delete()
 
         return Response({})
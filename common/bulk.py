@@ -0,0 +1,232 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+bulk create and update for the chart resources (dental state, ENT exam,
+etc.), so that a tablet saving a whole chart makes one request instead of
+one per record. POST and PUT of <resource>/bulk/ take a JSON list of the
+objects that a POST or PUT of the resource itself takes (for PUT, each 
+with its "id"), and return a list with a result for each, in order: 
+{"status": 200, "id": id} or {"status": 400 | 404}.
+
+Items are validated by the resource's own view (validatePostArgs and 
+validatePutArgs), with one query for each kind of referenced object 
+(clinic, patient, etc.) rather than one per item. Those that fail are 
+reported and skipped, the others are written in one transaction, all 
+with a single INSERT when creating.
+'''
+
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAuthenticated
+from django.db import transaction
+from django.db.models import Max
+from django.http import HttpResponseBadRequest, HttpResponseServerError
+
+from common.decorators import *
+
+import json
+import sys
+
+import logging
+
+LOG = logging.getLogger("tscharts")
+
+MAX_BULK_ITEMS = 500
+
+class BulkView(APIView):
+    '''
+    subclasses set chartView, the view of the resource, model, and 
+    references, a list of (field, model) for the objects an item refers 
+    to by id (e.g., ("clinic", Clinic)).
+    '''
+
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    chartView = None
+    model = None
+    references = ()
+
+    def getItems(self, request):
+        '''
+        returns the list of items in the body, or None if it is not a 
+        list of 1 to MAX_BULK_ITEMS objects
+        '''
+
+        ret = None
+        try:
+            data = json.loads(request.body)
+            if type(data) == list and len(data) > 0 and len(data) <= MAX_BULK_ITEMS:
+                ret = data
+                for x in data:
+                    if type(x) != dict:
+                        ret = None
+                        break
+        except:
+            pass
+        return ret
+
+    def getReferences(self, items):
+        '''
+        returns a dict mapping each reference field to a dict of id to
+        object, for the ids used by items
+        '''
+
+        ret = {}
+        for field, model in self.references:
+            ids = set()
+            for x in items:
+                try:
+                    ids.add(int(x[field]))
+                except:
+                    pass
+            ret[field] = model.objects.in_bulk(list(ids))
+        return ret
+
+    def makeObject(self, view, item, refs):
+        '''
+        returns (status, object) for an item of a POST, the object not
+        yet saved
+        '''
+
+        try:
+            ids = [(field, int(item[field])) for field, model in self.references]
+
+            # validatePostArgs modifies what it is given
+
+            valid, kwargs = view.validatePostArgs(dict(item))
+        except:
+            valid = False
+        if not valid:
+            return 400, None
+        for field, id in ids:
+            if not id in refs[field]:
+                return 404, None
+            kwargs[field] = refs[field][id]
+        try:
+            obj = self.model(**kwargs)
+        except:
+            LOG.warning("BulkView unable to create {}: {}".format(self.model.__name__, sys.exc_info()[0]))
+            return 400, None
+        return 200, obj
+
+    def insertObjects(self, objs):
+        '''
+        insert objs with bulk_create() and return their ids, which it does
+        not set with MySQL. They are the rows past the largest id before
+        the insert: inside the transaction no other rows are visible there
+        with InnoDB, and with MyISAM, which has no transactions, rows of
+        other requests are excluded by the references. If the rows found 
+        do not match, the ids are returned as None.
+        '''
+
+        with transaction.atomic():
+            last = self.model.objects.aggregate(Max("id"))["id__max"]
+            if last == None:
+                last = 0
+            self.model.objects.bulk_create(objs)
+            kwargs = {"id__gt": last}
+            for field, model in self.references:
+                kwargs[field + "__in"] = list(set([getattr(x, field + "_id") for x in objs]))
+            ids = list(self.model.objects.filter(**kwargs).order_by("id").values_list("id", flat=True))
+        if len(ids) != len(objs):
+            LOG.warning("BulkView inserted {} {} rows, found {}".format(len(objs), self.model.__name__, len(ids)))
+            ids = [None] * len(objs)
+        return ids
+
+    @log_request
+    def post(self, request, format=None):
+        items = self.getItems(request)
+        if items == None:
+            return HttpResponseBadRequest()
+
+        view = self.chartView()
+        try:
+            refs = self.getReferences(items)
+        except:
+            LOG.error("BulkView unable to get references: {}".format(sys.exc_info()[0]))
+            return HttpResponseServerError()
+
+        results = []
+        objs = []
+        for x in items:
+            status, obj = self.makeObject(view, x, refs)
+            results.append({"status": status})
+            if obj:
+                objs.append(obj)
+
+        if len(objs):
+            try:
+                ids = self.insertObjects(objs)
+            except:
+                LOG.error("BulkView unable to insert {} {} rows: {}".format(len(objs), self.model.__name__, sys.exc_info()[0]))
+                return HttpResponseServerError()
+            ids.reverse()
+            for x in results:
+                if x["status"] == 200:
+                    x["id"] = ids.pop()
+        return Response(results)
+
+    @log_request
+    def put(self, request, format=None):
+        items = self.getItems(request)
+        if items == None:
+            return HttpResponseBadRequest()
+
+        view = self.chartView()
+        ids = []
+        for x in items:
+            try:
+                ids.append(int(x["id"]))
+            except:
+                ids.append(None)
+        try:
+            existing = self.model.objects.in_bulk([x for x in ids if x != None])
+        except:
+            LOG.error("BulkView unable to get {} rows: {}".format(self.model.__name__, sys.exc_info()[0]))
+            return HttpResponseServerError()
+
+        results = []
+        objs = []
+        for id, x in zip(ids, items):
+            if id == None:
+                results.append({"status": 400})
+                continue
+            if not id in existing:
+                results.append({"status": 404, "id": id})
+                continue
+            data = dict(x)
+            del data["id"]
+            try:
+                valid, obj = view.validatePutArgs(data, existing[id])
+            except:
+                valid = False
+            if not valid:
+                results.append({"status": 400, "id": id})
+                continue
+            results.append({"status": 200, "id": id})
+            objs.append(obj)
+
+        if len(objs):
+            try:
+                with transaction.atomic():
+                    for x in objs:
+                        x.save()
+            except:
+                LOG.error("BulkView unable to update {} {} rows: {}".format(len(objs), self.model.__name__, sys.exc_info()[0]))
+                return HttpResponseServerError()
+        return Response(results)
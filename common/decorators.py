@@ -18,63 +18,66 @@
 import logging
 LOGGER = logging.getLogger(__name__)
 import sys
+import time
 
-from requestlog.models import RequestLog
+from django.utils import timezone
+from requestlog.writer import logRequest, isSampled
+
+def getRequestRecord(request):
+    '''
+    returns the RequestLog fields of a request, as a dict
+    '''
+
+    auth = request.auth
+    if auth == None:
+        auth = u''
+    return {"method": request.method,
+            "user": request.user.username,
+            "path": request.get_full_path(),
+            "origin": request.META.get('HTTP_HOST', u'Unknown'),
+            "useragent": request.META.get('HTTP_USER_AGENT', u'Unknown'),
+            "auth": unicode(auth),
+            "auths": u'\n    '.join(unicode(x) for x in request.authenticators),
+            "body": request.body.decode("utf-8", "replace"),
+            "files": u'\n    '.join(u'%s: %s' % (k,v) for k,v in sorted(request.FILES.items())),
+            "content": request.content_type,
+            "timestamp": timezone.now()}
 
 def log_request(func_to_decorate):
+    '''
+    record the request, its status and the time taken by the view in the
+    RequestLog. Records are written in the background, see 
+    requestlog/writer.py, so the request does not wait for the database.
+    '''
+
     def wrapper(*args, **kwargs):
+        record = None
         try:
             request = args[1]
-            method = request.method
-            user = request.user.username
-            path = request.get_full_path()
-            origin = request.META.get('HTTP_HOST', u'Unknown')
-            useragent = request.META.get('HTTP_USER_AGENT', u'Unknown')
-            auth = request.auth
-            auths = u'\n    '.join(unicode(x) for x in request.authenticators)
-            body = request.body
-            files = u'\n    '.join(u'%s: %s' % (k,v) for k,v in sorted(request.FILES.items()))
-            content = request.content_type
+            if isSampled(request.method):
+                # the body is read before the view reads the stream 
 
-            r = RequestLog(method = method,
-                           user = user, 
-                           path = path, 
-                           origin = origin,
-                           useragent = useragent,
-                           auth = auth,
-                           auths = auths,
-                           body = body,
-                           files = files,
-                           content = content)
-            r.save()
+                record = getRequestRecord(request)
         except:
             LOGGER.info(u'REQUEST_LOG: Exception trying to log request {}'.format(sys.exc_info()[0]))
-            try:
-                # logging to DB failed, try to log to file instead
 
-                LOGGER.info(u'REQUEST_LOG: %(method)s request on “%(path)s” for %(user)s '
-                    u'from %(origin)s (%(useragent)s):\n'
-                    u'auth: %(auth)s, authenticators: [\n%(auths)s\n]\n'
-                    u'content-type: %(content)s\n'
-                    u'data: %(data)s\n'
-                    u'files: {\n    %(files)s\n}' % {
-                        'method': request.method,
-                        'user': request.user.username,
-                        'path': request.get_full_path(),
-                        'origin': request.META.get('HTTP_HOST', u'Unknown'),
-                        'useragent': request.META.get('HTTP_USER_AGENT',
-                                                   u'Unknown'),
-                        'auth': request.auth,
-                        'auths': u'\n    '.join(
-                            unicode(x) for x in request.authenticators),
-                        'data': data,
-                        'files': u'\n    '.join(u'%s: %s' % (k,v)
-                            for k,v in sorted(request.FILES.items())),
-                        'content': request.content_type,
-                        }
-                    )
-            except:
-                LOGGER.info(u'REQUEST_LOG: Exception trying to log request to file {}'.format(sys.exc_info()[0]))
-        result = func_to_decorate(*args, **kwargs)
+        start = time.time()
+        status = 500
+        try:
+            result = func_to_decorate(*args, **kwargs)
+            status = getattr(result, "status_code", 200)
+        except Exception as e:
+            # e.g., NotFound, handled by the framework
+
+            status = getattr(e, "status_code", 500)
+            raise
+        finally:
+            if record != None:
+                try:
+                    record["elapsed"] = int((time.time() - start) * 1000)
+                    record["status"] = status
+                    logRequest(record)
+                except:
+                    LOGGER.info(u'REQUEST_LOG: Exception trying to log request {}'.format(sys.exc_info()[0]))
         return result
     return wrapper
@@ -13,3 +13,6 @@ class Consent(models.Model):
     clinic = models.ForeignKey(Clinic)
     general_consent = models.BooleanField(default = False)
     photo_consent = models.BooleanField(default = False)
+
+    class Meta:
+        index_together = [["patient", "clinic"]]
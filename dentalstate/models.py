@@ -77,3 +77,6 @@ class DentalState(models.Model):
     surface = models.CharField(max_length = 10, choices = DENTAL_SURFACE_CHOICES, default = DENTAL_SURFACE_NONE)
 
     comment = models.TextField(default = "")
+
+    class Meta:
+        index_together = [["patient", "clinic"]]
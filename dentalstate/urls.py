@@ -14,9 +14,10 @@
 #limitations under the License.
 
 from django.conf.urls import url
-from dentalstate.views import DentalStateView
+from dentalstate.views import DentalStateView, DentalStateBulkView
 
 urlpatterns = [
     url(r'^$', DentalStateView.as_view()),
+    url(r'^bulk/$', DentalStateBulkView.as_view()),
     url(r'^([0-9]+)/$', DentalStateView.as_view()),
 ]
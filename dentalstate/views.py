@@ -26,6 +26,7 @@ from django.core import serializers
 from django.http import HttpResponse, HttpResponseForbidden, HttpResponseBadRequest, HttpResponseServerError, HttpResponseNotFound
 
 from common.decorators import *
+from common.bulk import BulkView
 
 import traceback
 
@@ -672,3 +673,8 @@ class DentalStateView(APIView):
             dental_state.delete()
 
         return Response({})
+
+class DentalStateBulkView(BulkView):
+    chartView = DentalStateView
+    model = DentalState
+    references = (("clinic", Clinic), ("patient", Patient), ("code", DentalCDT))
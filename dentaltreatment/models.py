@@ -73,3 +73,6 @@ class DentalTreatment(models.Model):
 
     comment = models.TextField(default = "")
 
+    class Meta:
+        index_together = [["patient", "clinic"]]
+
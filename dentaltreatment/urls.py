@@ -14,9 +14,10 @@
 #limitations under the License.
 
 from django.conf.urls import url
-from dentaltreatment.views import DentalTreatmentView
+from dentaltreatment.views import DentalTreatmentView, DentalTreatmentBulkView
 
 urlpatterns = [
     url(r'^$', DentalTreatmentView.as_view()),
+    url(r'^bulk/$', DentalTreatmentBulkView.as_view()),
     url(r'^([0-9]+)/$', DentalTreatmentView.as_view()),
 ]
@@ -26,6 +26,7 @@ from django.core import serializers
 from django.http import HttpResponse, HttpResponseForbidden, HttpResponseBadRequest, HttpResponseServerError, HttpResponseNotFound
 
 from common.decorators import *
+from common.bulk import BulkView
 #from collections import namedtuple
 
 import traceback
@@ -575,3 +576,8 @@ class DentalTreatmentView(APIView):
             dental_treatment.delete()
 
         return Response({})
+
+class DentalTreatmentBulkView(BulkView):
+    chartView = DentalTreatmentView
+    model = DentalTreatment
+    references = (("clinic", Clinic), ("patient", Patient))
@@ -89,3 +89,6 @@ class ENTDiagnosis(models.Model):
 
     syndromeHemifacialMicrosomia = models.CharField(max_length = 1, choices = EAR_SIDE_CHOICES, default = EAR_SIDE_NONE)
     syndromePierreRobin = models.CharField(max_length = 1, choices = EAR_SIDE_CHOICES, default = EAR_SIDE_NONE)
+
+    class Meta:
+        index_together = [["patient", "clinic"]]
@@ -14,9 +14,10 @@
 #limitations under the License.
 
 from django.conf.urls import url
-from entdiagnosis.views import ENTDiagnosisView
+from entdiagnosis.views import ENTDiagnosisView, ENTDiagnosisBulkView
 
 urlpatterns = [
     url(r'^$', ENTDiagnosisView.as_view()),
+    url(r'^bulk/$', ENTDiagnosisBulkView.as_view()),
     url(r'^([0-9]+)/$', ENTDiagnosisView.as_view()),
 ]
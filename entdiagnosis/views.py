@@ -26,6 +26,7 @@ from django.core import serializers
 from django.http import HttpResponse, HttpResponseForbidden, HttpResponseBadRequest, HttpResponseServerError, HttpResponseNotFound
 
 from common.decorators import *
+from common.bulk import BulkView
 
 import sys
 import numbers
@@ -505,3 +506,8 @@ class ENTDiagnosisView(APIView):
             ent_diagnosis.delete()
 
         return Response({})
+
+class ENTDiagnosisBulkView(BulkView):
+    chartView = ENTDiagnosisView
+    model = ENTDiagnosis
+    references = (("clinic", Clinic), ("patient", Patient))
@@ -14,9 +14,10 @@
 #limitations under the License.
 
 from django.conf.urls import url
-from entdiagnosisextra.views import ENTDiagnosisExtraView
+from entdiagnosisextra.views import ENTDiagnosisExtraView, ENTDiagnosisExtraBulkView
 
 urlpatterns = [
     url(r'^$', ENTDiagnosisExtraView.as_view()),
+    url(r'^bulk/$', ENTDiagnosisExtraBulkView.as_view()),
     url(r'^([0-9]+)/$', ENTDiagnosisExtraView.as_view()),
 ]
@@ -25,6 +25,7 @@ from django.core import serializers
 from django.http import HttpResponse, HttpResponseForbidden, HttpResponseBadRequest, HttpResponseServerError, HttpResponseNotFound
 
 from common.decorators import *
+from common.bulk import BulkView
 
 import sys
 import numbers
@@ -246,3 +247,8 @@ class ENTDiagnosisExtraView(APIView):
             ent_diagnosis_extra.delete()
 
         return Response({})
+
+class ENTDiagnosisExtraBulkView(BulkView):
+    chartView = ENTDiagnosisExtraView
+    model = ENTDiagnosisExtra
+    references = (("entdiagnosis", ENTDiagnosis),)
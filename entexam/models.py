@@ -130,3 +130,6 @@ class ENTExam(models.Model):
     cleft_palate = models.BooleanField(default = False)
     repaired_lip = models.CharField(max_length = 1, choices = EAR_TRI_STATE_BOOLEAN_CHOICES, default = EAR_TRI_STATE_BOOLEAN_NA)
     repaired_palate = models.CharField(max_length = 1, choices = EAR_TRI_STATE_BOOLEAN_CHOICES, default = EAR_TRI_STATE_BOOLEAN_NA)
+
+    class Meta:
+        index_together = [["patient", "clinic"]]
@@ -14,9 +14,10 @@
 #limitations under the License.
 
 from django.conf.urls import url
-from entexam.views import ENTExamView
+from entexam.views import ENTExamView, ENTExamBulkView
 
 urlpatterns = [
     url(r'^$', ENTExamView.as_view()),
+    url(r'^bulk/$', ENTExamBulkView.as_view()),
     url(r'^([0-9]+)/$', ENTExamView.as_view()),
 ]
@@ -26,6 +26,7 @@ from django.core import serializers
 from django.http import HttpResponse, HttpResponseForbidden, HttpResponseBadRequest, HttpResponseServerError, HttpResponseNotFound
 
 from common.decorators import *
+from common.bulk import BulkView
 
 import sys
 import numbers
@@ -1043,3 +1044,8 @@ class ENTExamView(APIView):
             ent_exam.delete()
 
         return Response({})
+
+class ENTExamBulkView(BulkView):
+    chartView = ENTExamView
+    model = ENTExam
+    references = (("clinic", Clinic), ("patient", Patient))
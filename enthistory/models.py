@@ -51,3 +51,6 @@ class ENTHistory(models.Model):
     painDuration = models.CharField(max_length = 1, choices = EAR_DURATION_CHOICES, default = EAR_DURATION_NONE)
 
     comment = models.TextField(default = "")
+
+    class Meta:
+        index_together = [["patient", "clinic"]]
@@ -14,9 +14,10 @@
 #limitations under the License.
 
 from django.conf.urls import url
-from enthistory.views import ENTHistoryView
+from enthistory.views import ENTHistoryView, ENTHistoryBulkView
 
 urlpatterns = [
     url(r'^$', ENTHistoryView.as_view()),
+    url(r'^bulk/$', ENTHistoryBulkView.as_view()),
     url(r'^([0-9]+)/$', ENTHistoryView.as_view()),
 ]
@@ -26,6 +26,7 @@ from django.core import serializers
 from django.http import HttpResponse, HttpResponseForbidden, HttpResponseBadRequest, HttpResponseServerError, HttpResponseNotFound
 
 from common.decorators import *
+from common.bulk import BulkView
 
 import sys
 import numbers
@@ -454,3 +455,8 @@ class ENTHistoryView(APIView):
             ent_history.delete()
 
         return Response({})
+
+class ENTHistoryBulkView(BulkView):
+    chartView = ENTHistoryView
+    model = ENTHistory
+    references = (("clinic", Clinic), ("patient", Patient))
@@ -14,9 +14,10 @@
 #limitations under the License.
 
 from django.conf.urls import url
-from enthistoryextra.views import ENTHistoryExtraView
+from enthistoryextra.views import ENTHistoryExtraView, ENTHistoryExtraBulkView
 
 urlpatterns = [
     url(r'^$', ENTHistoryExtraView.as_view()),
+    url(r'^bulk/$', ENTHistoryExtraBulkView.as_view()),
     url(r'^([0-9]+)/$', ENTHistoryExtraView.as_view()),
 ]
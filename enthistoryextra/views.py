@@ -25,6 +25,7 @@ from django.core import serializers
 from django.http import HttpResponse, HttpResponseForbidden, HttpResponseBadRequest, HttpResponseServerError, HttpResponseNotFound
 
 from common.decorators import *
+from common.bulk import BulkView
 
 import sys
 import numbers
@@ -341,3 +342,8 @@ class ENTHistoryExtraView(APIView):
             ent_history_extra.delete()
 
         return Response({})
+
+class ENTHistoryExtraBulkView(BulkView):
+    chartView = ENTHistoryExtraView
+    model = ENTHistoryExtra
+    references = (("enthistory", ENTHistory),)
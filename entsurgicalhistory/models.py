@@ -51,3 +51,6 @@ class ENTSurgicalHistory(models.Model):
     frenulectomy = models.BooleanField(default = False)
     frenulectomycomment = models.TextField(default = "")
     time = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        index_together = [["patient", "clinic"]]
@@ -14,9 +14,10 @@
 #limitations under the License.
 
 from django.conf.urls import url
-from entsurgicalhistory.views import ENTSurgicalHistoryView
+from entsurgicalhistory.views import ENTSurgicalHistoryView, ENTSurgicalHistoryBulkView
 
 urlpatterns = [
     url(r'^$', ENTSurgicalHistoryView.as_view()),
+    url(r'^bulk/$', ENTSurgicalHistoryBulkView.as_view()),
     url(r'^([0-9]+)/$', ENTSurgicalHistoryView.as_view()),
 ]
@@ -26,6 +26,7 @@ from django.core import serializers
 from django.http import HttpResponse, HttpResponseForbidden, HttpResponseBadRequest, HttpResponseServerError, HttpResponseNotFound
 
 from common.decorators import *
+from common.bulk import BulkView
 
 import sys
 import numbers
@@ -449,3 +450,8 @@ class ENTSurgicalHistoryView(APIView):
             ent_surgicalhistory.delete()
 
         return Response({})
+
+class ENTSurgicalHistoryBulkView(BulkView):
+    chartView = ENTSurgicalHistoryView
+    model = ENTSurgicalHistory
+    references = (("clinic", Clinic), ("patient", Patient))
@@ -150,3 +150,6 @@ class ENTTreatment(models.Model):
 
     comment = models.TextField(default = "")
 
+    class Meta:
+        index_together = [["patient", "clinic"]]
+
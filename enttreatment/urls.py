@@ -14,9 +14,10 @@
 #limitations under the License.
 
 from django.conf.urls import url
-from enttreatment.views import ENTTreatmentView
+from enttreatment.views import ENTTreatmentView, ENTTreatmentBulkView
 
 urlpatterns = [
     url(r'^$', ENTTreatmentView.as_view()),
+    url(r'^bulk/$', ENTTreatmentBulkView.as_view()),
     url(r'^([0-9]+)/$', ENTTreatmentView.as_view()),
 ]
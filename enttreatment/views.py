@@ -27,6 +27,7 @@ from django.core import serializers
 from django.http import HttpResponse, HttpResponseForbidden, HttpResponseBadRequest, HttpResponseServerError, HttpResponseNotFound
 
 from common.decorators import *
+from common.bulk import BulkView
 #from collections import namedtuple
 
 import traceback
@@ -761,3 +762,8 @@ class ENTTreatmentView(APIView):
             ent_treatment.delete()
 
         return Response({})
+
+class ENTTreatmentBulkView(BulkView):
+    chartView = ENTTreatmentView
+    model = ENTTreatment
+    references = (("clinic", Clinic), ("patient", Patient))
@@ -0,0 +1,167 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+The content addressed image store. Each distinct image file is an 
+ImageBlob, keyed by the SHA-256 of its content, with a count of the Image
+rows that use it. Storing content that is already in the store only takes
+a reference, and a file is only removed when its last reference goes.
+
+The store must also work on MyISAM tables, which have no transactions,
+and files are not part of a transaction anyway, so the count is kept 
+with single statement updates: a reference is only taken on a blob whose
+count is still above zero, and a blob is only deleted while its count is
+zero, so that a blob cannot be deleted and referenced at the same time. 
+If content is stored while its blob is being deleted, a new blob (with a
+new file, see getStorePath()) is made once the old row is gone.
+'''
+
+import os
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F
+
+from image.models import ImageBlob
+from image.storage import ImageStorageError, ImageHasher, ImageWriter, getStorePath, removeFile, decodeBase64, readStream
+from image.renditions import getSharedRenditionDir, removeRenditions
+
+import logging
+
+LOG = logging.getLogger("tscharts")
+
+ADD_RETRIES = 5
+
+def refBlob(sha256):
+    '''
+    take a reference on the blob with this content, returns the blob or 
+    None if there is none (or it is being deleted)
+    '''
+
+    ret = None
+    try:
+        blob = ImageBlob.objects.get(sha256=sha256)
+        n = ImageBlob.objects.filter(id=blob.id, refcount__gt=0).update(refcount=F("refcount") + 1)
+        if n == 1:
+            ret = blob
+    except ImageBlob.DoesNotExist:
+        pass
+    return ret
+
+def addBlob(writer, info):
+    '''
+    add the content written (and closed) by writer to the store, or take 
+    a reference on its blob if the content is already there. Returns the
+    blob, which has a reference for the caller.
+    '''
+
+    for i in range(ADD_RETRIES):
+        blob = refBlob(info["sha256"])
+        if blob:
+            writer.abort()
+            return blob
+        path = getStorePath(info["sha256"])
+        writer.commit(os.path.join(settings.CHART_IMAGES_DIR, path))
+        try:
+            return ImageBlob.objects.create(sha256=info["sha256"], path=path, size=info["size"], refcount=1)
+        except IntegrityError:
+            # stored by someone else meanwhile, or a blob with no references
+            # not yet deleted, try again
+
+            pass
+    writer.abort()
+    raise Exception("unable to add blob {}".format(info["sha256"]))
+
+def storeChunks(getChunks, sha256=None):
+    '''
+    store the content returned by getChunks(), an iterator of binary data. 
+    The content is hashed first, and only written if it is not already in
+    the store, so getChunks() may be called twice. Returns (blob, info), 
+    info as returned by ImageHasher.getInfo(). If sha256 is given, raises
+    ImageStorageError if the content does not have it.
+    '''
+
+    hasher = ImageHasher()
+    for chunk in getChunks():
+        hasher.write(chunk)
+    info = hasher.getInfo()
+    if sha256 != None and sha256.lower() != info["sha256"]:
+        raise ImageStorageError("sha256 mismatch, content is {}".format(info["sha256"]))
+    blob = refBlob(info["sha256"])
+    if blob == None:
+        writer = ImageWriter()
+        try:
+            for chunk in getChunks():
+                writer.write(chunk)
+            writer.close()
+        except:
+            writer.abort()
+            raise
+        blob = addBlob(writer, info)
+    return (blob, info)
+
+def storeBase64(data):
+    '''
+    store base64 data, as uploaded, as binary. Raises ImageStorageError if
+    data is not valid, canonical base64.
+    '''
+
+    return storeChunks(lambda: decodeBase64(data))
+
+def storeText(data):
+    '''
+    store data that is not base64 (or not canonical base64) as it was 
+    uploaded, as all images were stored before binary storage
+    '''
+
+    return storeChunks(lambda: [data.encode("utf-8")])
+
+def storeStream(stream, length=None):
+    '''
+    store binary data read from a file-like object, e.g., a request. It
+    can only be read once, so it is written while it is hashed, and the 
+    file discarded if the content is already in the store.
+    '''
+
+    writer = ImageWriter()
+    try:
+        for chunk in readStream(stream, length):
+            writer.write(chunk)
+        info = writer.close()
+    except:
+        writer.abort()
+        raise
+    return (addBlob(writer, info), info)
+
+def releaseBlob(blobid):
+    '''
+    drop a reference to a blob, removing it, its file and its renditions 
+    when it was the last. Call after deleting the Image that held it.
+    Returns True if the blob was removed.
+    '''
+
+    ret = False
+    try:
+        blob = ImageBlob.objects.get(id=blobid)
+    except ImageBlob.DoesNotExist:
+        LOG.error("releaseBlob blob {} does not exist".format(blobid))
+        return ret
+    ImageBlob.objects.filter(id=blob.id).update(refcount=F("refcount") - 1)
+    n, deleted = ImageBlob.objects.filter(id=blob.id, refcount__lte=0).delete()
+    if n:
+        removeFile(os.path.join(settings.CHART_IMAGES_DIR, blob.path))
+        removeRenditions(getSharedRenditionDir(blob.sha256), blob.sha256)
+        ret = True
+    return ret
@@ -21,6 +21,15 @@ from clinic.models import Clinic
 from station.models import Station
 from patient.models import Patient
 
+class ImageBlob(models.Model):
+    # an image file in the content addressed store, shared by all images
+    # with the same content. See blobs.py
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    path = models.TextField()       # relative to CHART_IMAGES_DIR
+    size = models.BigIntegerField(default=0)
+    refcount = models.IntegerField(default=0)
+
 class Image(models.Model):
     clinic = models.ForeignKey(Clinic, null=True)
     station = models.ForeignKey(Station, null=True)
@@ -38,3 +47,47 @@ class Image(models.Model):
     )
     path = models.TextField(default = "")
     timestamp = models.DateTimeField(auto_now=True)
+
+    # how the file at path is stored, see storage.py. Images uploaded 
+    # before binary storage are base64 text, and have no size, sha256 or
+    # mimetype
+
+    BASE64 = 'b'
+    BINARY = 'r'
+    ENCODING_CHOICES = ((BASE64, "base64"), (BINARY, "binary"))
+    encoding = models.CharField(
+        max_length = 1,
+        choices = ENCODING_CHOICES,
+        default = BASE64
+    )
+    size = models.BigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, default="")
+    mimetype = models.CharField(max_length=64, default="")
+    datauri = models.BooleanField(default=False) # uploaded as a data: URI
+
+    # images in the store share a file with others of the same content, 
+    # path is then the path of the blob. Images uploaded before the store
+    # have no blob until tools/imagededupe moves them there
+
+    blob = models.ForeignKey(ImageBlob, null=True, on_delete=models.PROTECT)
+
+    class Meta:
+        index_together = [["patient", "clinic", "imagetype", "timestamp"]]
+
+class ImageUpload(models.Model):
+    # an image being uploaded in chunks, see ImageUploadView. The chunks 
+    # received are files in CHART_IMAGES_DIR/uploads/<id>/
+
+    clinic = models.ForeignKey(Clinic, null=True)
+    station = models.ForeignKey(Station, null=True)
+    patient = models.ForeignKey(Patient)
+    imagetype = models.CharField(
+        max_length = 1,
+        choices = Image.IMAGETYPE_CHOICES
+    )
+    size = models.BigIntegerField()     # of the image, in bytes
+    timestamp = models.DateTimeField(auto_now_add=True)
+
+    # once committed, so that a client that missed the response can ask again
+
+    image = models.ForeignKey(Image, null=True, on_delete=models.SET_NULL)
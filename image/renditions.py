@@ -0,0 +1,247 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+Resized renditions (e.g., thumbnails) of images, so that clients showing
+previews need not download full size X-rays and headshots and scale them.
+
+A rendition is a JPEG (or WebP) no larger than size x size pixels. For 
+images in the content addressed store it is named after the SHA-256 of 
+the image and stored in CHART_IMAGES_DIR/renditions/, so that images with
+the same content share their renditions. Older images have theirs in 
+CHART_IMAGES_DIR/<patient>/renditions/, next to the original. The 
+thumbnail is made when an image is uploaded, other sizes when they are 
+first asked for. Requested sizes are rounded up to one of SIZES so that
+the number of renditions of an image stays small.
+
+Renditions are a cache. They are removed with their image (or with the 
+last image that shares them), and the least
+recently used are removed when they take more than 
+CHART_IMAGES_RENDITION_CACHE bytes. Use is tracked with the file mtime,
+and the size of the cache is only computed (by walking the renditions 
+directories) after RENDITION_PRUNE_FRACTION of the budget has been 
+written since it was last computed, a count kept in the Django cache.
+
+Requires Pillow. If it is not installed, or an image cannot be decoded 
+(e.g., DICOM), getRendition() returns None and callers send the original.
+'''
+
+import glob
+import io
+import os
+import sys
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from image.storage import getPatientDir, getImageFile, readBase64Chunks
+
+try:
+    from PIL import Image as PILImage
+except ImportError:
+    PILImage = None
+
+import logging
+
+LOG = logging.getLogger("tscharts")
+
+RENDITIONS = {"thumb": 64, "small": 256, "medium": 1024}
+SIZES = (64, 128, 256, 512, 1024, 2048)
+
+FORMATS = {"jpeg": ("JPEG", "image/jpeg", "jpg"),
+           "webp": ("WEBP", "image/webp", "webp")}
+
+QUALITY = 80
+TOUCH_INTERVAL = 3600               # seconds, mtime granularity for LRU
+RENDITION_PRUNE_FRACTION = 0.1
+RENDITION_BYTES_KEY = "tscharts.image.renditionbytes"
+
+def isAvailable():
+    return PILImage != None
+
+def getRenditionSize(rendition=None, size=None):
+    '''
+    returns the size of the rendition to use, or None if the arguments
+    are not valid. size is rounded up to one of SIZES.
+    '''
+
+    ret = None
+    if rendition != None:
+        ret = RENDITIONS.get(rendition, None)
+    elif size != None:
+        try:
+            size = int(size)
+            if size > 0:
+                for x in SIZES:
+                    if x >= size:
+                        ret = x
+                        break
+                if ret == None:
+                    ret = SIZES[-1]
+        except:
+            ret = None
+    return ret
+
+def getSharedRenditionDir(sha256):
+    return os.path.join(settings.CHART_IMAGES_DIR, "renditions", sha256[:2])
+
+def getRenditionLocation(image):
+    '''
+    returns (directory, name) of the renditions of an image
+    '''
+
+    if image.blob_id:
+        return (getSharedRenditionDir(image.sha256), image.sha256)
+    return (os.path.join(getPatientDir(image.patient_id), "renditions"), image.path)
+
+def getRenditionPath(image, size, fmt):
+    renditionDir, name = getRenditionLocation(image)
+    return os.path.join(renditionDir, "{}.{}.{}".format(name, size, FORMATS[fmt][2]))
+
+def getMimeType(fmt):
+    return FORMATS[fmt][1]
+
+def openOriginal(image):
+    fullPath = getImageFile(image)
+    if image.encoding == image.BINARY:
+        return open(fullPath, "rb")
+    return io.BytesIO(b"".join(readBase64Chunks(fullPath)))
+
+def createRendition(image, size, fmt="jpeg"):
+    ret = None
+    f = None
+    tmpPath = None
+    try:
+        f = openOriginal(image)
+        img = PILImage.open(f)
+
+        # for JPEG, decode at a reduced scale, much faster for large images
+
+        img.draft("RGB", (size, size))
+        img.thumbnail((size, size), PILImage.LANCZOS)
+        if img.mode in ["I;16", "I;16B", "I;16L", "I"]:
+            # 16 bit grayscale, e.g., X-rays
+
+            img = img.convert("I").point(lambda i: i * (1.0 / 256)).convert("L")
+        elif not img.mode in ["RGB", "L"]:
+            img = img.convert("RGB")
+
+        renditionDir = getRenditionLocation(image)[0]
+        try:
+            os.makedirs(renditionDir)
+        except OSError:
+            pass
+        ret = getRenditionPath(image, size, fmt)
+        tmpPath = os.path.join(renditionDir, ".{}.tmp".format(uuid.uuid4()))
+        img.save(tmpPath, FORMATS[fmt][0], quality=QUALITY)
+        os.rename(tmpPath, ret)
+        tmpPath = None
+        accountRendition(os.path.getsize(ret))
+    except:
+        LOG.info("createRendition unable to make {} rendition of image {}: {}".format(size, image.id, sys.exc_info()[0]))
+        ret = None
+    if f:
+        f.close()
+    if tmpPath:
+        try:
+            os.remove(tmpPath)
+        except:
+            pass
+    return ret
+
+def getRendition(image, size, fmt="jpeg"):
+    '''
+    returns the path of the rendition, making it if needed, or None if it
+    cannot be made
+    '''
+
+    if not isAvailable():
+        return None
+    ret = getRenditionPath(image, size, fmt)
+    try:
+        mtime = os.path.getmtime(ret)
+        if time.time() - mtime > TOUCH_INTERVAL:
+            os.utime(ret, None)
+    except OSError:
+        ret = createRendition(image, size, fmt)
+    return ret
+
+def removeRenditions(renditionDir, name):
+    '''
+    remove the renditions in renditionDir of the image named name, see 
+    getRenditionLocation()
+    '''
+
+    for x in glob.glob(os.path.join(renditionDir, "{}.*".format(name))):
+        try:
+            os.remove(x)
+        except:
+            pass
+
+def getBudget():
+    return getattr(settings, "CHART_IMAGES_RENDITION_CACHE", 2 * 1024 * 1024 * 1024)
+
+def accountRendition(nbytes):
+    '''
+    count the bytes written, and prune once enough were written to matter
+    '''
+
+    written = None
+    try:
+        if cache.add(RENDITION_BYTES_KEY, nbytes, None):
+            written = nbytes
+        else:
+            written = cache.incr(RENDITION_BYTES_KEY, nbytes)
+    except:
+        pass
+    if written != None and written >= getBudget() * RENDITION_PRUNE_FRACTION:
+        try:
+            cache.set(RENDITION_BYTES_KEY, 0, None)
+        except:
+            pass
+        pruneRenditions()
+
+def pruneRenditions(budget=None):
+    '''
+    remove the least recently used renditions until they take no more 
+    than 90% of the budget. Returns the number of bytes in use after.
+    '''
+
+    if budget == None:
+        budget = getBudget()
+    files = []
+    total = 0
+    patterns = (os.path.join(settings.CHART_IMAGES_DIR, "*", "renditions", "*"),
+                os.path.join(settings.CHART_IMAGES_DIR, "renditions", "*", "*"))
+    for x in glob.glob(patterns[0]) + glob.glob(patterns[1]):
+        try:
+            st = os.stat(x)
+        except OSError:
+            continue
+        files.append((st.st_mtime, st.st_size, x))
+        total += st.st_size
+    if total > budget:
+        files.sort()
+        for mtime, size, x in files:
+            if total <= budget * 0.9:
+                break
+            try:
+                os.remove(x)
+                total -= size
+            except OSError:
+                pass
+    return total
@@ -0,0 +1,344 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+Storage of image files.
+
+Images used to be stored as the base64 text that was uploaded (encoding
+BASE64 in the Image model), in CHART_IMAGES_DIR/<patient>/<path>. New 
+images are decoded once, as they arrive, and stored as binary, in chunks,
+computing their size, SHA-256 and type on the way.
+
+Image files are content addressed: they are stored once per SHA-256 in 
+CHART_IMAGES_DIR/store/ (see blobs.py for the ImageBlob bookkeeping), and
+Image rows that have the same content share the file. Files are written
+to a temporary name and renamed into place, so that a reader never sees 
+a partial image.
+
+Images uploaded in chunks (see ImageUploadView) are kept as a file per 
+chunk in CHART_IMAGES_DIR/uploads/<upload>/ until they are complete.
+'''
+
+import base64
+import binascii
+import hashlib
+import os
+import re
+import shutil
+import uuid
+
+from django.conf import settings
+
+CHUNK_SIZE = 64 * 1024      # bytes, a multiple of 3 and 4
+STORE_DIR = "store"
+UPLOAD_DIR = "uploads"
+
+# data URI prefix, e.g., "data:image/jpeg;base64,"
+
+DATA_URI = re.compile(r'^data:([\w.+-]+/[\w.+-]+)?(;[^,]*)?;base64,')
+
+# leading bytes of the formats we store, see getMimeType()
+
+SIGNATURES = ((b"\xff\xd8\xff", "image/jpeg"),
+              (b"\x89PNG\r\n\x1a\n", "image/png"),
+              (b"GIF87a", "image/gif"),
+              (b"GIF89a", "image/gif"),
+              (b"II*\x00", "image/tiff"),
+              (b"MM\x00*", "image/tiff"),
+              (b"BM", "image/bmp"),
+              (b"%PDF", "application/pdf"))
+
+class ImageStorageError(Exception):
+    pass
+
+def getPatientDir(patient):
+    return os.path.join(settings.CHART_IMAGES_DIR, str(patient))
+
+def getImagePath(patient, path):
+    return os.path.join(getPatientDir(patient), path)
+
+def getStoreDir():
+    return os.path.join(settings.CHART_IMAGES_DIR, STORE_DIR)
+
+def getStorePath(sha256):
+    '''
+    returns a new path, relative to CHART_IMAGES_DIR, for content with this
+    SHA-256. The suffix makes it unique, so that a file being removed with
+    its last reference never collides with the same content stored again.
+    '''
+
+    return os.path.join(STORE_DIR, sha256[:2], "{}.{}".format(sha256, uuid.uuid4().hex[:8]))
+
+def getImageFile(image):
+    '''
+    returns the full path of the file of an Image. path is relative to 
+    CHART_IMAGES_DIR for images in the store, else to the patient directory
+    '''
+
+    if image.blob_id:
+        return os.path.join(settings.CHART_IMAGES_DIR, image.path)
+    return getImagePath(image.patient_id, image.path)
+
+def getMimeType(head):
+    '''
+    head is the first bytes of the image, at least 132 to detect DICOM
+    '''
+
+    ret = "application/octet-stream"
+    for x in SIGNATURES:
+        if head.startswith(x[0]):
+            ret = x[1]
+            break
+    if ret == "application/octet-stream" and head[128:132] == b"DICM":
+        ret = "application/dicom"
+    return ret
+
+class ImageHasher(object):
+    '''
+    compute the size, sha256 and mimetype of an image from chunks of 
+    binary data, as a dict for the Image model
+    '''
+
+    def __init__(self):
+        super(ImageHasher, self).__init__()
+        self._hash = hashlib.sha256()
+        self._size = 0
+        self._head = b""
+
+    def write(self, chunk):
+        if len(self._head) < 132:
+            self._head += chunk[:132 - len(self._head)]
+        self._hash.update(chunk)
+        self._size += len(chunk)
+
+    def getInfo(self):
+        return {"size": self._size,
+                "sha256": self._hash.hexdigest(),
+                "mimetype": getMimeType(self._head)}
+
+class ImageWriter(ImageHasher):
+    '''
+    write an image file from chunks of binary data, to a temporary file in
+    the store. close() returns the info dict, commit() then moves the file
+    to its place, abort() removes it wherever it is.
+    '''
+
+    def __init__(self):
+        super(ImageWriter, self).__init__()
+        storeDir = getStoreDir()
+        try:
+            os.makedirs(storeDir)
+        except OSError:
+            pass
+        self._path = os.path.join(storeDir, ".{}.tmp".format(uuid.uuid4()))
+        self._file = open(self._path, "wb")
+
+    def write(self, chunk):
+        super(ImageWriter, self).write(chunk)
+        self._file.write(chunk)
+
+    def close(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        return self.getInfo()
+
+    def commit(self, fullPath):
+        try:
+            os.makedirs(os.path.dirname(fullPath))
+        except OSError:
+            pass
+        os.rename(self._path, fullPath)
+        self._path = fullPath
+
+    def abort(self):
+        try:
+            self._file.close()
+            os.remove(self._path)
+        except:
+            pass
+
+def splitDataURI(data):
+    '''
+    returns (mimetype, base64) if data is a base64 data URI, else (None, data)
+    '''
+
+    m = DATA_URI.match(data[:256])
+    if m:
+        return (m.group(1), data[m.end():])
+    return (None, data)
+
+def decodeBase64(data):
+    '''
+    generator of the decoded chunks of base64 data, as uploaded. Raises 
+    ImageStorageError if data is not valid, canonical base64.
+    '''
+
+    step = CHUNK_SIZE // 3 * 4
+    rest = ""
+    for i in range(0, len(data), step):
+        chunk = rest + "".join(data[i:i + step].split())
+        n = len(chunk) // 4 * 4
+        rest = chunk[n:]
+        try:
+            decoded = base64.b64decode(chunk[:n])
+            canonical = base64.b64encode(decoded).decode("ascii") == chunk[:n]
+        except (TypeError, binascii.Error, UnicodeEncodeError):
+            raise ImageStorageError("invalid base64 data")
+        if not canonical:
+            # legacy clients get back what they uploaded, which must
+            # then survive decoding and encoding unchanged
+
+            raise ImageStorageError("non-canonical base64 data")
+        yield decoded
+    if len(rest):
+        raise ImageStorageError("truncated base64 data")
+
+def readStream(stream, length=None):
+    '''
+    generator of chunks of binary data read from a file-like object, e.g.,
+    a request. Raises ImageStorageError if length bytes cannot be read.
+    '''
+
+    remaining = length
+    while remaining == None or remaining > 0:
+        n = CHUNK_SIZE
+        if remaining != None:
+            n = min(n, remaining)
+        chunk = stream.read(n)
+        if not chunk:
+            break
+        if remaining != None:
+            remaining -= len(chunk)
+        yield chunk
+    if remaining:
+        raise ImageStorageError("short read, {} bytes missing".format(remaining))
+
+def readChunks(fullPath, start=0, length=None):
+    '''
+    generator of the bytes of a binary image file, optionally a range
+    '''
+
+    with open(fullPath, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining == None or remaining > 0:
+            n = CHUNK_SIZE
+            if remaining != None:
+                n = min(n, remaining)
+            chunk = f.read(n)
+            if not chunk:
+                break
+            if remaining != None:
+                remaining -= len(chunk)
+            yield chunk
+
+def readBase64Chunks(fullPath):
+    '''
+    generator of the decoded bytes of an image stored as base64 text
+    '''
+
+    with open(fullPath, "r") as f:
+        mimetype, data = splitDataURI(f.read(256))
+        rest = ""
+        while True:
+            chunk = rest + "".join(data.split())
+            n = len(chunk) // 4 * 4
+            rest = chunk[n:]
+            if n:
+                yield base64.b64decode(chunk[:n])
+            data = f.read(CHUNK_SIZE)
+            if not data:
+                break
+
+def readBase64(fullPath):
+    '''
+    returns the base64 text of a binary image file, for the legacy JSON
+    representation of an image
+    '''
+
+    with open(fullPath, "rb") as f:
+        data = f.read()
+    return base64.b64encode(data).decode("ascii")
+
+def removeFile(fullPath):
+    ret = True
+    try:
+        os.remove(fullPath)
+    except:
+        ret = False
+    return ret
+
+def getUploadDir(upload):
+    return os.path.join(settings.CHART_IMAGES_DIR, UPLOAD_DIR, str(upload))
+
+def writeChunk(upload, n, stream, length=None):
+    '''
+    store chunk n of an upload, read from a file-like object, replacing any
+    earlier copy (e.g., from a retry). Returns its size.
+    '''
+
+    uploadDir = getUploadDir(upload)
+    try:
+        os.makedirs(uploadDir)
+    except OSError:
+        pass
+    tmpPath = os.path.join(uploadDir, ".{}.tmp".format(uuid.uuid4()))
+    size = 0
+    try:
+        with open(tmpPath, "wb") as f:
+            for chunk in readStream(stream, length):
+                f.write(chunk)
+                size += len(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(tmpPath, os.path.join(uploadDir, str(n)))
+    except:
+        removeFile(tmpPath)
+        raise
+    return size
+
+def getUploadChunks(upload):
+    '''
+    returns a sorted list of (n, size) of the chunks of an upload received
+    '''
+
+    ret = []
+    uploadDir = getUploadDir(upload)
+    try:
+        names = os.listdir(uploadDir)
+    except OSError:
+        names = []
+    for x in names:
+        if x.isdigit():
+            try:
+                ret.append((int(x), os.path.getsize(os.path.join(uploadDir, x))))
+            except OSError:
+                pass
+    ret.sort()
+    return ret
+
+def readUpload(upload, count):
+    '''
+    generator of the bytes of chunks 0 to count - 1 of an upload, in order
+    '''
+
+    uploadDir = getUploadDir(upload)
+    for n in range(count):
+        for chunk in readChunks(os.path.join(uploadDir, str(n))):
+            yield chunk
+
+def removeUpload(upload):
+    shutil.rmtree(getUploadDir(upload), True)
@@ -14,9 +14,13 @@
 #limitations under the License.
 
 from django.conf.urls import url
-from image.views import ImageView
+from image.views import ImageView, ImageDataView, ImageUploadView
 
 urlpatterns = [
     url(r'^$', ImageView.as_view()),
     url(r'^([0-9]+)/$', ImageView.as_view()),
+    url(r'^([0-9]+)/data/$', ImageDataView.as_view()),
+    url(r'^upload/$', ImageUploadView.as_view()),
+    url(r'^upload/([0-9]+)/$', ImageUploadView.as_view()),
+    url(r'^upload/([0-9]+)/([0-9]+)/$', ImageUploadView.as_view()),
 ]
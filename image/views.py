@@ -24,9 +24,15 @@ from xray.models import *
 from station.models import *
 from clinic.models import *
 from datetime import *
-from django.http import HttpResponse, HttpResponseForbidden, HttpResponseBadRequest, HttpResponseServerError, HttpResponseNotFound
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseBadRequest, HttpResponseServerError, HttpResponseNotFound, HttpResponseNotModified, StreamingHttpResponse
 from django.conf import settings
+from django.db import transaction
+from image.storage import ImageStorageError, getImageFile, splitDataURI, readChunks, readBase64Chunks, readBase64, writeChunk, getUploadChunks, readUpload, removeUpload
+from image.blobs import storeChunks, storeBase64, storeText, storeStream, releaseBlob
+from image.renditions import getRenditionSize, getRendition, getRenditionLocation, removeRenditions, RENDITIONS
+from image.renditions import getMimeType as getRenditionMimeType
 import json
+import re
 import uuid
 import os
 import sys
@@ -35,6 +41,31 @@ import logging
 
 LOG = logging.getLogger("tscharts")
 
+def getRenditionArgs(request):
+    '''
+    returns (size, format, badRequest) of the rendition asked for with the
+    rendition (e.g., "thumb") or size (pixels) and imageformat ("jpeg" or
+    "webp") URL parameters. size is None if the original is wanted.
+    '''
+
+    badRequest = False
+    size = None
+    fmt = request.GET.get('imageformat', 'jpeg')
+    if not fmt in ["jpeg", "webp"]:
+        badRequest = True
+
+    rendition = request.GET.get('rendition', '')
+    pixels = request.GET.get('size', '')
+    if not rendition == '':
+        size = getRenditionSize(rendition=rendition)
+        if size == None:
+            badRequest = True
+    elif not pixels == '':
+        size = getRenditionSize(size=pixels)
+        if size == None:
+            badRequest = True
+    return (size, fmt, badRequest)
+
 class ImageView(APIView):
 
     authentication_classes = (TokenAuthentication,)
@@ -69,53 +100,24 @@ class ImageView(APIView):
     def getUUID(self):
         return uuid.uuid4()
     
-    def getImageData(self, path, patient):
-        # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
-
+    def getImageData(self, image):
         data = None
-        patient = str(patient)
         try:
-            imgPath = os.path.join(settings.CHART_IMAGES_DIR, patient, path)
+            imgPath = getImageFile(image)
             with open (imgPath, "r") as myfile:
                 data=myfile.readlines()
         except:
             pass
         return data
 
-    def deleteImageFile(self, path, patient):
+    def deleteImageFile(self, image):
         ret  = True
-        patient = str(patient)
         try:
-            imgPath = os.path.join(settings.CHART_IMAGES_DIR, patient, path)
-            os.remove(imgPath)
+            os.remove(getImageFile(image))
         except:
             ret = False
         return ret
 
-    def putImageData(self, path, patient, data):
-        # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
-
-        implError = False
-        implMsg = None
-        patient = str(patient)
-
-        try:
-            patientDir = os.path.join(settings.CHART_IMAGES_DIR, patient)
-            # create patient directory if it does not exist
-
-            try:
-                os.makedirs(patientDir)
-            except:
-                pass
-            imgPath = os.path.join(patientDir, path)
-            with open (imgPath, "w") as myfile:
-                data=myfile.write(data)
-        except:
-            implError = True
-            implMsg = sys.exc_info()[0] 
-
-        return implError, implMsg
-
     def get(self, request, image_id=None, format=None):
         image = None
         badRequest = False
@@ -127,6 +129,8 @@ class ImageView(APIView):
         sort = False
         newest = False
 
+        size, fmt, badRequest = getRenditionArgs(request)
+
         if image_id:
             try:
                 image = Image.objects.get(id=image_id)
@@ -236,11 +240,28 @@ class ImageView(APIView):
                 ret["clinic"] = image.clinic_id
                 ret["station"] = image.station_id
                 ret["type"] = self.typeToString(image.imagetype)
-                data = self.getImageData(image.path, image.patient_id)
-                if not data:
-                    implError = True
+                rendition = None
+                if size:
+                    rendition = getRendition(image, size, fmt)
+                if rendition:
+                    try:
+                        ret["data"] = readBase64(rendition)
+                    except:
+                        implError = True
+                elif image.encoding == Image.BINARY:
+                    try:
+                        data = readBase64(getImageFile(image))
+                        if image.datauri:
+                            data = "data:{};base64,{}".format(image.mimetype, data)
+                        ret["data"] = data
+                    except:
+                        implError = True
                 else:
-                    ret["data"] = data[0]
+                    data = self.getImageData(image)
+                    if not data:
+                        implError = True
+                    else:
+                        ret["data"] = data[0]
             else:
                 ret = []
                 for x in image:
@@ -305,17 +326,63 @@ class ImageView(APIView):
                 return False
         return True
 
+    def saveImage(self, kwargs):
+        '''
+        create an Image, kwargs including the blob holding its file. Returns
+        None, and drops the reference to the blob, if it cannot be saved.
+        '''
+
+        image = Image(**kwargs)
+        try:
+            with transaction.atomic():
+                image.save()
+                if image.imagetype == Image.XRAY:
+                    ret = self.CreateXRayRecordIfMissing(image.clinic_id, image.patient_id);
+                    if ret == False:
+                        # roll back (or below, remove) the image as well
+
+                        raise Exception("unable to create XRay record for clinic {} patient {}".format(image.clinic_id, image.patient_id))
+        except:
+            LOG.error("saveImage unable to save image: {} {}".format(sys.exc_info()[0], sys.exc_info()[1]))
+
+            # rolled back on InnoDB, a MyISAM table keeps the row
+
+            if image.id:
+                try:
+                    Image.objects.filter(id=image.id).delete()
+                except:
+                    LOG.error("saveImage unable to remove image {}: {}".format(image.id, sys.exc_info()[0]))
+            releaseBlob(kwargs["blob"].id)
+            return None
+
+        # previews are the common case, make the thumbnail now
+
+        if image.encoding == Image.BINARY:
+            getRendition(image, RENDITIONS["thumb"])
+        return image
+
+    '''
+    An image is uploaded either as JSON, with the image base64 encoded in
+    data, or as the raw bytes of the image, with any other Content-Type
+    (e.g., image/jpeg), in which case clinic, station, patient and type 
+    are URL parameters. Either way it is stored as binary.
+    '''
+
     def post(self, request, format=None):
         badRequest = False
         implError = False
         clinicid = None
         stationid = None
         patientid = None
-        isXray = False
+        imagedata = None
 
         kwargs = {}
 
-        data = json.loads(request.body)
+        isJSON = request.content_type.split(";")[0].strip() in ["", "application/json"]
+        if isJSON:
+            data = json.loads(request.body)
+        else:
+            data = request.GET
         if "clinic" in data:
             try:
                 clinicid = int(data["clinic"])
@@ -341,16 +408,15 @@ class ImageView(APIView):
             if imagetype == None:
                 badRequest = True
             else:
-                if imagetype == 'x':
-                    isXray = True
                 kwargs["imagetype"] = imagetype
         except:
             badRequest = True
 
-        try:
-            imagedata = data["data"]
-        except:
-            badRequest = True
+        if isJSON:
+            try:
+                imagedata = data["data"]
+            except:
+                badRequest = True
 
         if not badRequest:
 
@@ -383,19 +449,45 @@ class ImageView(APIView):
                 raise NotFound
 
         if not badRequest:
-            kwargs["path"] = path = str(self.getUUID())
-            implError, implMsg = self.putImageData(path, patientid, imagedata)
-
-        if not implError: 
             try:
-                image = Image(**kwargs)
-                if image:
-                    image.save()
-                    if isXray == True:
-                        ret = self.CreateXRayRecordIfMissing(clinicid, patientid);
-                        if ret == False:
-                            LOG.error("XRay POST unable to create XRay record for clinic {} patient {}".format(clinicid, patientid))
+                if isJSON:
+                    mimetype, encoded = splitDataURI(imagedata)
+                    try:
+                        blob, info = storeBase64(encoded)
+                        info["encoding"] = Image.BINARY
+                        if mimetype:
+                            info["mimetype"] = mimetype
+                            kwargs["datauri"] = True
+                    except ImageStorageError:
+                        # keep it as it was sent, the way images were
+                        # stored before binary storage
+
+                        blob, info = storeText(imagedata)
+                        info = {"encoding": Image.BASE64, 
+                                "sha256": info["sha256"]}
                 else:
+                    length = request.META.get("CONTENT_LENGTH", None)
+                    if length:
+                        length = int(length)
+                    stream = request.stream
+                    if stream == None:
+                        raise ImageStorageError("no image data")
+                    blob, info = storeStream(stream, length)
+                    info["encoding"] = Image.BINARY
+                kwargs.update(info)
+                kwargs["blob"] = blob
+                kwargs["path"] = blob.path
+            except ImageStorageError as e:
+                LOG.info("Image POST bad image data for patient {}: {}".format(patientid, e))
+                badRequest = True
+            except:
+                implError = True
+                implMsg = sys.exc_info()[0] 
+
+        if not badRequest and not implError: 
+            try:
+                image = self.saveImage(kwargs)
+                if image == None:
                     implError = True
                     implMsg = "Unable to create image object"
             except Exception as e:
@@ -423,7 +515,388 @@ class ImageView(APIView):
         if not image:
             raise NotFound
         else:
-            self.deleteImageFile(image.path, image.patient_id) 
+            if image.blob_id:
+                # the file and renditions go with the last image using them
+
+                image.delete()
+                releaseBlob(image.blob_id)
+            else:
+                self.deleteImageFile(image) 
+                removeRenditions(*getRenditionLocation(image))
+                image.delete()
+
+        return Response({})
+
+class ImageUploadView(ImageView):
+
+    '''
+    An image uploaded in chunks, so that a large X-ray need not be sent 
+    (and held in memory) in one request, and an upload interrupted by a
+    dropped connection can be resumed. POST creates the upload, each chunk
+    is PUT, numbered from 0, as the raw body of the request, GET tells which
+    chunks have been received, and a POST with the SHA-256 of the image
+    creates the Image. Uploads not completed in UPLOAD_EXPIRY are removed.
+    '''
+
+    MAX_CHUNK_SIZE = 16 * 1024 * 1024
+    MAX_CHUNKS = 10000
+    UPLOAD_EXPIRY = 24              # hours
+
+    def getUpload(self, upload_id):
+        try:
+            upload = ImageUpload.objects.get(id=upload_id)
+        except:
+            upload = None
+        return upload
+
+    def deleteUpload(self, upload):
+        removeUpload(upload.id)
+        upload.delete()
+
+    def pruneUploads(self):
+        before = datetime.now() - timedelta(hours=self.UPLOAD_EXPIRY)
+        for x in ImageUpload.objects.filter(timestamp__lt=before):
+            LOG.info("ImageUploadView removing expired upload {}".format(x.id))
+            self.deleteUpload(x)
+
+    def getUploadData(self, upload):
+        chunks = getUploadChunks(upload.id)
+        ret = {}
+        ret["id"] = upload.id
+        ret["patient"] = upload.patient_id
+        ret["clinic"] = upload.clinic_id
+        ret["station"] = upload.station_id
+        ret["type"] = self.typeToString(upload.imagetype)
+        ret["size"] = upload.size
+        ret["chunks"] = [x[0] for x in chunks]
+        ret["received"] = sum([x[1] for x in chunks])
+        ret["image"] = upload.image_id
+        return ret
+
+    def get(self, request, upload_id=None, format=None):
+        if not upload_id:
+            return HttpResponseBadRequest()
+        upload = self.getUpload(upload_id)
+        if not upload:
+            return HttpResponseNotFound()
+        return Response(self.getUploadData(upload))
+
+    def post(self, request, upload_id=None, format=None):
+        if upload_id:
+            return self.commit(request, upload_id)
+        return self.create(request)
+
+    def create(self, request):
+        badRequest = False
+        implError = False
+        clinicid = None
+        stationid = None
+        patientid = None
+        size = None
+
+        kwargs = {}
+
+        try:
+            data = json.loads(request.body)
+        except:
+            return HttpResponseBadRequest()
+
+        if "clinic" in data:
+            try:
+                clinicid = int(data["clinic"])
+            except:
+                badRequest = True
+
+        if "station" in data:
+            try:
+                stationid = int(data["station"])
+            except:
+                badRequest = True
+
+        try:
+            patientid = int(data["patient"])
+        except:
+            badRequest = True
+
+        try:
+            size = int(data["size"])
+            if size <= 0 or size > self.MAX_CHUNK_SIZE * self.MAX_CHUNKS:
+                badRequest = True
+            kwargs["size"] = size
+        except:
+            badRequest = True
+
+        try:
+            imagetype = self.stringToType(data["type"])
+            if imagetype == None:
+                badRequest = True
+            else:
+                kwargs["imagetype"] = imagetype
+        except:
+            badRequest = True
+
+        if badRequest:
+            return HttpResponseBadRequest()
+
+        if stationid != None:
+            try:
+                kwargs["station"] = Station.objects.get(id=stationid)
+            except:
+                raise NotFound
+
+        if clinicid != None: 
+            try:
+                kwargs["clinic"] = Clinic.objects.get(id=clinicid)
+            except:
+                raise NotFound
+
+        try:
+            kwargs["patient"] = Patient.objects.get(id=patientid)
+        except:
+            raise NotFound
+
+        self.pruneUploads()
+
+        try:
+            upload = ImageUpload(**kwargs)
+            upload.save()
+        except:
+            implError = True
+            implMsg = sys.exc_info()[0] 
+
+        if implError:
+            return HttpResponseServerError(implMsg) 
+        return Response({"id": upload.id, "chunksize": self.MAX_CHUNK_SIZE})
+
+    def put(self, request, upload_id=None, chunk=None, format=None):
+        badRequest = False
+        implError = False
+
+        if not upload_id or chunk == None:
+            return HttpResponseBadRequest()
+        upload = self.getUpload(upload_id)
+        if not upload:
+            return HttpResponseNotFound()
+
+        n = int(chunk)
+        length = request.META.get("CONTENT_LENGTH", None)
+        try:
+            length = int(length)
+        except:
+            length = None
+        if upload.image_id or n >= self.MAX_CHUNKS or not length or length > self.MAX_CHUNK_SIZE:
+            return HttpResponseBadRequest()
+
+        try:
+            size = writeChunk(upload.id, n, request.stream, length)
+        except ImageStorageError as e:
+            LOG.info("ImageUploadView PUT upload {} chunk {}: {}".format(upload.id, n, e))
+            badRequest = True
+        except:
+            implError = True
+            implMsg = sys.exc_info()[0] 
+
+        if badRequest:
+            return HttpResponseBadRequest()
+        if implError:
+            return HttpResponseServerError(implMsg) 
+        return Response({"chunk": n, "size": size})
+
+    def commit(self, request, upload_id):
+        badRequest = False
+        implError = False
+        image = None
+
+        try:
+            data = json.loads(request.body)
+            sha256 = str(data["sha256"])
+        except:
+            return HttpResponseBadRequest()
+
+        upload = self.getUpload(upload_id)
+        if not upload:
+            return HttpResponseNotFound()
+        if upload.image_id:
+            # committed already, the response was lost
+
+            return Response({"id": upload.image_id})
+
+        chunks = getUploadChunks(upload.id)
+        if [x[0] for x in chunks] != list(range(len(chunks))) or sum([x[1] for x in chunks]) != upload.size:
+            return HttpResponseBadRequest("missing chunks")
+
+        try:
+            blob, info = storeChunks(lambda: readUpload(upload.id, len(chunks)), sha256)
+            kwargs = {}
+            kwargs.update(info)
+            kwargs["encoding"] = Image.BINARY
+            kwargs["blob"] = blob
+            kwargs["path"] = blob.path
+            kwargs["patient"] = upload.patient
+            kwargs["clinic"] = upload.clinic
+            kwargs["station"] = upload.station
+            kwargs["imagetype"] = upload.imagetype
+            image = self.saveImage(kwargs)
+            if image == None:
+                implError = True
+                implMsg = "Unable to create image object"
+        except ImageStorageError as e:
+            # the chunks are kept, the client may replace a bad one
+
+            LOG.info("ImageUploadView commit upload {}: {}".format(upload.id, e))
+            badRequest = True
+        except:
+            implError = True
+            implMsg = sys.exc_info()[0] 
+
+        if badRequest:
+            return HttpResponseBadRequest("sha256 mismatch")
+        if implError:
+            return HttpResponseServerError(implMsg) 
+
+        # the upload is kept, without its chunks, until it expires
+
+        n = ImageUpload.objects.filter(id=upload.id, image=None).update(image=image)
+        if n == 0:
+            # committed at the same time by another request, keep theirs
+
             image.delete()
+            releaseBlob(image.blob_id)
+            image = ImageUpload.objects.get(id=upload.id).image
+        else:
+            removeUpload(upload.id)
+        return Response({"id": image.id})
 
+    def delete(self, request, upload_id=None, format=None):
+        if not upload_id:
+            return HttpResponseBadRequest()
+        upload = self.getUpload(upload_id)
+        if not upload:
+            raise NotFound
+        self.deleteUpload(upload)
         return Response({})
+
+class ImageDataView(APIView):
+
+    '''
+    The image itself, as bytes rather than base64 in JSON. Supports a single
+    byte range (Range: bytes=first-last), and revalidation with the SHA-256
+    of the image as ETag, images never change. If CHART_IMAGES_XSENDFILE is
+    set, the file is handed to the web server (e.g., Apache mod_xsendfile)
+    with an X-Sendfile header instead of being read by Django.
+    '''
+
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+    def perform_content_negotiation(self, request, force=False):
+        # the response is the image, whatever the client accepts
+
+        return super(ImageDataView, self).perform_content_negotiation(request, force=True)
+
+    def getRange(self, header, size):
+        '''
+        returns (start, length), None if header is absent or not a single
+        range (the whole image is sent), or False if it is unsatisfiable
+        '''
+
+        ret = None
+        m = self.RANGE.match(header.replace(" ", ""))
+        if m and (m.group(1) or m.group(2)):
+            if m.group(1) == "":
+                # suffix, the last n bytes
+
+                n = int(m.group(2))
+                if n == 0:
+                    ret = False
+                else:
+                    start = max(0, size - n)
+                    ret = (start, size - start)
+            else:
+                start = int(m.group(1))
+                last = size - 1
+                if m.group(2) != "":
+                    last = int(m.group(2))
+                if last < start:
+                    ret = None      # invalid, ignored
+                elif start >= size:
+                    ret = False
+                else:
+                    last = min(last, size - 1)
+                    ret = (start, last - start + 1)
+        return ret
+
+    def get(self, request, image_id=None, format=None):
+        image = None
+        fullPath = None
+
+        size, fmt, badRequest = getRenditionArgs(request)
+        if badRequest:
+            return HttpResponseBadRequest()
+
+        try:
+            image = Image.objects.get(id=image_id)
+        except:
+            image = None
+
+        if not image:
+            return HttpResponseNotFound()
+
+        fullPath = getImageFile(image)
+        if not os.path.exists(fullPath):
+            LOG.error("ImageDataView image {} file {} is missing".format(image.id, fullPath))
+            return HttpResponseServerError()
+
+        rendition = None
+        if size:
+            rendition = getRendition(image, size, fmt)
+
+        if rendition:
+            fullPath = rendition
+            length = os.path.getsize(rendition)
+            contentType = getRenditionMimeType(fmt)
+            etag = '"{}-{}-{}"'.format(image.sha256 or image.id, size, fmt)
+        elif image.encoding != Image.BINARY:
+            # not yet converted, decode as we go, ranges are not supported
+
+            response = StreamingHttpResponse(readBase64Chunks(fullPath), content_type="application/octet-stream")
+            response["Accept-Ranges"] = "none"
+            return response
+        else:
+            length = image.size
+            contentType = image.mimetype
+            if not contentType:
+                contentType = "application/octet-stream"
+            etag = '"{}"'.format(image.sha256)
+
+        if request.META.get("HTTP_IF_NONE_MATCH", None) == etag:
+            response = HttpResponseNotModified()
+            response["ETag"] = etag
+            return response
+
+        if getattr(settings, "CHART_IMAGES_XSENDFILE", False):
+            response = HttpResponse(content_type=contentType)
+            response["X-Sendfile"] = fullPath
+        else:
+            byteRange = None
+            header = request.META.get("HTTP_RANGE", None)
+            if header:
+                byteRange = self.getRange(header, length)
+            if byteRange == False:
+                response = HttpResponse(status=416)
+                response["Content-Range"] = "bytes */{}".format(length)
+                return response
+            elif byteRange:
+                start, n = byteRange
+                response = StreamingHttpResponse(readChunks(fullPath, start, n), content_type=contentType, status=206)
+                response["Content-Range"] = "bytes {}-{}/{}".format(start, start + n - 1, length)
+                response["Content-Length"] = n
+            else:
+                response = StreamingHttpResponse(readChunks(fullPath), content_type=contentType)
+                response["Content-Length"] = length
+            response["Accept-Ranges"] = "bytes"
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, max-age=86400"
+        return response
@@ -62,3 +62,6 @@ class MedicalHistory(models.Model):
     weight_metric = models.BooleanField(default=True)
     born_with_cleft_lip = models.BooleanField(default=False)
     born_with_cleft_palate = models.BooleanField(default=False)
+
+    class Meta:
+        index_together = [["patient", "clinic"]]
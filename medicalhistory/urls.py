@@ -14,9 +14,10 @@
 #limitations under the License.
 
 from django.conf.urls import url
-from medicalhistory.views import MedicalHistoryView
+from medicalhistory.views import MedicalHistoryView, MedicalHistoryBulkView
 
 urlpatterns = [
     url(r'^$', MedicalHistoryView.as_view()),
+    url(r'^bulk/$', MedicalHistoryBulkView.as_view()),
     url(r'^([0-9]+)/$', MedicalHistoryView.as_view()),
 ]
@@ -26,6 +26,7 @@ from django.core import serializers
 from django.http import HttpResponse, HttpResponseForbidden, HttpResponseBadRequest, HttpResponseServerError, HttpResponseNotFound
 
 from common.decorators import *
+from common.bulk import BulkView
 
 import sys
 import numbers
@@ -670,3 +671,8 @@ class MedicalHistoryView(APIView):
             medical_history.delete()
 
         return Response({})
+
+class MedicalHistoryBulkView(BulkView):
+    chartView = MedicalHistoryView
+    model = MedicalHistory
+    references = (("clinic", Clinic), ("patient", Patient))
@@ -0,0 +1,96 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+Middleware recording, for each request, the wall time, the number of SQL
+queries and the time spent in them, and the response size and status, by
+route (the path with ids replaced by {id}, e.g., /tscharts/v1/image/{id}/)
+and method. See registry.py, and MetricsView for the endpoint.
+
+Queries are counted with the debug cursor of the connection, which is
+forced on for the request. If METRICS_SLOW_REQUEST is set, requests that
+take longer (seconds) are logged with their SQL.
+'''
+
+import re
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from metrics.registry import registry
+
+import logging
+
+LOG = logging.getLogger("tscharts")
+
+ID = re.compile(r'/[0-9]+(?=/|$)')
+
+def getRoute(request):
+    '''
+    returns the route of a request. Requests that match no URL pattern 
+    (e.g., probes for random paths) share one route, so that they cannot
+    make the number of time series grow without bound.
+    '''
+
+    if getattr(request, "resolver_match", None) == None:
+        return "unmatched"
+    return ID.sub("/{id}", request.path)
+
+class MetricsMiddleware(object):
+
+    def process_request(self, request):
+        request._metricsStart = time.time()
+        request._metricsDebugCursor = connection.force_debug_cursor
+        connection.force_debug_cursor = True
+        connection.queries_log.clear()
+        return None
+
+    def process_response(self, request, response):
+        start = getattr(request, "_metricsStart", None)
+        if start == None:
+            # an earlier middleware answered before process_request
+
+            return response
+        try:
+            elapsed = time.time() - start
+            queries = list(connection.queries_log)
+            connection.force_debug_cursor = request._metricsDebugCursor
+            dbtime = 0.0
+            for x in queries:
+                dbtime += float(x.get("time", 0))
+
+            size = None
+            if not response.streaming:
+                size = len(response.content)
+            elif response.has_header("Content-Length"):
+                size = int(response["Content-Length"])
+
+            route = getRoute(request)
+            registry.observe(route, request.method, response.status_code,
+                             {"request_duration_seconds": elapsed,
+                              "request_db_queries": len(queries),
+                              "request_db_duration_seconds": dbtime,
+                              "response_size_bytes": size})
+
+            slow = getattr(settings, "METRICS_SLOW_REQUEST", None)
+            if slow != None and elapsed >= slow:
+                LOG.warning("slow request {} {} ({}) status {} {:.3f}s {} queries {:.3f}s in SQL:\n{}".format(
+                    request.method, request.get_full_path(), route, 
+                    response.status_code, elapsed, len(queries), dbtime,
+                    "\n".join(["{} {}".format(x.get("time", ""), x.get("sql", "")) for x in queries])))
+        except:
+            LOG.error("MetricsMiddleware unable to record request {}".format(request.path))
+        return response
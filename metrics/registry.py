@@ -0,0 +1,235 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+Request metrics, as Prometheus histograms, kept in memory by each web 
+server process (see middleware.py). 
+
+Each process writes a snapshot of its metrics to METRICS_DIR/<pid>.json
+at most every DUMP_INTERVAL seconds, and the metrics endpoint adds up the
+snapshots of all processes, so that whichever process a scrape reaches,
+it reports the metrics of the server. Snapshots of processes that have
+exited are kept for METRICS_SNAPSHOT_TTL seconds, so counts do not go 
+down each time a process exits, and are then removed by the next scrape.
+Prometheus handles the drop (or a new process reusing a pid) as a 
+counter reset.
+'''
+
+import bisect
+import errno
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+import logging
+
+LOG = logging.getLogger("tscharts")
+
+DUMP_INTERVAL = 15          # seconds
+SNAPSHOT_TTL = 86400        # seconds, default METRICS_SNAPSHOT_TTL
+
+# bucket upper bounds, Prometheus adds +Inf
+
+HISTOGRAMS = (("request_duration_seconds", "Wall time of requests", 
+               (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)),
+              ("request_db_queries", "SQL queries issued by requests", 
+               (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)),
+              ("request_db_duration_seconds", "Time requests spent in SQL queries", 
+               (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)),
+              ("response_size_bytes", "Size of response bodies", 
+               (100, 1000, 10000, 100000, 1000000, 10000000, 100000000)))
+
+PREFIX = "tscharts_"
+
+class Histogram(object):
+    def __init__(self, buckets):
+        super(Histogram, self).__init__()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # not cumulative
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+class Registry(object):
+
+    def __init__(self):
+        super(Registry, self).__init__()
+        self._lock = threading.Lock()
+        self._requests = {}         # (route, method, status) -> count
+        self._histograms = {}       # (name, route, method) -> Histogram
+        self._lastDump = time.time()
+
+    def observe(self, route, method, status, values):
+        '''
+        record a request. values maps names in HISTOGRAMS to values, a 
+        value that is None (e.g., the size of a streamed response) is not 
+        recorded
+        '''
+
+        with self._lock:
+            key = (route, method, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            for name, help, buckets in HISTOGRAMS:
+                value = values.get(name, None)
+                if value == None:
+                    continue
+                key = (name, route, method)
+                h = self._histograms.get(key, None)
+                if h == None:
+                    h = self._histograms[key] = Histogram(buckets)
+                h.observe(value)
+            dump = time.time() - self._lastDump > DUMP_INTERVAL
+            if dump:
+                self._lastDump = time.time()
+        if dump:
+            self.dump()
+
+    def getSnapshot(self):
+        with self._lock:
+            return {"requests": [list(k) + [v] for k, v in self._requests.items()],
+                    "histograms": [list(k) + [list(h.counts), h.sum] for k, h in self._histograms.items()]}
+
+    def dump(self):
+        '''
+        write the snapshot of this process for the others to read
+        '''
+
+        snapshot = self.getSnapshot()
+        metricsDir = getMetricsDir()
+        try:
+            try:
+                os.makedirs(metricsDir)
+            except OSError:
+                pass
+            tmpPath = os.path.join(metricsDir, ".{}.tmp".format(uuid.uuid4()))
+            with open(tmpPath, "w") as f:
+                json.dump(snapshot, f)
+            os.rename(tmpPath, os.path.join(metricsDir, "{}.json".format(os.getpid())))
+        except:
+            LOG.error("metrics unable to write snapshot to {}".format(metricsDir))
+        return snapshot
+
+def getMetricsDir():
+    return getattr(settings, "METRICS_DIR", "/var/tmp/tscharts_metrics")
+
+def isRunning(pid):
+    ret = True
+    try:
+        os.kill(pid, 0)
+    except OSError as e:
+        # EPERM, the process exists but belongs to another user
+
+        ret = e.errno != errno.ESRCH
+    return ret
+
+def isExpired(path):
+    '''
+    True if the snapshot at path is of a process that has exited, and was
+    last written more than METRICS_SNAPSHOT_TTL seconds ago
+    '''
+
+    ret = False
+    ttl = getattr(settings, "METRICS_SNAPSHOT_TTL", SNAPSHOT_TTL)
+    try:
+        pid = int(os.path.splitext(os.path.basename(path))[0])
+        ret = time.time() - os.path.getmtime(path) > ttl and not isRunning(pid)
+    except (ValueError, OSError):
+        ret = False
+    return ret
+
+def getMergedSnapshot():
+    '''
+    returns the metrics of all processes, as (requests, histograms), 
+    dicts keyed like those of Registry
+    '''
+
+    snapshots = [registry.dump()]
+    own = "{}.json".format(os.getpid())
+    for x in glob.glob(os.path.join(getMetricsDir(), "*.json")):
+        if os.path.basename(x) == own:
+            continue
+        if isExpired(x):
+            try:
+                os.unlink(x)
+                LOG.info("metrics removed snapshot {} of exited process".format(x))
+            except OSError:
+                LOG.info("metrics unable to remove snapshot {}".format(x))
+            continue
+        try:
+            with open(x, "r") as f:
+                snapshots.append(json.load(f))
+        except:
+            LOG.info("metrics unable to read snapshot {}".format(x))
+
+    requests = {}
+    histograms = {}
+    for snapshot in snapshots:
+        for route, method, status, n in snapshot["requests"]:
+            key = (route, method, status)
+            requests[key] = requests.get(key, 0) + n
+        for name, route, method, counts, total in snapshot["histograms"]:
+            key = (name, route, method)
+            if key in histograms:
+                old = histograms[key]
+                histograms[key] = ([a + b for a, b in zip(old[0], counts)], old[1] + total)
+            else:
+                histograms[key] = (counts, total)
+    return (requests, histograms)
+
+def formatLabels(labels):
+    return ",".join(['{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in labels])
+
+def formatBound(bound):
+    return repr(float(bound))
+
+def getPrometheusText():
+    '''
+    returns the metrics in the Prometheus text exposition format (0.0.4)
+    '''
+
+    requests, histograms = getMergedSnapshot()
+    lines = []
+    name = PREFIX + "requests_total"
+    lines.append("# HELP {} Requests by route, method and status".format(name))
+    lines.append("# TYPE {} counter".format(name))
+    for key in sorted(requests.keys()):
+        route, method, status = key
+        lines.append("{}{{{}}} {}".format(name, formatLabels((("route", route), ("method", method), ("status", status))), requests[key]))
+
+    for hname, help, buckets in HISTOGRAMS:
+        name = PREFIX + hname
+        lines.append("# HELP {} {}".format(name, help))
+        lines.append("# TYPE {} histogram".format(name))
+        for key in sorted([x for x in histograms.keys() if x[0] == hname]):
+            counts, total = histograms[key]
+            labels = (("route", key[1]), ("method", key[2]))
+            n = 0
+            for i, bound in enumerate(buckets):
+                n += counts[i]
+                lines.append("{}_bucket{{{},le=\"{}\"}} {}".format(name, formatLabels(labels), formatBound(bound), n))
+            n += counts[-1]
+            lines.append("{}_bucket{{{},le=\"+Inf\"}} {}".format(name, formatLabels(labels), n))
+            lines.append("{}_sum{{{}}} {}".format(name, formatLabels(labels), repr(float(total))))
+            lines.append("{}_count{{{}}} {}".format(name, formatLabels(labels), n))
+    return "\n".join(lines) + "\n"
+
+registry = Registry()
@@ -0,0 +1,48 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+from rest_framework.views import APIView
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAuthenticated
+from django.http import HttpResponse, HttpResponseServerError
+from metrics.registry import getPrometheusText
+import sys
+
+import logging
+
+LOG = logging.getLogger("tscharts")
+
+class MetricsView(APIView):
+
+    '''
+    request metrics of all web server processes, in the Prometheus text 
+    format, see registry.py
+    '''
+
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def perform_content_negotiation(self, request, force=False):
+        # Prometheus asks for text/plain, which has no renderer
+
+        return super(MetricsView, self).perform_content_negotiation(request, force=True)
+
+    def get(self, request, format=None):
+        try:
+            text = getPrometheusText()
+        except:
+            LOG.error("MetricsView unable to get metrics {}".format(sys.exc_info()[0]))
+            return HttpResponseServerError()
+        return HttpResponse(text, content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,7 +1,14 @@
 from __future__ import unicode_literals
 
 from django.apps import AppConfig
+from django.db.models.signals import post_save
 
 
 class PatientConfig(AppConfig):
     name = 'patient'
+
+    def ready(self):
+        # keep the search index up to date (see search.py)
+
+        from patient.search import patientSaved
+        post_save.connect(patientSaved, sender=self.get_model("Patient"))
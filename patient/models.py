@@ -78,3 +78,20 @@ class Patient(models.Model):
     emergencyemail = models.EmailField()
     curp = models.CharField(max_length=128, default="") # Mexican CURP (national ID)
     oldid = models.IntegerField(default=-1) # ID in previous database 
+
+class PatientSearchTerm(models.Model):
+    # search index entries for a patient, see search.py
+    patient = models.ForeignKey(Patient)
+
+    NAME = 'n'
+    CURP = 'c'
+    TRIGRAM = 't'
+    KIND_CHOICES = ((NAME, "Name"), (CURP, "CURP"), (TRIGRAM, "Trigram"))
+
+    kind = models.CharField(
+        max_length = 1,
+        choices = KIND_CHOICES,
+        default = NAME,
+    )
+
+    term = models.CharField(max_length=32, db_index=True) # normalized, see search.py
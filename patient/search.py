@@ -0,0 +1,180 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+Search index for patient names and CURPs.
+
+Searching the patient table with LIKE '%name%' scans every row. Instead,
+each patient has PatientSearchTerm rows for the words of its name, its 
+CURP, and the trigrams (three character substrings) of its name words, 
+all normalized: lowercase, with accents removed, so that a name matches
+whether or not it is typed with its accents. A word of a query matches a patient if:
+
+  - a name word or CURP equals the query word, scoring EXACT_SCORE
+  - a name word or CURP starts with the query word, scoring PREFIX_SCORE
+  - the patient's name words have at least TRIGRAM_MATCH of the trigrams
+    of the query word, scoring the fraction they have (at most 1). This 
+    finds query words in the middle of a name, and misspelled names.
+
+Each word of a query must match, and patients are ranked by the sum of
+their scores. Every lookup is an index lookup on the term column.
+
+The index is maintained by patientSaved(), a post_save receiver that 
+apps.py connects, whenever a Patient is saved, and its rows are deleted
+with the patient. Patients created or changed with update() or 
+bulk_create() bypass the receiver; index them with tools/patientindex.
+'''
+
+from __future__ import unicode_literals
+
+import math
+import unicodedata
+
+from django.db.models import Count
+
+from patient.models import PatientSearchTerm
+
+EXACT_SCORE = 3
+PREFIX_SCORE = 2
+TRIGRAM_MATCH = 0.5
+MAX_QUERY_WORDS = 5
+
+TERM_LENGTH = PatientSearchTerm._meta.get_field("term").max_length
+
+def normalize(s):
+    '''
+    lowercase s, remove accents, and replace anything that is not a 
+    letter or digit with a space
+    '''
+
+    if not isinstance(s, unicode):
+        s = s.decode("utf-8", "replace")
+    ret = []
+    for c in unicodedata.normalize("NFKD", s):
+        if unicodedata.combining(c):
+            continue
+        if c.isalnum():
+            ret.append(c.lower())
+        else:
+            ret.append(" ")
+    return "".join(ret)
+
+def getWords(s):
+    return [x[:TERM_LENGTH] for x in normalize(s).split()]
+
+def getTrigrams(word):
+    return set([word[i:i + 3] for i in range(len(word) - 2)])
+
+def getSearchTerms(patient):
+    '''
+    returns the set of (kind, term) that index patient
+    '''
+
+    terms = set()
+    for field in (patient.paternal_last, patient.maternal_last, 
+                  patient.first, patient.middle):
+        for word in getWords(field):
+            terms.add((PatientSearchTerm.NAME, word))
+            for trigram in getTrigrams(word):
+                terms.add((PatientSearchTerm.TRIGRAM, trigram))
+
+    # CURPs are indexed whole and, if they contain punctuation (e.g., 
+    # "11-22-33"), by each part, as queries are split the same way
+
+    words = getWords(patient.curp)
+    if len(words):
+        terms.add((PatientSearchTerm.CURP, "".join(words)[:TERM_LENGTH]))
+        for word in words:
+            terms.add((PatientSearchTerm.CURP, word))
+    return terms
+
+def indexPatient(patient):
+    '''
+    bring the search terms of patient up to date, writing only the terms 
+    that changed
+    '''
+
+    terms = getSearchTerms(patient)
+    current = {}
+    for x in PatientSearchTerm.objects.filter(patient=patient).values_list("id", "kind", "term"):
+        current[(x[1], x[2])] = x[0]
+
+    stale = [current[x] for x in current if not x in terms]
+    if len(stale):
+        PatientSearchTerm.objects.filter(id__in=stale).delete()
+
+    added = [PatientSearchTerm(patient=patient, kind=x[0], term=x[1]) for x in terms if not x in current]
+    if len(added):
+        PatientSearchTerm.objects.bulk_create(added)
+
+def patientSaved(sender, instance, **kwargs):
+    indexPatient(instance)
+
+def matchWord(word):
+    '''
+    returns a dict mapping the id of each patient matching word to its 
+    score
+    '''
+
+    scores = {}
+
+    # terms are stored normalized, so the case insensitive LIKE 'word%' 
+    # is the same as a case sensitive one, and unlike LIKE BINARY it can 
+    # use the index under MySQL's default collation
+
+    rows = PatientSearchTerm.objects.filter(
+        kind__in=[PatientSearchTerm.NAME, PatientSearchTerm.CURP],
+        term__istartswith=word).values_list("patient_id", "term")
+    for patient, term in rows:
+        if term == word:
+            score = EXACT_SCORE
+        else:
+            score = PREFIX_SCORE
+        if score > scores.get(patient, 0):
+            scores[patient] = score
+
+    trigrams = getTrigrams(word)
+    if len(trigrams):
+        needed = max(1, int(math.ceil(len(trigrams) * TRIGRAM_MATCH)))
+        rows = PatientSearchTerm.objects.filter(
+            kind=PatientSearchTerm.TRIGRAM,
+            term__in=list(trigrams)).values("patient").annotate(
+            count=Count("id")).filter(count__gte=needed)
+        for row in rows:
+            score = min(1.0, float(row["count"]) / len(trigrams))
+            if score > scores.get(row["patient"], 0):
+                scores[row["patient"]] = score
+    return scores
+
+def searchPatients(query):
+    '''
+    returns the ids of the patients matching query, best match first, 
+    and by id for patients that score the same
+    '''
+
+    words = getWords(query)[:MAX_QUERY_WORDS]
+    if len(words) == 0:
+        return []
+
+    scores = None
+    for word in words:
+        matches = matchWord(word)
+        if scores == None:
+            scores = matches
+        else:
+            scores = dict([(x, scores[x] + matches[x]) for x in matches if x in scores])
+        if len(scores) == 0:
+            break
+    return sorted(scores, key=lambda x: (-scores[x], x))
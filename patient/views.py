@@ -20,11 +20,12 @@ from rest_framework.response import Response
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from patient.models import *
+from patient.search import searchPatients
 from clinic.models import *
 from routingslip.models import *
+from register.models import Register
 from datetime import *
 from django.core import serializers
-from django.db.models import Q
 from django.http import HttpResponse, HttpResponseForbidden, HttpResponseBadRequest, HttpResponseServerError, HttpResponseNotFound
 
 from common.decorators import *
@@ -32,6 +33,36 @@ from common.decorators import *
 import json
 import sys
 
+SUMMARY_FIELDS = ("id", "paternal_last", "maternal_last", "first", "middle", "dob", "gender", "curp")
+
+def getPatientSummary(entry):
+    m = {}
+
+    m["id"] = entry.id
+    m["paternal_last"] = entry.paternal_last
+    m["maternal_last"] = entry.maternal_last
+    m["first"] = entry.first
+    m["middle"] = entry.middle
+    m["dob"] = entry.dob.strftime("%m/%d/%Y")
+    if entry.gender == "f":
+        m["gender"] = "Female"
+    else:
+        m["gender"] = "Male"
+    m["curp"] = entry.curp
+
+    return m
+
+def getPatientSummaries(ids):
+    '''
+    returns the summaries of the patients in ids, in the same order, in
+    one query
+    '''
+
+    patients = {}
+    for x in Patient.objects.filter(id__in=ids).only(*SUMMARY_FIELDS):
+        patients[x.id] = x
+    return [getPatientSummary(patients[x]) for x in ids if x in patients]
+
 class PatientView(APIView):
 
     authentication_classes = (TokenAuthentication,)
@@ -81,31 +112,52 @@ class PatientView(APIView):
         badRequest = False
         notFound = False
         patient = None
-        byClinicId = None
-        aClinic = None
+        ret = None
         
         if patient_id:
             try:
                 patient = Patient.objects.get(id = patient_id)
             except:
                 patient = None
+            if not patient:
+                notFound = True
+            else:
+                ret = self.serialize(patient)
         else:
             # look for optional arguments for searching
+            aClinic = None
             byClinicId = request.GET.get("clinic", '')
             if byClinicId != '':
-                aClinic = Clinic.objects.get(id=byClinicId)
+                try:
+                    aClinic = Clinic.objects.get(id=byClinicId)
+                except:
+                    aClinic = None
                 if not aClinic:
                     notFound = True
 
-            if not notFound:
+            registered = request.GET.get("registered", '')
+            if not registered in ('', "any", "Checked In", "Checked Out"):
+                badRequest = True
+
+            offset = 0
+            limit = None
+            try:
+                offset = int(request.GET.get('offset', '0'))
+                if request.GET.get('limit', '') != '':
+                    limit = int(request.GET.get('limit'))
+                if offset < 0 or (limit != None and limit < 1):
+                    badRequest = True
+            except:
+                badRequest = True
+
+            summary = request.GET.get('summary', 'false')
+            if not summary in ("true", "false"):
+                badRequest = True
+
+            if not notFound and not badRequest:
                 kwargs = {}
                 name = request.GET.get('name', '')
-                if not name == '':
-                    try:
-                        patient = Patient.objects.filter(Q(paternal_last__icontains=name) | Q(maternal_last__icontains=name) | Q(first__icontains=name) | Q(middle__icontains=name))
-                    except:
-                        patient = None
-                else:
+                if name == '':
                     exact = request.GET.get('exact', "false")
                     paternal_last = request.GET.get('paternal_last', '')
                     if not paternal_last == '':
@@ -159,26 +211,13 @@ class PatientView(APIView):
                         else:
                             badRequest = True
 
-                    if not badRequest:
-                        try:
-                            patient = Patient.objects.filter(**kwargs)
-                        except:
-                            patient = None
-
-        if not patient and not badRequest:
-            notFound = True
-        elif patient:
-            if patient_id:
-                ret = self.serialize(patient)
-            else: 
-                ret = []
-                for x in patient:
-                    if aClinic != None:
-                        routingSlip = RoutingSlip.objects.filter(patient=x.id, clinic=aClinic)
-                        if routingSlip != None and len(routingSlip) > 0:
-                            ret.append(x.id)
-                    else:
-                        ret.append(x.id)
+                if not badRequest:
+                    try:
+                        ret = self.search(name, kwargs, aClinic, registered, offset, limit, summary == "true")
+                    except:
+                        ret = None
+                    if ret == None:
+                        notFound = True
                             
         if badRequest:
             return HttpResponseBadRequest()
@@ -187,6 +226,62 @@ class PatientView(APIView):
         else:
             return Response(ret)
 
+    def filterByClinic(self, patients, aClinic, registered):
+        '''
+        restrict the patients queryset to those with a routing slip for 
+        aClinic or, if registered is given, to those with a registration 
+        in that state (at aClinic, if given). These are subqueries, so the
+        database does the filtering in the same query.
+        '''
+
+        if registered != '':
+            kwargs = {}
+            if aClinic != None:
+                kwargs["clinic"] = aClinic
+            if registered == "Checked In":
+                kwargs["state"] = Register.IN
+            elif registered == "Checked Out":
+                kwargs["state"] = Register.OUT
+            patients = patients.filter(id__in=Register.objects.filter(**kwargs).values("patient"))
+        elif aClinic != None:
+            patients = patients.filter(id__in=RoutingSlip.objects.filter(clinic=aClinic).values("patient"))
+        return patients
+
+    def search(self, name, kwargs, aClinic, registered, offset, limit, summary):
+        '''
+        returns a page of the ids, or summaries, of the patients matching
+        the search, or None if no patient matches
+        '''
+
+        if name != '':
+            ranked = searchPatients(name)
+            if len(ranked) and (aClinic != None or registered != ''):
+                patients = self.filterByClinic(Patient.objects.filter(id__in=ranked), aClinic, registered)
+                matching = set(patients.values_list("id", flat=True))
+                ranked = [x for x in ranked if x in matching]
+            if len(ranked) == 0:
+                return None
+            if limit != None:
+                ranked = ranked[offset:offset + limit]
+            else:
+                ranked = ranked[offset:]
+            if summary:
+                return getPatientSummaries(ranked)
+            return ranked
+
+        patients = self.filterByClinic(Patient.objects.filter(**kwargs), aClinic, registered).order_by("id")
+        if limit != None:
+            page = patients[offset:offset + limit]
+        else:
+            page = patients[offset:]
+        if summary:
+            ret = [getPatientSummary(x) for x in page.only(*SUMMARY_FIELDS)]
+        else:
+            ret = list(page.values_list("id", flat=True))
+        if len(ret) == 0 and (offset == 0 or not patients.exists()):
+            return None
+        return ret
+
     def validateState(self, state):
         valid = False
         ret = None
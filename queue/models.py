@@ -16,6 +16,8 @@
 from __future__ import unicode_literals
 
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 
 from patient.models import Patient
 from clinic.models import Clinic
@@ -25,6 +27,8 @@ from routingslip.models import RoutingSlip
 from routingslip.models import RoutingSlipEntry
 import datetime
 
+from queue.version import bumpQueueVersion
+
 # data about all queues in clinic
 
 class QueueStatus(models.Model):
@@ -44,6 +48,8 @@ class Queue(models.Model):
     station = models.ForeignKey(Station) 
     clinicstation = models.ForeignKey(ClinicStation) 
     avgservicetime = models.TimeField(default=datetime.time(0,0))
+    p50servicetime = models.TimeField(default=datetime.time(0,0)) # median service time
+    p90servicetime = models.TimeField(default=datetime.time(0,0)) # 90th percentile service time
 
 # a specific queue entry
 
@@ -54,4 +60,18 @@ class QueueEntry(models.Model):
     waittime = models.TimeField(default=datetime.time(0,0)) # timenow - timein
     routingslip = models.ForeignKey(RoutingSlip)
     routingslipentry = models.ForeignKey(RoutingSlipEntry)
-    estwaittime = models.TimeField(default=datetime.time(0,0)) # queue average service time * (number of patients ahead of this patient in the queue)
+    estwaittime = models.TimeField(default=datetime.time(0,0)) # computed by the scheduler, see scheduler/estimator.py
+
+    class Meta:
+        index_together = [["queue", "timein"]]
+
+# any change to queue data invalidates the queue snapshot, see version.py
+
+@receiver(post_save, sender=QueueStatus)
+@receiver(post_delete, sender=QueueStatus)
+@receiver(post_save, sender=Queue)
+@receiver(post_delete, sender=Queue)
+@receiver(post_save, sender=QueueEntry)
+@receiver(post_delete, sender=QueueEntry)
+def queueChanged(sender, **kwargs):
+    bumpQueueVersion()
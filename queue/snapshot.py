@@ -0,0 +1,73 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+Rendering of queue data, shared by QueueView and by the scheduler, which
+publishes the same structures as change events for subscribers (see 
+changeevent/views.py).
+'''
+
+from django.db.models import Prefetch
+
+from queue.models import Queue, QueueEntry
+
+def getQueues(clinic, station=None):
+    '''
+    returns the queues of a clinic (optionally for one station) with their
+    clinicstation joined in and their entries, ordered by timein, in the
+    orderedentries attribute. Three queries, however many queues.
+    '''
+
+    kwargs = {}
+    kwargs["clinic"] = clinic
+    if station:
+        kwargs["station"] = station
+    entries = QueueEntry.objects.order_by("timein")
+    queues = Queue.objects.filter(**kwargs).select_related("clinicstation").prefetch_related(Prefetch("queueentry_set", queryset=entries, to_attr="orderedentries"))
+    return list(queues)
+
+def getQueueData(queue):
+    aClinicStation = queue.clinicstation
+
+    queueData = {}
+    queueData["name"] = aClinicStation.name
+    queueData["name_es"] = aClinicStation.name_es
+    queueData["clinicstation"] = aClinicStation.id
+    queueData["avgservicetime"] = queue.avgservicetime
+    queueData["p50servicetime"] = queue.p50servicetime
+    queueData["p90servicetime"] = queue.p90servicetime
+    queueData["entries"] = []
+
+    for y in queue.orderedentries: 
+        entryData = {}
+        entryData["id"] = y.id
+        entryData["patient"] = y.patient_id
+        entryData["timein"] = str(y.timein)
+        entryData["waittime"] = str(y.waittime)
+        entryData["estwaittime"] = str(y.estwaittime)
+        entryData["routingslip"] = y.routingslip_id
+        entryData["routingslipentry"] = y.routingslipentry_id
+        
+        queueData["entries"].append(entryData)
+    return queueData
+
+def getQueueStatusData(queueStatus):
+    return {"numwaiting": queueStatus.numwaiting,
+            "minq": queueStatus.minq,
+            "maxq": queueStatus.maxq,
+            "avgq": queueStatus.avgq,
+            "minwait": queueStatus.minwait,
+            "maxwait": queueStatus.maxwait,
+            "avgwait": queueStatus.avgwait}
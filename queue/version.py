@@ -0,0 +1,71 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+Version token for queue data. 
+
+Every change to a Queue, QueueEntry or QueueStatus row replaces the token
+(see the signal receivers in models.py). The scheduler, which updates 
+queue entries and queues in bulk with update() and so bypasses signals,
+calls bumpQueueVersion() itself after doing so. QueueView uses the token
+as an ETag, answering polls from tablets that already have the current
+data with 304 Not Modified, and caches the rendered snapshot under it.
+
+The token lives in the Django cache, which must be shared between the
+web server processes and the scheduler, and writable by both (see CACHES
+in settings.py). It is replaced rather than incremented, so concurrent 
+bumps cannot be lost. A failure to replace it is logged, as clients 
+would otherwise be told the old queues are current.
+'''
+
+import sys
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+import logging
+
+LOG = logging.getLogger("tscharts")
+
+QUEUE_VERSION_KEY = "tscharts.queue.version"
+
+def setQueueVersion():
+    try:
+        cache.set(QUEUE_VERSION_KEY, uuid.uuid4().hex, None)
+    except:
+        LOG.error("setQueueVersion exception: {} unable to replace the queue version, check that the cache (CACHES in settings.py) is writable".format(sys.exc_info()[0]))
+
+def bumpQueueVersion():
+    # inside an atomic block, a snapshot rendered before the commit would 
+    # be cached under the new token, so the token is replaced on commit
+
+    transaction.on_commit(setQueueVersion)
+
+def getQueueVersion():
+    '''
+    returns the current token, creating one if there is none (e.g., the
+    cache was cleared). Returns None if the cache is not working.
+    '''
+
+    ret = None
+    try:
+        ret = cache.get(QUEUE_VERSION_KEY)
+        if ret == None:
+            cache.add(QUEUE_VERSION_KEY, uuid.uuid4().hex, None)
+            ret = cache.get(QUEUE_VERSION_KEY)
+    except:
+        ret = None
+    return ret
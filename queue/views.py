@@ -25,7 +25,12 @@ from queue.models import *
 from datetime import *
 import sys
 from django.core import serializers
-from django.http import HttpResponse, HttpResponseForbidden, HttpResponseBadRequest, HttpResponseServerError, HttpResponseNotFound
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseBadRequest, HttpResponseServerError, HttpResponseNotFound, HttpResponseNotModified
+from django.core.cache import cache
+from queue.version import getQueueVersion
+from queue.snapshot import getQueues, getQueueData, getQueueStatusData
+from changeevent.models import ChangeEvent
+from changeevent.notify import notifyChange
 
 import json
 
@@ -38,15 +43,64 @@ class QueueView(APIView):
 
         super(QueueView, self).__init__()
 
+    '''
+    The snapshot is cached under an ETag made from the queue version token
+    (see version.py) and the query arguments. A tablet that sends the ETag
+    of the data it already has in If-None-Match gets 304 Not Modified 
+    until something in the queues changes, without the database being 
+    read.
+    '''
+
+    def getETag(self, version, clinicid, stationid, clinicstation):
+        return '"{}-{}-{}-{}"'.format(version, clinicid, stationid, clinicstation)
+
+    def getSnapshot(self, aClinic, aStation, clinicstation):
+        '''
+        returns a tuple (data, notFound, internalError)
+        '''
+
+        notFound = False
+        internalError = False
+        queues = None
+        queueStatus = None
+        ret = {}
+
+        try:
+            queues = getQueues(aClinic, aStation)
+            if len(queues) == 0:
+                notFound = True
+        except:
+            notFound = True
+
+        if not notFound:
+            try:
+                queueStatus = QueueStatus.objects.filter(clinic=aClinic)
+                if not queueStatus or len(queueStatus) == 0:
+                    notFound = True
+                elif queueStatus and len(queueStatus) > 1:
+                    internalError = True
+                else:
+                    queueStatus = queueStatus[0]
+            except:
+                internalError = True
+
+        if not notFound and not internalError:
+            ret["status"] = getQueueStatusData(queueStatus)
+            ret["queues"] = []
+            for x in queues:
+                if not clinicstation == '' and int(clinicstation) != x.clinicstation_id:
+                    # clinicstation does not match
+                    continue
+                ret["queues"].append(getQueueData(x)) 
+        return (ret, notFound, internalError)
+
     def get(self, request, format=None):
         badRequest = False
         notFound = False
         aClinic = None
         aStation = None
-        queues = None
-        queueStatus = None
         internalError = False
-        ret = {}
+        ret = None
 
         clinicid = request.GET.get('clinic', '')
         stationid = request.GET.get('station', '')
@@ -54,11 +108,6 @@ class QueueView(APIView):
         if not clinicid == '':
             try:
                 clinicid = int(clinicid)
-                try:
-                    aClinic = Clinic.objects.get(id=clinicid)
-                except:
-                    aClinic = None
-                    notFound = True
             except:
                 badRequest = True
         else:
@@ -67,99 +116,61 @@ class QueueView(APIView):
         if not stationid == '':
             try:
                 stationid = int(stationid)
-                try:
-                    aStation = Station.objects.get(id=stationid)
-                except:
-                    aStation = None
-                    notFound = True
             except:
-                pass
+                stationid = ''
 
-        if not notFound and not badRequest:
-            kwargs = {}
-            kwargs["clinic"] = aClinic
-            if aStation:
-                kwargs["station"] = aStation 
+        if not clinicstation == '':
             try:
-                queues = Queue.objects.filter(**kwargs)
-                if not queues or len(queues) == 0:
-                    notFound = True
+                clinicstation = int(clinicstation)
             except:
-                notFound = True
+                badRequest = True
+
+        if badRequest:
+            return HttpResponseBadRequest()
 
-        if not notFound and not badRequest:
+        etag = None
+        version = getQueueVersion()
+        if version:
+            etag = self.getETag(version, clinicid, stationid, clinicstation)
+            if request.META.get("HTTP_IF_NONE_MATCH", None) == etag:
+                response = HttpResponseNotModified()
+                response["ETag"] = etag
+                return response
             try:
-                queueStatus = QueueStatus.objects.filter(clinic=aClinic)
-                if not queueStatus or len(queueStatus) == 0:
-                    notFound = True
-                elif queueStatus and len(queueStatus) > 1:
-                    internalError = True
-                else:
-                    queueStatus = queueStatus[0]
+                ret = cache.get("tscharts.queue.snapshot." + etag)
             except:
-                internalError = True
+                ret = None
 
-        if not notFound and not badRequest and not internalError:
-            ret["status"] = {"numwaiting": queueStatus.numwaiting,
-                             "minq": queueStatus.minq,
-                             "maxq": queueStatus.maxq,
-                             "avgq": queueStatus.avgq,
-                             "minwait": queueStatus.minwait,
-                             "maxwait": queueStatus.maxwait,
-                             "avgwait": queueStatus.avgwait}
-            ret["queues"] = []
-            for x in queues:
-                if not clinicstation == '' and int(clinicstation) != x.clinicstation_id:
-                    # clinicstation does not match
-                    continue
-                queueData = {}
-                aClinicStation = None
+        if ret == None:
+            try:
+                aClinic = Clinic.objects.get(id=clinicid)
+            except:
+                aClinic = None
+                notFound = True
+
+            if not notFound and not stationid == '':
                 try:
-                    aClinicStation = ClinicStation.objects.get(id=x.clinicstation_id)
+                    aStation = Station.objects.get(id=stationid)
                 except:
-                    aClinicStation = None
-
-                if not aClinicStation:
-                    internalError = True
-                    break
-
-                queueData["name"] = aClinicStation.name
-                queueData["name_es"] = aClinicStation.name_es
-                queueData["clinicstation"] = aClinicStation.id
-                queueData["avgservicetime"] = x.avgservicetime
-                queueData["entries"] = []
+                    aStation = None
+                    notFound = True
 
+            if not notFound:
+                ret, notFound, internalError = self.getSnapshot(aClinic, aStation, clinicstation)
+            if not notFound and not internalError and etag:
                 try:
-                    queueEntries = QueueEntry.objects.filter(queue=x.id).order_by("timein")
-                    if not queueEntries:
-                        queueEntries = []
+                    cache.set("tscharts.queue.snapshot." + etag, ret, 60)
                 except:
-                    internalError = True
-
-                if internalError:
-                    break
-
-                for y in queueEntries: 
-                    entryData = {}
-                    entryData["id"] = y.id
-                    entryData["patient"] = y.patient_id
-                    entryData["timein"] = str(y.timein)
-                    entryData["waittime"] = str(y.waittime)
-                    entryData["estwaittime"] = str(y.estwaittime)
-                    entryData["routingslip"] = y.routingslip_id
-                    entryData["routingslipentry"] = y.routingslipentry_id
-                    
-                    queueData["entries"].append(entryData)
-               
-                ret["queues"].append(queueData) 
+                    pass
  
-        if badRequest:
-            return HttpResponseBadRequest()
         if notFound:
             return HttpResponseNotFound()
         if internalError:
             return HttpResponseServerError()
-        return Response(ret)
+        response = Response(ret)
+        if etag:
+            response["ETag"] = etag
+        return response
 
 class QueueEntryView(APIView):
 
@@ -183,6 +194,13 @@ class QueueEntryView(APIView):
         if not queueentry:
             raise NotFound
         else:
+            data = {"id": queueentry.id,
+                    "queue": queueentry.queue_id,
+                    "clinicstation": queueentry.queue.clinicstation_id}
+            clinic = queueentry.queue.clinic_id
             queueentry.delete()
+            notifyChange("queueentry", data["id"], ChangeEvent.DELETE,
+                         clinic=clinic, patient=queueentry.patient_id,
+                         routingslip=queueentry.routingslip_id, data=data)
 
         return Response({})
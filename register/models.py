@@ -33,3 +33,6 @@ class Register(models.Model):
         choices = STATE_CHOICES,
         default = IN,
     )
+
+    class Meta:
+        index_together = [["clinic", "patient"], ["clinic", "state"]]
@@ -16,6 +16,7 @@
 from __future__ import unicode_literals
 
 from django.db import models
+from django.utils import timezone
 
 # Create your models here.
 
@@ -30,4 +31,9 @@ class RequestLog(models.Model):
     body = models.CharField(max_length=1024)      # request.body,
     files = models.CharField(max_length=1024)     # u'\n    '.join(u'%s: %s' % (k,v) for k,v in sorted(request.FILES.items())),
     content = models.CharField(max_length=1024)   # request.content_type,
-    timestamp = models.DateTimeField(auto_now_add=True)
+    status = models.IntegerField(default=0)       # of the response
+    elapsed = models.IntegerField(default=0)      # ms, in the view
+
+    # when the request was made, records are written later, in batches
+
+    timestamp = models.DateTimeField(default=timezone.now)
@@ -0,0 +1,157 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+Writes RequestLog records in the background, so that a request does not
+wait for an insert (and, with MyISAM, a table lock) before its view runs.
+
+Records are queued in memory and written by a thread, with bulk_create(),
+when REQUEST_LOG_BATCH_SIZE have been queued or REQUEST_LOG_FLUSH_INTERVAL
+milliseconds have passed. If the queue holds REQUEST_LOG_BUFFER_SIZE 
+records, or the database cannot be written, records go to the "requestlog"
+logger (a rotating file, see LOGGING in settings.py) instead. Records
+still queued when the process exits are written at exit, unless it is
+killed.
+'''
+
+import atexit
+import json
+import os
+import random
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+
+from requestlog.models import RequestLog
+
+import logging
+
+LOG = logging.getLogger("tscharts")
+FILE_LOG = logging.getLogger("requestlog")
+
+class RequestLogWriter(object):
+
+    def __init__(self, bufferSize=10000, batchSize=200, flushInterval=500):
+        super(RequestLogWriter, self).__init__()
+        self._bufferSize = bufferSize
+        self._batchSize = batchSize
+        self._flushInterval = flushInterval / 1000.0
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._flushLock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._fields = dict((f.name, f.max_length) for f in RequestLog._meta.fields if f.max_length)
+
+    def start(self):
+        # threads do not survive a fork (e.g., of web server processes), 
+        # each process runs its own
+
+        if self._thread == None or self._pid != os.getpid() or not self._thread.is_alive():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self.run, name="requestlog")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def log(self, record):
+        '''
+        queue a record, a dict of RequestLog fields
+        '''
+
+        for k, v in self._fields.items():
+            if isinstance(record.get(k, None), basestring):
+                record[k] = record[k][:v]
+        with self._lock:
+            full = len(self._buffer) >= self._bufferSize
+            if not full:
+                self._buffer.append(record)
+                n = len(self._buffer)
+                self.start()
+        if full:
+            self.logToFile([record])
+        elif n >= self._batchSize:
+            self._wake.set()
+
+    def run(self):
+        while True:
+            self._wake.wait(self._flushInterval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except:
+                LOG.error("RequestLogWriter flush failed")
+
+    def flush(self):
+        '''
+        write the records queued, in batches
+        '''
+
+        with self._flushLock:
+            while True:
+                records = []
+                with self._lock:
+                    while len(records) < self._batchSize and len(self._buffer):
+                        records.append(self._buffer.popleft())
+                if not records:
+                    break
+
+                # drop a connection the server has closed, e.g., after 
+                # wait_timeout, rather than fail with it
+
+                close_old_connections()
+                try:
+                    RequestLog.objects.bulk_create([RequestLog(**x) for x in records])
+                except Exception as e:
+                    LOG.error("RequestLogWriter unable to write {} records: {}".format(len(records), e))
+                    self.logToFile(records)
+
+    def logToFile(self, records):
+        for x in records:
+            try:
+                FILE_LOG.info(json.dumps(x, cls=DjangoJSONEncoder))
+            except:
+                LOG.error("RequestLogWriter unable to log request to file")
+
+_writer = None
+_writerLock = threading.Lock()
+
+def getWriter():
+    global _writer
+    with _writerLock:
+        if _writer == None:
+            _writer = RequestLogWriter(
+                bufferSize=getattr(settings, "REQUEST_LOG_BUFFER_SIZE", 10000),
+                batchSize=getattr(settings, "REQUEST_LOG_BATCH_SIZE", 200),
+                flushInterval=getattr(settings, "REQUEST_LOG_FLUSH_INTERVAL", 500))
+            atexit.register(_writer.flush)
+    return _writer
+
+def isSampled(method):
+    '''
+    returns True if a request with this method is to be logged
+    '''
+
+    ret = True
+    if method == "GET":
+        rate = getattr(settings, "REQUEST_LOG_GET_SAMPLE_RATE", 1.0)
+        ret = rate >= 1.0 or random.random() < rate
+    return ret
+
+def logRequest(record):
+    getWriter().log(record)
@@ -29,3 +29,6 @@ class ReturnToClinic(models.Model):
     station = models.ForeignKey(Station)
     interval = models.IntegerField()
     comment = models.TextField()
+
+    class Meta:
+        index_together = [["patient", "clinic"]]
@@ -25,6 +25,8 @@ from django.http import HttpResponse, HttpResponseForbidden, HttpResponseBadRequ
 import numbers
 
 from common.decorators import *
+from changeevent.models import ChangeEvent
+from changeevent.notify import notifyChange
 
 import json
 import sys
@@ -199,6 +201,11 @@ class ReturnToClinicStationView(APIView):
                 try:
                     returntoclinicstation.state=stateDb
                     returntoclinicstation.save()
+                    notifyChange("returntoclinicstation",
+                                 returntoclinicstation.id,
+                                 ChangeEvent.UPDATE,
+                                 clinic=returntoclinicstation.clinic_id,
+                                 patient=returntoclinicstation.patient_id)
                 except:
                     implError = True
                     implMsg = sys.exc_info()[0] 
@@ -303,6 +310,10 @@ class ReturnToClinicStationView(APIView):
         if implError:
             return HttpResponseServerError(implMsg) 
         else:
+            notifyChange("returntoclinicstation", returntoclinicstation.id,
+                         ChangeEvent.CREATE,
+                         clinic=returntoclinicstation.clinic_id,
+                         patient=returntoclinicstation.patient_id)
             return Response({'id': returntoclinicstation.id})
        
     @log_request 
@@ -319,6 +330,10 @@ class ReturnToClinicStationView(APIView):
         if not returntoclinicstation:
             raise NotFound
         else:
+            notifyChange("returntoclinicstation", returntoclinicstation.id,
+                         ChangeEvent.DELETE,
+                         clinic=returntoclinicstation.clinic_id,
+                         patient=returntoclinicstation.patient_id)
             returntoclinicstation.delete()
 
         return Response({})
@@ -55,6 +55,9 @@ class RoutingSlip(models.Model):
     createtime = models.DateTimeField(auto_now_add=True)
     statechangetime = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        index_together = [["clinic", "patient"]]
+
 '''
 A given patient will be associated with a routing slip and a set of 
 routing slip entries that represent both stations in the clinic the
@@ -107,6 +110,9 @@ class RoutingSlipEntry(models.Model):
     createtime = models.DateTimeField(auto_now_add=True)
     statechangetime = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        index_together = [["routingslip", "order"], ["routingslip", "state"]]
+
 class RoutingSlipComment(models.Model):
     routingslip = models.ForeignKey(RoutingSlip)
     comment = models.TextField()
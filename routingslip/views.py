@@ -27,10 +27,14 @@ import sys
 from types import *
 from django.core import serializers
 from django.http import HttpResponse, HttpResponseForbidden, HttpResponseBadRequest, HttpResponseServerError, HttpResponseNotFound
+from django.db import transaction
+from django.db.models import Prefetch
 import urllib
 import traceback
 
 from common.decorators import *
+from changeevent.models import ChangeEvent
+from changeevent.notify import notifyChange
 
 import logging
 
@@ -38,6 +42,32 @@ LOG = logging.getLogger("tscharts")
 
 import json
 
+stateToText = {"n": "New", "s": "Scheduled", "i": "Checked In", "o": "Checked Out", "r": "Removed", "d": "Deleted", "l": "Return"}
+textToState = {"New": "n", "Scheduled": "s", "Checked In": "i", "Checked Out": "o", "Removed": "r", "Deleted": "d", "Return": "l"}
+
+def getRoutingSlipEntryData(entry):
+    m = {}
+    m["id"] = entry.id  
+    m["routingslip"] = entry.routingslip_id  
+    m["station"] = entry.station_id
+    m["returntoclinicstation"] = entry.returntoclinicstation_id
+    m["order"] = entry.order
+    m["state"] = stateToText[entry.state]
+    return m
+
+def getRoutingSlips(**kwargs):
+    '''
+    routing slips matching kwargs, with their entries (in routing order) 
+    and comments (newest first) fetched by one query each, rather than 
+    two per routing slip
+    '''
+
+    entries = RoutingSlipEntry.objects.order_by("order", "id")
+    comments = RoutingSlipComment.objects.order_by("-updatetime").only("id", "routingslip")
+    return RoutingSlip.objects.filter(**kwargs).prefetch_related(
+        Prefetch("routingslipentry_set", queryset=entries, to_attr="orderedentries"),
+        Prefetch("routingslipcomment_set", queryset=comments, to_attr="orderedcomments"))
+
 class RoutingSlipView(APIView):
 
     authentication_classes = (TokenAuthentication,)
@@ -63,7 +93,11 @@ class RoutingSlipView(APIView):
                            "Ortho": 'o',
                            "Other": 't'}
 
-    def serialize(self, entry):
+    def serialize(self, entry, expand=False):
+        '''
+        entry is a routing slip from getRoutingSlips(). If expand, the 
+        routing slip entries are included, in routing order, in "entries"
+        '''
 
         error = False
 
@@ -74,32 +108,13 @@ class RoutingSlipView(APIView):
         m["category"] = self.catsToText[entry.category]
 
         try:
-            routingslip = RoutingSlip.objects.get(id=entry.id)
+            m["routing"] = [x.id for x in entry.orderedentries]
+            if expand:
+                m["entries"] = [getRoutingSlipEntryData(x) for x in entry.orderedentries]
+            m["comments"] = [x.id for x in entry.orderedcomments]
         except:
             error = True
 
-        if not error:
-            m["routing"] = []
-            try:
-                entries = RoutingSlipEntry.objects.filter(routingslip = routingslip)
-                if entries and len(entries):
-                    entries = entries.order_by("order")
-                    for x in entries:
-                        m["routing"].append(x.id)
-            except:
-                error = True
-
-        if not error:
-            m["comments"] = []
-            try:
-                entries = RoutingSlipComment.objects.filter(routingslip = routingslip)
-                if entries and len(entries):
-                    entries = entries.order_by('-updatetime')
-                    for x in entries:
-                        m["comments"].append(x.id)
-            except:
-                error = True
-
         if error:
             m = None
 
@@ -116,9 +131,14 @@ class RoutingSlipView(APIView):
         ret = None
         kwargs = {}
 
+        expand = request.GET.get("expand", '')
+        if not expand in ['', "entries"]:
+            badRequest = True
+        expand = expand == "entries"
+
         if routing_slip_id:
             try:
-                routing_slip = RoutingSlip.objects.get(id = routing_slip_id)
+                routing_slip = getRoutingSlips(id = routing_slip_id).get()
                 if not routing_slip:
                     notFound = True
             except:
@@ -166,9 +186,9 @@ class RoutingSlipView(APIView):
                 if len(kwargs):
                     try:
                         if aPatient and aClinic:
-                            routing_slip = RoutingSlip.objects.get(**kwargs)
+                            routing_slip = getRoutingSlips(**kwargs).get()
                         else:
-                            routing_slip = RoutingSlip.objects.filter(**kwargs)
+                            routing_slip = getRoutingSlips(**kwargs)
                     except:
                         notFound = True
                         routing_slip = None
@@ -183,15 +203,15 @@ class RoutingSlipView(APIView):
             if routing_slip: 
                 if routing_slip_id:
                     # one based on ID
-                    ret = self.serialize(routing_slip)
+                    ret = self.serialize(routing_slip, expand)
                 elif aPatient and aClinic:
                     # one for patient, clinic pair
-                    ret = self.serialize(routing_slip)
+                    ret = self.serialize(routing_slip, expand)
                 else:
                     # array
                     ret = []
                     for x in routing_slip:
-                        m = self.serialize(x);
+                        m = self.serialize(x, expand);
                         if m == None:
                             ret = None
                             break
@@ -285,6 +305,10 @@ class RoutingSlipView(APIView):
         if implError:
             return HttpResponseServerError(implMsg) 
         else:
+            notifyChange("routingslip", routing_slip.id, ChangeEvent.CREATE,
+                         clinic=routing_slip.clinic_id,
+                         patient=routing_slip.patient_id,
+                         routingslip=routing_slip.id)
             return Response({'id': routing_slip.id})
 
     @log_request
@@ -317,6 +341,11 @@ class RoutingSlipView(APIView):
                 try:
                     routing_slip.category=category
                     routing_slip.save()
+                    notifyChange("routingslip", routing_slip.id,
+                                 ChangeEvent.UPDATE,
+                                 clinic=routing_slip.clinic_id,
+                                 patient=routing_slip.patient_id,
+                                 routingslip=routing_slip.id)
                 except:
                     implError = True
                     implMsg = sys.exc_info()[0] 
@@ -334,6 +363,7 @@ class RoutingSlipView(APIView):
 
         badParam = False 
         notFound = False 
+        implError = False
         routing_slip = None
 
         if not routing_slip_id:
@@ -350,30 +380,29 @@ class RoutingSlipView(APIView):
 
         if not badParam and not notFound:
 
-            # remove dependent objects
-
-            try:
-                comments = RoutingSlipComment.objects.filter(routingslip=routing_slip)
-            except:
-                comments = None
-
-            for x in comments:
-                x.delete()
+            # remove dependent objects along with the slip, so that a 
+            # failure part way does not leave entries of a deleted slip
 
             try:
-                entries = RoutingSlipEntry.objects.filter(routingslip=routing_slip)
+                with transaction.atomic():
+                    RoutingSlipComment.objects.filter(routingslip=routing_slip).delete()
+                    RoutingSlipEntry.objects.filter(routingslip=routing_slip).delete()
+                    notifyChange("routingslip", routing_slip.id, 
+                                 ChangeEvent.DELETE,
+                                 clinic=routing_slip.clinic_id,
+                                 patient=routing_slip.patient_id,
+                                 routingslip=routing_slip.id)
+                    routing_slip.delete()
             except:
-                entries = None
-
-            for x in entries:
-                x.delete()
-
-            routing_slip.delete()
+                LOG.error("RoutingSlipView delete failed for {}: {}".format(routing_slip_id, sys.exc_info()[0]))
+                implError = True
 
         if badParam:
             return HttpResponseBadRequest()
         if notFound:
             return HttpResponseNotFound()
+        if implError:
+            return HttpResponseServerError()
         return Response({})
 
 class RoutingSlipEntryView(APIView):
@@ -383,20 +412,14 @@ class RoutingSlipEntryView(APIView):
 
     def __init__(self):
         super(RoutingSlipEntryView, self).__init__()
-        self.stateToText = {"n": "New", "s": "Scheduled", "i": "Checked In", "o": "Checked Out", "r": "Removed", "d": "Deleted", "l": "Return"}
-        self.textToState = {"New": "n", "Scheduled": "s", "Checked In": "i", "Checked Out": "o", "Removed": "r", "Deleted": "d", "Return": "l"}
+        self.stateToText = stateToText
+        self.textToState = textToState
 
     def serialize(self, entry):
         error = False
 
         try:
-            m = {}
-            m["id"] = entry.id  
-            m["routingslip"] = entry.routingslip_id  
-            m["station"] = entry.station_id
-            m["returntoclinicstation"] = entry.returntoclinicstation_id
-            m["order"] = entry.order
-            m["state"] = self.stateToText[entry.state]
+            m = getRoutingSlipEntryData(entry)
         except:
             error = True
 
@@ -630,6 +653,11 @@ class RoutingSlipEntryView(APIView):
         if implError:
             return HttpResponseServerError(implMsg) 
         else:
+            notifyChange("routingslipentry", routing_slip_entry.id,
+                         ChangeEvent.CREATE,
+                         clinic=aRoutingSlip.clinic_id,
+                         patient=aRoutingSlip.patient_id,
+                         routingslip=aRoutingSlip.id)
             return Response({'id': routing_slip_entry.id})
 
     def verifyState(self, old, new):
@@ -713,6 +741,10 @@ class RoutingSlipEntryView(APIView):
 
                     try:
                         routing_slip_entry.save()
+                        notifyChange("routingslipentry",
+                                     routing_slip_entry.id,
+                                     ChangeEvent.UPDATE,
+                                     routingslip=routing_slip_entry.routingslip_id)
                     except:
                         implError = True
                         implMsg = sys.exc_info()[0] 
@@ -743,6 +775,9 @@ class RoutingSlipEntryView(APIView):
         if not routing_slip_entry:
             raise NotFound
         else:
+            notifyChange("routingslipentry", routing_slip_entry.id,
+                         ChangeEvent.DELETE,
+                         routingslip=routing_slip_entry.routingslip_id)
             routing_slip_entry.delete()
 
         return Response({})
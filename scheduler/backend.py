@@ -0,0 +1,433 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+Data access backends for the scheduler. 
+
+HTTPBackend reads and updates routing slips, routing slip entries, 
+clinicstations and returntoclinicstation resources through the REST API,
+which is how the scheduler has always worked. ORMBackend does the same 
+work directly against the database, which saves hundreds of HTTP round 
+trips per scheduling cycle: all routing slips of a clinic and their 
+entries are read with two queries, and state changes are single UPDATEs.
+
+Both backends return dicts shaped like the corresponding REST API 
+responses, so the scheduler does not care which one it is using. The one
+addition is that routing slips carry an "entries" list holding the 
+routing slip entry objects, in routing order, alongside "routing".
+
+ORMBackend records the same change events as the REST views it bypasses
+(see changeevent/notify.py), so subscribers see its changes as well. 
+They are recorded with wake False, as the scheduler made them itself.
+'''
+
+import datetime
+
+from test.tscharts.tscharts import Login, Logout
+from test.routingslip.routingslip import GetRoutingSlip, GetRoutingSlipEntry, UpdateRoutingSlipEntry, CreateRoutingSlipEntry
+from test.clinic.clinic import GetClinic, GetAllClinics
+from test.clinicstation.clinicstation import GetClinicStation
+from test.returntoclinicstation.returntoclinicstation import GetReturnToClinicStation, UpdateReturnToClinicStation
+
+from django.db.models import Prefetch
+
+from routingslip.models import RoutingSlip, RoutingSlipEntry
+from clinic.models import Clinic
+from station.models import Station
+from clinicstation.models import ClinicStation 
+from returntoclinicstation.models import ReturnToClinicStation
+from changeevent.models import ChangeEvent
+from changeevent.notify import notifyChange
+
+stateToText = {"n": "New", "s": "Scheduled", "i": "Checked In", "o": "Checked Out", "r": "Removed", "d": "Deleted", "l": "Return"}
+textToState = {"New": "n", "Scheduled": "s", "Checked In": "i", "Checked Out": "o", "Removed": "r", "Deleted": "d", "Return": "l"}
+
+# for each new routing slip entry state, the states it may not be entered 
+# from. Mirrors RoutingSlipEntryView.verifyState()
+
+illegalFromStates = {"n": ["i", "o", "r"],
+                     "s": ["i", "o", "r"],
+                     "l": ["i", "o"],
+                     "r": ["i"],
+                     "i": ["o", "r"],
+                     "o": ["r"],
+                     "d": []}
+
+rtcStateToDb = {"created": '1', "scheduled_dest": '2', "checked_out_dest": '3', "scheduled_return": '4'}
+rtcDbToState = {'1': "created", '2': "scheduled_dest", '3': "checked_out_dest", '4': "scheduled_return"}
+
+class SchedulerBackend(object):
+    def login(self):
+        return True
+
+    def logout(self):
+        pass
+
+    def getClinic(self, clinicid):
+        return None
+
+    def getAllClinics(self):
+        return []
+
+    def getClinicStations(self, clinicid):
+        return []
+
+    def getRoutingSlips(self, clinicid):
+        return None
+
+    def getRoutingSlip(self, routingslipid):
+        return None
+
+    def getRoutingSlipForPatient(self, clinicid, patientid):
+        return None
+
+    def getReturnToClinicStations(self, clinicid, state):
+        return []
+
+    def createRoutingSlipEntry(self, routingslipid, stationid, returntoclinicstationid):
+        return None
+
+    def setRoutingSlipEntryState(self, rseId, state):
+        return False
+
+    def setReturnToClinicStationState(self, rtcid, state):
+        return False
+
+class HTTPBackend(SchedulerBackend):
+    def __init__(self, host, port, username, password):
+        super(HTTPBackend, self).__init__()
+        self._host = host
+        self._port = port
+        self._username = username
+        self._password = password
+        self._token = None
+
+    def login(self):
+        ret = False
+        try:
+            login = Login(self._host, self._port, self._username, self._password)
+            val = login.send(timeout=30)
+            if val[0] == 200:
+                self._token = val[1]["token"]
+                ret = True
+        except:
+            ret = False
+        return ret
+
+    def logout(self):
+        logout = Logout(self._host, self._port)
+        logout.send(timeout=30)
+
+    def getClinic(self, clinicid):
+        ret = None
+        x = GetClinic(self._host, self._port, self._token, clinicid)
+        val = x.send(timeout=30)
+        if val[0] == 200:
+            ret = val[1]
+        return ret
+
+    def getAllClinics(self):
+        ret = []
+        x = GetAllClinics(self._host, self._port, self._token) 
+        val = x.send(timeout=30)
+        if val[0] == 200:
+            ret = val[1]
+        return ret
+
+    def getClinicStations(self, clinicid):
+        ret = []
+        x = GetClinicStation(self._host, self._port, self._token)
+        x.setClinic(clinicid)
+        val = x.send(timeout=30)
+        if val[0] == 200:
+            ret = val[1]
+        return ret
+
+    def getRoutingSlipEntry(self, rseId):
+        ret = None
+        x = GetRoutingSlipEntry(self._host, self._port, self._token)
+        x.setId(rseId)
+        val = x.send(timeout=30)
+        if val[0] == 200:
+            ret = val[1]
+        return ret
+
+    def addEntries(self, routingslip):
+        if "entries" in routingslip:
+            # expanded by the server
+
+            return routingslip
+        routingslip["entries"] = []
+        for x in routingslip["routing"]:
+            entry = self.getRoutingSlipEntry(x)
+            if entry:
+                routingslip["entries"].append(entry)
+        return routingslip
+
+    def getRoutingSlips(self, clinicid):
+        ret = None
+        x = GetRoutingSlip(self._host, self._port, self._token)
+        x.setExpand("entries")
+        x.setClinic(clinicid)
+        val = x.send(timeout=30)
+        if val[0] == 200:
+            ret = []
+            for y in val[1]:
+                ret.append(self.addEntries(y))
+        return ret
+
+    def getRoutingSlip(self, routingslipid):
+        ret = None
+        x = GetRoutingSlip(self._host, self._port, self._token)
+        x.setExpand("entries")
+        x.setId(routingslipid)
+        val = x.send(timeout=30)
+        if val[0] == 200:
+            ret = self.addEntries(val[1])
+        return ret
+
+    def getRoutingSlipForPatient(self, clinicid, patientid):
+        ret = None
+        x = GetRoutingSlip(self._host, self._port, self._token)
+        x.setExpand("entries")
+        x.setClinic(clinicid)
+        x.setPatient(patientid)
+        val = x.send(timeout=30)
+        if val[0] == 200:
+            ret = self.addEntries(val[1])
+        return ret
+
+    def getReturnToClinicStations(self, clinicid, state):
+        ret = []
+        x = GetReturnToClinicStation(self._host, self._port, self._token)
+        x.setClinic(clinicid)
+        x.setState(state)
+        val = x.send(timeout=30)
+        if val[0] == 200:
+            for y in val[1]:
+                z = GetReturnToClinicStation(self._host, self._port, self._token)
+                z.setId(y["id"])
+                val = z.send(timeout=30)
+                if val[0] == 200:
+                    ret.append(val[1])
+        return ret
+
+    def createRoutingSlipEntry(self, routingslipid, stationid, returntoclinicstationid):
+        ret = None
+        x = CreateRoutingSlipEntry(self._host, self._port, self._token)
+        x.setRoutingSlip(routingslipid)
+        x.setStation(stationid)
+        x.setReturnToClinicStation(returntoclinicstationid)
+        val = x.send(timeout=30)
+        if val[0] == 200:
+            ret = self.getRoutingSlipEntry(val[1]["id"])
+        return ret
+
+    def setRoutingSlipEntryState(self, rseId, state):
+        x = UpdateRoutingSlipEntry(self._host, self._port, self._token, rseId)
+        x.setState(state)
+        val = x.send(timeout=30)
+        return val[0] == 200
+
+    def setReturnToClinicStationState(self, rtcid, state):
+        x = UpdateReturnToClinicStation(self._host, self._port, self._token, rtcid)
+        x.setState(state)
+        val = x.send(timeout=30)
+        return val[0] == 200
+
+class ORMBackend(SchedulerBackend):
+    def serializeClinic(self, x):
+        m = {}
+        m["id"] = x.id  
+        m["start"] = x.start.strftime("%m/%d/%Y")
+        m["end"] = x.end.strftime("%m/%d/%Y")  
+        m["location"] = x.location
+        return m
+
+    def serializeClinicStation(self, x):
+        m = {}
+        m["id"] = x.id  
+        m["name"] = x.name
+        m["name_es"] = x.name_es
+        m["clinic"] = x.clinic_id
+        m["station"] = x.station_id
+        m["active"] = x.active
+        m["level"] = x.level
+        m["away"] = x.away
+        m["awaytime"] = x.awaytime
+        m["willreturn"] = x.willreturn
+        m["activepatient"] = x.activepatient_id
+        m["nextpatient"] = x.nextpatient_id
+        m["finished"] = x.finished
+        return m
+
+    def serializeRoutingSlipEntry(self, x):
+        m = {}
+        m["id"] = x.id  
+        m["routingslip"] = x.routingslip_id  
+        m["station"] = x.station_id
+        m["returntoclinicstation"] = x.returntoclinicstation_id
+        m["order"] = x.order
+        m["state"] = stateToText[x.state]
+        return m
+
+    def serializeRoutingSlip(self, x):
+        m = {}
+        m["id"] = x.id  
+        m["patient"] = x.patient_id
+        m["clinic"] = x.clinic_id
+        m["routing"] = []
+        m["entries"] = []
+        for y in x.orderedentries:
+            m["routing"].append(y.id)
+            m["entries"].append(self.serializeRoutingSlipEntry(y))
+        return m
+
+    def serializeReturnToClinicStation(self, x):
+        m = {}
+        m["id"] = x.id
+        m["clinic"] = x.clinic_id  
+        m["patient"] = x.patient_id  
+        m["station"] = x.station_id  
+        m["requestingclinicstation"] = x.requestingclinicstation_id  
+        m["createtime"] = x.createtime  
+        m["statechangetime"] = x.statechangetime  
+        m["state"] = rtcDbToState[x.state]
+        return m
+
+    def routingSlips(self):
+        entries = RoutingSlipEntry.objects.order_by("order", "id")
+        return RoutingSlip.objects.prefetch_related(Prefetch("routingslipentry_set", queryset=entries, to_attr="orderedentries"))
+
+    def getClinic(self, clinicid):
+        ret = None
+        try:
+            ret = self.serializeClinic(Clinic.objects.get(id=clinicid))
+        except:
+            ret = None
+        return ret
+
+    def getAllClinics(self):
+        ret = []
+        for x in Clinic.objects.all():
+            ret.append(self.serializeClinic(x))
+        return ret
+
+    def getClinicStations(self, clinicid):
+        ret = []
+        for x in ClinicStation.objects.filter(clinic_id=clinicid):
+            ret.append(self.serializeClinicStation(x))
+        ret = sorted(ret, key = lambda i: (i['station'], i['id']))
+        return ret
+
+    def getRoutingSlips(self, clinicid):
+        ret = None
+        try:
+            ret = []
+            for x in self.routingSlips().filter(clinic_id=clinicid):
+                ret.append(self.serializeRoutingSlip(x))
+        except:
+            ret = None
+        return ret
+
+    def getRoutingSlip(self, routingslipid):
+        ret = None
+        try:
+            x = self.routingSlips().filter(id=routingslipid)
+            if len(x):
+                ret = self.serializeRoutingSlip(x[0])
+        except:
+            ret = None
+        return ret
+
+    def getRoutingSlipForPatient(self, clinicid, patientid):
+        ret = None
+        try:
+            x = self.routingSlips().filter(clinic_id=clinicid, patient_id=patientid)
+            if len(x):
+                ret = self.serializeRoutingSlip(x[0])
+        except:
+            ret = None
+        return ret
+
+    def getReturnToClinicStations(self, clinicid, state):
+        ret = []
+        try:
+            for x in ReturnToClinicStation.objects.filter(clinic_id=clinicid, state=rtcStateToDb[state]):
+                ret.append(self.serializeReturnToClinicStation(x))
+        except:
+            ret = []
+        return ret
+
+    def createRoutingSlipEntry(self, routingslipid, stationid, returntoclinicstationid):
+
+        # same semantics as RoutingSlipEntryView.post
+
+        ret = None
+        try:
+            kwargs = {}
+            kwargs["routingslip_id"] = routingslipid
+            kwargs["station_id"] = stationid
+            if returntoclinicstationid != None:
+                kwargs["returntoclinicstation_id"] = returntoclinicstationid
+            entry = RoutingSlipEntry.objects.filter(**kwargs)
+            if entry and len(entry) > 0:
+                entry = entry[0]
+                entry.state = 'n'
+            else:
+                entry = RoutingSlipEntry(**kwargs)
+                entry.order = Station.objects.get(id=stationid).level
+                if returntoclinicstationid != None:
+                    entry.state = 'l'
+            entry.save()
+            routingslip = RoutingSlip.objects.get(id=routingslipid)
+            notifyChange("routingslipentry", entry.id, ChangeEvent.CREATE,
+                         clinic=routingslip.clinic_id,
+                         patient=routingslip.patient_id,
+                         routingslip=routingslip.id, wake=False)
+            ret = self.serializeRoutingSlipEntry(entry)
+        except:
+            ret = None
+        return ret
+
+    def setRoutingSlipEntryState(self, rseId, state):
+        ret = False
+        try:
+            state = textToState[state]
+            count = RoutingSlipEntry.objects.filter(id=rseId).exclude(state__in=illegalFromStates[state]).update(state=state, statechangetime=datetime.datetime.now())
+            ret = count == 1
+            if ret:
+                x = RoutingSlipEntry.objects.filter(id=rseId).values("routingslip_id", "routingslip__clinic_id", "routingslip__patient_id")[0]
+                notifyChange("routingslipentry", rseId, ChangeEvent.UPDATE,
+                             clinic=x["routingslip__clinic_id"],
+                             patient=x["routingslip__patient_id"],
+                             routingslip=x["routingslip_id"], wake=False)
+        except:
+            ret = False
+        return ret
+
+    def setReturnToClinicStationState(self, rtcid, state):
+        ret = False
+        try:
+            count = ReturnToClinicStation.objects.filter(id=rtcid).update(state=rtcStateToDb[state], statechangetime=datetime.datetime.now())
+            ret = count == 1
+            if ret:
+                x = ReturnToClinicStation.objects.filter(id=rtcid).values("clinic_id", "patient_id")[0]
+                notifyChange("returntoclinicstation", rtcid, ChangeEvent.UPDATE,
+                             clinic=x["clinic_id"], patient=x["patient_id"],
+                             wake=False)
+        except:
+            ret = False
+        return ret
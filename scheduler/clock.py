@@ -0,0 +1,53 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+The scheduler's notion of the current time. Everything that computes wait
+times, service times or estimates asks now() rather than calling 
+datetime.datetime.now() directly, so the simulator (see simulator.py) can
+run the scheduler against a VirtualClock.
+'''
+
+import datetime
+
+class Clock(object):
+    def now(self):
+        return datetime.datetime.now()
+
+class VirtualClock(Clock):
+    def __init__(self, start):
+        super(VirtualClock, self).__init__()
+        self._now = start
+
+    def now(self):
+        return self._now
+
+    def set(self, t):
+        self._now = t
+
+    def advance(self, seconds):
+        self._now = self._now + datetime.timedelta(seconds=seconds)
+
+_clock = Clock()
+
+def now():
+    return _clock.now()
+
+def setClock(c):
+    global _clock
+    _clock = c
+
+def getClock():
+    return _clock
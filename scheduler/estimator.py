@@ -0,0 +1,285 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+Estimated wait times for patients in clinicstation queues.
+
+For each clinicstation the estimator keeps a rolling window of recent 
+service times (the time between a patient being checked in and checked
+out, taken from StateChange in/out pairs) along with a running sum, so
+the mean service time is available in constant time. It also tracks when
+the patient currently being seen was checked in. For the whole day it
+keeps the count, sum and sum of squares of service times, and a 
+PercentileSketch from which p50 and p90 are read.
+
+The estimated wait of the patient at position n of a queue (n patients
+ahead) is then:
+
+    time until the station returns, if it is away 
+  + expected remaining service time of the active patient, if any
+  + n * mean service time
+
+which is O(1) per queue entry. StateChange rows are read incrementally,
+only those with an id above the last one seen are fetched each cycle.
+'''
+
+import collections
+import datetime
+import math
+
+import clock
+
+from statechange.models import StateChange
+
+class PercentileSketch(object):
+    '''
+    streaming quantile estimates with bounded relative error. Values are
+    counted in buckets whose bounds grow geometrically by a factor of 
+    (1 + accuracy) / (1 - accuracy), so a quantile read from the sketch 
+    is within accuracy of the true value, and a day of service times 
+    needs only a few dozen buckets.
+    '''
+
+    def __init__(self, accuracy=0.02):
+        super(PercentileSketch, self).__init__()
+        self._gamma = (1 + accuracy) / (1 - accuracy)
+        self._logGamma = math.log(self._gamma)
+        self._buckets = {}
+        self._zeros = 0
+        self._count = 0
+
+    def add(self, value):
+        if value < 1:
+            self._zeros += 1    # under a second
+        else:
+            key = int(math.ceil(math.log(value) / self._logGamma))
+            self._buckets[key] = self._buckets.get(key, 0) + 1
+        self._count += 1
+
+    def getCount(self):
+        return self._count
+
+    def quantile(self, q):
+        if self._count == 0:
+            return None
+        rank = q * (self._count - 1)
+        seen = self._zeros
+        if rank < seen:
+            return 0
+        for key in sorted(self._buckets.keys()):
+            seen += self._buckets[key]
+            if rank < seen:
+                return 2 * math.pow(self._gamma, key) / (self._gamma + 1)
+        return 2 * math.pow(self._gamma, max(self._buckets.keys())) / (self._gamma + 1)
+
+class ServiceTimeStats(object):
+    def __init__(self, window):
+        super(ServiceTimeStats, self).__init__()
+        self._window = collections.deque()
+        self._windowSize = window
+        self._windowSum = 0.0
+        self._count = 0
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._sketch = PercentileSketch()
+        self._checkin = None    # (patient, time) of the active patient
+        self._unpaired = 0
+
+    def add(self, seconds):
+        self._window.append(seconds)
+        self._windowSum += seconds
+        if len(self._window) > self._windowSize:
+            self._windowSum -= self._window.popleft()
+        self._count += 1
+        self._sum += seconds
+        self._sumsq += seconds * seconds
+        self._sketch.add(seconds)
+
+    def getCount(self):
+        return self._count
+
+    def getMean(self):
+        '''
+        mean of the most recent service times, used for prediction
+        '''
+
+        if not len(self._window):
+            return None
+        return self._windowSum / len(self._window)
+
+    def getDailyMean(self):
+        if self._count == 0:
+            return None
+        return self._sum / self._count
+
+    def getStdDev(self):
+        if self._count == 0:
+            return None
+        mean = self._sum / self._count
+        return math.sqrt(max(self._sumsq / self._count - mean * mean, 0))
+
+    def getPercentile(self, p):
+        return self._sketch.quantile(p / 100.0)
+
+    def getUnpaired(self):
+        '''
+        number of state changes that did not pair up (e.g., two check ins
+        in a row), these are not counted as service times
+        '''
+
+        return self._unpaired
+
+    def checkIn(self, patient, time):
+        if self._checkin:
+            self._unpaired += 1
+        self._checkin = (patient, time)
+
+    def checkOut(self, patient, time):
+        if self._checkin and self._checkin[0] == patient:
+            delta = time - self._checkin[1]
+            self.add(max(delta.total_seconds(), 0))
+        else:
+            self._unpaired += 1
+        self._checkin = None
+
+    def getCheckInTime(self):
+        if self._checkin:
+            return self._checkin[1]
+        return None
+
+class Estimator(object):
+    def __init__(self, window=20, defaultServiceTime=600):
+        super(Estimator, self).__init__()
+        self._window = window
+        self._defaultServiceTime = defaultServiceTime   # seconds
+        self._stats = {}
+        self._clinicstations = {}
+        self._highWater = 0
+        self._fallbackMean = defaultServiceTime
+
+    def getStats(self, clinicstationid):
+        index = str(clinicstationid)
+        if not index in self._stats:
+            self._stats[index] = ServiceTimeStats(self._window)
+        return self._stats[index]
+
+    def setClinicStations(self, clinicstations):
+        '''
+        clinicstations are dicts as returned by the clinicstation API
+        '''
+
+        self._clinicstations = {}
+        for x in clinicstations:
+            self._clinicstations[str(x["id"])] = x
+
+    def observe(self, clinicstationid, patientid, state, time):
+        stats = self.getStats(clinicstationid)
+        if state == StateChange.IN:
+            stats.checkIn(patientid, time)
+        else:
+            stats.checkOut(patientid, time)
+
+    def update(self, clinicid):
+        '''
+        read state changes recorded since the last call. Returns the 
+        number of new state changes.
+        '''
+
+        count = 0
+        statechanges = StateChange.objects.filter(clinicstation__clinic_id=clinicid, id__gt=self._highWater).order_by("id")
+        for x in statechanges:
+            self.observe(x.clinicstation_id, x.patient_id, x.state, x.time)
+            self._highWater = x.id
+            count = count + 1
+
+        means = [x.getMean() for x in self._stats.values() if x.getMean() != None]
+        if len(means):
+            self._fallbackMean = sum(means) / len(means)
+        return count
+
+    def getMeanServiceTime(self, clinicstationid):
+        '''
+        mean service time in seconds. Stations with no history yet use the
+        mean of all stations that have one, or the default.
+        '''
+
+        mean = self.getStats(clinicstationid).getMean()
+        if mean == None:
+            mean = self._fallbackMean
+        return mean
+
+    def parseTime(self, value):
+        if value == None or isinstance(value, datetime.datetime):
+            return value
+        for fmt in ["%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S"]:
+            try:
+                return datetime.datetime.strptime(value, fmt)
+            except ValueError:
+                pass
+        return None
+
+    def getWillReturn(self, clinicstationid):
+        ret = None
+        clinicstation = self._clinicstations.get(str(clinicstationid))
+        if clinicstation:
+            ret = self.parseTime(clinicstation["willreturn"])
+        return ret
+
+    def getStartDelay(self, clinicstationid, now):
+        '''
+        seconds until the station can start on the first patient in its 
+        queue
+        '''
+
+        delay = 0
+        clinicstation = self._clinicstations.get(str(clinicstationid))
+        if not clinicstation:
+            return delay
+        mean = self.getMeanServiceTime(clinicstationid)
+        if clinicstation["away"] == True:
+            willreturn = self.getWillReturn(clinicstationid)
+            if willreturn and willreturn > now:
+                delay += (willreturn - now).total_seconds()
+        if clinicstation["active"] == True:
+            checkin = self.getStats(clinicstationid).getCheckInTime()
+            if checkin:
+                # patients already over the mean are assumed to be 
+                # nearly done
+
+                elapsed = (now - checkin).total_seconds()
+                delay += max(mean - elapsed, mean * 0.1)
+            else:
+                delay += mean / 2
+        return delay
+
+    def estimate(self, clinicstationid, position, now=None):
+        '''
+        estimated wait, as a timedelta, for a patient with position
+        patients ahead of it in the queue of clinicstationid
+        '''
+
+        start, mean = self.getQueueParameters(clinicstationid, now)
+        return datetime.timedelta(seconds=start + position * mean)
+
+    def getQueueParameters(self, clinicstationid, now=None):
+        '''
+        returns (start delay, mean service time) in seconds, the estimated
+        wait at position n of the queue is start delay + n * mean. Use this
+        to estimate a whole queue at once.
+        '''
+
+        if now == None:
+            now = clock.now()
+        return (self.getStartDelay(clinicstationid, now), self.getMeanServiceTime(clinicstationid))
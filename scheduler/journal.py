@@ -0,0 +1,150 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+Write-ahead journal and snapshots of scheduler queue state.
+
+Every mutation of the in-memory clinicstation queues (enqueue, insert 
+front, remove, routing slip entry state change) is appended to the 
+journal as a line of JSON and flushed to disk before the scheduler moves
+on. Periodically the complete queue state is written to a snapshot file
+(written to a temporary file, then renamed over the old snapshot so that
+a crash never leaves a partial snapshot behind) and the journal is 
+truncated. 
+
+To recover, load the snapshot and replay the journal records that follow
+it. Each record carries a sequence number, and the snapshot records the
+last sequence number it includes, so records that made it into a 
+snapshot are not applied twice if the scheduler dies between writing the
+snapshot and truncating the journal. A torn final line (crash during an
+append) is ignored.
+'''
+
+import json
+import os
+import time
+
+class Journal(object):
+    def __init__(self, path):
+        super(Journal, self).__init__()
+        self._path = path
+        self._journalPath = path + ".journal"
+        self._file = None
+        self._seq = 0
+        self._snapshotSeq = 0
+        self._lastSnapshot = time.time()
+
+    def getPath(self):
+        return self._path
+
+    def getJournalPath(self):
+        return self._journalPath
+
+    def getSeq(self):
+        return self._seq
+
+    def getRecordsSinceSnapshot(self):
+        return self._seq - self._snapshotSeq
+
+    def getTimeSinceSnapshot(self):
+        return time.time() - self._lastSnapshot
+
+    def open(self):
+        if not self._file:
+            self._file = open(self._journalPath, "a")
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def reset(self):
+        '''
+        discard any saved state, used when starting without recovery
+        '''
+
+        self.close()
+        for x in [self._path, self._journalPath]:
+            try:
+                os.unlink(x)
+            except OSError:
+                pass
+        self._seq = 0
+        self._snapshotSeq = 0
+
+    def append(self, record):
+        self.open()
+        self._seq += 1
+        record["seq"] = self._seq
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def writeSnapshot(self, state):
+        state["seq"] = self._seq
+        tmp = self._path + ".tmp"
+        f = open(tmp, "w")
+        try:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            f.close()
+        os.rename(tmp, self._path)
+
+        # the snapshot now holds everything in the journal
+
+        self.close()
+        self._file = open(self._journalPath, "w")
+        self._snapshotSeq = self._seq
+        self._lastSnapshot = time.time()
+
+    def load(self):
+        '''
+        returns a tuple (snapshot, records), snapshot is None if there is
+        no snapshot, records are the journal records that follow it
+        '''
+
+        snapshot = None
+        records = []
+        snapshotSeq = 0
+
+        if os.path.exists(self._path):
+            f = open(self._path, "r")
+            try:
+                snapshot = json.load(f)
+            finally:
+                f.close()
+            snapshotSeq = snapshot.get("seq", 0)
+
+        seq = snapshotSeq
+        if os.path.exists(self._journalPath):
+            f = open(self._journalPath, "r")
+            try:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break   # torn write, nothing valid follows
+                    if record["seq"] <= snapshotSeq:
+                        continue
+                    records.append(record)
+                    seq = record["seq"]
+            finally:
+                f.close()
+
+        self._seq = seq
+        self._snapshotSeq = snapshotSeq
+        return (snapshot, records)
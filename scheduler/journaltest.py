@@ -0,0 +1,131 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+Tests of scheduler recovery from its journal (scheduler -r), run against
+the simulator's in-memory clinic:
+
+    python journaltest.py
+'''
+
+import os
+import datetime
+import shutil
+import tempfile
+import unittest
+
+import clock
+from clock import VirtualClock
+from journal import Journal
+from simulator import SimClinic, SimScheduler
+
+clinicPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tschartslib", "scheduler", "dentalclinic.json")
+
+class TestRestore(unittest.TestCase):
+
+    def setUp(self):
+        start = datetime.datetime.now().replace(hour=8, minute=0, second=0, microsecond=0)
+        clock.setClock(VirtualClock(start))
+        self._clinic = SimClinic(clinicPath, start)
+        self._dir = tempfile.mkdtemp()
+        self._path = os.path.join(self._dir, "scheduler.state")
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def createScheduler(self):
+        scheduler = SimScheduler(self._clinic)
+        scheduler.setJournal(Journal(self._path))
+        return scheduler
+
+    def enqueuePatients(self, scheduler):
+        '''
+        queue the first entry of a routing slip for each staffed station, 
+        returns the routing slip entry ids by clinicstation
+        '''
+
+        queued = {}
+        for name in self._clinic.getStaffedStations():
+            patientid = self._clinic.allocId()
+            slip = self._clinic.createRoutingSlip(patientid, [name])
+            entry = slip["entries"][0]
+            self.assertTrue(scheduler.addToQueue(entry, patientid))
+            index = [k for k, v in scheduler._queues.items() if entry in v][0]
+            queued.setdefault(index, []).append(entry["id"])
+        return queued
+
+    def queuedIds(self, scheduler):
+        ret = {}
+        for k, v in scheduler._queues.items():
+            if len(v):
+                ret[k] = [x["id"] for x in v]
+        return ret
+
+    def testRestoreWithoutSnapshot(self):
+        # crash before the first checkpoint, only the journal exists
+
+        scheduler = self.createScheduler()
+        scheduler.getJournal().reset()
+        scheduler.updateClinicStations()
+        queued = self.enqueuePatients(scheduler)
+        self.assertTrue(len(queued) > 0)
+        scheduler.getJournal().close()
+        self.assertFalse(os.path.exists(self._path))
+
+        scheduler = self.createScheduler()
+        self.assertTrue(scheduler.restore())
+        self.assertEqual(self.queuedIds(scheduler), queued)
+
+        # the compacted snapshot holds the queues
+
+        scheduler.getJournal().close()
+        snapshot, records = Journal(self._path).load()
+        self.assertEqual(len(records), 0)
+        for k, v in queued.items():
+            self.assertEqual([x["entry"]["id"] for x in snapshot["queues"][k]], v)
+
+    def testRestoreSkippedRecords(self):
+        scheduler = self.createScheduler()
+        scheduler.getJournal().reset()
+        scheduler.updateClinicStations()
+        queued = self.enqueuePatients(scheduler)
+
+        # a record for a clinicstation the restored scheduler can't see
+
+        scheduler.journalAppend({"op": "enqueue", "queue": "99999", "entry": {"id": 99999}, "qent": {}})
+        scheduler.getJournal().close()
+
+        scheduler = self.createScheduler()
+        self.assertTrue(scheduler.restore())
+        self.assertEqual(self.queuedIds(scheduler), queued)
+
+        # nothing was compacted, the journal still holds every record
+
+        scheduler.checkpoint(True)
+        self.assertFalse(os.path.exists(self._path))
+        snapshot, records = Journal(self._path).load()
+        self.assertEqual(snapshot, None)
+        self.assertEqual(len(records), sum([len(x) for x in queued.values()]) + 1)
+
+        # once the clinicstations are read again the unknown record is 
+        # dropped and checkpoints resume
+
+        scheduler.updateClinicStations()
+        scheduler.checkpoint(True)
+        self.assertTrue(os.path.exists(self._path))
+        scheduler.getJournal().close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,202 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+Routing optimizer. 
+
+Normally the scheduler queues a patient for the highest priority (level)
+station remaining on their routing slip, even if its queue is long and 
+another station on the slip has nobody waiting. In optimizer mode the 
+remaining entries of a routing slip are treated as order independent, 
+except where a constraint says one station must come before another 
+(e.g., X-Ray before Dental), and the next station is chosen to minimize
+the time at which the patient is expected to be done.
+
+The solver is greedy with look-ahead. For each eligible entry it builds 
+the best sequence of up to lookahead stations starting with that entry,
+using the estimator to predict the wait and service time at the best 
+available clinicstation of each station. Queues are assumed to drain 
+while the patient is busy elsewhere, and stations beyond the look-ahead 
+contribute their mean service time. The entry that starts the best 
+sequence is queued. Patients are placed one at a time, so each placement
+sees the queues as lengthened by the ones before it.
+
+Station times are computed once per routing slip, the look-ahead is 
+bounded (a routing slip seldom has more than 6 or 7 entries), so the 
+cost is small even for clinics of several hundred patients.
+
+Constraints are read from a JSON file of the form:
+
+    {"constraints": [{"before": "X-Ray", "after": "Dental"}, ...]}
+
+where the names are station names.
+'''
+
+import json
+
+from station.models import Station
+
+class RoutingOptimizer(object):
+    def __init__(self, lookahead=2):
+        super(RoutingOptimizer, self).__init__()
+        self._lookahead = lookahead
+        self._constraints = []  # (before, after) station ids, as strings
+
+    def setLookahead(self, lookahead):
+        self._lookahead = lookahead
+
+    def getLookahead(self):
+        return self._lookahead
+
+    def addConstraint(self, before, after):
+        self._constraints.append((str(before), str(after)))
+
+    def getConstraints(self):
+        return self._constraints
+
+    def getStationId(self, name):
+        ret = None
+        station = Station.objects.filter(name=name).first()
+        if station:
+            ret = station.id
+        return ret
+
+    def loadConstraints(self, path, lookup=None):
+        '''
+        read constraints from path, returns a list of station names that
+        could not be found. lookup maps a station name to its id, by 
+        default stations are looked up in the database.
+        '''
+
+        if lookup == None:
+            lookup = self.getStationId
+
+        f = open(path, "r")
+        try:
+            data = json.load(f)
+        finally:
+            f.close()
+
+        missing = []
+        for x in data["constraints"]:
+            ids = []
+            for name in [x["before"], x["after"]]:
+                id = lookup(name)
+                if id != None:
+                    ids.append(id)
+                elif not name in missing:
+                    missing.append(name)
+            if len(ids) == 2:
+                self.addConstraint(ids[0], ids[1])
+        return missing
+
+    def isEligible(self, entry, pending):
+        '''
+        an entry is eligible if no other pending entry is for a station
+        that must be visited first
+        '''
+
+        station = str(entry["station"])
+        for before, after in self._constraints:
+            if after != station:
+                continue
+            for x in pending:
+                if x is not entry and str(x["station"]) == before:
+                    return False
+        return True
+
+    def getStationTimes(self, scheduler, stationid, cache):
+        '''
+        returns (wait, service) in seconds for the best clinicstation of 
+        stationid, wait is None if none of them can take a patient
+        '''
+
+        key = str(stationid)
+        if key in cache:
+            return cache[key]
+
+        estimator = scheduler._estimator
+        best = None
+        service = None
+        for x in scheduler.getClinicStationsForStation(stationid):
+            index = str(x)
+            mean = estimator.getMeanServiceTime(index)
+            if service == None:
+                service = mean
+            if scheduler._policy.getCost(scheduler, index) == None:
+                continue
+            wait = estimator.estimate(index, len(scheduler._queues[index])).total_seconds()
+            if best == None or wait + mean < best[0] + best[1]:
+                best = (wait, mean)
+        if best == None:
+            best = (None, service if service != None else 0)
+        cache[key] = best
+        return best
+
+    def getLowerBound(self, scheduler, entries, cache):
+        ret = 0
+        for x in entries:
+            ret += self.getStationTimes(scheduler, x["station"], cache)[1]
+        return ret
+
+    def evaluate(self, scheduler, entry, pending, elapsed, depth, cache):
+        '''
+        expected time, from now, at which the patient is done if entry is
+        visited next after elapsed seconds, or None if its station is not
+        available
+        '''
+
+        wait, service = self.getStationTimes(scheduler, entry["station"], cache)
+        if wait == None:
+            return None
+        finish = elapsed + max(wait - elapsed, 0) + service
+        remaining = [x for x in pending if x is not entry]
+        if not len(remaining):
+            return finish
+
+        best = None
+        if depth > 1:
+            for x in remaining:
+                if not self.isEligible(x, remaining):
+                    continue
+                t = self.evaluate(scheduler, x, remaining, finish, depth - 1, cache)
+                if t != None and (best == None or t < best):
+                    best = t
+        if best == None:
+            best = finish + self.getLowerBound(scheduler, remaining, cache)
+        return best
+
+    def select(self, scheduler, queueables):
+        '''
+        choose the routing slip entry to queue from queueables, the New 
+        entries of a routing slip. Returns None if none can be queued.
+        '''
+
+        ret = None
+        best = None
+        cache = {}
+        for x in queueables:
+            if not self.isEligible(x, queueables):
+                continue
+            t = self.evaluate(scheduler, x, queueables, 0, self._lookahead, cache)
+            if t == None:
+                continue
+
+            # ties go to the more important station 
+
+            if best == None or t < best or (t == best and x["order"] > ret["order"]):
+                ret = x
+                best = t
+        return ret
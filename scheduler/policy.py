@@ -0,0 +1,114 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+Clinicstation assignment policies.
+
+When a routing slip entry for a station is queued, the scheduler must 
+pick one of the clinicstations of that station (e.g., Dental1 ... 
+Dental4). A policy assigns each clinicstation a cost for taking one more
+patient, or None if the clinicstation cannot take patients right now, 
+and the scheduler uses the clinicstation with the lowest cost. A second
+cost, by default the same one, is used to choose between queueable 
+routing slip entries of equal priority.
+
+ShortestQueuePolicy is the original behavior. The cost is the number of
+patients waiting plus the one being seen, skipping away and finished 
+clinicstations. Between queueables it is the number waiting, skipping
+only away clinicstations, as before. LeastExpectedCompletionPolicy 
+uses the estimator (see estimator.py) to predict when a new patient 
+would be finished at each clinicstation, so slow stations get fewer 
+patients than fast ones, and a station that will soon be back from a 
+break can be given patients before it returns.
+'''
+
+import clock
+
+class AssignmentPolicy(object):
+    def getName(self):
+        return None
+
+    def getCost(self, scheduler, clinicstationid):
+        return None
+
+    def getQueueableCost(self, scheduler, clinicstationid):
+        return self.getCost(scheduler, clinicstationid)
+
+    def selectClinicStation(self, scheduler, clinicstations):
+        ret = None
+        min = None
+        for x in clinicstations:
+            cost = self.getCost(scheduler, x)
+            if cost == None:
+                continue
+            if min == None or cost < min:
+                min = cost
+                ret = str(x)
+        return ret
+
+class ShortestQueuePolicy(AssignmentPolicy):
+    def getName(self):
+        return "shortest"
+
+    def getCost(self, scheduler, clinicstationid):
+        index = str(clinicstationid)
+        if scheduler._clinicStationAwayMap[index] == True or scheduler._clinicStationFinishedMap[index] == True:
+            return None
+        cost = len(scheduler._queues[index])
+        if scheduler._clinicStationActiveMap[index] == True:
+            cost += 1
+        return cost
+
+    def getQueueableCost(self, scheduler, clinicstationid):
+        index = str(clinicstationid)
+        if scheduler._clinicStationAwayMap[index] == True:
+            return None
+        return len(scheduler._queues[index])
+
+class LeastExpectedCompletionPolicy(AssignmentPolicy):
+    def __init__(self, maxAwayWait=1800):
+        super(LeastExpectedCompletionPolicy, self).__init__()
+        self._maxAwayWait = maxAwayWait     # seconds
+
+    def getName(self):
+        return "lec"
+
+    def getCost(self, scheduler, clinicstationid):
+        index = str(clinicstationid)
+        if scheduler._clinicStationFinishedMap[index] == True:
+            return None
+        estimator = scheduler._estimator
+        now = clock.now()
+        if scheduler._clinicStationAwayMap[index] == True:
+            # only consider away stations that say when they will be back,
+            # and will be back soon
+
+            willreturn = estimator.getWillReturn(index)
+            if not willreturn or willreturn <= now or (willreturn - now).total_seconds() > self._maxAwayWait:
+                return None
+        wait = estimator.estimate(index, len(scheduler._queues[index]), now)
+        return wait.total_seconds() + estimator.getMeanServiceTime(index)
+
+policies = {"shortest": ShortestQueuePolicy, "lec": LeastExpectedCompletionPolicy}
+
+def getPolicy(name):
+    '''
+    returns an instance of the named policy, or None
+    '''
+
+    ret = None
+    if name in policies:
+        ret = policies[name]()
+    return ret
@@ -0,0 +1,101 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+Tests of the assignment policies (see policy.py), run against the 
+simulator's in-memory clinic:
+
+    python policytest.py
+'''
+
+import os
+import datetime
+import unittest
+
+import clock
+from clock import VirtualClock
+from simulator import SimClinic, SimScheduler
+
+clinicPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tschartslib", "scheduler", "dentalclinic.json")
+
+class TestShortestQueuePolicy(unittest.TestCase):
+
+    def setUp(self):
+        start = datetime.datetime.now().replace(hour=8, minute=0, second=0, microsecond=0)
+        clock.setClock(VirtualClock(start))
+        self._clinic = SimClinic(clinicPath, start)
+        self._scheduler = SimScheduler(self._clinic)
+        self._scheduler.updateClinicStations()
+
+        # two stations, and their clinicstations
+
+        names = self._clinic.getStaffedStations()[:2]
+        self.assertEqual(len(names), 2)
+        self._stations = [self._clinic.getStationId(x) for x in names]
+        self._indexes = [[str(y) for y in self._scheduler.getClinicStationsForStation(x)] for x in self._stations]
+
+    def setStation(self, i, length, flags=None):
+        '''
+        give each clinicstation of the i'th station a queue of length 
+        patients, flags (e.g., self._scheduler._clinicStationAwayMap) are
+        set True for them
+        '''
+
+        for index in self._indexes[i]:
+            self._scheduler._queues[index] = [{"id": -1 - j} for j in range(length)]
+            if flags != None:
+                flags[index] = True
+
+    def queueable(self, i):
+        return {"id": i, "station": self._stations[i], "order": 1}
+
+    def getLowestCostQueueable(self):
+        ret = self._scheduler.getLowestCostQueueable([self.queueable(0), self.queueable(1)])
+        return ret["id"]
+
+    def testQueueableIgnoresActivePatient(self):
+        # the first has one waiting, the second none waiting but one being
+        # seen, the second has the shorter queue
+
+        self.setStation(0, 1)
+        self.setStation(1, 0, self._scheduler._clinicStationActiveMap)
+        self.assertEqual(self.getLowestCostQueueable(), 1)
+
+    def testQueueableIgnoresFinished(self):
+        self.setStation(0, 1)
+        self.setStation(1, 0, self._scheduler._clinicStationFinishedMap)
+        self.assertEqual(self.getLowestCostQueueable(), 1)
+
+    def testQueueableSkipsAway(self):
+        self.setStation(0, 1)
+        self.setStation(1, 0, self._scheduler._clinicStationAwayMap)
+        self.assertEqual(self.getLowestCostQueueable(), 0)
+
+    def testAssignmentCountsActivePatient(self):
+        # a clinicstation is still assigned by waiting plus being seen, 
+        # skipping finished clinicstations
+
+        policy = self._scheduler.getPolicy()
+        index = self._indexes[0][0]
+        self._scheduler._queues[index] = [{"id": -1}]
+        self._scheduler._clinicStationActiveMap[index] = True
+        self.assertEqual(policy.getCost(self._scheduler, index), 2)
+        self.assertEqual(policy.getQueueableCost(self._scheduler, index), 1)
+        self._scheduler._clinicStationFinishedMap[index] = True
+        self.assertEqual(policy.getCost(self._scheduler, index), None)
+        self.assertEqual(policy.getQueueableCost(self._scheduler, index), 1)
+
+if __name__ == '__main__':
+    unittest.main()
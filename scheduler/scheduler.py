@@ -17,39 +17,63 @@ import daemon
 import getopt, os, sys, time
 import json
 import datetime 
-import pickle
+import select
+import socket
 
 # unit tests provide a set of good utilities for accessing the web services.
 
-from service.serviceapi import ServiceAPI
-from test.tscharts.tscharts import Login, Logout
-from test.routingslip.routingslip import GetRoutingSlip, GetRoutingSlipEntry, UpdateRoutingSlipEntry, CreateRoutingSlipEntry
-from test.clinic.clinic import GetClinic, GetAllClinics
-from test.clinicstation.clinicstation import GetClinicStation
-from test.returntoclinicstation.returntoclinicstation import GetReturnToClinicStation, UpdateReturnToClinicStation
-
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tscharts.settings")
 import django
 django.setup()
 
-from statechange.models import StateChange
+from backend import HTTPBackend, ORMBackend
+import clock
+from journal import Journal
+from estimator import Estimator
+from policy import ShortestQueuePolicy, getPolicy
+from optimizer import RoutingOptimizer
+
 from queue.models import QueueStatus, Queue, QueueEntry
+from queue.version import bumpQueueVersion
+from queue.snapshot import getQueues, getQueueData, getQueueStatusData
 from routingslip.models import RoutingSlip, RoutingSlipEntry
 from patient.models import Patient
 from clinic.models import Clinic
 from station.models import Station
 from clinicstation.models import ClinicStation 
+from changeevent.models import ChangeEvent
+from changeevent.notify import notifyChange, pruneChangeEvents
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, When, Value, TimeField
+from django.core.serializers.json import DjangoJSONEncoder
+
+def timedeltaToTime(delta):
+    '''
+    convert a timedelta to a time of day, truncated to the second, as 
+    stored in TimeFields of the queue models. Saturates at 23:59:59.
+    '''
+
+    secs = int(delta.total_seconds())
+    if secs < 0:
+        secs = 0
+    if secs > 86399:
+        secs = 86399
+    return datetime.time(secs / 3600, (secs % 3600) / 60, secs % 60)
 
 class ClinicStationQueueEntry():
     def __init__(self):
         self._patientid = None
-        self._timein = datetime.datetime.now()
+        self._timein = clock.now()
         self._elapsedtime = 0
         self._timeout = 0
         self._queueid = None
         self._queueEntryId = None
         self._routingslipentryid = None
         self._routingslip = None
+        self._waittime = None
+        self._estwaittime = None
+        self._savedTimes = None
 
     def setQueue(self, id):
         self._queueid = id
@@ -57,6 +81,9 @@ class ClinicStationQueueEntry():
     def setQueueEntryId(self, id):
         self._queueEntryId = id
 
+    def getQueueEntryId(self):
+        return self._queueEntryId
+
     def setRoutingSlip(self, id):
         self._routingslip = id
 
@@ -78,44 +105,66 @@ class ClinicStationQueueEntry():
     def getElapsedTime(self):
         return self._elapsedtime
 
-    def getEstWaitTime(self, queueentryid):   
-        # use self._queueid to determine relative position of
-        # queueentry and the avgservice time, plus the time the
-        # current patient (if any) has been in service, and then
-        # compute an estimated time for this particular entry
-        return self._elapsedtime  # XXX
+    def setTimeIn(self, timein):
+        self._timein = timein
+
+    def getTimeIn(self):
+        return self._timein
+
+    def serialize(self):
+        m = {}
+        m["patient"] = self._patientid
+        m["timein"] = self._timein.strftime("%Y-%m-%dT%H:%M:%S.%f")
+        m["queue"] = self._queueid
+        m["queueentry"] = self._queueEntryId
+        m["routingslipentry"] = self._routingslipentryid
+        m["routingslip"] = self._routingslip
+        return m
+
+    def deserialize(self, m):
+        self._patientid = m["patient"]
+        self._timein = datetime.datetime.strptime(m["timein"], "%Y-%m-%dT%H:%M:%S.%f")
+        self._queueid = m["queue"]
+        self._queueEntryId = m["queueentry"]
+        self._routingslipentryid = m["routingslipentry"]
+        self._routingslip = m["routingslip"]
+
+    def getWaitTime(self):
+        return self._waittime
+
+    def getEstWaitTime(self):
+        return self._estwaittime
+
+    def update(self, estwaittime):
+        '''
+        recompute waittime and set estwaittime (a timedelta, see 
+        estimator.py). Returns True if either differs from what was last 
+        written to the QueueEntry (see setSaved()).
+        '''
 
-    def update(self, scheduler):
-        ret = False
-        self._elapsedtime = datetime.datetime.now() - self._timein
-        q = None
-        try:
-            q = QueueEntry.objects.get(id=self._queueEntryId, patient=self._patientid)
-        except:
-            scheduler.showWarning("update exception: {} unable to get QueueEntry for queueentry id {} queue {} patient {}".format(sys.exc_info()[0], self._queueEntryId, self._queueid, self._patientid))
-            q = None
-            
-        if (q != None) :
-            q.waittime = str(self.getElapsedTime())
-            q.estwaittime = str(self.getEstWaitTime(q.id))
-            q.save()            
-            ret = True
-        else:
-            scheduler.showWarning("update: unable to get queue entry queueentry id {} queue {} patient {} routingslipentry {}".format(self._queueEntryId, self._queueid, self._patientid, self._routingslipentryid))
-        return ret
+        self._elapsedtime = clock.now() - self._timein
+        self._waittime = timedeltaToTime(self.getElapsedTime())
+        self._estwaittime = timedeltaToTime(estwaittime)
+        return (self._waittime, self._estwaittime) != self._savedTimes
+
+    def setSaved(self):
+        self._savedTimes = (self._waittime, self._estwaittime)
 
     def __str__(self):
-        self._elapsedtime = datetime.datetime.now() - self._timein
+        self._elapsedtime = clock.now() - self._timein
         return "id: {} time in: {} waiting time {}".format(self._patientid, self._timein.strftime("%H:%M:%S"), self._elapsedtime)
 
 f = None
 
 class Scheduler():
-    def __init__(self, host, port, username, password, clinicid=None):
+    def __init__(self, host, port, username, password, clinicid=None, backend=None):
         self._host = host
         self._port = port
         self._username = username
         self._password = password
+        if backend == None:
+            backend = HTTPBackend(host, port, username, password)
+        self._backend = backend
         self._clinicid = clinicid
         self._clinic = None
         self._clinicstations = []
@@ -128,28 +177,59 @@ class Scheduler():
         self._clinicStationActiveMap = {}
         self._clinicStationAwayMap = {}
         self._abortOnError = False
-
-        fail = False
-        try:
-            login = Login(self._host, self._port, self._username, self._password)
-            ret = login.send(timeout=30)
-            if ret[0] == 200:
-                self._token = ret[1]["token"]
-            else:
-                fail = True
-        except:
-            fail = True
-
-        if fail:
+        self._eventMode = False
+        self._eventSocket = None
+        self._eventHighWater = 0
+        self._pendingSlips = set()
+        self._updateInterval = 5        # seconds between queue updates
+        self._eventPollInterval = 0.25  # seconds, used if there is no socket
+        self._sweepInterval = 120       # seconds between full sweeps
+        self._journal = None
+        self._replayRecords = []        # journal records not yet replayed
+        self._estimator = Estimator()
+        self._policy = ShortestQueuePolicy()
+        self._optimizer = None
+        self._snapshotInterval = 60     # seconds between snapshots
+        self._snapshotRecords = 500     # journal records between snapshots
+        self._lastQueueStatus = None
+        self._published = {}           # published queue data, by resource
+        self._eventRetention = 7200     # seconds change events are kept
+        self._lastPrune = None
+
+        if not self._backend.login():
             self.showError("failed to login")
             sys.exit(2)
 
     def getAbortOnError(self):
         return self._abortOnError
 
+    def getEventMode(self):
+        return self._eventMode
+
+    def setEventMode(self, val):
+        self._eventMode = val
+
     def setAbortOnError(self, val):
         self._abortOnError = val
 
+    def setPolicy(self, policy):
+        self._policy = policy
+
+    def getPolicy(self):
+        return self._policy
+
+    def setOptimizer(self, optimizer):
+        self._optimizer = optimizer
+
+    def getOptimizer(self):
+        return self._optimizer
+
+    def setJournal(self, journal):
+        self._journal = journal
+
+    def getJournal(self):
+        return self._journal
+
     def setLogOutfile(self, path):
         global f
         if path == None:
@@ -198,8 +278,187 @@ class Scheduler():
             print(msg);
 
     def __del__(self):
-        logout = Logout(self._host, self._port)
-        ret = logout.send(timeout=30)
+        self._backend.logout()
+
+    '''
+    Queue state checkpointing, see journal.py. Changes to self._queues are
+    journaled as they happen, and checkpoint() (called once per cycle)
+    compacts the journal into a snapshot when enough has accumulated.
+    '''
+
+    def journalAppend(self, record):
+        if self._journal:
+            try:
+                self._journal.append(record)
+            except:
+                self.showError("journalAppend exception: {} unable to journal {}".format(sys.exc_info()[0], record["op"]))
+
+    def serializeQueueItem(self, item):
+        entry = {}
+        for k, v in item.iteritems():
+            if k != "qent":
+                entry[k] = v
+        return {"entry": entry, "qent": item["qent"].serialize()}
+
+    def deserializeQueueItem(self, m):
+        item = dict(m["entry"])
+        qent = ClinicStationQueueEntry()
+        qent.deserialize(m["qent"])
+        item["qent"] = qent
+        return item
+
+    def journalEnqueue(self, op, index, item):
+        record = self.serializeQueueItem(item)
+        record["op"] = op
+        record["queue"] = index
+        self.journalAppend(record)
+
+    def journalRemove(self, index, item):
+        self.journalAppend({"op": "remove", "queue": index, "entry": item["id"]})
+
+    def getSnapshot(self):
+        queues = {}
+        dbQueues = {}
+        for k, v in self._queues.iteritems():
+            queues[k] = [self.serializeQueueItem(x) for x in v]
+            if self._dbQueues.get(k):
+                dbQueues[k] = self._dbQueues[k].id
+        state = {}
+        state["clinicid"] = self._clinicid
+        state["queues"] = queues
+        state["dbqueues"] = dbQueues
+        state["pendingslips"] = list(self._pendingSlips)
+        return state
+
+    def restoreSnapshot(self, state):
+        if state["clinicid"] != None:
+            self._clinicid = state["clinicid"]
+        self._pendingSlips = set(state["pendingslips"])
+        for k, v in state["queues"].iteritems():
+            try:
+                self._dbQueues[k] = Queue.objects.get(id=state["dbqueues"][k])
+            except:
+                # keep the entries, updateClinicStations() will create the
+                # queue again
+
+                self.showWarning("restoreSnapshot exception: {} unable to get queue for clinicstation {}".format(sys.exc_info()[0], k))
+            self._queues[k] = [self.deserializeQueueItem(x) for x in v]
+
+    def findQueueItem(self, index, rseId):
+        ret = None
+        if index in self._queues:
+            for x in self._queues[index]:
+                if x["id"] == rseId:
+                    ret = x
+                    break
+        return ret
+
+    def applyJournalRecord(self, record):
+        '''
+        returns False if the record could not be applied, as there is no
+        queue for its clinicstation
+        '''
+
+        ret = True
+        op = record["op"]
+        if op == "enqueue" or op == "insertfront":
+            index = record["queue"]
+            if not index in self._queues:
+                self.showWarning("applyJournalRecord: no queue for clinicstation {}, skipping record {}".format(index, record["seq"]))
+                ret = False
+            elif not self.findQueueItem(index, record["entry"]["id"]):
+                self._queues[index].append(self.deserializeQueueItem(record))
+        elif op == "remove":
+            item = self.findQueueItem(record["queue"], record["entry"])
+            if item:
+                self._queues[record["queue"]].remove(item)
+        elif op == "state":
+            for k in self._queues:
+                item = self.findQueueItem(k, record["entry"])
+                if item:
+                    item["state"] = record["state"]
+        else:
+            self.showWarning("applyJournalRecord: unknown op {} in record {}".format(op, record["seq"]))
+        return ret
+
+    def replayJournal(self, records):
+        '''
+        apply records in order, returning the number skipped. Records are 
+        idempotent, so a sequence can be applied again once the queues it
+        refers to exist.
+        '''
+
+        skipped = 0
+        for x in records:
+            if not self.applyJournalRecord(x):
+                skipped += 1
+        return skipped
+
+    def replaySkippedRecords(self):
+        '''
+        called once the clinicstations are known, after a restore that 
+        could not apply every record. Records for clinicstations that no
+        longer exist are dropped, after which checkpoints resume.
+        '''
+
+        records = self._replayRecords
+        self._replayRecords = []
+        skipped = self.replayJournal(records)
+        if skipped:
+            self.showError("replaySkippedRecords: dropped {} journal records for unknown clinicstations".format(skipped))
+        else:
+            self.showInfo("replaySkippedRecords: replayed {} journal records".format(len(records)))
+
+    def restore(self):
+        '''
+        rebuild queue state from the snapshot and journal. Returns False if
+        there was nothing to restore from.
+        '''
+
+        try:
+            state, records = self._journal.load()
+        except:
+            self.showError("restore exception: {} unable to load {}".format(sys.exc_info()[0], self._journal.getPath()))
+            return False
+        if state == None and not len(records):
+            return False
+        if state:
+            self.restoreSnapshot(state)
+
+        # records refer to queues by clinicstation, which exist only once 
+        # the clinicstations are read (e.g., after a crash before the first
+        # snapshot)
+
+        try:
+            if self.getClinic():
+                self.updateClinicStations()
+        except:
+            self.showWarning("restore exception: {} unable to get clinicstations".format(sys.exc_info()[0]))
+
+        skipped = self.replayJournal(records)
+        self.showInfo("restored state from {} and {} journal records".format(self._journal.getPath(), len(records)))
+        if skipped:
+            # a snapshot now would lose the skipped records, keep the 
+            # journal and try again in updateClinicStations()
+
+            self.showWarning("restore: {} journal records skipped, not compacting".format(skipped))
+            self._replayRecords = records
+        else:
+            # start over from a compacted snapshot
+
+            self.checkpoint(True)
+        return True
+
+    def checkpoint(self, force=False):
+        if not self._journal or len(self._replayRecords):
+            return
+        records = self._journal.getRecordsSinceSnapshot()
+        elapsed = self._journal.getTimeSinceSnapshot()
+        if force or records >= self._snapshotRecords or (records > 0 and elapsed >= self._snapshotInterval):
+            try:
+                self._journal.writeSnapshot(self.getSnapshot())
+            except:
+                self.showError("checkpoint exception: {} unable to write snapshot {}".format(sys.exc_info()[0], self._journal.getPath()))
 
     def getClinicStationName(self, id):
         ret = None
@@ -271,7 +530,7 @@ class Scheduler():
         try:
             queueent = QueueEntry(queue = aQueue,
                                   patient = aPatient,
-                                  timein = datetime.datetime.now(),
+                                  timein = clock.now(),
                                   routingslip = aRoutingSlip,
                                   routingslipentry = aRoutingSlipEntry)
             queueent.save()
@@ -301,89 +560,135 @@ class Scheduler():
                                   patient = aPatient,
                                   routingslipentry = aRoutingSlipEntry)
             if queueent:
+                data = {"id": queueent.id,
+                        "queue": queueent.queue_id,
+                        "clinicstation": aQueue.clinicstation_id}
                 queueent.delete()
+                notifyChange("queueentry", data["id"], ChangeEvent.DELETE,
+                             clinic=aQueue.clinic_id,
+                             patient=queueent.patient_id,
+                             routingslip=queueent.routingslip_id, data=data,
+                             wake=False)
                 ret = True
         except:
             self.showError("deleteDbQueueEntry exception: {} unable to delete queue entry queue ({}) {} patient ({}) {} routingslipentry ({}) {}".format(sys.exc_info()[0], queueid, aQueue, patientid, aPatient, routingslipentryid, aRoutingSlipEntry))
         return ret
 
-    def getClinicStationAvgServiceTime(self, statechanges):
-        sumt = 0
-        count = 0
-        if len(statechanges) == 0:
-            return "00:00:00"
-        for x in statechanges:
-            if x.state == 'i':
-                t0 = x.time
-            else:
-                t1 = x.time
-                delta = t1 - t0
-                sumt += delta.total_seconds()
-                count = count + 1
-        if count == 0:
-            return "00:00:00"
-        hours = 0
-        minutes = 0
-        seconds = 0
-        avg_secs = int(sumt / count)
-
-        hours = avg_secs / 3600
-        minutes = (avg_secs - (hours * 3600)) / 60
-        seconds = avg_secs - ((hours * 3600) + (minutes * 60))    
-        strtime = "{}:{}:{}".format(hours, minutes, seconds)
-        ret = datetime.datetime.strptime(strtime, '%H:%M:%S').time()
-        return ret
-
-    def verifyStateChanges(self, statechanges):
-        ret = True
-
-        count = 0
-        for x in statechanges:          
-            if count % 2 == 0:
-                if not x.state == 'i':
-                    self.showWarning("statechanges expected in 'i' but got '{}'".format(x.state))
-                    ret = False
-                    break
-            else:
-               if not x.state == 'o':
-                   self.showWarning("statechanges expected out 'o' but got '{}'".format(x.state))
-                   ret = False
-                   break
-            count = count + 1
-        return ret
+    def secondsToTime(self, seconds):
+        if seconds == None:
+            return datetime.time(0, 0)
+        return timedeltaToTime(datetime.timedelta(seconds=seconds))
 
     def updateQueueAvgServiceTime(self):
-        for x in self._clinicstations:
-            # get statechange sorted by date for this clinicstation. Order
-            # should be in, out pairs for each patient that has visited the
-            # clinic. Verify this, and sum the time deltas between arriving 
-            # and leaving. Finally, compute average of these time deltas.
+        '''
+        copy the service time statistics of each clinicstation, maintained
+        incrementally by the estimator from new statechanges only (see 
+        updateEstimator()), to its queue. Queues whose values changed are 
+        written with a single UPDATE.
+        '''
 
-            try:
-                aClinicStation = ClinicStation.objects.get(id=x["id"])
-                if not aClinicStation:
-                    self.showWarning("updateQueueAvgServiceTime not found clinicstation {}".format(x["id"]))
-                    
-            except:
-                self.showWarning("updateQueueAvgServiceTime exception: {} unable to get clinicstation {}".format(sys.exc_info()[0], x["id"]))
+        changed = {}
+        for x in self._clinicstations:
+            index = str(x["id"])
+            stats = self._estimator.getStats(index)
+            if stats.getCount() == 0:
                 continue
-            try:
-                statechanges = StateChange.objects.filter(clinicstation=aClinicStation).order_by("time")              
-            except:
-                self.showWarning("updateQueueAvgServiceTime exception: {} unable to get statechanges {}".format(sys.exc_info()[0], x["id"]))
+            dbQueue = self._dbQueues.get(index)
+            if not dbQueue:
+                self.showWarning("updateQueueAvgServiceTime no queue for clinicstation {}".format(x["id"]))
                 continue
-            if statechanges and len(statechanges):
-                if not self.verifyStateChanges(statechanges): 
-                    self.showWarning("updateQueueAvgServiceTime statechanges for clinicstation {} are not valid".format(x))                        
-                    continue
-                avg = self.getClinicStationAvgServiceTime(statechanges)
-                try:
-                    aQueue = Queue.objects.filter(clinicstation=aClinicStation)
-                    if aQueue and len(aQueue) == 1:
-                        aQueue[0].avgservicetime = avg
-                        aQueue[0].save() 
-                except:
-                    self.showError("updateQueueAvgServiceTime exception: {} unable to get queue".format(sys.exc_info()[0]))
+            times = (self.secondsToTime(stats.getDailyMean()),
+                     self.secondsToTime(stats.getPercentile(50)),
+                     self.secondsToTime(stats.getPercentile(90)))
+            if times != (dbQueue.avgservicetime, dbQueue.p50servicetime, dbQueue.p90servicetime):
+                changed[dbQueue.id] = (dbQueue, times)
+
+        if len(changed) and self.saveQueueServiceTimes(changed):
+            for k, v in changed.iteritems():
+                v[0].avgservicetime, v[0].p50servicetime, v[0].p90servicetime = v[1]
+
+    def saveQueueServiceTimes(self, changed):
+        '''
+        changed maps queue ids to (queue, (avg, p50, p90))
+        '''
+
+        ret = False
+        avgs = [When(id=k, then=Value(v[1][0])) for k, v in changed.iteritems()]
+        p50s = [When(id=k, then=Value(v[1][1])) for k, v in changed.iteritems()]
+        p90s = [When(id=k, then=Value(v[1][2])) for k, v in changed.iteritems()]
+        try:
+            Queue.objects.filter(id__in=changed.keys()).update(
+                avgservicetime=Case(*avgs, output_field=TimeField()),
+                p50servicetime=Case(*p50s, output_field=TimeField()),
+                p90servicetime=Case(*p90s, output_field=TimeField()))
+            # update() does not send post_save, see queue/version.py
+            bumpQueueVersion()
+            ret = True
+        except:
+            self.showError("saveQueueServiceTimes exception: {} unable to update queues".format(sys.exc_info()[0]))
+        return ret
+
+    def updateQueueEntries(self):
+        '''
+        recompute the wait times of every queued patient and write the ones
+        that changed to the database with a single UPDATE. Patients whose 
+        QueueEntry no longer exists (e.g., it was deleted when the patient
+        was checked in) are dropped from the queue.
+        '''
+
+        ids = []
+        for k, v in self._queues.iteritems():
+            for y in v:
+                ids.append(y["qent"].getQueueEntryId())
+        existing = self.getExistingQueueEntryIds(ids)
+        if existing == None:
+            return
+
+        changed = []
+        now = clock.now()
+        for k, v in self._queues.iteritems():
+            for y in v[:]:
+                qent = y["qent"]
+                if not qent.getQueueEntryId() in existing:
+                    self.showWarning("updateQueueEntries: unable to get queue entry queueentry id {} queue {} patient {} routingslipentry {}".format(qent.getQueueEntryId(), k, qent.getPatientId(), qent.getRoutingSlipEntry()))
+                    v.remove(y)
+                    self.journalRemove(k, y)
+            if len(v):
+                start, mean = self._estimator.getQueueParameters(k, now)
+            for position, y in enumerate(v):
+                qent = y["qent"]
+                if qent.update(datetime.timedelta(seconds=start + position * mean)):
+                    changed.append(qent)
+
+        if len(changed) and self.saveQueueEntryTimes(changed):
+            for x in changed:
+                x.setSaved()
+
+    def getExistingQueueEntryIds(self, ids):
+        '''
+        returns the set of ids for which a QueueEntry exists, or None
+        '''
+
+        ret = None
+        try:
+            ret = set(QueueEntry.objects.filter(id__in=ids).values_list("id", flat=True))
+        except:
+            self.showWarning("getExistingQueueEntryIds exception: {} unable to get queue entries".format(sys.exc_info()[0]))
+        return ret
+
+    def saveQueueEntryTimes(self, changed):
+        ret = False
+        waits = [When(id=x.getQueueEntryId(), then=Value(x.getWaitTime())) for x in changed]
+        ests = [When(id=x.getQueueEntryId(), then=Value(x.getEstWaitTime())) for x in changed]
+        try:
+            QueueEntry.objects.filter(id__in=[x.getQueueEntryId() for x in changed]).update(
+                waittime=Case(*waits, output_field=TimeField()),
+                estwaittime=Case(*ests, output_field=TimeField()))
+            bumpQueueVersion()
+            ret = True
+        except:
+            self.showWarning("saveQueueEntryTimes exception: {} unable to update {} queue entries".format(sys.exc_info()[0], len(changed)))
+        return ret
 
     def updateClinicStations(self):
         self._clinicstations = self.getClinicStations()
@@ -391,8 +696,9 @@ class Scheduler():
         for x in self._clinicstations:
             idstring = str(x["id"])
             if not idstring in self._queues:
-                self._dbQueues[idstring] = self.createDbQueue(x["clinic"], x["station"], x["id"]) 
                 self._queues[idstring] = [] 
+            if not self._dbQueues.get(idstring):
+                self._dbQueues[idstring] = self.createDbQueue(x["clinic"], x["station"], x["id"]) 
             if not str(x["station"]) in self._stationToClinicStationMap:
                 self._stationToClinicStationMap[str(x["station"])] = []
             if not x["id"] in self._stationToClinicStationMap[str(x["station"])]:
@@ -401,6 +707,9 @@ class Scheduler():
             self._clinicStationActiveMap[str(x["id"])] = x["active"]
             self._clinicStationFinishedMap[str(x["id"])] = x["finished"]
             self._clinicStationAwayMap[str(x["id"])] = x["away"]
+        self._estimator.setClinicStations(self._clinicstations)
+        if len(self._replayRecords):
+            self.replaySkippedRecords()
 
     def getClinic(self):
         retval = None
@@ -408,17 +717,11 @@ class Scheduler():
         if self._clinic:
             retval = self._clinic
         elif self._clinicid:
-            x = GetClinic(self._host, self._port, self._token, self._clinicid)
-            ret = x.send(timeout=30)
-            if ret[0] == 200:
-                retval = ret[1]
+            retval = self._backend.getClinic(self._clinicid)
 
         if not retval:
-            today = datetime.datetime.now()
-            x = GetAllClinics(self._host, self._port, self._token) 
-            ret = x.send(timeout=30)
-            if ret[0] == 200:
-                for x in ret[1]:
+            today = clock.now()
+            for x in self._backend.getAllClinics():
                     start = datetime.datetime.strptime(x["start"], "%m/%d/%Y")
                     end = datetime.datetime.strptime(x["end"], "%m/%d/%Y")
                     if start == end:
@@ -470,27 +773,79 @@ class Scheduler():
                         count = count + 1  # if not active, skip first in list
                         continue
                     qent = item["qent"] 
-                    r = GetRoutingSlip(self._host, self._port, self._token)
-		    r.setId(qent.getRoutingSlip())
-                    ret = r.send(timeout=30)
-                    if ret[0] == 200:
-                        routing = ret[1]["routing"]
-                        patient = ret[1]["patient"]
-                        for y in routing:
-                            entry = GetRoutingSlipEntry(self._host, self._port, self._token)
-			    entry.setId(y)
-                            ret = entry.send(timeout=30)
-                            if ret[0] == 200:
-                                rse = ret[1]
-                                state = ret[1]["state"] 
-                                if str(ret[1]["station"]) == station and (state == "Scheduled"):
-                                    self.showInfo("************ moving a queue item ******************* item {} patient {}".format(y, patient))
-
-                                    dbQueue = self._dbQueues[k]
-                                    ret = self.deleteDbQueueEntry(dbQueue.id, qent.getPatientId(), rse["id"])
-                                    if ret == True:
-                                        self.markNew(rse["id"])
-                                        self._queues[k].remove(item)
+                    routingslip = self._backend.getRoutingSlip(qent.getRoutingSlip())
+                    if routingslip:
+                        patient = routingslip["patient"]
+                        for rse in routingslip["entries"]:
+                            state = rse["state"] 
+                            if str(rse["station"]) == station and (state == "Scheduled"):
+                                self.showInfo("************ moving a queue item ******************* item {} patient {}".format(rse["id"], patient))
+
+                                dbQueue = self._dbQueues[k]
+                                ret = self.deleteDbQueueEntry(dbQueue.id, qent.getPatientId(), rse["id"])
+                                if ret == True:
+                                    self.markNew(rse["id"])
+                                    self._queues[k].remove(item)
+                                    self.journalRemove(k, item)
+
+    '''
+    Queue changes are published to subscribers (see changeevent/views.py)
+    as change events carrying the queue, as QueueView renders it. Wait 
+    times grow every cycle while patients are waiting, so they are compared
+    at the granularity of a minute, subscribers can compute the current
+    wait from timein between events.
+    '''
+
+    def getPublishKey(self, data):
+        ret = json.loads(json.dumps(data, cls=DjangoJSONEncoder))
+        entries = ret.get("entries", [ret])
+        for x in entries:
+            for y in ["waittime", "estwaittime", "minwait", "maxwait", "avgwait"]:
+                if y in x:
+                    x[y] = ":".join(str(x[y]).split(":")[:2])   # drop seconds
+        return json.dumps(ret, sort_keys=True)
+
+    def publish(self, resource, resourceid, data):
+        key = "{}.{}".format(resource, resourceid)
+        if data == None:
+            action = ChangeEvent.DELETE
+            publishKey = None
+        else:
+            action = ChangeEvent.UPDATE
+            publishKey = self.getPublishKey(data)
+            if not key in self._published:
+                action = ChangeEvent.CREATE
+        if self._published.get(key, None) == publishKey:
+            return
+        if notifyChange(resource, resourceid, action, clinic=self._clinicid,
+                        data=data, wake=False):
+            if publishKey == None:
+                del self._published[key]
+            else:
+                self._published[key] = publishKey
+
+    def publishQueues(self):
+        try:
+            queues = getQueues(self._clinicid)
+            status = list(QueueStatus.objects.filter(clinic_id=self._clinicid)[:1])
+        except:
+            self.showWarning("publishQueues exception: {} unable to read queues".format(sys.exc_info()[0]))
+            return
+
+        ids = set()
+        for x in queues:
+            ids.add("queue.{}".format(x.id))
+            self.publish("queue", x.id, getQueueData(x))
+        for x in [k for k in self._published.keys() if k.startswith("queue.")]:
+            if not x in ids:
+                self.publish("queue", int(x.split(".")[1]), None)
+        if len(status):
+            self.publish("queuestatus", self._clinicid, getQueueStatusData(status[0]))
+
+        now = clock.now()
+        if self._lastPrune == None or (now - self._lastPrune).total_seconds() >= self._eventRetention / 10:
+            if pruneChangeEvents(now - datetime.timedelta(seconds=self._eventRetention)):
+                self._lastPrune = now
 
     def dumpQueues(self):
         #os.system("clear")
@@ -501,7 +856,7 @@ class Scheduler():
         total = 0
         numQueues = 0
         totalWait = datetime.timedelta(seconds=0)
-        print("\nClinic queue report time {}\n".format(datetime.datetime.now().strftime("%m/%d/%Y %H:%M:%S")))
+        print("\nClinic queue report time {}\n".format(clock.now().strftime("%m/%d/%Y %H:%M:%S")))
         for k, v in self._queues.iteritems():
             away = self._clinicStationAwayMap[k]
             finished = self._clinicStationFinishedMap[k]
@@ -536,23 +891,30 @@ class Scheduler():
             minWait = "00:00"
             maxWait = "00:00"
 
-        qs = QueueStatus()
-        qs.numwaiting = total
-        qs.minq = minQ
-        qs.maxq = maxQ
-        qs.avgq = avg
-        qs.minwait = str(minWait)
-        qs.maxwait = str(maxWait)
-        qs.avgwait = str(avgWait)
-        qs.clinic_id = self._clinicid
-        try:
-            qsold = QueueStatus.objects.filter()
-            if qsold:
-                for x in qsold:
-                    x.delete()
-        except:
-            pass
-        qs.save()
+        # only rewrite the status when it changed, every write invalidates
+        # the cached queue snapshots served to the tablets
+
+        status = (total, minQ, maxQ, avg, str(minWait), str(maxWait), str(avgWait), self._clinicid)
+        if status != self._lastQueueStatus or not QueueStatus.objects.filter(clinic_id=self._clinicid).exists():
+            qs = QueueStatus()
+            qs.numwaiting = total
+            qs.minq = minQ
+            qs.maxq = maxQ
+            qs.avgq = avg
+            qs.minwait = str(minWait)
+            qs.maxwait = str(maxWait)
+            qs.avgwait = str(avgWait)
+            qs.clinic_id = self._clinicid
+            # replace the old status in one transaction, so that tablets
+            # never read the table while it is empty
+
+            try:
+                with transaction.atomic():
+                    QueueStatus.objects.filter().delete()
+                    qs.save()
+                self._lastQueueStatus = status
+            except:
+                self.showError("dumpQueues exception: {} unable to save queue status".format(sys.exc_info()[0]))
         print("\nNumber of patients waiting {} smallest Q {} largest Q {} avg Q {} smallest wait {} largest wait {} avg wait {}".format(total, minQ, maxQ, avg, minWait, maxWait, avgWait))
 
     def getClinicStations(self):
@@ -560,14 +922,11 @@ class Scheduler():
         clinic = self.getClinic()
 
         if clinic:
-            x = GetClinicStation(self._host, self._port, self._token)
-            x.setClinic(clinic["id"])
-            ret = x.send(timeout=30)
-            if ret[0] == 200:
-                retval = ret[1]
+            retval = self._backend.getClinicStations(clinic["id"])
         return retval
 
     def insertFrontOfClinicStationQueue(self, routingslipentry, patientid, clinicstationid):
+        ret = False
 
         index = str(clinicstationid)
         isInQueue = routingslipentry in self._queues[index]
@@ -588,26 +947,17 @@ class Scheduler():
             if dbQueueEntry:
                 self._dbQueueEntries[index] = dbQueueEntry
                 qent.setQueueEntryId(dbQueueEntry.id)
+            self.journalEnqueue("insertfront", index, routingslipentry)
             ret = True
         return ret
 
     def addToQueue(self, routingslipentry, patientid):
         ret = False
-        min = 9999      
-        index = None
+
+        # the assignment policy (see policy.py) picks the clinicstation
 
         clinicstations = self.getClinicStationsForStation(routingslipentry["station"])
-        for x in clinicstations:
-            away = self._clinicStationAwayMap[str(x)]
-            finished = self._clinicStationFinishedMap[str(x)]
-            if away == True or finished == True:
-                continue
-            tmp = len(self._queues[str(x)])
-            if self._clinicStationActiveMap[str(x)] == True:
-                tmp += 1
-            if tmp < min:
-                min = tmp
-                index = str(x) 
+        index = self._policy.selectClinicStation(self, clinicstations)
         if index:
             isInQueue = routingslipentry in self._queues[index]
             if index and (not isInQueue):
@@ -630,6 +980,7 @@ class Scheduler():
                     qent.setQueueEntryId(dbQueueEntry.id)
                 else:
                     self.showError("addToQueue failed to create queue entry dbQueue.id {} patientid {} routingslip {} routingslipentry {}".format(dbQueue.id, patientid, routingslipentry["routingslip"], routingslipentry["id"]))
+                self.journalEnqueue("enqueue", index, routingslipentry)
                 ret = True
         return ret
 
@@ -647,36 +998,31 @@ class Scheduler():
                 break
         return ret
 
-    def getSmallestLengthQueue(self, queueables):
+    def getLowestCostQueueable(self, queueables):
         ret = None
-        smallest = 9999
+        smallest = None
 
         for x in queueables:
             clinicstations = self.getClinicStationsForStation(x["station"])
             for clinicstation in clinicstations:
-                # don't schedule into away queues
-                away = self._clinicStationAwayMap[str(clinicstation)]
-                if away == True:
+                # unavailable (e.g., away) clinicstations have no cost
+                tmp = self._policy.getQueueableCost(self, clinicstation)
+                if tmp == None:
                     continue
-                tmp = len(self._queues[str(clinicstation)])
-                if tmp < smallest:
+                if smallest == None or tmp < smallest:
                     ret = x
                     smallest = tmp
         return ret
 
-    def isScheduledOrCheckedIn(self, routing):
+    def isScheduledOrCheckedIn(self, entries):
         retval = False
 
-        for x in routing:
-            entry = GetRoutingSlipEntry(self._host, self._port, self._token)
-	    entry.setId(x)
-            ret = entry.send(timeout=30)
-            if ret[0] == 200:
-                state = ret[1]["state"] 
+        for x in entries:
+            state = x["state"] 
 
-                if state == "Scheduled" or state == "Checked In":
-                    retval = True
-                    break
+            if state == "Scheduled" or state == "Checked In":
+                retval = True
+                break
 
         return retval
 
@@ -690,51 +1036,25 @@ class Scheduler():
     def findCreatedReturnToClinicStationQueueables(self, clinicid):
         queueables = []
 
-        x = GetReturnToClinicStation(self._host, self._port, self._token)
-        x.setClinic(clinicid)
-        x.setState("created")
-        ret = x.send(timeout=30)
-        if ret[0] == 200:
-            createdList = ret[1]
-        else:
-            createdList = []
-
-        for x in createdList:
+        for x in self._backend.getReturnToClinicStations(clinicid, "created"):
 
             # get the routing slip for the patient
 
-            y = GetReturnToClinicStation(self._host, self._port, self._token)
-            y.setId(x["id"])
-            ret = y.send(timeout=30)
-            if not (ret[0] == 200):
-                self.showWarning("findCreatedReturnToClinicStation warning: unable to get returntoclinicstation id {}: return {}".format(x["id"], ret[0]))
-                continue
-            y = GetRoutingSlip(self._host, self._port, self._token)
-            y.setClinic(clinicid)
-            patientid = ret[1]["patient"]
-            stationid = ret[1]["station"]
-            y.setPatient(patientid)
-            ret = y.send(timeout=30)
-            if not (ret[0] == 200):
-                self.showWarning("findCreateReturnToClinicStation warning: unable to get routing slip for clinic {} and patient {}: return {}".format(x["clinic"], x["patient"], ret[0]))
+            patientid = x["patient"]
+            stationid = x["station"]
+            routingslip = self._backend.getRoutingSlipForPatient(clinicid, patientid)
+            if not routingslip:
+                self.showWarning("findCreateReturnToClinicStation warning: unable to get routing slip for clinic {} and patient {}".format(clinicid, patientid))
                 continue
 
             # create a routing slip entry for the patient
 
-            routingslipid = ret[1]["id"]
-            y = CreateRoutingSlipEntry(self._host, self._port, self._token)
-            y.setRoutingSlip(routingslipid)
-            y.setStation(stationid)
-            y.setReturnToClinicStation(x["id"])
-            ret = y.send(timeout=30)
-            if not (ret[0] == 200):
-                self.showWarning("findCreateReturnToClinicStation warning: unable to create a routing slip entry for clinic {} patient {} station {} routingslip {} returntoclinicstation {}: return {}".format(clinicid, patientid, stationid, routingslipid, x["id"], ret[0]))
+            routingslipid = routingslip["id"]
+            entry = self._backend.createRoutingSlipEntry(routingslipid, stationid, x["id"])
+            if not entry:
+                self.showWarning("findCreateReturnToClinicStation warning: unable to create a routing slip entry for clinic {} patient {} station {} routingslip {} returntoclinicstation {}".format(clinicid, patientid, stationid, routingslipid, x["id"]))
                 continue
-            entry = GetRoutingSlipEntry(self._host, self._port, self._token)
-	    entry.setId(ret[1]["id"])
-            ret = entry.send(timeout=30)
-            if ret[0] == 200:
-                queueables.append((ret[1], patientid, x["id"]))
+            queueables.append((entry, patientid, x["id"]))
         return queueables
 
     '''
@@ -749,61 +1069,33 @@ class Scheduler():
     def findCheckedOutDestReturnToClinicStationQueueables(self, clinicid):
         queueables = []
 
-        x = GetReturnToClinicStation(self._host, self._port, self._token)
-        x.setClinic(clinicid)
-        x.setState("checked_out_dest")
-        ret = x.send(timeout=30)
-        if ret[0] == 200:
-            checkedOutDestList = ret[1]
-        else:
-            checkedOutDestList = []
-
-        for x in checkedOutDestList:
-
-            returntoclinicstationid = x["id"]
-            y = GetReturnToClinicStation(self._host, self._port, self._token)
-            y.setId(returntoclinicstationid)
-            ret = y.send(timeout=30)
-            if not (ret[0] == 200):
-                self.showWarning("findCheckedOutDestReturnToClinicStationQueueables warning: unable to get returntoclinicstation id {}: return {}".format(returntoclinicstationid, ret[0]))
-                continue
+        for x in self._backend.getReturnToClinicStations(clinicid, "checked_out_dest"):
 
             # get the routing slip for the patient
 
-            requestingclinicstationid = ret[1]["requestingclinicstation"]
-            patientid = ret[1]["patient"]
-            stationid = ret[1]["station"]
+            returntoclinicstationid = x["id"]
+            requestingclinicstationid = x["requestingclinicstation"]
+            patientid = x["patient"]
+            stationid = self._clinicStationToStationMap[str(requestingclinicstationid)]
 
-            y = GetRoutingSlip(self._host, self._port, self._token)
-            y.setClinic(clinicid)
-            y.setPatient(patientid)
-            ret = y.send(timeout=30)
-            if not (ret[0] == 200):
-                self.showWarning("findCheckedOutDestReturnToClinicStationQueueables warning: unable to get routing slip for clinic {} and patient {}: return {}".format(x["clinic"], x["patient"], ret[0]))
+            routingslip = self._backend.getRoutingSlipForPatient(clinicid, patientid)
+            if not routingslip:
+                self.showWarning("findCheckedOutDestReturnToClinicStationQueueables warning: unable to get routing slip for clinic {} and patient {}".format(clinicid, patientid))
                 continue
 
             # create a routing slip entry for the patient
 
-            routingslipid = ret[1]["id"]
-            y = CreateRoutingSlipEntry(self._host, self._port, self._token)
-            y.setRoutingSlip(routingslipid)
-            y.setStation(self._clinicStationToStationMap[str(requestingclinicstationid)])
-            #y.setStation(stationid)
-            y.setReturnToClinicStation(returntoclinicstationid)
-            ret = y.send(timeout=30)
-            if not (ret[0] == 200):
-                self.showWarning("findCheckedOutDestReturnToClinicStationQueueables warning: unable to create a routing slip entry for clinic {} patient {} station {} routingslip {} returntoclinicstation {}: return {}".format(clinicid, patientid, stationid, routingslipid, returntoclinicstationid, ret[0]))
+            routingslipid = routingslip["id"]
+            entry = self._backend.createRoutingSlipEntry(routingslipid, stationid, returntoclinicstationid)
+            if not entry:
+                self.showWarning("findCheckedOutDestReturnToClinicStationQueueables warning: unable to create a routing slip entry for clinic {} patient {} station {} routingslip {} returntoclinicstation {}".format(clinicid, patientid, stationid, routingslipid, returntoclinicstationid))
                 continue
-            entry = GetRoutingSlipEntry(self._host, self._port, self._token)
-	    entry.setId(ret[1]["id"])
-            ret = entry.send(timeout=30)
-            if ret[0] == 200:
-                queueables.append((ret[1], patientid, returntoclinicstationid, requestingclinicstationid))
+            queueables.append((entry, patientid, returntoclinicstationid, requestingclinicstationid))
         return queueables
 
-    def hasReturnToClinicNotCheckedOut(self, routingslipid):
+    def hasReturnToClinicNotCheckedOut(self, entries):
         '''
-        call this function from findQueueableEntry. If returns True, skip this patient.
+        call this function from findQueueables. If returns True, skip this patient.
         otherwise, the patient may be returned to a clinicstation that is not the
         specified requestingclinicstation for the active returntoclinicstation record.
 
@@ -814,54 +1106,40 @@ class Scheduler():
         patient must go back to that dentist, not to some other station (like hygiene).
         '''
 
-        '''
-        pseudocode
-
-        select routingslipentry where routingslip == routingslip and returntoclinic != null and state != o
-
-        if result not empty
-            skip
-        '''
-        x = GetRoutingSlipEntry(self._host, self._port, self._token)
-        x.setRoutingSlip(routingslipid)
-        x.setNullrcs(False)
-        x.setStates("Checked In, New, Scheduled, Removed, Return")
-        ret = x.send(timeout=30)
-        if ret[0] == 404:
-            return False
-        else:
-            return True
+        ret = False
+        for x in entries:
+            if x["returntoclinicstation"] != None and x["state"] in ["Checked In", "New", "Scheduled", "Removed", "Return"]:
+                ret = True
+                break
+        return ret
 
-    def findRemovedRoutingSlipEntries(self, routing):
+    def findRemovedRoutingSlipEntries(self, entries):
         retval = []
-        x = GetRoutingSlipEntry(self._host, self._port, self._token)
-        x.setRoutingSlip(routing)
-        x.setStates("Removed")
-        ret = x.send(timeout=30)
-        if ret[0] == 200:
-            retval = ret[1]
+        for x in entries:
+            if x["state"] == "Removed":
+                retval.append(x["id"])
         return retval
 
-    def findQueueableEntry(self, routing):
+    def findQueueables(self, entries):
         queueables = []
+
+        if not self.isScheduledOrCheckedIn(entries) and not self.hasReturnToClinicNotCheckedOut(entries):
+            for x in entries:
+                if x["state"] == "New" :
+                    queueables.append(x)
+        return queueables
+
+    def selectQueueable(self, queueables):
         retval = None      # default: nothing to queue on this routing slip
 
-        if not self.isScheduledOrCheckedIn(routing):
-            for x in routing:
-                if self.hasReturnToClinicNotCheckedOut(x):
-                    continue
-                entry = GetRoutingSlipEntry(self._host, self._port, self._token)
-	    	entry.setId(x)
-                ret = entry.send(timeout=30)
-                if ret[0] == 200:
-                    state = ret[1]["state"] 
-                    if state == "New" :
-                        queueables.append(ret[1])
-                else:
-                    self.showError("findQueueableEntry failure in GetRoutingSlipEntry".format(ret[0]))
-        if len(queueables):
+        if len(queueables) and self._optimizer:
+
+            # optimizer mode, see optimizer.py
 
-            # found something to schedule, find highest priority with smallest queue size
+            retval = self._optimizer.select(self, queueables)
+        elif len(queueables):
+
+            # found something to schedule, find highest priority with lowest cost queue
 
             if len(queueables) == 1:
                 retval = queueables[0]          # last station for this patient, choose it
@@ -870,163 +1148,412 @@ class Scheduler():
 
                 tmp = self.sortQueueablesByPriority(queueables)
 
-                retval = self.getSmallestLengthQueue(tmp) 
+                retval = self.getLowestCostQueueable(tmp) 
                 
         return retval
 
+    def findQueueableEntry(self, entries):
+        return self.selectQueueable(self.findQueueables(entries))
+
     def setRoutingSlipEntryState(self, rseId, state):
-        x = UpdateRoutingSlipEntry(self._host, self._port, self._token, rseId)
-        x.setState(state)
-        ret = x.send(timeout=30)
-        if ret[0] != 200:
+        ret = self._backend.setRoutingSlipEntryState(rseId, state)
+        if not ret:
             self.showError("setRoutingSlipState failure to set state {} for routingslip entry {}".format(state, rseId))
+        else:
+            for k in self._queues:
+                item = self.findQueueItem(k, rseId)
+                if item:
+                    item["state"] = state
+            self.journalAppend({"op": "state", "entry": rseId, "state": state})
+        return ret
 
     def markDeleted(self, rseId):
-        self.setRoutingSlipEntryState(rseId, "Deleted")
+        return self.setRoutingSlipEntryState(rseId, "Deleted")
 
     def markScheduled(self, rseId):
-        self.setRoutingSlipEntryState(rseId, "Scheduled")
+        return self.setRoutingSlipEntryState(rseId, "Scheduled")
 
     def markNew(self, rseId):
-        self.setRoutingSlipEntryState(rseId, "New")
+        return self.setRoutingSlipEntryState(rseId, "New")
+
+    def atomic(self):
+        return transaction.atomic()
+
+    def removeFromQueues(self, rseId):
+        for k in self._queues:
+            item = self.findQueueItem(k, rseId)
+            if item:
+                self._queues[k].remove(item)
+                self.journalRemove(k, item)
+
+    def scheduleEntry(self, entry, place):
+        '''
+        place entry in a clinicstation queue by calling place() (e.g., 
+        addToQueue) and mark it Scheduled. The queue entry and the state
+        change are written in one transaction, so that a failure between
+        them cannot leave a queue entry for a routing slip entry that is 
+        still New. If the state change fails, the entry is taken out of 
+        the in-memory queue again. Returns True if the entry was placed.
+        '''
+
+        placed = False
+        try:
+            with self.atomic():
+                placed = place()
+                if placed and not self.markScheduled(entry["id"]):
+                    raise Exception("unable to mark routingslip entry {} Scheduled".format(entry["id"]))
+        except:
+            self.showError("scheduleEntry exception: {} {}".format(sys.exc_info()[0], sys.exc_info()[1]))
+            if placed:
+                self.removeFromQueues(entry["id"])
+            placed = False
+        return placed
 
     def setRtcState(self, rtcid, state):
-        x = UpdateReturnToClinicStation(self._host, self._port, self._token, rtcid)
-        x.setState(state)
-        ret = x.send(timeout=30)
-        if ret[0] != 200:
+        if not self._backend.setReturnToClinicStationState(rtcid, state):
             self.showError("setRtcState failure for rtc {} state {}".format(rtcid, state))
 
-    def run(self):
+    def processReturnToClinicStations(self, clinicid):
+        found = False
 
-        while True:
-            pickle.dump(self, open( picklepath, "wb" ))
-            clinic = self.getClinic()
-            if not clinic:
-                continue
+        # process any newly created returntoclinicstation resources
 
-            self.updateClinicStations()
+        rtcQueueables = self.findCreatedReturnToClinicStationQueueables(clinicid)
+
+        for rtc in rtcQueueables:
+            # append the entry to the corresponding
+            # clinicstation queue
+            entry = rtc[0]
+            patient = rtc[1]
+            rtcresource = rtc[2]
+
+            # queue the entry and set its state to "Scheduled"
+
+            if self.scheduleEntry(entry, lambda: self.addToQueue(entry, patient)) == True:
+                # update the returntoclinicstation entry state to "scheduled_dest"
+                self.setRtcState(rtcresource, "scheduled_dest")
+                found = True
+            else:
+                self.showError("Unable to add created return to clinic station item to queue");
 
-            # process any newly created returntoclinicstation resources
+        # process any returntoclinicstation resources that need to be
+        # sent back to the requesting clinic station. 
 
-            found = False
+        if found == False:
+            rtcCheckedOut = self.findCheckedOutDestReturnToClinicStationQueueables(clinicid)
 
-            rtcQueueables = self.findCreatedReturnToClinicStationQueueables(clinic["id"])
-    
-            for rtc in rtcQueueables:
-                # append the entry to the corresponding
-                # clinicstation queue
+            for rtc in rtcCheckedOut:
                 entry = rtc[0]
                 patient = rtc[1]
                 rtcresource = rtc[2]
+                requestingclinicstation = rtc[3]
 
-                if self.addToQueue(entry, patient) == True:
-                    # update the routingslip entry state to "Scheduled"
-                    self.markScheduled(entry["id"])
-                    # update the returntoclinicstation entry state to "scheduled_dest"
-                    self.setRtcState(rtcresource, "scheduled_dest")
+                # queue the entry and set its state to "Scheduled"
+
+                if self.scheduleEntry(entry, lambda: self.insertFrontOfClinicStationQueue(entry, patient, requestingclinicstation)) == True:
+                    self.setRtcState(rtcresource, "scheduled_return")
                     found = True
                 else:
-                    self.showError("Unable to add created return to clinic station item to queue");
+                    self.showError("Unable to add checkedout return to clinic station item to queue");
+        return found
 
-            # process any returntoclinicstation resources that need to be
-            # sent back to the requesting clinic station. 
+    def processRemovedRoutingSlipEntries(self, entries):
 
-            if found == False:
-                rtcCheckedOut = self.findCheckedOutDestReturnToClinicStationQueueables(clinic["id"])
-
-                for rtc in rtcCheckedOut:
-                    entry = rtc[0]
-                    patient = rtc[1]
-                    rtcresource = rtc[2]
-                    requestingclinicstation = rtc[3]
-
-                    if self.insertFrontOfClinicStationQueue(entry, patient, requestingclinicstation) == True:
-                        # update the routingslip entry state to "Scheduled"
-                        self.markScheduled(entry["id"])
-                        self.setRtcState(rtcresource, "scheduled_return")
-                        found = True
+        # search for any routingslip entries that are in 
+        # removed state and make sure that routingslip 
+        # entries that are in a queue are removed from that 
+        # queue
+
+        for rseId in self.findRemovedRoutingSlipEntries(entries):
+            for k, v in self._queues.iteritems():
+                dbQueue = self._dbQueues[k]
+                for item in v:
+                    if item["id"] != rseId:
+                        continue
+                    qent = item["qent"] 
+                    ret = self.deleteDbQueueEntry(dbQueue.id, qent.getPatientId(), rseId)
+                    if ret == True:
+                        self.showInfo("deleted DbQueueEntry id {} patient {} rseId {} removing item from queue".format(dbQueue.id, qent.getPatientId(), rseId))
+                        try:
+                            self._queues[k].remove(item)
+                            self.journalRemove(k, item)
+                        except:
+                            self.showError("exception: {} failed to remove entry corresponding to DbQueueEntry id {} patient {} rseId {}".format(sys.exc_info()[0], dbQueue.id, qent.getPatientId(), rseId))
                     else:
-                        self.showError("Unable to add checkedout return to clinic station item to queue");
+                        self.showError("failed to delete DbQueueEntry id {} patient {} rseId {}".format(dbQueue.id, qent.getPatientId(), rseId))
+                    break
+            self.markDeleted(rseId)
+
+    def processRoutingSlip(self, routingslip):
+        '''
+        process a single routing slip (as returned by GetRoutingSlip). 
+        Returns True if an entry of the slip was placed in a queue.
+        '''
+
+        ret = False
+        entries = routingslip["entries"]
+        self.processRemovedRoutingSlipEntries(entries)
+        queueables = self.findQueueables(entries)
+        entry = self.selectQueueable(queueables)
+        if entry:
+            # append the entry to the corresponding
+            # clinicstation queue and set its state to "Scheduled"
+            if self.scheduleEntry(entry, lambda: self.addToQueue(entry, routingslip["patient"])) == True:
+                ret = True
+            else:
+                self.showError("Unable to add item to queue");
+
+        # remember slips that have work left but could not be placed (e.g.,
+        # every clinicstation for the station is away) so they can be 
+        # retried in event mode when a clinicstation changes state
+
+        if ret == False and len(queueables):
+            self._pendingSlips.add(routingslip["id"])
+        else:
+            self._pendingSlips.discard(routingslip["id"])
+        return ret
+
+    def getRoutingSlips(self, clinicid):
+        ret = self._backend.getRoutingSlips(clinicid)
+        if ret == None:
+            self.showError("GetRoutingSlip failed"); 
+        return ret
+
+    def getRoutingSlipById(self, routingslipid):
+        return self._backend.getRoutingSlip(routingslipid)
+
+    def getRoutingSlipForPatient(self, clinicid, patientid):
+        return self._backend.getRoutingSlipForPatient(clinicid, patientid)
+
+    def updateEstimator(self):
+        if self._clinicid:
+            try:
+                self._estimator.update(self._clinicid)
+            except:
+                self.showWarning("updateEstimator exception: {} unable to read statechanges".format(sys.exc_info()[0]))
+
+    def getEstimatedWait(self, clinicstationid, position):
+        return self._estimator.estimate(clinicstationid, position)
+
+    def processQueues(self):
+        self.updateEstimator()
+        self.updateQueueEntries()
+        self.dumpQueues()
+        #self.fillAnEmptyQueue()
+        self.updateQueueAvgServiceTime()
+        self.publishQueues()
+
+    def run(self):
+        if self._eventMode == True:
+            self.runEventDriven()
+        else:
+            self.runPolling()
+
+    def runPolling(self):
+
+        while True:
+            self.checkpoint()
+            clinic = self.getClinic()
+            if not clinic:
+                continue
+
+            self.updateClinicStations()
+
+            found = self.processReturnToClinicStations(clinic["id"])
 
             if found == False:
 
                 # get all the routing slips for the clinic
 
-                x = GetRoutingSlip(self._host, self._port, self._token)
-                x.setClinic(clinic["id"])
-                ret = x.send(timeout=30)
-                if ret[0] == 200:
-                    results = ret[1]
+                results = self.getRoutingSlips(clinic["id"])
+                if results != None:
 
-                    # process each of the routing slips
+                    # process each of the routing slips, placing at most
+                    # one patient each cycle
 
                     for i in results:
-                        routing = i["routing"]
-            
-                        # search for any routingslip entries that are in 
-                        # removed state and make sure that routingslip 
-                        # entries that are in a queue are removed from that 
-                        # queue
-
-                        for slip in routing:
-                            entries = self.findRemovedRoutingSlipEntries(slip)
-                            if entries and len(entries) > 0:
-                                for rseId in entries:
-                                    for k, v in self._queues.iteritems():
-                                        dbQueue = self._dbQueues[k]
-                                        for item in v:
-                                            qent = item["qent"] 
-                                            ret = self.deleteDbQueueEntry(dbQueue.id, qent.getPatientId(), rseId)
-                                            if ret == True:
-                                                self.showInfo("deleted DbQueueEntry id {} patient {} rseId {} removing item from queue".format(dbQueue.id, qent.getPatientId(), rseId))
-                                                try:
-                                                    self._queues[k].remove(item)
-                                                except:
-                                                    self.showError("exception: {} failed to remove entry corresponding to DbQueueEntry id {} patient {} rseId {}".format(sys.exc_info()[0], dbQueue.id, qent.getPatientId(), rseId))
-                                            else:
-                                                self.showError("failed to delete DbQueueEntry id {} patient {} rseId {}".format(dbQueue.id, qent.getPatientId(), rseId))
-                                    self.markDeleted(rseId)
-                        entry = self.findQueueableEntry(routing)
-                        if entry:
-                            # append the entry to the corresponding
-                            # clinicstation queue
-                            if self.addToQueue(entry, i["patient"]) == True:
-                                # update the routingslip entry state to "Scheduled"
-                                self.markScheduled(entry["id"])
-                                break
-                            else:
-                                self.showError("Unable to add item to queue");
+                        if self.processRoutingSlip(i) == True:
+                            break
 
-                else:
-                    self.showError("GetRoutingSlip failed"); 
+            self.processQueues()
+            time.sleep(self._updateInterval)
 
-            # process queues
+    '''
+    Event driven operation. Rather than walking every routing slip of the
+    clinic every 5 seconds, wait for views to record change events (see
+    changeevent/notify.py) and only process the routing slips those events
+    refer to. Queue wait times are still updated every _updateInterval 
+    seconds, and a full sweep is made every _sweepInterval seconds to catch
+    anything that was missed (e.g., changes made while the scheduler was not
+    running).
+    '''
 
-            for k, v in self._queues.iteritems():
-                for y in v:
-                    ret = y["qent"].update(self)
-                    if not ret:
-                        v.remove(y)
+    def openEventSocket(self):
+        path = getattr(settings, "SCHEDULER_EVENT_SOCKET", None)
+        if not path:
+            self.showInfo("SCHEDULER_EVENT_SOCKET not set, polling change events every {} seconds".format(self._eventPollInterval))
+            return
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        try:
+            s = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            s.bind(path)
+            s.setblocking(0)
+            # web server usually runs as a different user
+
+            os.chmod(path, 0o666)
+            self._eventSocket = s
+        except:
+            self.showWarning("openEventSocket exception: {} unable to bind {}, polling change events instead".format(sys.exc_info()[0], path))
+            self._eventSocket = None
+
+    def waitForEvents(self, timeout):
+        if self._eventSocket:
+            try:
+                r, w, x = select.select([self._eventSocket], [], [], timeout)
+            except select.error:
+                r = []
+            if r:
+                # drain, the datagrams carry no data
+
+                while True:
+                    try:
+                        self._eventSocket.recv(64)
+                    except socket.error:
+                        break
+        else:
+            time.sleep(min(timeout, self._eventPollInterval))
+
+    def getChangeEvents(self):
+        ret = []
+        try:
+            # skip the events the scheduler recorded itself (wake False), 
+            # e.g., the queues it published and the routing slip entries
+            # it scheduled
+
+            events = ChangeEvent.objects.filter(id__gt=self._eventHighWater, wake=True).exclude(resource__in=["queue", "queuestatus"]).order_by("id")
+            for x in events:
+                ret.append(x)
+                self._eventHighWater = x.id
+        except:
+            self.showWarning("getChangeEvents exception: {} unable to read change events".format(sys.exc_info()[0]))
+        return ret
+
+    def initEventHighWater(self):
+        try:
+            last = ChangeEvent.objects.order_by("-id")[:1]
+            if last and len(last):
+                self._eventHighWater = last[0].id
+        except:
+            self.showWarning("initEventHighWater exception: {} unable to read change events".format(sys.exc_info()[0]))
+
+    def processChangeEvents(self, clinicid, events):
+        routingslips = set()
+        patients = set()
+        rtcChanged = False
+        clinicStationsChanged = False
+
+        for x in events:
+            if x.clinic != None and str(x.clinic) != str(clinicid):
+                continue
+            if x.resource == "clinicstation":
+                clinicStationsChanged = True
+            elif x.resource == "returntoclinicstation":
+                rtcChanged = True
+                if x.patient != None:
+                    patients.add(x.patient)
+            elif x.resource in ["routingslip", "routingslipentry"]:
+                if x.action == ChangeEvent.DELETE and x.resource == "routingslip":
+                    self._pendingSlips.discard(x.routingslip)
+                elif x.routingslip != None:
+                    routingslips.add(x.routingslip)
+
+        if clinicStationsChanged:
+            # a station coming back from away, or freeing up, may allow
+            # patients that could not be placed earlier to be queued
+
+            self.updateClinicStations()
+            routingslips |= self._pendingSlips
+
+        if rtcChanged:
+            self.processReturnToClinicStations(clinicid)
+
+        slips = []
+        for x in routingslips:
+            slip = self.getRoutingSlipById(x)
+            if slip and str(slip["clinic"]) == str(clinicid):
+                slips.append(slip)
+        for x in patients:
+            slip = self.getRoutingSlipForPatient(clinicid, x)
+            if slip and not slip["id"] in routingslips:
+                slips.append(slip)
+
+        for x in slips:
+            self.processRoutingSlip(x)
+
+    def sweep(self, clinicid):
+        self.processReturnToClinicStations(clinicid)
+        results = self.getRoutingSlips(clinicid)
+        if results != None:
+            for x in results:
+                self.processRoutingSlip(x)
+
+    def runEventDriven(self):
+        clinic = None
+        while not clinic:
+            clinic = self.getClinic()
+            if not clinic:
+                time.sleep(self._updateInterval)
 
-            self.dumpQueues()
-            #self.fillAnEmptyQueue()
-            self.updateQueueAvgServiceTime()
-            time.sleep(5)
+        if not self._eventSocket:
+            self.openEventSocket()
+        self.updateClinicStations()
+
+        # events recorded from now on will be seen, the sweep covers
+        # everything that happened before
+
+        self.initEventHighWater()
+        self.sweep(clinic["id"])
+        self.processQueues()
+        lastUpdate = lastSweep = time.time()
+
+        while True:
+            timeout = max(0, self._updateInterval - (time.time() - lastUpdate))
+            self.waitForEvents(timeout)
+
+            events = self.getChangeEvents()
+            if len(events):
+                self.processChangeEvents(clinic["id"], events)
+                self.publishQueues()
+
+            now = time.time()
+            if now - lastSweep >= self._sweepInterval:
+                self.updateClinicStations()
+                self.sweep(clinic["id"])
+                lastSweep = now
+            if now - lastUpdate >= self._updateInterval:
+                self.processQueues()
+                self.checkpoint()
+                lastUpdate = now
 
 def usage():
-    print("scheduler [-f picklepath] [-c clinicid] [-h host] [-p port] [-r] [-u username] [-w password] [-x] [-l path]")
+    print("scheduler [-f statepath] [-c clinicid] [-h host] [-p port] [-r] [-u username] [-w password] [-x] [-l path] [-e] [-b orm|http] [-a shortest|lec] [-o] [-t path]")
     print("where:")
-    print("-f picklepath -- pathname of saved state")
-    print("-r            -- initialize with state found in pickelpath")
+    print("-a policy     -- clinicstation assignment policy, shortest queue (default) or least expected completion")
+    print("-b backend    -- data access backend, orm (default) or http")
+    print("-e            -- event mode, process change events instead of polling")
+    print("-f statepath  -- pathname of saved state snapshot, the journal is statepath.journal")
+    print("-r            -- initialize with state found in statepath and its journal")
     print("-x            -- fail on errors")
     print("-l            -- send warnings and errors to path")
+    print("-o            -- optimize the order in which routing slip stations are visited")
+    print("-t path       -- station ordering constraints for -o (see constraints.json)")
 
 def main():
-    global picklepath
-    global restart
     try:
-        opts, args = getopt.getopt(sys.argv[1:], "xrf:c:h:p:u:w:kl:")
+        opts, args = getopt.getopt(sys.argv[1:], "exrf:c:h:p:u:w:kl:b:a:ot:")
     except getopt.GetoptError as err:
         print str(err)
         usage()
@@ -1038,8 +1565,13 @@ def main():
     clinicid = None
     restart = False
     abortOnError = False
+    eventMode = False
+    backendName = "orm"
+    policyName = "shortest"
+    optimize = False
+    constraintsPath = None
     outFile = None
-    picklepath = "save.p"
+    statepath = "scheduler.state"
     for o, a in opts:
         if o == "-c":
             clinicid = a
@@ -1054,25 +1586,62 @@ def main():
         elif o == "-u":
             username = a
         elif o == "-f":
-            picklepath = a
+            statepath = a
         elif o == "-r":
             restart = True
         elif o == "-x":
             abortOnError = True
+        elif o == "-e":
+            eventMode = True
+        elif o == "-b":
+            backendName = a
+        elif o == "-a":
+            policyName = a
+        elif o == "-o":
+            optimize = True
+        elif o == "-t":
+            constraintsPath = a
         else:
             assert False, "unhandled option"
     #with daemon.DaemonContext():
-    if restart == True:
-        try:
-            x = pickle.load( open( picklepath, "rb" ) )
-            print("loaded state from pickle {}".format(picklepath))
-        except:
-            print("Unable to load state from pickle {}".format(picklepath))
-            sys.exit(3)
+    if backendName == "orm":
+        backend = ORMBackend()
+    elif backendName == "http":
+        backend = HTTPBackend(host, port, username, password)
     else:
-        x = Scheduler(host, port, username, password, clinicid)
+        print("unknown backend {}".format(backendName))
+        usage()
+        sys.exit(2)
+    policy = getPolicy(policyName)
+    if not policy:
+        print("unknown policy {}".format(policyName))
+        usage()
+        sys.exit(2)
+    x = Scheduler(host, port, username, password, clinicid, backend)
+    x.setPolicy(policy)
+    if optimize == True:
+        optimizer = RoutingOptimizer()
+        if constraintsPath:
+            try:
+                missing = optimizer.loadConstraints(constraintsPath)
+            except:
+                print("Unable to load constraints from {}".format(constraintsPath))
+                sys.exit(2)
+            if len(missing):
+                print("warning: constraints refer to unknown stations {}".format(missing))
+        x.setOptimizer(optimizer)
     x.setAbortOnError(abortOnError)
+    x.setEventMode(eventMode)
     x.setLogOutfile(outFile)
+    journal = Journal(statepath)
+    x.setJournal(journal)
+    if restart == True:
+        if x.restore() == False:
+            print("Unable to load state from {}".format(statepath))
+            sys.exit(3)
+        print("loaded state from {}".format(statepath))
+    else:
+        journal.reset()
     x.run()
 
 if __name__ == '__main__':
@@ -0,0 +1,723 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+Discrete event simulation of a clinic day, used to benchmark the 
+scheduler.
+
+mockclinic.py (tschartslib/scheduler) exercises the scheduler against a
+live server in real time, so trying a change takes hours. The simulator
+runs the scheduler's own decision logic (Scheduler, the assignment 
+policies and the optimizer) against an in-memory store and a virtual 
+clock (see clock.py) instead, and replays a clinic day in seconds. 
+
+The clinic is read from the same JSON files mockclinic uses (clinic.json,
+dentalclinic.json, fullclinic.json, mixedclinic.json), including the
+optional per clinicstation "servicefactor". Patients and their routing 
+slips are generated as mockclinic does: patients register every 1 to 30
+seconds, their category decides the stations on their routing slip, and
+clinicstations look at their queue every 1 to 30 seconds, check in the 
+first patient and see them for 120 to 180 seconds times the service 
+factor. With -a, each clinicstation goes away once for 1 to 5 minutes.
+All randomness comes from a seeded generator, so runs are reproducible.
+
+In event mode (the default) the scheduler is driven through the same 
+change event handling as "scheduler -e"; in poll mode it runs the 
+polling loop every 5 virtual seconds. At the end, throughput, mean and
+p95 waits, queue lengths over time and clinicstation utilization are 
+reported. -C runs the same workload under each assignment policy, with
+and without the optimizer, and prints the results side by side.
+'''
+
+import getopt, os, sys
+import datetime
+import heapq
+import json
+import random
+
+import clock
+from clock import VirtualClock
+from scheduler import Scheduler
+from backend import SchedulerBackend, illegalFromStates, textToState
+from policy import getPolicy
+from optimizer import RoutingOptimizer
+from changeevent.models import ChangeEvent
+
+# stations visited by each patient category, as in mockclinic.py. Other 
+# categories get a random selection of stations.
+
+categoryRoutes = {"Dental": ["X-Ray", "Dental"],
+                  "New Cleft": ["ENT", "Surgery Screening"],
+                  "Returning Cleft": ["ENT", "Surgery Screening"],
+                  "Ortho": ["Ortho"],
+                  "Hearing Aids": ["Audiology"],
+                  "Ears": ["ENT"]}
+
+terminalStates = ["Checked Out", "Deleted"]
+
+class Record(object):
+    '''
+    stands in for Queue and QueueEntry model instances
+    '''
+
+    def __init__(self, **kwargs):
+        super(Record, self).__init__()
+        for k, v in kwargs.iteritems():
+            setattr(self, k, v)
+
+class NoTransaction(object):
+    '''
+    stands in for transaction.atomic()
+    '''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        return False
+
+class SimEvent(object):
+    '''
+    stands in for a ChangeEvent
+    '''
+
+    def __init__(self, resource, resourceid, clinic, patient=None, routingslip=None, action=ChangeEvent.UPDATE):
+        super(SimEvent, self).__init__()
+        self.resource = resource
+        self.resourceid = resourceid
+        self.clinic = clinic
+        self.patient = patient
+        self.routingslip = routingslip
+        self.action = action
+
+class SimClinic(object):
+    '''
+    in-memory store holding the clinic, its stations and clinicstations,
+    routing slips and queue entries
+    '''
+
+    def __init__(self, path, start):
+        super(SimClinic, self).__init__()
+        f = open(path, "r")
+        try:
+            data = json.load(f)
+        finally:
+            f.close()
+
+        self._nextId = 1
+        self.clinic = {"id": self.allocId(), 
+                       "location": data["name"],
+                       "start": start.strftime("%m/%d/%Y"),
+                       "end": start.strftime("%m/%d/%Y")}
+        self.categories = data["categories"]
+        self.stations = {}              # name -> {"id", "name", "level"}
+        self.clinicstations = {}        # id -> dict shaped like the API
+        self.servicefactors = {}        # clinicstation id -> factor
+        self.routingslips = {}          # id -> {"id", "patient", "entries"}
+        self.patientSlips = {}          # patient id -> routingslip id
+        self.queueEntries = {}          # id -> Record
+        self.queueEntriesByQueue = {}   # queue id -> [Record, ...]
+
+        for x in data["stations"]:
+            station = {"id": self.allocId(), "name": x["name"], "level": x["level"]}
+            self.stations[x["name"]] = station
+            for y in x["stations"]:
+                id = self.allocId()
+                self.clinicstations[id] = {"id": id, 
+                                           "name": y["name"],
+                                           "name_es": y["name_es"],
+                                           "clinic": self.clinic["id"],
+                                           "station": station["id"],
+                                           "active": False,
+                                           "level": 1,
+                                           "away": False,
+                                           "awaytime": 30,
+                                           "willreturn": start,
+                                           "activepatient": None,
+                                           "nextpatient": None,
+                                           "finished": False}
+                self.servicefactors[id] = y.get("servicefactor", 1.0)
+
+    def allocId(self):
+        ret = self._nextId
+        self._nextId += 1
+        return ret
+
+    def getStationId(self, name):
+        ret = None
+        if name in self.stations:
+            ret = self.stations[name]["id"]
+        return ret
+
+    def getStaffedStations(self):
+        '''
+        names of stations that have at least one clinicstation
+        '''
+
+        staffed = set([x["station"] for x in self.clinicstations.values()])
+        return [x["name"] for x in self.stations.values() if x["id"] in staffed]
+
+    def createRoutingSlip(self, patientid, stationNames):
+        slip = {"id": self.allocId(), "patient": patientid, "clinic": self.clinic["id"], "entries": []}
+        for name in stationNames:
+            station = self.stations[name]
+            slip["entries"].append({"id": self.allocId(),
+                                    "routingslip": slip["id"],
+                                    "station": station["id"],
+                                    "returntoclinicstation": None,
+                                    "order": station["level"],
+                                    "state": "New"})
+        self.routingslips[slip["id"]] = slip
+        self.patientSlips[patientid] = slip["id"]
+        return slip
+
+    def copyRoutingSlip(self, slip):
+        ret = {"id": slip["id"], "patient": slip["patient"], "clinic": slip["clinic"]}
+        ret["entries"] = [dict(x) for x in slip["entries"]]
+        ret["routing"] = [x["id"] for x in slip["entries"]]
+        return ret
+
+    def isDone(self, slip):
+        for x in slip["entries"]:
+            if not x["state"] in terminalStates:
+                return False
+        return True
+
+    def findEntry(self, rseId):
+        for slip in self.routingslips.values():
+            for x in slip["entries"]:
+                if x["id"] == rseId:
+                    return x
+        return None
+
+    def createQueueEntry(self, queueid, patientid, routingslipid, routingslipentryid, timein):
+        ent = Record(id=self.allocId(), queue=queueid, patient=patientid, routingslip=routingslipid, routingslipentry=routingslipentryid, timein=timein)
+        self.queueEntries[ent.id] = ent
+        self.queueEntriesByQueue.setdefault(queueid, []).append(ent)
+        return ent
+
+    def deleteQueueEntry(self, ent):
+        del self.queueEntries[ent.id]
+        self.queueEntriesByQueue[ent.queue].remove(ent)
+
+class SimBackend(SchedulerBackend):
+    def __init__(self, clinic):
+        super(SimBackend, self).__init__()
+        self._clinic = clinic
+        self._entries = {}
+
+    def getClinic(self, clinicid):
+        return dict(self._clinic.clinic)
+
+    def getAllClinics(self):
+        return [dict(self._clinic.clinic)]
+
+    def getClinicStations(self, clinicid):
+        return [dict(self._clinic.clinicstations[x]) for x in sorted(self._clinic.clinicstations.keys())]
+
+    def getRoutingSlips(self, clinicid):
+        # finished routing slips have nothing left to schedule
+
+        ret = []
+        for x in sorted(self._clinic.routingslips.keys()):
+            slip = self._clinic.routingslips[x]
+            if not self._clinic.isDone(slip):
+                ret.append(self._clinic.copyRoutingSlip(slip))
+        return ret
+
+    def getRoutingSlip(self, routingslipid):
+        ret = None
+        if routingslipid in self._clinic.routingslips:
+            ret = self._clinic.copyRoutingSlip(self._clinic.routingslips[routingslipid])
+        return ret
+
+    def getRoutingSlipForPatient(self, clinicid, patientid):
+        ret = None
+        if patientid in self._clinic.patientSlips:
+            ret = self.getRoutingSlip(self._clinic.patientSlips[patientid])
+        return ret
+
+    def setRoutingSlipEntryState(self, rseId, state):
+        ret = False
+        if not rseId in self._entries:
+            self._entries[rseId] = self._clinic.findEntry(rseId)
+        entry = self._entries[rseId]
+        newState = textToState[state]
+        if entry and not textToState[entry["state"]] in illegalFromStates[newState]:
+            entry["state"] = state
+            ret = True
+        return ret
+
+class SimScheduler(Scheduler):
+    '''
+    a Scheduler whose database access goes to a SimClinic
+    '''
+
+    def __init__(self, clinic, verbose=False):
+        self._simClinic = clinic
+        self._verbose = verbose
+        self._messages = {"error": 0, "warning": 0, "info": 0}
+        self._queueSamples = []
+        Scheduler.__init__(self, None, None, None, None, clinic.clinic["id"], SimBackend(clinic))
+
+    def showMessage(self, kind, msg):
+        self._messages[kind] += 1
+        if self._verbose:
+            print("{} {}: {}".format(clock.now().strftime("%H:%M:%S"), kind, msg))
+
+    def showError(self, msg):
+        self.showMessage("error", msg)
+
+    def showWarning(self, msg):
+        self.showMessage("warning", msg)
+
+    def showInfo(self, msg):
+        self.showMessage("info", msg)
+
+    def getMessageCounts(self):
+        return self._messages
+
+    def atomic(self):
+        # there is no database, nothing to roll back
+
+        return NoTransaction()
+
+    def createDbQueue(self, clinicid, stationid, clinicstationid):
+        return Record(id=clinicstationid, clinic=clinicid, station=stationid, clinicstation=clinicstationid,
+                      avgservicetime=datetime.time(0, 0), p50servicetime=datetime.time(0, 0), p90servicetime=datetime.time(0, 0))
+
+    def createDbQueueEntry(self, queueid, patientid, routingslipid, routingslipentryid):
+        return self._simClinic.createQueueEntry(queueid, patientid, routingslipid, routingslipentryid, clock.now())
+
+    def deleteDbQueueEntry(self, queueid, patientid, routingslipentryid):
+        for x in self._simClinic.queueEntriesByQueue.get(queueid, []):
+            if x.patient == patientid and x.routingslipentry == routingslipentryid:
+                self._simClinic.deleteQueueEntry(x)
+                return True
+        return False
+
+    def getExistingQueueEntryIds(self, ids):
+        return set([x for x in ids if x in self._simClinic.queueEntries])
+
+    def saveQueueEntryTimes(self, changed):
+        return True
+
+    def saveQueueServiceTimes(self, changed):
+        return True
+
+    def publishQueues(self):
+        # there are no subscribers
+        pass
+
+    def updateEstimator(self):
+        # the simulator reports check ins and outs to the estimator directly
+        pass
+
+    def dumpQueues(self):
+        lengths = [len(v) for v in self._simClinic.queueEntriesByQueue.values()]
+        total = sum(lengths)
+        longest = 0
+        if len(lengths):
+            longest = max(lengths)
+        self._queueSamples.append((clock.now(), total, longest))
+
+    def getQueueSamples(self):
+        return self._queueSamples
+
+def percentile(values, p):
+    if not len(values):
+        return 0
+    values = sorted(values)
+    return values[min(int(round(p / 100.0 * (len(values) - 1))), len(values) - 1)]
+
+def mean(values):
+    if not len(values):
+        return 0
+    return float(sum(values)) / len(values)
+
+class Simulator(object):
+    def __init__(self, path, patients=100, seed=1, mode="event", policy="shortest", optimize=False, constraints=None, away=False, verbose=False):
+        super(Simulator, self).__init__()
+        self._path = path
+        self._numPatients = patients
+        self._seed = seed
+        self._mode = mode
+        self._policyName = policy
+        self._optimize = optimize
+        self._constraints = constraints
+        self._away = away
+        self._verbose = verbose
+        self._arrivalInterval = (1, 30)     # seconds between registrations
+        self._pollInterval = (1, 30)        # seconds between queue checks
+        self._serviceTime = (120, 180)      # seconds, times service factor
+        self._awayStart = (60, 300)         # seconds between stations going away
+        self._awayTime = (1, 5)             # minutes away
+        self._updateInterval = 5            # seconds, as the scheduler
+        self._limit = 24 * 3600             # give up after a day
+
+    def setArrivalInterval(self, interval):
+        self._arrivalInterval = interval
+
+    def setServiceTime(self, interval):
+        self._serviceTime = interval
+
+    def setLimit(self, seconds):
+        self._limit = seconds
+
+    def schedule(self, t, kind, data=None):
+        self._seq += 1
+        heapq.heappush(self._events, (t, self._seq, kind, data))
+
+    def setup(self):
+        self._rng = random.Random(self._seed)
+        self._start = datetime.datetime.now().replace(hour=8, minute=0, second=0, microsecond=0)
+        self._clock = VirtualClock(self._start)
+        clock.setClock(self._clock)
+
+        self._clinic = SimClinic(self._path, self._start)
+        self._scheduler = SimScheduler(self._clinic, self._verbose)
+        self._scheduler.setPolicy(getPolicy(self._policyName))
+        if self._optimize:
+            optimizer = RoutingOptimizer()
+            if self._constraints:
+                optimizer.loadConstraints(self._constraints, self._clinic.getStationId)
+            self._scheduler.setOptimizer(optimizer)
+        self._scheduler.updateClinicStations()
+
+        self._events = []
+        self._seq = 0
+        self._now = 0
+        self._patients = {}         # id -> {"arrival", "done", "visits"}
+        self._waits = []            # seconds in queue, per visit
+        self._busy = {}             # clinicstation id -> seconds busy
+        self._awaySeconds = {}      # clinicstation id -> seconds away
+        self._inQueue = {}          # routingslipentry id -> time queued
+        self._wantAway = set()
+
+        # patient arrivals, as mockclinic's registration loop
+
+        staffed = self._clinic.getStaffedStations()
+        t = 0
+        for i in range(self._numPatients):
+            t += self._rng.randint(*self._arrivalInterval)
+            category = self._clinic.categories[self._rng.randint(0, len(self._clinic.categories) - 1)]
+            if category in categoryRoutes:
+                route = [x for x in categoryRoutes[category] if x in staffed]
+            else:
+                route = [x for x in sorted(staffed) if self._rng.randint(0, 1) == 1]
+            if len(route):
+                self.schedule(t, "arrival", route)
+
+        for x in self._clinic.clinicstations:
+            self._busy[x] = 0
+            self._awaySeconds[x] = 0
+            self.schedule(self._rng.randint(*self._pollInterval), "poll", x)
+
+        if self._away:
+            ids = sorted(self._clinic.clinicstations.keys())
+            self._rng.shuffle(ids)
+            t = 0
+            for x in ids:
+                t += self._rng.randint(*self._awayStart)
+                self.schedule(t, "away", x)
+
+        self.schedule(self._updateInterval, "update")
+
+    def notify(self, events):
+        if self._mode == "event":
+            self._scheduler.processChangeEvents(self._clinic.clinic["id"], events)
+
+    def clinicStationEvent(self, clinicstationid):
+        return SimEvent("clinicstation", clinicstationid, self._clinic.clinic["id"])
+
+    def entryEvent(self, entry, patientid):
+        return SimEvent("routingslipentry", entry["id"], self._clinic.clinic["id"], patientid, entry["routingslip"])
+
+    def isFinished(self):
+        if len(self._patients) == 0 or len(self._patients) < self._expected:
+            return False
+        for x in self._patients.values():
+            if x["done"] == None:
+                return False
+        return True
+
+    def arrival(self, route):
+        patientid = self._clinic.allocId()
+        slip = self._clinic.createRoutingSlip(patientid, route)
+        self._patients[patientid] = {"arrival": self._now, "done": None, "visits": len(route), "seen": 0}
+        self.notify([SimEvent("routingslip", slip["id"], self._clinic.clinic["id"], patientid, slip["id"], ChangeEvent.CREATE)])
+
+    def poll(self, clinicstationid):
+        clinicstation = self._clinic.clinicstations[clinicstationid]
+        queue = self._clinic.queueEntriesByQueue.get(clinicstationid, [])
+        if clinicstation["away"] or clinicstation["active"] or not len(queue):
+            if not clinicstation["active"]:
+                self.schedule(self._now + self._rng.randint(*self._pollInterval), "poll", clinicstationid)
+            return
+
+        # check in the first patient in the queue, as checkinWorker does
+
+        ent = queue[0]
+        self._clinic.deleteQueueEntry(ent)
+        entry = self._clinic.findEntry(ent.routingslipentry)
+        entry["state"] = "Checked In"
+        clinicstation["active"] = True
+        clinicstation["activepatient"] = ent.patient
+        self._waits.append((self._clock.now() - ent.timein).total_seconds())
+        self._scheduler._estimator.observe(clinicstationid, ent.patient, "i", self._clock.now())
+        self.notify([self.entryEvent(entry, ent.patient), self.clinicStationEvent(clinicstationid)])
+
+        service = self._rng.randint(*self._serviceTime) * self._clinic.servicefactors[clinicstationid]
+        self._busy[clinicstationid] += service
+        self.schedule(self._now + service, "checkout", (clinicstationid, entry))
+
+    def checkout(self, clinicstationid, entry):
+        clinicstation = self._clinic.clinicstations[clinicstationid]
+        patientid = clinicstation["activepatient"]
+        entry["state"] = "Checked Out"
+        clinicstation["active"] = False
+        clinicstation["activepatient"] = None
+        self._scheduler._estimator.observe(clinicstationid, patientid, "o", self._clock.now())
+
+        patient = self._patients[patientid]
+        patient["seen"] += 1
+        if patient["seen"] == patient["visits"]:
+            patient["done"] = self._now
+
+        if clinicstationid in self._wantAway:
+            self._wantAway.discard(clinicstationid)
+            self.goAway(clinicstationid)
+        else:
+            self.schedule(self._now + self._rng.randint(*self._pollInterval), "poll", clinicstationid)
+        self.notify([self.entryEvent(entry, patientid), self.clinicStationEvent(clinicstationid)])
+
+    def away(self, clinicstationid):
+        if self._clinic.clinicstations[clinicstationid]["active"]:
+            self._wantAway.add(clinicstationid)     # after this patient
+        else:
+            self.goAway(clinicstationid)
+            self.notify([self.clinicStationEvent(clinicstationid)])
+
+    def goAway(self, clinicstationid):
+        clinicstation = self._clinic.clinicstations[clinicstationid]
+        awaytime = self._rng.randint(*self._awayTime)
+        clinicstation["away"] = True
+        clinicstation["awaytime"] = awaytime
+        clinicstation["willreturn"] = self._clock.now() + datetime.timedelta(minutes=awaytime)
+        self._awaySeconds[clinicstationid] += awaytime * 60
+        self.schedule(self._now + awaytime * 60, "back", clinicstationid)
+
+    def back(self, clinicstationid):
+        self._clinic.clinicstations[clinicstationid]["away"] = False
+        self.schedule(self._now + self._rng.randint(*self._pollInterval), "poll", clinicstationid)
+        self.notify([self.clinicStationEvent(clinicstationid)])
+
+    def update(self):
+        scheduler = self._scheduler
+        if self._mode == "poll":
+            scheduler.updateClinicStations()
+            clinicid = self._clinic.clinic["id"]
+            if scheduler.processReturnToClinicStations(clinicid) == False:
+                results = scheduler.getRoutingSlips(clinicid)
+                if results != None:
+                    for x in results:
+                        if scheduler.processRoutingSlip(x) == True:
+                            break
+        scheduler.processQueues()
+        self.schedule(self._now + self._updateInterval, "update")
+
+    def run(self):
+        self.setup()
+        self._expected = len([x for x in self._events if x[2] == "arrival"])
+        handlers = {"arrival": self.arrival,
+                    "poll": self.poll,
+                    "away": self.away,
+                    "back": self.back}
+
+        while len(self._events):
+            t, seq, kind, data = heapq.heappop(self._events)
+            if t > self._limit:
+                break
+            self._now = t
+            self._clock.set(self._start + datetime.timedelta(seconds=t))
+            if kind == "update":
+                self.update()
+                if self.isFinished():
+                    break
+            elif kind == "checkout":
+                self.checkout(data[0], data[1])
+            else:
+                handlers[kind](data)
+
+        clock.setClock(clock.Clock())
+        return self.getResults()
+
+    def getResults(self):
+        done = [x for x in self._patients.values() if x["done"] != None]
+        inClinic = [x["done"] - x["arrival"] for x in done]
+        end = self._now
+        if len(done):
+            end = max([x["done"] for x in done])
+        hours = max(end, 1) / 3600.0
+        samples = self._scheduler.getQueueSamples()
+
+        utilization = {}
+        for k, v in self._busy.iteritems():
+            available = max(end - self._awaySeconds[k], 1)
+            utilization[self._clinic.clinicstations[k]["name"]] = min(v / available, 1.0)
+
+        ret = {}
+        ret["policy"] = self._policyName
+        ret["optimize"] = self._optimize
+        ret["mode"] = self._mode
+        ret["patients"] = self._expected
+        ret["completed"] = len(done)
+        ret["makespan"] = end
+        ret["throughput"] = len(done) / hours
+        ret["visits"] = len(self._waits)
+        ret["meanwait"] = mean(self._waits)
+        ret["p95wait"] = percentile(self._waits, 95)
+        ret["maxwait"] = max(self._waits) if len(self._waits) else 0
+        ret["meaninclinic"] = mean(inClinic)
+        ret["p95inclinic"] = percentile(inClinic, 95)
+        ret["meanqueued"] = mean([x[1] for x in samples])
+        ret["maxqueued"] = max([x[1] for x in samples]) if len(samples) else 0
+        ret["maxqueue"] = max([x[2] for x in samples]) if len(samples) else 0
+        ret["utilization"] = utilization
+        ret["queuesamples"] = [((x[0] - self._start).total_seconds(), x[1], x[2]) for x in samples]
+        ret["messages"] = self._scheduler.getMessageCounts()
+        return ret
+
+def formatSeconds(seconds):
+    seconds = int(seconds)
+    return "{}:{:02d}:{:02d}".format(seconds / 3600, (seconds % 3600) / 60, seconds % 60)
+
+def report(results):
+    print("policy {} optimize {} mode {}".format(results["policy"], results["optimize"], results["mode"]))
+    print("patients completed      {} of {}".format(results["completed"], results["patients"]))
+    print("makespan                {}".format(formatSeconds(results["makespan"])))
+    print("throughput              {:.1f} patients per hour".format(results["throughput"]))
+    print("wait per visit          mean {} p95 {} max {}".format(formatSeconds(results["meanwait"]), formatSeconds(results["p95wait"]), formatSeconds(results["maxwait"])))
+    print("time in clinic          mean {} p95 {}".format(formatSeconds(results["meaninclinic"]), formatSeconds(results["p95inclinic"])))
+    print("patients queued         mean {:.1f} max {}, longest queue {}".format(results["meanqueued"], results["maxqueued"], results["maxqueue"]))
+    print("utilization")
+    for k in sorted(results["utilization"].keys()):
+        print("    {:24s} {:5.1f}%".format(k, results["utilization"][k] * 100))
+    print("")
+
+def compare(allResults):
+    print("{:10s} {:9s} {:>10s} {:>9s} {:>10s} {:>10s} {:>10s}".format("policy", "optimize", "completed", "per hour", "mean wait", "p95 wait", "makespan"))
+    for x in allResults:
+        print("{:10s} {:9s} {:>10d} {:>9.1f} {:>10s} {:>10s} {:>10s}".format(x["policy"], str(x["optimize"]), x["completed"], x["throughput"], formatSeconds(x["meanwait"]), formatSeconds(x["p95wait"]), formatSeconds(x["makespan"])))
+
+def writeQueueSamples(results, path):
+    f = open(path, "w")
+    try:
+        f.write("seconds,waiting,longest\n")
+        for x in results["queuesamples"]:
+            f.write("{},{},{}\n".format(int(x[0]), x[1], x[2]))
+    finally:
+        f.close()
+
+def usage():
+    print("simulator [-f clinicpath] [-n patients] [-s seed] [-m event|poll] [-a shortest|lec] [-o] [-t path] [-w] [-C] [-q path] [-j] [-v]")
+    print("where:")
+    print("-f clinicpath -- clinic description, as used by mockclinic (default dentalclinic.json)")
+    print("-n patients   -- number of patients (default 100)")
+    print("-s seed       -- random seed (default 1)")
+    print("-m mode       -- drive the scheduler with change events (default) or by polling")
+    print("-a policy     -- clinicstation assignment policy")
+    print("-o            -- optimize the order of routing slip stations")
+    print("-t path       -- station ordering constraints for -o")
+    print("-w            -- simulate clinicstations going away")
+    print("-C            -- compare policies, with and without -o, on the same workload")
+    print("-q path       -- write queue lengths over time to path as CSV")
+    print("-j            -- print results as JSON")
+    print("-v            -- print scheduler messages")
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "f:n:s:m:a:ot:wCq:jv")
+    except getopt.GetoptError as err:
+        print str(err)
+        usage()
+        sys.exit(2)
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tschartslib", "scheduler", "dentalclinic.json")
+    patients = 100
+    seed = 1
+    mode = "event"
+    policy = "shortest"
+    optimize = False
+    constraints = None
+    away = False
+    doCompare = False
+    samplesPath = None
+    asJSON = False
+    verbose = False
+    for o, a in opts:
+        if o == "-f":
+            path = a
+        elif o == "-n":
+            patients = int(a)
+        elif o == "-s":
+            seed = int(a)
+        elif o == "-m":
+            mode = a
+        elif o == "-a":
+            policy = a
+        elif o == "-o":
+            optimize = True
+        elif o == "-t":
+            constraints = a
+        elif o == "-w":
+            away = True
+        elif o == "-C":
+            doCompare = True
+        elif o == "-q":
+            samplesPath = a
+        elif o == "-j":
+            asJSON = True
+        elif o == "-v":
+            verbose = True
+        else:
+            assert False, "unhandled option"
+    if not mode in ["event", "poll"] or getPolicy(policy) == None:
+        usage()
+        sys.exit(2)
+
+    if doCompare:
+        configs = [("shortest", False), ("lec", False), ("shortest", True), ("lec", True)]
+    else:
+        configs = [(policy, optimize)]
+
+    allResults = []
+    for x in configs:
+        sim = Simulator(path, patients, seed, mode, x[0], x[1], constraints, away, verbose)
+        results = sim.run()
+        allResults.append(results)
+        if samplesPath:
+            writeQueueSamples(results, samplesPath)
+        if not asJSON and not doCompare:
+            report(results)
+
+    if asJSON:
+        for x in allResults:
+            del x["queuesamples"]
+        print(json.dumps(allResults, indent=2))
+    elif doCompare:
+        compare(allResults)
+
+if __name__ == '__main__':
+    main()
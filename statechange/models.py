@@ -19,3 +19,6 @@ class StateChange(models.Model):
         choices = STATE_CHOICES,
         default = OUT,
     )
+
+    class Meta:
+        index_together = [["clinicstation", "time"]]
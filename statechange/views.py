@@ -24,9 +24,32 @@ from patient.models import *
 from datetime import *
 from django.core import serializers
 from django.http import HttpResponse, HttpResponseForbidden, HttpResponseBadRequest, HttpResponseServerError, HttpResponseNotFound
+from django.db.models import Q
+import base64
 import sys
 import json
 
+# a paging cursor is the time and id of the last state change returned, 
+# base64 encoded
+
+CURSOR_FORMAT = "{},{}"
+
+def stateToText(state):
+    ret = None
+    if state == StateChange.IN:
+        ret = "in"
+    else:
+        ret = "out"
+    return ret
+
+def textToState(text):
+    ret = None
+    if text == "in":
+        ret = StateChange.IN
+    else:
+        ret = StateChange.OUT
+    return ret
+
 class StateChangeView(APIView):
 
     authentication_classes = (TokenAuthentication,)
@@ -38,19 +61,67 @@ class StateChangeView(APIView):
         m["clinicstation"] = entry.clinicstation_id
         m["patient"] = entry.patient_id
         m["time"] = entry.time
-        if entry.state == 'i':
-            m["state"] = "in"
-        else:
-            m["state"] = "out"
+        m["state"] = stateToText(entry.state)
 
         return m
 
+    def getTime(self, value):
+        '''
+        parse a time argument, either a time string as returned by this 
+        API (e.g., 2017-04-21T15:33:15.123456) or a date mm/dd/YYYY, which
+        is midnight at the start of that day. Times are naive local times
+        (USE_TZ is off), a trailing Z is ignored, not converted from UTC
+        '''
+
+        value = value.rstrip("Z")
+        for fmt in ("%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S", "%m/%d/%Y"):
+            try:
+                return datetime.strptime(value, fmt)
+            except ValueError:
+                pass
+        raise ValueError("invalid time {}".format(value))
+
+    def makeCursor(self, row):
+        # the time and id of the last row of a page, see CURSOR_FORMAT
+
+        return base64.urlsafe_b64encode(CURSOR_FORMAT.format(row[3].strftime("%Y-%m-%dT%H:%M:%S.%f"), row[0]))
+
+    def parseCursor(self, cursor):
+        time, id = base64.urlsafe_b64decode(str(cursor)).split(",")
+        return datetime.strptime(time, "%Y-%m-%dT%H:%M:%S.%f"), int(id)
+
+    def serializeRows(self, rows, columns):
+        '''
+        rows are (id, clinicstation, patient, time, state) tuples. Returns
+        a list of dicts, or if columns is True, a dict of lists, one per 
+        field, which is much smaller for long timelines
+        '''
+
+        if columns:
+            m = {}
+            m["id"] = [x[0] for x in rows]
+            m["clinicstation"] = [x[1] for x in rows]
+            m["patient"] = [x[2] for x in rows]
+            m["time"] = [x[3] for x in rows]
+            m["state"] = [stateToText(x[4]) for x in rows]
+            return m
+
+        ret = []
+        for x in rows:
+            m = {}
+            m["id"] = x[0]
+            m["clinicstation"] = x[1]
+            m["patient"] = x[2]
+            m["time"] = x[3]
+            m["state"] = stateToText(x[4])
+            ret.append(m)
+        return ret
+
     def get(self, request, state_change_id=None, format=None):
         state_change = None
         badRequest = False
         aPatient = None
         aClinic = None
-        aStation = None
         aClinicStation = None
         kwargs = {}
 
@@ -59,130 +130,116 @@ class StateChangeView(APIView):
                 state_change = StateChange.objects.get(id = state_change_id)
             except:
                 state_change = None
-        else:
-            # look for optional arguments
+            if not state_change:
+                raise NotFound
+            return Response(self.serialize(state_change))
+
+        # look for optional arguments
+
+        patientid = request.GET.get('patient', '')
+        if not patientid == '':
             try:
-                patientid = request.GET.get('patient', '')
-                if not patientid == '':
-                    try:
-                        aPatient = Patient.objects.get(id=patientid)
-                        if not aPatient:
-                            badRequest = True
-                        else:
-                            kwargs["patient"] = aPatient
-                    except:
-                        badRequest = True
+                aPatient = Patient.objects.get(id=patientid)
+                kwargs["patient"] = aPatient
             except:
-                pass # no patient ID
+                badRequest = True
 
+        clinicid = request.GET.get('clinic', '')
+        if not clinicid == '':
             try:
-                clinicid = request.GET.get('clinic', '')
-                if not clinicid == '':
-                    try:
-                        aClinic = Clinic.objects.get(id=clinicid)
-                        if not aClinic:
-                            badRequest = True
-                        else:
-                            kwargs["clinic"] = aClinic
-                    except:
-                        badRequest = True
+                aClinic = Clinic.objects.get(id=clinicid)
+                kwargs["clinicstation__clinic"] = aClinic
             except:
-                pass # no clinic ID
+                badRequest = True
 
+        clinicstationid = request.GET.get('clinicstation', '')
+        if not clinicstationid == '':
             try:
-                clinicstationid = request.GET.get('clinicstation', '')
-                if not clinicstationid == '':
-                    try:
-                        aClinicStation = ClinicStation.objects.get(id=clinicstationid)
-                        if not aClinicStation:
-                            badRequest = True
-                        else:
-                            kwargs["clinicstation"] = aClinicStation
-                    except:
-                        badRequest = True
+                aClinicStation = ClinicStation.objects.get(id=clinicstationid)
+                kwargs["clinicstation"] = aClinicStation
             except:
-                pass # no clinicstation ID
-
-            if not badRequest and len(kwargs):
-                # look for invalid arg combinations
-
-                # there are 4 legal combination of args
-
-                case1 = False
-                case2 = False
-                case3 = False
-                case4 = False
-
-                if aPatient and aClinicStation and not aClinic:
-                    case1 = True
-                elif aPatient and aClinic and not aClinicStation:
-                    case2 = True
-                elif aClinicStation and not aClinic and not aPatient:
-                    case3 = True
-                elif aClinic and not aClinicStation and not aPatient:
-                    case4 = True
-                else:
-                    badRequest = True
+                badRequest = True
 
-            if not badRequest and (case1 or case3):
-                kwargs = {}
-                if case1:
-                    kwargs["patient"] = aPatient;
-                    kwargs["clinicstation"] = aClinicStation
-                elif case3:
-                    kwargs["clinicstation"] = aClinicStation
-                try:
-                    state_change = StateChange.objects.filter(**kwargs)
-                except:
-                    state_change = None
-            elif not badRequest and case2:
-                # get all clinicstations for the clinic. 
-                # state_change = []
-                # for each clinicstation:
-                #    get statechanges for patient, clinicstation
-                #    append these to state_change
-
-                clinicstations = ClinicStation.objects.filter(clinic=aClinic);
-                state_change = []
-           
-                kwargs = {}
-                kwargs["patient"] = aPatient 
-                for x in clinicstations:
-                    kwargs["clinicstation"] = x 
-                    y = StateChange.objects.filter(**kwargs)
-                    for el in y:
-                        state_change.append(el)
-            elif not badRequest and case4:      
-                # get all clinicstations for the clinic. 
-                # state_change = []
-                # for each clinicstation:
-                #    get statechanges for clinicstation
-                #    append these to state_change
-
-                clinicstations = ClinicStation.objects.filter(clinic=aClinic);
-                state_change = []
-           
-                kwargs = {}
-                for x in clinicstations:
-                    kwargs["clinicstation"] = x 
-                    y = StateChange.objects.filter(**kwargs)
-                    for el in y:
-                        state_change.append(el)
-
-        if not state_change and not badRequest:
-            raise NotFound
-        elif not badRequest:
-            if state_change_id:
-                ret = self.serialize(state_change)
+        # there are 4 legal combination of args: patient & clinicstation, 
+        # patient & clinic, clinicstation, and clinic
+
+        if not badRequest:
+            if aClinic and aClinicStation:
+                badRequest = True
+            elif not aClinic and not aClinicStation:
+                badRequest = True
+
+        try:
+            start = request.GET.get('start', '')
+            if not start == '':
+                kwargs["time__gte"] = self.getTime(start)
+            end = request.GET.get('end', '')
+            if not end == '':
+                kwargs["time__lt"] = self.getTime(end)
+        except:
+            badRequest = True
+
+        state = request.GET.get('state', '')
+        if not state == '':
+            if not state in ("in", "out"):
+                badRequest = True
             else:
-                ret = []
-                for x in state_change:
-                    m = self.serialize(x)
-                    ret.append(m)
+                kwargs["state"] = textToState(state)
+
+        # paging, and the columnar format, change the response to a dict 
+        # holding the state changes and the cursor of the next page
+
+        paged = False
+        limit = None
+        after = None
+        try:
+            if request.GET.get('limit', '') != '':
+                paged = True
+                limit = int(request.GET.get('limit'))
+                if limit < 1:
+                    badRequest = True
+            if request.GET.get('cursor', '') != '':
+                paged = True
+                after = self.parseCursor(request.GET.get('cursor'))
+        except:
+            badRequest = True
+
+        columns = request.GET.get('columns', 'false')
+        if not columns in ("true", "false"):
+            badRequest = True
+        elif columns == "true":
+            paged = True
+
         if badRequest:
             return HttpResponseBadRequest()
-        else:
-            return Response(ret)
+
+        # one query, ordered by time, whether it is for a clinicstation or
+        # for all the clinicstations of a clinic
+
+        try:
+            state_change = StateChange.objects.filter(**kwargs)
+            if after:
+                state_change = state_change.filter(Q(time__gt=after[0]) | Q(time=after[0], id__gt=after[1]))
+            state_change = state_change.order_by("time", "id").values_list("id", "clinicstation_id", "patient_id", "time", "state")
+            if limit:
+                rows = list(state_change[:limit + 1])
+            else:
+                rows = list(state_change)
+        except:
+            return HttpResponseServerError()
+
+        if not paged:
+            if len(rows) == 0:
+                raise NotFound
+            return Response(self.serializeRows(rows, False))
+
+        ret = {}
+        ret["next"] = None
+        if limit and len(rows) > limit:
+            rows = rows[:limit]
+            ret["next"] = self.makeCursor(rows[-1])
+        ret["statechanges"] = self.serializeRows(rows, columns == "true")
+        return Response(ret)
 
     def post(self, request, format=None):
         badRequest = False
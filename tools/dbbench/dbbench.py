@@ -0,0 +1,332 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+time the main query of each endpoint with and without the composite
+indexes declared with index_together in the models, against a database
+seeded with several years of clinics (-s).
+
+For each query, the indexes of the table it reads are dropped, the query
+is timed, the indexes are created again, and it is timed again. Run it
+against a copy of the database, or a scratch one, never production: it
+seeds data and drops indexes. See README.md.
+'''
+
+import getopt, os, random, sys, time
+from datetime import date, datetime, timedelta
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tscharts.settings")
+import django
+django.setup()
+
+from django.db import connection, models
+
+from clinic.models import Clinic
+from station.models import Station
+from clinicstation.models import ClinicStation
+from patient.models import Patient
+from register.models import Register
+from routingslip.models import RoutingSlip, RoutingSlipEntry
+from statechange.models import StateChange
+from queue.models import Queue, QueueEntry
+from image.models import Image
+from dentalcdt.models import DentalCDT
+from audiogram.models import Audiogram
+from consent.models import Consent
+from dentalstate.models import DentalState
+from dentaltreatment.models import DentalTreatment
+from entdiagnosis.models import ENTDiagnosis
+from entexam.models import ENTExam
+from enthistory.models import ENTHistory
+from entsurgicalhistory.models import ENTSurgicalHistory
+from enttreatment.models import ENTTreatment
+from medicalhistory.models import MedicalHistory
+from returntoclinic.models import ReturnToClinic
+from vaccine.models import Vaccine
+from xray.models import XRay
+
+STATIONS = ("Dental", "ENT", "Audiology", "Speech", "Ortho", "Surgery Screening", "Hygiene", "X-Ray", "Runner", "Check Out")
+CHARTS = (Audiogram, Consent, DentalState, DentalTreatment, ENTDiagnosis, ENTExam, ENTHistory, ENTSurgicalHistory, ENTTreatment, MedicalHistory, ReturnToClinic, Vaccine, XRay)
+INSERT_BATCH = 1000
+
+def insertRows(model, rows):
+    '''
+    insert rows, each a dict of field name to value, with multi-row INSERT
+    statements rather than bulk_create(), so that auto_now and auto_now_add
+    fields keep the times given. Fields not given get their default, or an
+    empty value. Returns the ids of the new rows.
+
+    The ids of the rows of one INSERT are consecutive from the id returned
+    for it, as they are in MySQL for MyISAM, and for InnoDB with the 
+    default innodb_autoinc_lock_mode.
+    '''
+
+    fields = [x for x in model._meta.concrete_fields if not isinstance(x, models.AutoField)]
+    sql = "INSERT INTO {} ({}) VALUES ".format(connection.ops.quote_name(model._meta.db_table),
+        ", ".join([connection.ops.quote_name(x.column) for x in fields]))
+    placeholders = "({})".format(", ".join(["%s"] * len(fields)))
+    ids = []
+    cursor = connection.cursor()
+    for i in range(0, len(rows), INSERT_BATCH):
+        batch = rows[i:i + INSERT_BATCH]
+        params = []
+        for row in batch:
+            for field in fields:
+                params.append(field.get_db_prep_save(getValue(field, row), connection))
+        cursor.execute(sql + ", ".join([placeholders] * len(batch)), params)
+        ids.extend(range(cursor.lastrowid, cursor.lastrowid + len(batch)))
+    return ids
+
+def getValue(field, row):
+    if field.name in row:
+        return row[field.name]
+    if field.has_default():
+        return field.get_default()
+    if field.null:
+        return None
+    if isinstance(field, models.ForeignKey):
+        raise ValueError("no value for {}.{}".format(field.model.__name__, field.name))
+    if isinstance(field, models.DateTimeField):
+        return datetime.now()
+    if isinstance(field, models.DateField):
+        return date.today()
+    if isinstance(field, models.TimeField):
+        return datetime.now().time()
+    if isinstance(field, models.BooleanField):
+        return False
+    if isinstance(field, (models.IntegerField, models.FloatField, models.DecimalField)):
+        return 0
+    return ""
+
+def seed(years, clinicsPerYear, patientsPerClinic, verbose):
+    '''
+    a clinic every few months, each seeing patientsPerClinic patients,
+    about half of them returning from earlier clinics. Each patient is
+    registered, has a routing slip through several stations, checks in and
+    out of each, and has images and a row in each chart table.
+    '''
+
+    random.seed(0)
+
+    stations = []
+    for name in STATIONS:
+        stations.append(Station.objects.create(name=name))
+
+    cdt = DentalCDT.objects.all().first()
+    if not cdt:
+        cdt = DentalCDT.objects.create(category="Diagnostic", code="D0120", desc="periodic oral evaluation")
+
+    patients = []
+    start = date.today() - timedelta(days=365 * years)
+    for n in range(years * clinicsPerYear):
+        day = start + timedelta(days=n * 365 // clinicsPerYear)
+        clinic = Clinic.objects.create(location="Ensenada", start=day, end=day + timedelta(days=1))
+        opened = datetime(day.year, day.month, day.day, 8, 0)
+
+        clinicstations = []
+        queues = []
+        for station in stations:
+            cs = ClinicStation.objects.create(name=station.name, name_es=station.name, station=station, clinic=clinic)
+            clinicstations.append(cs)
+            queues.append(Queue.objects.create(clinic=clinic, station=station, clinicstation=cs))
+
+        returning = random.sample(patients, min(len(patients), patientsPerClinic // 2))
+        rows = []
+        for i in range(patientsPerClinic - len(returning)):
+            rows.append({"paternal_last": "bench{}".format(len(patients) + i), "maternal_last": "seed",
+                "first": "patient", "dob": date(2000 + i % 20, 1 + i % 12, 1 + i % 28),
+                "gender": random.choice((Patient.MALE, Patient.FEMALE))})
+        visiting = returning + insertRows(Patient, rows)
+        patients.extend(visiting[len(returning):])
+
+        arrivals = [opened + timedelta(seconds=random.randint(0, 8 * 3600)) for x in visiting]
+        registrations = insertRows(Register, [{"clinic": clinic.id, "patient": p, "timein": t, "timeout": t + timedelta(hours=6), "state": Register.OUT} for p, t in zip(visiting, arrivals)])
+        routingslips = insertRows(RoutingSlip, [{"clinic": clinic.id, "patient": p, "createtime": t, "statechangetime": t} for p, t in zip(visiting, arrivals)])
+
+        entries = []
+        statechanges = []
+        queueentries = []
+        for p, t, rs in zip(visiting, arrivals, routingslips):
+            for order, i in enumerate(random.sample(range(len(stations)), 4)):
+                entries.append({"routingslip": rs, "station": stations[i].id, "order": order, "state": RoutingSlipEntry.CHECKEDOUT, "createtime": t, "statechangetime": t})
+                timein = t + timedelta(minutes=30 * order + random.randint(0, 20))
+                statechanges.append({"clinicstation": clinicstations[i].id, "patient": p, "time": timein, "state": StateChange.IN})
+                statechanges.append({"clinicstation": clinicstations[i].id, "patient": p, "time": timein + timedelta(minutes=random.randint(5, 25)), "state": StateChange.OUT})
+        entryids = insertRows(RoutingSlipEntry, entries)
+
+        # the queue of the last clinic still holds its patients
+
+        if n == years * clinicsPerYear - 1:
+            for entry, id in zip(entries, entryids):
+                i = [x.id for x in stations].index(entry["station"])
+                queueentries.append({"queue": queues[i].id, "patient": visiting[routingslips.index(entry["routingslip"])], "timein": entry["createtime"], "routingslip": entry["routingslip"], "routingslipentry": id})
+            insertRows(QueueEntry, queueentries)
+        insertRows(StateChange, statechanges)
+
+        images = []
+        for p, t in zip(visiting, arrivals):
+            for imagetype in (Image.HEADSHOT, Image.XRAY, Image.XRAY):
+                images.append({"clinic": clinic.id, "patient": p, "imagetype": imagetype, "timestamp": t, "path": "bench"})
+        imageids = insertRows(Image, images)
+
+        for model in CHARTS:
+            rows = []
+            for i, p in enumerate(visiting):
+                row = {"clinic": clinic.id, "patient": p, "station": stations[0].id, 
+                    "image": imageids[3 * i], "registration": registrations[i], "code": cdt.id}
+                rows.append(row)
+            insertRows(model, rows)
+
+        if verbose:
+            print("seeded clinic {} on {}, {} patients".format(clinic.id, day, len(visiting)))
+
+    print("seeded {} clinics, {} patients".format(years * clinicsPerYear, len(patients)))
+
+def getQueries():
+    '''
+    (name, model, function returning the queryset) for the main query of
+    each endpoint, with the arguments of a random patient, clinic, etc.
+    '''
+
+    clinic = lambda: random.choice(clinics)
+    rs = lambda: RoutingSlip.objects.filter(id__gte=random.randint(1, lastRoutingSlip)).order_by("id").values_list("id", "patient_id", "clinic_id").first()
+    clinics = list(Clinic.objects.values_list("id", flat=True))
+    clinicstations = list(ClinicStation.objects.values_list("id", flat=True))
+    queues = list(Queue.objects.values_list("id", flat=True))
+    lastRoutingSlip = RoutingSlip.objects.order_by("-id").values_list("id", flat=True).first()
+
+    def routingSlip():
+        r = rs()
+        return RoutingSlip.objects.filter(clinic=r[2], patient=r[1])
+
+    def register():
+        r = rs()
+        return Register.objects.filter(clinic=r[2], patient=r[1])
+
+    def images():
+        r = rs()
+        return Image.objects.filter(patient=r[1], clinic=r[2], imagetype=Image.XRAY).order_by("-timestamp")
+
+    def chart(model):
+        def query():
+            r = rs()
+            return model.objects.filter(patient=r[1], clinic=r[2])
+        return query
+
+    ret = [
+        ("statechange clinic timeline", StateChange, lambda: StateChange.objects.filter(clinicstation__clinic=clinic()).order_by("time", "id")),
+        ("statechange clinicstation", StateChange, lambda: StateChange.objects.filter(clinicstation=random.choice(clinicstations)).order_by("time", "id")),
+        ("queue entries", QueueEntry, lambda: QueueEntry.objects.filter(queue=random.choice(queues)).order_by("timein")),
+        ("routingslip clinic+patient", RoutingSlip, routingSlip),
+        ("routingslip entries", RoutingSlipEntry, lambda: RoutingSlipEntry.objects.filter(routingslip=rs()[0]).order_by("order")),
+        ("routingslip entries by state", RoutingSlipEntry, lambda: RoutingSlipEntry.objects.filter(routingslip=rs()[0], state=RoutingSlipEntry.CHECKEDOUT)),
+        ("register clinic+patient", Register, register),
+        ("register clinic+state", Register, lambda: Register.objects.filter(clinic=clinic(), state=Register.OUT).values("patient")),
+        ("image patient+clinic+type", Image, images),
+    ]
+    for model in CHARTS:
+        ret.append(("{} patient+clinic".format(model._meta.model_name), model, chart(model)))
+    return ret
+
+def timeQuery(query, repeat):
+    '''
+    median milliseconds to run query and read its rows
+    '''
+
+    times = []
+    for i in range(repeat):
+        qs = query()
+        start = time.time()
+        list(qs)
+        times.append((time.time() - start) * 1000)
+    times.sort()
+    return times[len(times) // 2]
+
+def setIndexes(model, on):
+    indexes = set(model._meta.index_together)
+    with connection.schema_editor() as editor:
+        if on:
+            editor.alter_index_together(model, set(), indexes)
+        else:
+            editor.alter_index_together(model, indexes, set())
+
+def bench(repeat):
+    if not Clinic.objects.exists():
+        print("the database is empty, seed it with -s")
+        sys.exit(1)
+
+    print("{:40} {:>12} {:>12} {:>8}".format("query", "before ms", "after ms", "speedup"))
+    for name, model, query in getQueries():
+        random.seed(name)
+        setIndexes(model, False)
+        try:
+            before = timeQuery(query, repeat)
+        finally:
+            setIndexes(model, True)
+        random.seed(name)
+        after = timeQuery(query, repeat)
+        print("{:40} {:12.2f} {:12.2f} {:7.1f}x".format(name, before, after, before / max(after, 0.001)))
+
+def usage():
+    print("dbbench [-s] [-f] [-y years] [-c clinics per year] [-p patients per clinic] [-n repeat] [-v]")
+    print("-s seed the database before timing")
+    print("-f seed even if the database already has clinics")
+    print("-y years of clinics to seed (default 5)")
+    print("-c clinics per year to seed (default 3)")
+    print("-p patients per clinic to seed (default 400)")
+    print("-n times to run each query (default 50)")
+    print("-v verbose")
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "sfy:c:p:n:v")
+    except getopt.GetoptError as err:
+        print(str(err))
+        usage()
+        sys.exit(2)
+    doSeed = False
+    force = False
+    years = 5
+    clinicsPerYear = 3
+    patientsPerClinic = 400
+    repeat = 50
+    verbose = False
+    for o, a in opts:
+        if o == "-s":
+            doSeed = True
+        elif o == "-f":
+            force = True
+        elif o == "-y":
+            years = int(a)
+        elif o == "-c":
+            clinicsPerYear = int(a)
+        elif o == "-p":
+            patientsPerClinic = int(a)
+        elif o == "-n":
+            repeat = int(a)
+        elif o == "-v":
+            verbose = True
+        else:
+            assert False, "unhandled option"
+
+    if doSeed:
+        if Clinic.objects.exists() and not force:
+            print("the database already has clinics, use -f to seed it anyway")
+            sys.exit(1)
+        seed(years, clinicsPerYear, patientsPerClinic, verbose)
+    bench(repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+move images stored in patient directories (CHART_IMAGES_DIR/<patient>/)
+into the content addressed store, so that images with the same content
+share one file. Base64 images are converted to binary on the way, unless
+they are not canonical base64, in which case they are kept as text. 
+
+Runs against the database and image directory of this server, not the
+web services. See README.md.
+'''
+
+import getopt, os, sys
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tscharts.settings")
+import django
+django.setup()
+
+from django.db.models import Count, Sum
+from image.models import Image, ImageBlob
+from image.storage import ImageHasher, ImageStorageError, getImagePath, splitDataURI, decodeBase64, readChunks
+from image.blobs import storeChunks, releaseBlob
+from image.renditions import getRenditionLocation, removeRenditions
+
+def getContent(image, fullPath):
+    '''
+    returns (getChunks, fields) for storeChunks() and the Image update
+    '''
+
+    fields = {"encoding": image.encoding, "datauri": image.datauri}
+    if image.encoding == Image.BINARY:
+        return (lambda: readChunks(fullPath), fields)
+
+    with open(fullPath, "rb") as f:
+        text = f.read()
+    if not b"\n" in text:
+        try:
+            mimetype, encoded = splitDataURI(text.decode("ascii"))
+            prefix = ""
+            if mimetype:
+                prefix = "data:{};base64,".format(mimetype)
+            if text.decode("ascii") == prefix + encoded:
+                for chunk in decodeBase64(encoded):
+                    pass
+                fields["encoding"] = Image.BINARY
+                if mimetype:
+                    fields["datauri"] = True
+                    fields["mimetype"] = mimetype
+                return (lambda: decodeBase64(encoded), fields)
+        except (ImageStorageError, UnicodeError):
+            pass
+
+    # GET returns the text as it is, keep it that way
+
+    return (lambda: [text], fields)
+
+def dedupe(dryRun, verbose):
+    images = 0
+    moved = 0
+    missing = 0
+    oldBytes = 0
+    seen = {}
+    before = ImageBlob.objects.aggregate(Sum("size"))["size__sum"] or 0
+
+    for image in Image.objects.filter(blob=None).order_by("id").iterator():
+        images += 1
+        fullPath = getImagePath(image.patient_id, image.path)
+        if not os.path.exists(fullPath):
+            print("image {} file {} is missing".format(image.id, fullPath))
+            missing += 1
+            continue
+        oldBytes += os.path.getsize(fullPath)
+        getChunks, fields = getContent(image, fullPath)
+
+        if dryRun:
+            hasher = ImageHasher()
+            for chunk in getChunks():
+                hasher.write(chunk)
+            info = hasher.getInfo()
+            if not info["sha256"] in seen and not ImageBlob.objects.filter(sha256=info["sha256"]).exists():
+                seen[info["sha256"]] = info["size"]
+            continue
+
+        blob, info = storeChunks(getChunks)
+        fields["blob"] = blob
+        fields["path"] = blob.path
+        fields["sha256"] = info["sha256"]
+        if fields["encoding"] == Image.BINARY:
+            fields["size"] = info["size"]
+            if not fields.get("mimetype", None):
+                fields["mimetype"] = info["mimetype"]
+
+        # update(), not save(), keeps the timestamp of the image
+
+        n = Image.objects.filter(id=image.id, blob=None).update(**fields)
+        if n == 0:
+            # deleted (or moved) meanwhile
+
+            releaseBlob(blob.id)
+            continue
+        os.remove(fullPath)
+        removeRenditions(*getRenditionLocation(image))
+        moved += 1
+        if verbose:
+            print("image {} -> {}".format(image.id, blob.path))
+
+    if dryRun:
+        after = before + sum(seen.values())
+    else:
+        after = ImageBlob.objects.aggregate(Sum("size"))["size__sum"] or 0
+    print("{} images not in the store, {} moved, {} missing".format(images, moved, missing))
+    print("{} bytes in patient directories, store grew by {} bytes, {} bytes saved".format(oldBytes, after - before, oldBytes - (after - before)))
+
+def recount(dryRun):
+    '''
+    set the refcount of each blob to the number of images using it, e.g.,
+    after a crash between storing an image and saving its Image, and 
+    remove blobs no image uses
+    '''
+
+    counts = dict(Image.objects.exclude(blob=None).values_list("blob").annotate(Count("id")))
+    for blob in ImageBlob.objects.all().iterator():
+        n = counts.get(blob.id, 0)
+        if n == blob.refcount:
+            continue
+        print("blob {} refcount {} should be {}".format(blob.id, blob.refcount, n))
+        if dryRun:
+            continue
+        if n == 0:
+            # releaseBlob() drops one more reference and removes it
+
+            ImageBlob.objects.filter(id=blob.id).update(refcount=1)
+            releaseBlob(blob.id)
+        else:
+            ImageBlob.objects.filter(id=blob.id).update(refcount=n)
+
+def usage():
+    print("imagededupe [-n] [-r] [-v]")
+    print("-n dry run, report what would be done")
+    print("-r check the refcounts of the blobs in the store, with the server stopped")
+    print("-v verbose")
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "nrv")
+    except getopt.GetoptError as err:
+        print(str(err))
+        usage()
+        sys.exit(2)
+    dryRun = False
+    recountOnly = False
+    verbose = False
+    for o, a in opts:
+        if o == "-n":
+            dryRun = True
+        elif o == "-r":
+            recountOnly = True
+        elif o == "-v":
+            verbose = True
+        else:
+            assert False, "unhandled option"
+
+    if recountOnly:
+        recount(dryRun)
+    else:
+        dedupe(dryRun, verbose)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+simulate many tablets writing to the web services at once, and report 
+throughput and latency of each kind of write. Used to compare the MyISAM 
+and InnoDB storage engines (see tools/storageengine). Creates its own 
+clinic, station and patients, and removes them when done.
+'''
+
+import getopt, sys
+import threading
+import time
+
+from tschartslib.tscharts.tscharts import Login, Logout
+from tschartslib.clinic.clinic import CreateClinic, DeleteClinic
+from tschartslib.station.station import CreateStation, DeleteStation
+from tschartslib.clinicstation.clinicstation import CreateClinicStation, DeleteClinicStation
+from tschartslib.patient.patient import CreatePatient, UpdatePatient, DeletePatient
+from tschartslib.statechange.statechange import CreateStateChange, DeleteStateChange
+
+def login():
+    ret = None
+    x = Login(host, port, username, password)
+    r = x.send(timeout=30)
+    if r[0] == 200:
+        ret = r[1]["token"]
+    return ret
+
+def getPatientData(n):
+    data = {}
+    data["paternal_last"] = "loadtest{}".format(n)
+    data["maternal_last"] = "yyyyyy"
+    data["first"] = "zzzzzzz"
+    data["middle"] = ""
+    data["suffix"] = ""
+    data["prefix"] = ""
+    data["dob"] = "04/01/1962"
+    data["gender"] = "Female"
+    data["street1"] = "1234 First Ave"
+    data["street2"] = ""
+    data["city"] = "Ensenada"
+    data["colonia"] = ""
+    data["state"] = u"Baja California"
+    data["phone1"] = "1-111-111-1111"
+    data["phone2"] = ""
+    data["email"] = "patient@example.com"
+    data["emergencyfullname"] = "Maria Sanchez"
+    data["emergencyphone"] = "1-222-222-2222"
+    data["emergencyemail"] = "maria.sanchez@example.com"
+    return data
+
+class Tablet(threading.Thread):
+    '''
+    one tablet: checks its patient in and out of the clinic station and
+    updates the patient, as fast as the server allows, until stopped
+    '''
+
+    def __init__(self, n, clinicstationid, patientid, stop):
+        super(Tablet, self).__init__()
+        self._n = n
+        self._clinicstationid = clinicstationid
+        self._patientid = patientid
+        self._stop = stop
+        self._times = {"statechange": [], "patient": []}
+        self._errors = 0
+        self._statechanges = []
+
+    def getTimes(self):
+        return self._times
+
+    def getErrors(self):
+        return self._errors
+
+    def getStateChanges(self):
+        return self._statechanges
+
+    def timed(self, name, x):
+        start = time.time()
+        try:
+            ret = x.send(timeout=30)
+        except:
+            ret = (None, None)
+        self._times[name].append(time.time() - start)
+        if ret[0] != 200:
+            self._errors += 1
+        return ret
+
+    def run(self):
+        token = login()
+        if not token:
+            self._errors += 1
+            return
+        data = getPatientData(self._n)
+        count = 0
+        while not self._stop.is_set():
+            for state in ("in", "out"):
+                x = CreateStateChange(host, port, token)
+                x.setClinicStation(self._clinicstationid)
+                x.setPatient(self._patientid)
+                x.setState(state)
+                ret = self.timed("statechange", x)
+                if ret[0] == 200:
+                    self._statechanges.append(ret[1]["id"])
+            data["phone2"] = "{}".format(count)
+            x = UpdatePatient(host, port, token, self._patientid, data)
+            self.timed("patient", x)
+            count += 1
+
+def percentile(times, p):
+    return times[min(len(times) - 1, int(len(times) * p / 100))]
+
+def report(tablets, elapsed):
+    errors = 0
+    for x in tablets:
+        errors += x.getErrors()
+    for name in ("statechange", "patient"):
+        times = []
+        for x in tablets:
+            times.extend(x.getTimes()[name])
+        times.sort()
+        if not len(times):
+            continue
+        print("{:12} {:6} requests {:8.1f}/s p50 {:6.1f}ms p90 {:6.1f}ms p99 {:6.1f}ms".format(name, len(times), len(times) / elapsed, percentile(times, 50) * 1000, percentile(times, 90) * 1000, percentile(times, 99) * 1000))
+    print("{} errors".format(errors))
+
+def loadTest(numTablets, duration):
+    token = login()
+    if not token:
+        print("unable to log in")
+        return False
+
+    x = CreateClinic(host, port, token, "Ensenada", "02/05/2016", "02/06/2016")
+    ret = x.send(timeout=30)
+    clinicid = int(ret[1]["id"])
+    x = CreateStation(host, port, token, "ENT")
+    ret = x.send(timeout=30)
+    stationid = int(ret[1]["id"])
+    x = CreateClinicStation(host, port, token, clinicid, stationid)
+    ret = x.send(timeout=30)
+    clinicstationid = int(ret[1]["id"])
+
+    patients = []
+    for i in range(numTablets):
+        x = CreatePatient(host, port, token, getPatientData(i))
+        ret = x.send(timeout=30)
+        patients.append(int(ret[1]["id"]))
+
+    stop = threading.Event()
+    tablets = []
+    for i in range(numTablets):
+        tablets.append(Tablet(i, clinicstationid, patients[i], stop))
+    start = time.time()
+    for x in tablets:
+        x.start()
+    time.sleep(duration)
+    stop.set()
+    for x in tablets:
+        x.join()
+    elapsed = time.time() - start
+
+    print("{} tablets for {:.1f} seconds".format(numTablets, elapsed))
+    report(tablets, elapsed)
+
+    # clean up
+
+    for x in tablets:
+        for y in x.getStateChanges():
+            DeleteStateChange(host, port, token, y).send(timeout=30)
+    for x in patients:
+        DeletePatient(host, port, token, x).send(timeout=30)
+    DeleteClinicStation(host, port, token, clinicstationid).send(timeout=30)
+    DeleteStation(host, port, token, stationid).send(timeout=30)
+    DeleteClinic(host, port, token, clinicid).send(timeout=30)
+    Logout(host, port).send(timeout=30)
+    return True
+
+def usage():
+    print("loadtest [-h host] [-p port] [-u username] [-w password] [-t tablets] [-d duration]")
+    print("-t number of simulated tablets, default 32")
+    print("-d seconds to run, default 60")
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "h:p:u:w:t:d:")
+    except getopt.GetoptError as err:
+        print(str(err))
+        usage()
+        sys.exit(2)
+    global host
+    host = "127.0.0.1"
+    global port
+    port = 8000
+    global username
+    username = None
+    global password
+    password = None
+    numTablets = 32
+    duration = 60
+    for o, a in opts:
+        if o == "-h":
+            host = a
+        elif o == "-p":
+            port = int(a)
+        elif o == "-u":
+            username = a
+        elif o == "-w":
+            password = a
+        elif o == "-t":
+            numTablets = int(a)
+        elif o == "-d":
+            duration = int(a)
+        else:
+            assert False, "unhandled option"
+
+    if not loadTest(numTablets, duration):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
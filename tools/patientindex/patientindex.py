@@ -0,0 +1,72 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+build the patient search index (see patient/search.py) for patients that
+are not in it, e.g., patients created before the index existed, or loaded
+with bulk_create(). Patients already indexed are left as they are, unless
+-a is given.
+
+Runs against the database of this server, not the web services. See 
+README.md.
+'''
+
+import getopt, os, sys
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tscharts.settings")
+import django
+django.setup()
+
+from patient.models import Patient, PatientSearchTerm
+from patient.search import indexPatient
+
+def reindex(allPatients, verbose):
+    indexed = set(PatientSearchTerm.objects.values_list("patient_id", flat=True).distinct())
+    count = 0
+    for patient in Patient.objects.all().order_by("id").iterator():
+        if not allPatients and patient.id in indexed:
+            continue
+        indexPatient(patient)
+        count += 1
+        if verbose:
+            print("indexed patient {}".format(patient.id))
+    print("indexed {} patients".format(count))
+
+def usage():
+    print("patientindex [-a] [-v]")
+    print("-a index all patients, not just those missing from the index")
+    print("-v verbose")
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "av")
+    except getopt.GetoptError as err:
+        print(str(err))
+        usage()
+        sys.exit(2)
+    allPatients = False
+    verbose = False
+    for o, a in opts:
+        if o == "-a":
+            allPatients = True
+        elif o == "-v":
+            verbose = True
+        else:
+            assert False, "unhandled option"
+
+    reindex(allPatients, verbose)
+
+if __name__ == "__main__":
+    main()
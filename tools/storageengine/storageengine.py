@@ -0,0 +1,108 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+convert the tables of the tscharts database to another storage engine, 
+by default InnoDB. Databases created before DATABASE_STORAGE_ENGINE (see
+settings.py) was InnoDB have every table on MyISAM, which locks a whole
+table for each write and has no transactions.
+
+The change event table stays on MyISAM: subscribers read the events with
+ids greater than the last one they saw (see changeevent/views.py), which
+needs ids to become visible in the order they are handed out. 
+
+Runs against the database of this server, not the web services. See 
+README.md.
+'''
+
+import getopt, os, sys
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tscharts.settings")
+import django
+django.setup()
+
+from django.db import connection
+from changeevent.models import ChangeEvent
+
+KEEP_MYISAM = (ChangeEvent._meta.db_table,)
+
+def getTables():
+    '''
+    returns a list of (table, engine) for the tables of the database 
+    '''
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT TABLE_NAME, ENGINE FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE' ORDER BY TABLE_NAME")
+        ret = cursor.fetchall()
+    return ret
+
+def convert(engine, dryrun, verbose):
+    count = 0
+    errors = 0
+    for table, current in getTables():
+        target = engine
+        if table in KEEP_MYISAM:
+            target = "MyISAM"
+        if current and current.lower() == target.lower():
+            if verbose:
+                print("{} is {}".format(table, current))
+            continue
+        print("{} {} -> {}".format(table, current, target))
+        if dryrun:
+            continue
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("ALTER TABLE {} ENGINE={}".format(connection.ops.quote_name(table), target))
+            count += 1
+        except:
+            # e.g., a row too large for the target engine, report it and
+            # carry on with the others
+
+            print("unable to convert {}: {}".format(table, sys.exc_info()[1]))
+            errors += 1
+    print("converted {} tables, {} errors".format(count, errors))
+    return errors == 0
+
+def usage():
+    print("storageengine [-e engine] [-n] [-v]")
+    print("-e engine to convert to, default InnoDB")
+    print("-n only show the tables that would be converted")
+    print("-v verbose")
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "e:nv")
+    except getopt.GetoptError as err:
+        print(str(err))
+        usage()
+        sys.exit(2)
+    engine = "InnoDB"
+    dryrun = False
+    verbose = False
+    for o, a in opts:
+        if o == "-e":
+            engine = a
+        elif o == "-n":
+            dryrun = True
+        elif o == "-v":
+            verbose = True
+        else:
+            assert False, "unhandled option"
+
+    if not convert(engine, dryrun, verbose):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
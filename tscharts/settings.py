@@ -32,6 +32,70 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 CHART_IMAGES_DIR = "/opt/thousandsmiles/images"
 
+# Set to True if the web server sends files named in an X-Sendfile header
+# (e.g., Apache with mod_xsendfile, XSendFilePath set to CHART_IMAGES_DIR).
+# GET /tscharts/v1/image/id/data/ then leaves reading the image, and byte
+# ranges, to the web server.
+
+CHART_IMAGES_XSENDFILE = False
+
+# Bytes of disk the resized renditions of images (thumbnails, see
+# image/renditions.py) may take. The least recently used are removed when
+# they take more.
+
+CHART_IMAGES_RENDITION_CACHE = 2 * 1024 * 1024 * 1024
+
+# Unix datagram socket the scheduler listens on when run in event mode (-e).
+# Views post a datagram here after recording a change event so that the
+# scheduler wakes up immediately. Set to None to have the scheduler poll
+# the change event table instead.
+
+SCHEDULER_EVENT_SOCKET = "/tmp/tscharts_scheduler.sock"
+
+# Requests of views decorated with log_request (common/decorators.py) are
+# recorded in the RequestLog table by a background thread, see 
+# requestlog/writer.py, in batches of REQUEST_LOG_BATCH_SIZE, at least 
+# every REQUEST_LOG_FLUSH_INTERVAL milliseconds. At most 
+# REQUEST_LOG_BUFFER_SIZE records wait to be written, others (and those
+# that cannot be written to the database) go to the "requestlog" logger,
+# a rotating file. REQUEST_LOG_GET_SAMPLE_RATE is the fraction of GET 
+# requests recorded, 0.0 to 1.0, other methods are always recorded.
+
+REQUEST_LOG_BUFFER_SIZE = 10000
+REQUEST_LOG_BATCH_SIZE = 200
+REQUEST_LOG_FLUSH_INTERVAL = 500
+REQUEST_LOG_GET_SAMPLE_RATE = 1.0
+
+# Request metrics (metrics/), served at /tscharts/v1/metrics/ in the 
+# Prometheus text format. Each web server process writes its metrics to
+# METRICS_DIR for the others to add up. The metrics of a process that 
+# has exited are dropped METRICS_SNAPSHOT_TTL seconds after its last 
+# write. Requests taking longer than METRICS_SLOW_REQUEST seconds are 
+# logged with their SQL, None disables.
+
+METRICS_DIR = "/var/tmp/tscharts_metrics"
+METRICS_SNAPSHOT_TTL = 86400
+METRICS_SLOW_REQUEST = 2.0
+
+# The cache holds the queue version token (see queue/version.py) and the
+# rendered queue snapshots, so it must be shared by all web server 
+# processes and the scheduler. A file based cache does that without 
+# another service, memcached works too. The file based cache creates its
+# directories mode 0700 and its files mode 0600, so the web server (e.g.,
+# Apache's www-data) and the scheduler must run as the same user, and 
+# LOCATION must be owned by that user. Otherwise the scheduler cannot 
+# replace the token and tablets keep getting 304 for stale queues. If 
+# they cannot run as one user, use memcached, or the database cache 
+# (django.core.cache.backends.db.DatabaseCache, after running 
+# "python manage.py createcachetable").
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': '/var/tmp/tscharts_cache',
+    }
+}
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/1.9/howto/deployment/checklist/
 
@@ -63,6 +127,8 @@ INSTALLED_APPS = [
     'clinic.apps.ClinicConfig',
     'clinicstation.apps.ClinicstationConfig',
     'audiogram',
+    'batch',
+    'changeevent',
     'image',
     'covidvac',
     'dentalcdt',
@@ -76,6 +142,7 @@ INSTALLED_APPS = [
     'entdiagnosisextra',
     'entsurgicalhistory',
     'medicalhistory',
+    'metrics',
     'mexicanstates',
     'patient',
     'pin',
@@ -98,6 +165,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE_CLASSES = [
+    'metrics.middleware.MetricsMiddleware',     # first, to time the others
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -133,6 +201,13 @@ WSGI_APPLICATION = 'tscharts.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/1.9/ref/settings/#databases
 
+# engine of the tables created by migrate. InnoDB has row level locking 
+# and transactions. Databases created when this was MyISAM are converted
+# with tools/storageengine (see the README there). The change event table
+# is always MyISAM, migrate converts it (see changeevent/engine.py).
+
+DATABASE_STORAGE_ENGINE = "InnoDB"
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.mysql',
@@ -142,7 +217,7 @@ DATABASES = {
         'HOST': '',
         'PORT': '',
         'OPTIONS': {
-           "init_command": "SET default_storage_engine=MyISAM",
+           "init_command": "SET default_storage_engine={}".format(DATABASE_STORAGE_ENGINE),
            'sql_mode': 'traditional',
         }
     }
@@ -215,6 +290,14 @@ LOGGING = {
             'filename': '/tmp/tscharts.log',
             'formatter': 'verbose'
         },
+        'requestlog': {
+            'level': 'INFO',
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': '/tmp/tscharts_requests.log',
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'formatter': 'simple'
+        },
     },
     'loggers': {
         'django': {
@@ -232,5 +315,10 @@ LOGGING = {
             'propagate': True,
             'level': 'DEBUG',
         },
+        'requestlog': {
+            'handlers': ['requestlog'],
+            'propagate': False,
+            'level': 'INFO',
+        },
     }
 }
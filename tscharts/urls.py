@@ -38,7 +38,9 @@ urlpatterns = [
     url(r'^admin/', admin.site.urls),
     url(r'^api-auth/', include('rest_framework.urls', namespace='rest_framework')),
     url(r'^accounts/', include('registration.backends.simple.urls')),
+    url(r'^tscharts/v1/batch/', include('batch.urls', namespace='batch')),
     url(r'^tscharts/v1/category/', include('category.urls', namespace='category')),
+    url(r'^tscharts/v1/changeevent/', include('changeevent.urls', namespace='changeevent')),
     url(r'^tscharts/v1/clinic/', include('clinic.urls', namespace='clinic')),
     url(r'^tscharts/v1/clinicstation/', include('clinicstation.urls', namespace='clinicstation')),
     url(r'^tscharts/v1/consent/', include('consent.urls', namespace='consent')),
@@ -61,6 +63,7 @@ urlpatterns = [
     url(r'^tscharts/v1/dentaltreatment/', include('dentaltreatment.urls', namespace='dentaltreatment')),
     url(r'^tscharts/v1/medicalhistory/', include('medicalhistory.urls', namespace='medicalhistory')),
     url(r'^tscharts/v1/medications/', include('medications.urls', namespace='medications')),
+    url(r'^tscharts/v1/metrics/', include('metrics.urls', namespace='metrics')),
     url(r'^tscharts/v1/mexicanstates/', include('mexicanstates.urls', namespace='mexicanstates')),
     url(r'^tscharts/v1/patient/', include('patient.urls', namespace='patient')),
     url(r'^tscharts/v1/queue/', include('queue.urls', namespace='queue')),
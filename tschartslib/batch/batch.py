@@ -0,0 +1,195 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+unit tests for batch application. Assumes django server is up
+and running on the specified host and port.
+'''
+
+import unittest
+import getopt, sys
+
+from tschartslib.service.serviceapi import ServiceAPI
+from tschartslib.tscharts.tscharts import Login
+from tschartslib.clinic.clinic import CreateClinic, DeleteClinic
+from tschartslib.patient.patient import CreatePatient, DeletePatient
+
+class Batch(ServiceAPI):
+    def __init__(self, host, port, token):
+        super(Batch, self).__init__()
+        
+        self.setHttpMethod("POST")
+        self.setHost(host)
+        self.setPort(port)
+        self.setToken(token)
+        self._payload = {"requests": []}
+        self.setPayload(self._payload)
+        self.setURL("tscharts/v1/batch/")
+
+    def addRequest(self, method, path, body=None):
+        x = {"method": method, "path": path}
+        if body != None:
+            x["body"] = body
+        self._payload["requests"].append(x)
+        self.setPayload(self._payload)
+
+    def setParallel(self, val):
+        self._payload["parallel"] = val
+        self.setPayload(self._payload)
+
+class TestTSBatch(unittest.TestCase):
+
+    def setUp(self):
+        login = Login(host, port, username, password)
+        ret = login.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertTrue("token" in ret[1])
+        global token
+        token = ret[1]["token"]
+
+    def createPatient(self):
+        data = {}
+        data["paternal_last"] = "abcd1234"
+        data["maternal_last"] = "yyyyyy"
+        data["first"] = "zzzzzzz"
+        data["middle"] = ""
+        data["suffix"] = "Jr."
+        data["prefix"] = ""
+        data["dob"] = "04/01/1962"
+        data["gender"] = "Female"
+        data["street1"] = "1234 First Ave"
+        data["street2"] = ""
+        data["city"] = "Ensenada"
+        data["colonia"] = ""
+        data["state"] = u"Baja California"
+        data["phone1"] = "1-111-111-1111"
+        data["phone2"] = ""
+        data["email"] = "patient@example.com"
+        data["emergencyfullname"] = "Maria Sanchez"
+        data["emergencyphone"] = "1-222-222-2222"
+        data["emergencyemail"] = "maria.sanchez@example.com"
+
+        x = CreatePatient(host, port, token, data)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        return int(ret[1]["id"])
+
+    def testBatch(self):
+        x = CreateClinic(host, port, token, "Ensenada", "02/05/2016", "02/06/2016")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        clinicid = int(ret[1]["id"])
+
+        patientid = self.createPatient()
+
+        for parallel in [False, True]:
+            x = Batch(host, port, token)
+            x.setParallel(parallel)
+            x.addRequest("GET", "/tscharts/v1/patient/{}/".format(patientid))
+            x.addRequest("GET", "tscharts/v1/clinic/{}/".format(clinicid))
+            x.addRequest("PUT", "/tscharts/v1/patient/{}/".format(patientid), {"phone2": "1-333-333-3333"})
+            x.addRequest("GET", "/tscharts/v1/patient/{}/".format(patientid))
+            x.addRequest("GET", "/tscharts/v1/patient/9999999/")
+            x.addRequest("GET", "/tscharts/v1/nosuchapi/")
+            x.addRequest("PATCH", "/tscharts/v1/patient/{}/".format(patientid))
+            x.addRequest("POST", "/tscharts/v1/batch/", {"requests": []})
+            x.addRequest("GET", "/tscharts/v1/consent/?patient={}&clinic={}".format(patientid, clinicid))
+            ret = x.send(timeout=30)
+            self.assertEqual(ret[0], 200)
+            responses = ret[1]["responses"]
+            self.assertEqual(len(responses), 9)
+            self.assertEqual(responses[0]["status"], 200)
+            self.assertEqual(responses[0]["body"]["id"], patientid)
+            self.assertEqual(responses[1]["status"], 200)
+            self.assertEqual(responses[1]["body"]["id"], clinicid)
+            self.assertEqual(responses[2]["status"], 200)
+            self.assertEqual(responses[3]["status"], 200)
+            self.assertEqual(responses[3]["body"]["phone2"], "1-333-333-3333")
+            self.assertEqual(responses[4]["status"], 404)
+            self.assertEqual(responses[5]["status"], 404)
+            self.assertEqual(responses[6]["status"], 400)
+            self.assertEqual(responses[7]["status"], 400)
+            self.assertEqual(responses[8]["status"], 200)
+            self.assertEqual(responses[8]["body"], [])
+
+        x = DeletePatient(host, port, token, patientid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = DeleteClinic(host, port, token, clinicid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+    def testBatchBadArgs(self):
+        x = Batch(host, port, token)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 400)
+
+        x = Batch(host, port, token)
+        for i in range(0, 51):
+            x.addRequest("GET", "/tscharts/v1/clinic/")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 400)
+
+        x = Batch(host, port, token)
+        x.addRequest("GET", "/tscharts/v1/clinic/")
+        x.setParallel("yes")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 400)
+
+        x = Batch(host, port, token)
+        x.setPayload({"requests": "GET /tscharts/v1/clinic/"})
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 400)
+
+    def testBatchNotAuthenticated(self):
+        x = Batch(host, port, None)
+        x.addRequest("GET", "/tscharts/v1/clinic/")
+        ret = x.send(timeout=30)
+        self.assertTrue(ret[0] in [401, 403])
+
+def usage():
+    print("batch [-h host] [-p port] [-u username] [-w password]") 
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "h:p:u:w:")
+    except getopt.GetoptError as err:
+        print(str(err))
+        usage()
+        sys.exit(2)
+    global host
+    host = "127.0.0.1"
+    global port
+    port = 8000
+    global username
+    username = None
+    global password
+    password = None
+    for o, a in opts:
+        if o == "-h":
+            host = a
+        elif o == "-p":
+            port = int(a)
+        elif o == "-u":
+            username = a
+        elif o == "-w":
+            password = a
+        else:   
+            assert False, "unhandled option"
+    unittest.main(argv=[sys.argv[0]])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+unit tests for change event application. Assumes django server is up
+and running on the specified host and port.
+'''
+
+import unittest
+import getopt, sys
+
+from tschartslib.service.serviceapi import ServiceAPI
+from tschartslib.tscharts.tscharts import Login
+from tschartslib.clinic.clinic import CreateClinic, DeleteClinic
+from tschartslib.station.station import CreateStation, DeleteStation
+from tschartslib.clinicstation.clinicstation import CreateClinicStation, UpdateClinicStation, DeleteClinicStation
+
+class GetChangeEvents(ServiceAPI):
+    def makeURL(self):
+        hasQArgs = False
+        base = "tscharts/v1/changeevent/"
+
+        if not self._clinic == None:
+            if not hasQArgs:
+                base += "?"
+            else:
+                base += "&"
+            base += "clinic={}".format(self._clinic)
+            hasQArgs = True
+
+        if not self._since == None:
+            if not hasQArgs:
+                base += "?"
+            else:
+                base += "&"
+            base += "since={}".format(self._since)
+            hasQArgs = True
+
+        if not self._wait == None:
+            if not hasQArgs:
+                base += "?"
+            else:
+                base += "&"
+            base += "wait={}".format(self._wait)
+            hasQArgs = True
+
+        if not self._resource == None:
+            if not hasQArgs:
+                base += "?"
+            else:
+                base += "&"
+            base += "resource={}".format(self._resource)
+            hasQArgs = True
+
+        self.setURL(base)
+
+    def __init__(self, host, port, token):
+        super(GetChangeEvents, self).__init__()
+        
+        self.setHttpMethod("GET")
+        self.setHost(host)
+        self.setPort(port)
+        self.setToken(token)
+        self._clinic = None
+        self._since = None
+        self._wait = None
+        self._resource = None
+        self.makeURL()
+
+    def setClinic(self, clinic):
+        self._clinic = clinic
+        self.makeURL()
+
+    def setSince(self, since):
+        self._since = since
+        self.makeURL()
+
+    def setWait(self, wait):
+        self._wait = wait
+        self.makeURL()
+
+    def setResource(self, resource):
+        self._resource = resource
+        self.makeURL()
+
+class TestTSChangeEvent(unittest.TestCase):
+
+    def setUp(self):
+        login = Login(host, port, username, password)
+        ret = login.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertTrue("token" in ret[1])
+        global token
+        token = ret[1]["token"]
+
+    def testClinicStationEvents(self):
+        x = CreateClinic(host, port, token, "Ensenada", "02/05/2016", "02/06/2016")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        clinicid = int(ret[1]["id"])
+
+        x = CreateStation(host, port, token, "ENT")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        stationid = int(ret[1]["id"])
+
+        x = CreateClinicStation(host, port, token, clinicid, stationid, name="test1")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        clinicstationid = int(ret[1]["id"])
+
+        # start of subscription, returns at once
+
+        x = GetChangeEvents(host, port, token)
+        x.setClinic(clinicid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertEqual(ret[1]["reset"], False)
+        self.assertEqual(len(ret[1]["events"]), 0)
+        seq = ret[1]["seq"]
+
+        x = UpdateClinicStation(host, port, token, clinicstationid)
+        x.setAway(False)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = GetChangeEvents(host, port, token)
+        x.setClinic(clinicid)
+        x.setSince(seq)
+        x.setResource("clinicstation")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertTrue(ret[1]["seq"] > seq)
+        events = ret[1]["events"]
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["resource"], "clinicstation")
+        self.assertEqual(events[0]["id"], clinicstationid)
+        self.assertEqual(events[0]["action"], "update")
+        self.assertEqual(events[0]["data"]["away"], False)
+        seq = ret[1]["seq"]
+
+        # nothing new, waits and returns no events
+
+        x = GetChangeEvents(host, port, token)
+        x.setClinic(clinicid)
+        x.setSince(seq)
+        x.setWait(1)
+        x.setResource("clinicstation")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertEqual(len(ret[1]["events"]), 0)
+        self.assertTrue(ret[1]["seq"] >= seq)
+
+        x = DeleteClinicStation(host, port, token, clinicstationid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = GetChangeEvents(host, port, token)
+        x.setClinic(clinicid)
+        x.setSince(seq)
+        x.setResource("clinicstation")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        events = ret[1]["events"]
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["action"], "delete")
+
+        x = DeleteStation(host, port, token, stationid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = DeleteClinic(host, port, token, clinicid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+    def testBadArgs(self):
+        x = GetChangeEvents(host, port, token)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 400)
+
+        x = GetChangeEvents(host, port, token)
+        x.setClinic(9999)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 404)
+
+        x = GetChangeEvents(host, port, token)
+        x.setClinic("abc")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 400)
+
+        x = GetChangeEvents(host, port, token)
+        x.setClinic(9999)
+        x.setSince(-1)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 400)
+
+        x = GetChangeEvents(host, port, token)
+        x.setClinic(9999)
+        x.setWait("abc")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 400)
+
+def usage():
+    print("changeevent [-h host] [-p port] [-u username] [-w password]") 
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "h:p:u:w:")
+    except getopt.GetoptError as err:
+        print(str(err))
+        usage()
+        sys.exit(2)
+    global host
+    host = "127.0.0.1"
+    global port
+    port = 8000
+    global username
+    username = None
+    global password
+    password = None
+    for o, a in opts:
+        if o == "-h":
+            host = a
+        elif o == "-p":
+            port = int(a)
+        elif o == "-u":
+            username = a
+        elif o == "-w":
+            password = a
+        else:   
+            assert False, "unhandled option"
+    unittest.main(argv=[sys.argv[0]])
+
+if __name__ == "__main__":
+    main()
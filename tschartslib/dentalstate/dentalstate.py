@@ -487,6 +487,28 @@ class DeleteDentalState(ServiceAPI):
         self.setToken(token)
         self.setURL("tscharts/v1/dentalstate/{}/".format(id))
 
+class CreateDentalStates(ServiceAPI):
+    def __init__(self, host, port, token, items):
+        super(CreateDentalStates, self).__init__()
+        
+        self.setHttpMethod("POST")
+        self.setHost(host)
+        self.setPort(port)
+        self.setToken(token)
+        self.setBody(json.dumps(items).encode("utf-8"))
+        self.setURL("tscharts/v1/dentalstate/bulk/")
+
+class UpdateDentalStates(ServiceAPI):
+    def __init__(self, host, port, token, items):
+        super(UpdateDentalStates, self).__init__()
+        
+        self.setHttpMethod("PUT")
+        self.setHost(host)
+        self.setPort(port)
+        self.setToken(token)
+        self.setBody(json.dumps(items).encode("utf-8"))
+        self.setURL("tscharts/v1/dentalstate/bulk/")
+
 class TestTSDentalState(unittest.TestCase):
 
     def setUp(self):
@@ -1180,6 +1202,135 @@ class TestTSDentalState(unittest.TestCase):
         ret = x.send(timeout=30)
         self.assertEqual(ret[0], 200)
 
+    def testBulkDentalStates(self):
+        x = CreateClinic(host, port, token, "Ensenada", "02/05/2016", "02/06/2016")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        clinicid = int(ret[1]["id"])
+
+        data = {}
+
+        data["paternal_last"] = "abcd1234"
+        data["maternal_last"] = "yyyyyy"
+        data["first"] = "zzzzzzz"
+        data["middle"] = ""
+        data["suffix"] = "Jr."
+        data["prefix"] = ""
+        data["dob"] = "04/01/1962"
+        data["gender"] = "Female"
+        data["street1"] = "1234 First Ave"
+        data["street2"] = ""
+        data["city"] = "Ensenada"
+        data["colonia"] = ""
+        data["state"] = u"Baja California"
+        data["phone1"] = "1-111-111-1111"
+        data["phone2"] = ""
+        data["email"] = "patient@example.com"
+        data["emergencyfullname"] = "Maria Sanchez"
+        data["emergencyphone"] = "1-222-222-2222"
+        data["emergencyemail"] = "maria.sanchez@example.com"
+
+        x = CreatePatient(host, port, token, data)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        patientid = int(ret[1]["id"])
+
+        x = CreateDentalCDT(host, port, token)
+        x.setCode("D4322")
+        x.setCategory("Another category")
+        x.setDesc("Another description")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        codeid = int(ret[1]["id"])
+
+        generator = DentalStateGenerator()
+        items = []
+        for i in range(0, 10):
+            body = generator.createPayloadBody(True)
+            body["clinic"] = clinicid
+            body["patient"] = patientid
+            body["code"] = codeid
+            body["tooth"] = i
+            items.append(body)
+
+        # a patient that does not exist, and an invalid state
+
+        bad = dict(items[0])
+        bad["patient"] = 9999
+        items.append(bad)
+        bad = dict(items[0])
+        bad["state"] = "UnTrEaTeD"
+        items.append(bad)
+
+        x = CreateDentalStates(host, port, token, items)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertEqual(len(ret[1]), len(items))
+        ids = []
+        for i in range(0, 10):
+            self.assertEqual(ret[1][i]["status"], 200)
+            ids.append(int(ret[1][i]["id"]))
+        self.assertEqual(ret[1][10]["status"], 404)
+        self.assertEqual(ret[1][11]["status"], 400)
+
+        for i in range(0, 10):
+            x = GetDentalState(host, port, token)
+            x.setId(ids[i])
+            ret = x.send(timeout=30)
+            self.assertEqual(ret[0], 200)
+            self.assertEqual(ret[1]["tooth"], i)
+            self.assertEqual(ret[1]["patient"], patientid)
+            self.assertEqual(ret[1]["clinic"], clinicid)
+            self.assertEqual(ret[1]["code"], codeid)
+            self.assertEqual(ret[1]["state"], items[i]["state"])
+
+        items = []
+        for i in range(0, 10):
+            items.append({"id": ids[i], "comment": "bulk {}".format(i)})
+        items.append({"id": 9999999, "comment": "bulk"})
+        items.append({"id": ids[0], "state": "UnTrEaTeD"})
+
+        x = UpdateDentalStates(host, port, token, items)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertEqual(len(ret[1]), len(items))
+        for i in range(0, 10):
+            self.assertEqual(ret[1][i]["status"], 200)
+        self.assertEqual(ret[1][10]["status"], 404)
+        self.assertEqual(ret[1][11]["status"], 400)
+
+        for i in range(0, 10):
+            x = GetDentalState(host, port, token)
+            x.setId(ids[i])
+            ret = x.send(timeout=30)
+            self.assertEqual(ret[0], 200)
+            self.assertEqual(ret[1]["comment"], "bulk {}".format(i))
+
+        x = CreateDentalStates(host, port, token, [])
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 400)
+
+        x = CreateDentalStates(host, port, token, {"patient": patientid})
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 400)
+
+        for id in ids:
+            x = DeleteDentalState(host, port, token, id)
+            ret = x.send(timeout=30)
+            self.assertEqual(ret[0], 200)
+
+        x = DeleteDentalCDT(host, port, token, codeid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = DeleteClinic(host, port, token, clinicid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = DeletePatient(host, port, token, patientid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
     def testUpdateDentalState(self):
         x = CreateClinic(host, port, token, "Ensenada", "02/05/2016", "02/06/2016")
         ret = x.send(timeout=30)
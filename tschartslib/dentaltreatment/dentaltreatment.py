@@ -504,6 +504,28 @@ class DeleteDentalTreatment(ServiceAPI):
         self.setToken(token)
         self.setURL("tscharts/v1/dentaltreatment/{}/".format(id))
 
+class CreateDentalTreatments(ServiceAPI):
+    def __init__(self, host, port, token, items):
+        super(CreateDentalTreatments, self).__init__()
+        
+        self.setHttpMethod("POST")
+        self.setHost(host)
+        self.setPort(port)
+        self.setToken(token)
+        self.setBody(json.dumps(items).encode("utf-8"))
+        self.setURL("tscharts/v1/dentaltreatment/bulk/")
+
+class UpdateDentalTreatments(ServiceAPI):
+    def __init__(self, host, port, token, items):
+        super(UpdateDentalTreatments, self).__init__()
+        
+        self.setHttpMethod("PUT")
+        self.setHost(host)
+        self.setPort(port)
+        self.setToken(token)
+        self.setBody(json.dumps(items).encode("utf-8"))
+        self.setURL("tscharts/v1/dentaltreatment/bulk/")
+
 class TestTSDentalTreatment(unittest.TestCase):
 
     def setUp(self):
@@ -834,6 +856,113 @@ class TestTSDentalTreatment(unittest.TestCase):
         ret = x.send(timeout=30)
         self.assertEqual(ret[0], 200)
 
+    def testBulkDentalTreatments(self):
+        x = CreateClinic(host, port, token, "Ensenada", "02/05/2016", "02/06/2016")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        clinicid = int(ret[1]["id"])
+
+        data = {}
+
+        data["paternal_last"] = "abcd1234"
+        data["maternal_last"] = "yyyyyy"
+        data["first"] = "zzzzzzz"
+        data["middle"] = ""
+        data["suffix"] = "Jr."
+        data["prefix"] = ""
+        data["dob"] = "04/01/1962"
+        data["gender"] = "Female"
+        data["street1"] = "1234 First Ave"
+        data["street2"] = ""
+        data["city"] = "Ensenada"
+        data["colonia"] = ""
+        data["state"] = u"Baja California"
+        data["phone1"] = "1-111-111-1111"
+        data["phone2"] = ""
+        data["email"] = "patient@example.com"
+        data["emergencyfullname"] = "Maria Sanchez"
+        data["emergencyphone"] = "1-222-222-2222"
+        data["emergencyemail"] = "maria.sanchez@example.com"
+
+        x = CreatePatient(host, port, token, data)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        patientid = int(ret[1]["id"])
+
+        generator = DentalTreatmentGenerator()
+        items = []
+        for i in range(0, 5):
+            body = generator.createPayloadBody(True)
+            body["clinic"] = clinicid
+            body["patient"] = patientid
+            body["username"] = "Gomez"
+            body["examComment"] = "exam {}".format(i)
+            items.append(body)
+
+        # a clinic that does not exist, and an unknown key
+
+        bad = dict(items[0])
+        bad["clinic"] = 9999
+        items.append(bad)
+        bad = dict(items[0])
+        bad["fooboo"] = "true"
+        items.append(bad)
+
+        x = CreateDentalTreatments(host, port, token, items)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertEqual(len(ret[1]), len(items))
+        ids = []
+        for i in range(0, 5):
+            self.assertEqual(ret[1][i]["status"], 200)
+            ids.append(int(ret[1][i]["id"]))
+        self.assertEqual(ret[1][5]["status"], 404)
+        self.assertEqual(ret[1][6]["status"], 400)
+
+        for i in range(0, 5):
+            x = GetDentalTreatment(host, port, token)
+            x.setId(ids[i])
+            ret = x.send(timeout=30)
+            self.assertEqual(ret[0], 200)
+            self.assertEqual(ret[1]["examComment"], "exam {}".format(i))
+            self.assertEqual(ret[1]["patient"], patientid)
+            self.assertEqual(ret[1]["clinic"], clinicid)
+
+        items = []
+        for i in range(0, 5):
+            items.append({"id": ids[i], "examComment": "bulk {}".format(i)})
+        items.append({"id": 9999999, "examComment": "bulk"})
+        items.append({"examComment": "bulk"})
+
+        x = UpdateDentalTreatments(host, port, token, items)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertEqual(len(ret[1]), len(items))
+        for i in range(0, 5):
+            self.assertEqual(ret[1][i]["status"], 200)
+        self.assertEqual(ret[1][5]["status"], 404)
+        self.assertEqual(ret[1][6]["status"], 400)
+
+        for i in range(0, 5):
+            x = GetDentalTreatment(host, port, token)
+            x.setId(ids[i])
+            ret = x.send(timeout=30)
+            self.assertEqual(ret[0], 200)
+            self.assertEqual(ret[1]["examComment"], "bulk {}".format(i))
+
+        for id in ids:
+            x = DeleteDentalTreatment(host, port, token, id)
+            ret = x.send(timeout=30)
+            self.assertEqual(ret[0], 200)
+
+        x = DeleteClinic(host, port, token, clinicid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = DeletePatient(host, port, token, patientid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
     def testUpdateDentalTreatment(self):
         x = CreateClinic(host, port, token, "Ensenada", "02/05/2016", "02/06/2016")
         ret = x.send(timeout=30)
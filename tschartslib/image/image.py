@@ -21,6 +21,11 @@ and running on the specified host and port
 import unittest
 import getopt, sys
 import json
+import base64
+import hashlib
+import os
+import tempfile
+import time
 from random import randint
 
 from tschartslib.service.serviceapi import ServiceAPI
@@ -78,6 +83,8 @@ class GetImage(ServiceAPI):
         self._id = None
         self._sort = None
         self._newest = None
+        self._rendition = None
+        self._size = None
         self.makeURL();
 
     def makeURL(self):
@@ -135,6 +142,22 @@ class GetImage(ServiceAPI):
             base += "sort={}".format(self._sort)
             hasQArgs = True
 
+        if not self._rendition == None:
+            if not hasQArgs:
+                base += "?"
+            else:
+                base += "&"
+            base += "rendition={}".format(self._rendition)
+            hasQArgs = True
+
+        if not self._size == None:
+            if not hasQArgs:
+                base += "?"
+            else:
+                base += "&"
+            base += "size={}".format(self._size)
+            hasQArgs = True
+
         self.setURL(base)
 
     def setId(self, id):
@@ -164,6 +187,14 @@ class GetImage(ServiceAPI):
     def setSort(self, sort):
         self._sort = sort
         self.makeURL()
+
+    def setRendition(self, rendition):
+        self._rendition = rendition
+        self.makeURL()
+
+    def setSize(self, size):
+        self._size = size
+        self.makeURL()
     
 class DeleteImage(ServiceAPI):
     def __init__(self, host, port, token, id):
@@ -175,6 +206,212 @@ class DeleteImage(ServiceAPI):
         self.setToken(token)
         self.setURL("tscharts/v1/image/{}/".format(id))
 
+class GetImageData(ServiceAPI):
+    def makeURL(self):
+        base = "tscharts/v1/image/{}/data/".format(self._id)
+        if not self._rendition == None:
+            base += "?rendition={}".format(self._rendition)
+        self.setURL(base)
+
+    def __init__(self, host, port, token, id):
+        super(GetImageData, self).__init__()
+        
+        self.setHttpMethod("GET")
+        self.setHost(host)
+        self.setPort(port)
+        self.setToken(token)
+        self._id = id
+        self._rendition = None
+        self.makeURL()
+
+    def setRendition(self, rendition):
+        self._rendition = rendition
+        self.makeURL()
+
+    def setRange(self, first, last):
+        self.setHeader("Range", "bytes={}-{}".format(first, last))
+
+    def setETag(self, etag):
+        self.setHeader("If-None-Match", etag)
+
+class CreateImageUpload(ServiceAPI):
+    def __init__(self, host, port, token):
+        super(CreateImageUpload, self).__init__()
+        
+        self.setHttpMethod("POST")
+        self.setHost(host)
+        self.setPort(port)
+        self.setToken(token)
+
+        self._payload = {}
+        self.setPayload(self._payload)
+        self.setURL("tscharts/v1/image/upload/")       
+
+    def setClinic(self, clinic):
+        self._payload["clinic"] = clinic
+        self.setPayload(self._payload)
+    
+    def setStation(self, station):
+        self._payload["station"] = station
+        self.setPayload(self._payload)
+    
+    def setPatient(self, patient):
+        self._payload["patient"] = patient
+        self.setPayload(self._payload)
+    
+    def setType(self, imagetype):
+        self._payload["type"] = imagetype
+        self.setPayload(self._payload)
+
+    def setSize(self, size):
+        self._payload["size"] = size
+        self.setPayload(self._payload)
+
+class GetImageUpload(ServiceAPI):
+    def __init__(self, host, port, token, id):
+        super(GetImageUpload, self).__init__()
+        
+        self.setHttpMethod("GET")
+        self.setHost(host)
+        self.setPort(port)
+        self.setToken(token)
+        self.setURL("tscharts/v1/image/upload/{}/".format(id))
+
+class PutImageUploadChunk(ServiceAPI):
+    def __init__(self, host, port, token, id, chunk, data):
+        super(PutImageUploadChunk, self).__init__()
+        
+        self.setHttpMethod("PUT")
+        self.setHost(host)
+        self.setPort(port)
+        self.setToken(token)
+        self.setHeader("Content-Type", "application/octet-stream")
+        self.setBody(data)
+        self.setURL("tscharts/v1/image/upload/{}/{}/".format(id, chunk))
+
+class CommitImageUpload(ServiceAPI):
+    def __init__(self, host, port, token, id, sha256):
+        super(CommitImageUpload, self).__init__()
+        
+        self.setHttpMethod("POST")
+        self.setHost(host)
+        self.setPort(port)
+        self.setToken(token)
+        self.setPayload({"sha256": sha256})
+        self.setURL("tscharts/v1/image/upload/{}/".format(id))
+
+class DeleteImageUpload(ServiceAPI):
+    def __init__(self, host, port, token, id):
+        super(DeleteImageUpload, self).__init__()
+        
+        self.setHttpMethod("DELETE")
+        self.setHost(host)
+        self.setPort(port)
+        self.setToken(token)
+        self.setURL("tscharts/v1/image/upload/{}/".format(id))
+
+class ImageUploader(object):
+    '''
+    upload an image file in chunks, retrying requests that fail, e.g., on
+    a dropped connection. An upload that still fails can be resumed later
+    by another ImageUploader, with the same chunk size, given the id from
+    getUploadId(). upload() returns (status, json) like ServiceAPI.send(),
+    json having the id of the image.
+    '''
+
+    def __init__(self, host, port, token, chunksize=1024 * 1024, retries=5):
+        super(ImageUploader, self).__init__()
+        self._host = host
+        self._port = port
+        self._token = token
+        self._chunksize = chunksize
+        self._retries = retries
+        self._uploadid = None
+        self._clinic = None
+        self._station = None
+        self._patient = None
+        self._type = None
+
+    def setClinic(self, clinic):
+        self._clinic = clinic
+
+    def setStation(self, station):
+        self._station = station
+
+    def setPatient(self, patient):
+        self._patient = patient
+
+    def setType(self, imagetype):
+        self._type = imagetype
+
+    def setUploadId(self, id):
+        self._uploadid = id
+
+    def getUploadId(self):
+        return self._uploadid
+
+    def sendWithRetries(self, x, timeout):
+        ret = (500, {})
+        for i in range(self._retries):
+            try:
+                ret = x.send(timeout=timeout)
+            except Exception:
+                ret = (500, {})
+            if ret[0] < 500:
+                break
+            time.sleep(2 ** i)
+        return ret
+
+    def upload(self, path, timeout=30):
+        size = os.path.getsize(path)
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(self._chunksize)
+                if not data:
+                    break
+                h.update(data)
+
+        received = []
+        if self._uploadid == None:
+            x = CreateImageUpload(self._host, self._port, self._token)
+            if self._clinic != None:
+                x.setClinic(self._clinic)
+            if self._station != None:
+                x.setStation(self._station)
+            x.setPatient(self._patient)
+            x.setType(self._type)
+            x.setSize(size)
+            ret = self.sendWithRetries(x, timeout)
+            if ret[0] != 200:
+                return ret
+            self._uploadid = int(ret[1]["id"])
+            self._chunksize = min(self._chunksize, int(ret[1]["chunksize"]))
+        else:
+            x = GetImageUpload(self._host, self._port, self._token, self._uploadid)
+            ret = self.sendWithRetries(x, timeout)
+            if ret[0] != 200:
+                return ret
+            if ret[1]["image"] != None:
+                return (200, {"id": ret[1]["image"]})
+            received = ret[1]["chunks"]
+
+        with open(path, "rb") as f:
+            n = 0
+            while True:
+                data = f.read(self._chunksize)
+                if not data:
+                    break
+                if not n in received:
+                    x = PutImageUploadChunk(self._host, self._port, self._token, self._uploadid, n, data)
+                    ret = self.sendWithRetries(x, timeout)
+                    if ret[0] != 200:
+                        return ret
+                n += 1
+
+        x = CommitImageUpload(self._host, self._port, self._token, self._uploadid, h.hexdigest())
+        return self.sendWithRetries(x, timeout)
+
 class TestTSImage(unittest.TestCase):
 
     def setUp(self):
@@ -389,6 +626,486 @@ class TestTSImage(unittest.TestCase):
         ret = x.send(timeout=30)
         self.assertEqual(ret[0], 200)
 
+    def testImageData(self):
+        x = CreateClinic(host, port, token, "Ensenada", "02/05/2016", "02/06/2016")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        clinicid = int(ret[1]["id"])
+
+        x = CreateStation(host, port, token, "ENT")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        stationid = int(ret[1]["id"])
+
+        data = {}
+        data["paternal_last"] = "abcd1234"
+        data["maternal_last"] = "yyyyyy"
+        data["first"] = "zzzzzzz"
+        data["middle"] = ""
+        data["suffix"] = "Jr."
+        data["prefix"] = ""
+        data["dob"] = "04/01/1962"
+        data["gender"] = "Female"
+        data["street1"] = "1234 First Ave"
+        data["street2"] = ""
+        data["city"] = "Ensenada"
+        data["colonia"] = ""
+        data["state"] = u"Baja California"
+        data["phone1"] = "1-111-111-1111"
+        data["phone2"] = ""
+        data["email"] = "patient@example.com"
+        data["emergencyfullname"] = "Maria Sanchez"
+        data["emergencyphone"] = "1-222-222-2222"
+        data["emergencyemail"] = "maria.sanchez@example.com"
+
+        x = CreatePatient(host, port, token, data)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        patientid = int(ret[1]["id"])
+
+        # PNG signature followed by arbitrary bytes
+
+        imagedata = b"\x89PNG\r\n\x1a\n" + bytes(bytearray(range(256))) * 40
+        encoded = base64.b64encode(imagedata).decode("ascii")
+
+        x = CreateImage(host, port, token)
+        x.setPatient(patientid)
+        x.setClinic(clinicid)
+        x.setStation(stationid)
+        x.setType("Xray")
+        x.setData(encoded)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        id = int(ret[1]["id"])
+
+        # legacy clients still get base64 in JSON
+
+        x = GetImage(host, port, token)
+        x.setId(id)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)  
+        self.assertEqual(ret[1]["data"], encoded)
+
+        x = GetImageData(host, port, token, id)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)  
+        self.assertEqual(x.getResponseContent(), imagedata)
+        self.assertEqual(x.getResponseHeader("Content-Type"), "image/png")
+        etag = x.getResponseHeader("ETag")
+        self.assertEqual(etag, '"{}"'.format(hashlib.sha256(imagedata).hexdigest()))
+
+        x = GetImageData(host, port, token, id)
+        x.setETag(etag)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 304)  
+
+        x = GetImageData(host, port, token, id)
+        x.setRange(100, 199)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 206)  
+        self.assertEqual(x.getResponseContent(), imagedata[100:200])
+        self.assertEqual(x.getResponseHeader("Content-Range"), "bytes 100-199/{}".format(len(imagedata)))
+
+        x = GetImageData(host, port, token, id)
+        x.setRange(len(imagedata), len(imagedata) + 10)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 416)  
+
+        x = DeleteImage(host, port, token, id)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = GetImageData(host, port, token, id)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 404)  
+
+        x = DeletePatient(host, port, token, patientid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = DeleteStation(host, port, token, stationid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = DeleteClinic(host, port, token, clinicid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+    def testImageUpload(self):
+        x = CreateClinic(host, port, token, "Ensenada", "02/05/2016", "02/06/2016")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        clinicid = int(ret[1]["id"])
+
+        x = CreateStation(host, port, token, "ENT")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        stationid = int(ret[1]["id"])
+
+        data = {}
+        data["paternal_last"] = "abcd1234"
+        data["maternal_last"] = "yyyyyy"
+        data["first"] = "zzzzzzz"
+        data["middle"] = ""
+        data["suffix"] = "Jr."
+        data["prefix"] = ""
+        data["dob"] = "04/01/1962"
+        data["gender"] = "Female"
+        data["street1"] = "1234 First Ave"
+        data["street2"] = ""
+        data["city"] = "Ensenada"
+        data["colonia"] = ""
+        data["state"] = u"Baja California"
+        data["phone1"] = "1-111-111-1111"
+        data["phone2"] = ""
+        data["email"] = "patient@example.com"
+        data["emergencyfullname"] = "Maria Sanchez"
+        data["emergencyphone"] = "1-222-222-2222"
+        data["emergencyemail"] = "maria.sanchez@example.com"
+
+        x = CreatePatient(host, port, token, data)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        patientid = int(ret[1]["id"])
+
+        imagedata = b"\x89PNG\r\n\x1a\n" + bytes(bytearray([randint(0, 255) for i in range(10000)]))
+        sha256 = hashlib.sha256(imagedata).hexdigest()
+        chunks = [imagedata[0:4000], imagedata[4000:8000], imagedata[8000:]]
+
+        x = CreateImageUpload(host, port, token)
+        x.setPatient(patientid)
+        x.setClinic(clinicid)
+        x.setStation(stationid)
+        x.setType("Xray")
+        x.setSize(len(imagedata))
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        uploadid = int(ret[1]["id"])
+        self.assertTrue(ret[1]["chunksize"] >= 4000)
+
+        # chunks may arrive in any order, and be sent again
+
+        for n in [2, 0, 0]:
+            x = PutImageUploadChunk(host, port, token, uploadid, n, chunks[n])
+            ret = x.send(timeout=30)
+            self.assertEqual(ret[0], 200)
+            self.assertEqual(ret[1]["size"], len(chunks[n]))
+
+        x = GetImageUpload(host, port, token, uploadid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertEqual(ret[1]["chunks"], [0, 2])
+        self.assertEqual(ret[1]["received"], len(chunks[0]) + len(chunks[2]))
+        self.assertEqual(ret[1]["size"], len(imagedata))
+        self.assertEqual(ret[1]["image"], None)
+
+        x = CommitImageUpload(host, port, token, uploadid, sha256)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 400)
+
+        x = PutImageUploadChunk(host, port, token, uploadid, 1, chunks[2])
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = CommitImageUpload(host, port, token, uploadid, sha256)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 400)
+
+        x = PutImageUploadChunk(host, port, token, uploadid, 1, chunks[1])
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = CommitImageUpload(host, port, token, uploadid, "0" * 64)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 400)
+
+        x = CommitImageUpload(host, port, token, uploadid, sha256)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        id = int(ret[1]["id"])
+
+        # a commit that is sent again gets the same image
+
+        x = CommitImageUpload(host, port, token, uploadid, sha256)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertEqual(int(ret[1]["id"]), id)
+
+        x = GetImageData(host, port, token, id)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)  
+        self.assertEqual(x.getResponseContent(), imagedata)
+        self.assertEqual(x.getResponseHeader("Content-Type"), "image/png")
+
+        x = DeleteImageUpload(host, port, token, uploadid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = GetImageUpload(host, port, token, uploadid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 404)
+
+        x = DeleteImage(host, port, token, id)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        # the same, with the client
+
+        f = tempfile.NamedTemporaryFile(delete=False)
+        f.write(imagedata)
+        f.close()
+
+        x = ImageUploader(host, port, token, chunksize=3000)
+        x.setPatient(patientid)
+        x.setClinic(clinicid)
+        x.setStation(stationid)
+        x.setType("Xray")
+        ret = x.upload(f.name)
+        os.remove(f.name)
+        self.assertEqual(ret[0], 200)
+        id = int(ret[1]["id"])
+
+        x = GetImageData(host, port, token, id)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)  
+        self.assertEqual(x.getResponseContent(), imagedata)
+
+        x = DeleteImage(host, port, token, id)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        # bad requests
+
+        x = CreateImageUpload(host, port, token)
+        x.setPatient(patientid)
+        x.setType("Xray")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 400)
+
+        x = CreateImageUpload(host, port, token)
+        x.setPatient(9999999)
+        x.setType("Xray")
+        x.setSize(100)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 404)
+
+        x = PutImageUploadChunk(host, port, token, 9999999, 0, chunks[0])
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 404)
+
+        x = DeletePatient(host, port, token, patientid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = DeleteStation(host, port, token, stationid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = DeleteClinic(host, port, token, clinicid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+    def testImageDuplicates(self):
+        x = CreateClinic(host, port, token, "Ensenada", "02/05/2016", "02/06/2016")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        clinicid = int(ret[1]["id"])
+
+        x = CreateStation(host, port, token, "ENT")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        stationid = int(ret[1]["id"])
+
+        data = {}
+        data["paternal_last"] = "abcd1234"
+        data["maternal_last"] = "yyyyyy"
+        data["first"] = "zzzzzzz"
+        data["middle"] = ""
+        data["suffix"] = "Jr."
+        data["prefix"] = ""
+        data["dob"] = "04/01/1962"
+        data["gender"] = "Female"
+        data["street1"] = "1234 First Ave"
+        data["street2"] = ""
+        data["city"] = "Ensenada"
+        data["colonia"] = ""
+        data["state"] = u"Baja California"
+        data["phone1"] = "1-111-111-1111"
+        data["phone2"] = ""
+        data["email"] = "patient@example.com"
+        data["emergencyfullname"] = "Maria Sanchez"
+        data["emergencyphone"] = "1-222-222-2222"
+        data["emergencyemail"] = "maria.sanchez@example.com"
+
+        x = CreatePatient(host, port, token, data)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        patientid = int(ret[1]["id"])
+
+        # the same content, uploaded twice, shares a file. Deleting one
+        # image must not affect the other
+
+        imagedata = b"\xff\xd8\xff" + bytes(bytearray([randint(0, 255) for i in range(4096)]))
+        encoded = base64.b64encode(imagedata).decode("ascii")
+
+        ids = []
+        for i in range(2):
+            x = CreateImage(host, port, token)
+            x.setPatient(patientid)
+            x.setClinic(clinicid)
+            x.setStation(stationid)
+            x.setType("Headshot")
+            x.setData(encoded)
+            ret = x.send(timeout=30)
+            self.assertEqual(ret[0], 200)
+            ids.append(int(ret[1]["id"]))
+        self.assertNotEqual(ids[0], ids[1])
+
+        x = DeleteImage(host, port, token, ids[0])
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = GetImage(host, port, token)
+        x.setId(ids[1])
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)  
+        self.assertEqual(ret[1]["data"], encoded)
+
+        x = GetImageData(host, port, token, ids[1])
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)  
+        self.assertEqual(x.getResponseContent(), imagedata)
+
+        # once all are deleted, the content can be stored again
+
+        x = DeleteImage(host, port, token, ids[1])
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = CreateImage(host, port, token)
+        x.setPatient(patientid)
+        x.setClinic(clinicid)
+        x.setStation(stationid)
+        x.setType("Headshot")
+        x.setData(encoded)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        id = int(ret[1]["id"])
+
+        x = GetImageData(host, port, token, id)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)  
+        self.assertEqual(x.getResponseContent(), imagedata)
+
+        x = DeleteImage(host, port, token, id)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = DeletePatient(host, port, token, patientid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = DeleteStation(host, port, token, stationid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = DeleteClinic(host, port, token, clinicid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+    def testImageRenditions(self):
+        x = CreateClinic(host, port, token, "Ensenada", "02/05/2016", "02/06/2016")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        clinicid = int(ret[1]["id"])
+
+        x = CreateStation(host, port, token, "ENT")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        stationid = int(ret[1]["id"])
+
+        data = {}
+        data["paternal_last"] = "abcd1234"
+        data["maternal_last"] = "yyyyyy"
+        data["first"] = "zzzzzzz"
+        data["middle"] = ""
+        data["suffix"] = "Jr."
+        data["prefix"] = ""
+        data["dob"] = "04/01/1962"
+        data["gender"] = "Female"
+        data["street1"] = "1234 First Ave"
+        data["street2"] = ""
+        data["city"] = "Ensenada"
+        data["colonia"] = ""
+        data["state"] = u"Baja California"
+        data["phone1"] = "1-111-111-1111"
+        data["phone2"] = ""
+        data["email"] = "patient@example.com"
+        data["emergencyfullname"] = "Maria Sanchez"
+        data["emergencyphone"] = "1-222-222-2222"
+        data["emergencyemail"] = "maria.sanchez@example.com"
+
+        x = CreatePatient(host, port, token, data)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        patientid = int(ret[1]["id"])
+
+        # a 1x1 PNG
+
+        encoded = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+
+        x = CreateImage(host, port, token)
+        x.setPatient(patientid)
+        x.setClinic(clinicid)
+        x.setStation(stationid)
+        x.setType("Headshot")
+        x.setData(encoded)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        id = int(ret[1]["id"])
+
+        x = GetImageData(host, port, token, id)
+        x.setRendition("thumb")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)  
+        self.assertEqual(x.getResponseHeader("Content-Type"), "image/jpeg")
+        self.assertTrue(x.getResponseContent().startswith(b"\xff\xd8\xff"))
+
+        x = GetImage(host, port, token)
+        x.setId(id)
+        x.setSize(100)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)  
+        self.assertTrue(base64.b64decode(ret[1]["data"]).startswith(b"\xff\xd8\xff"))
+
+        x = GetImage(host, port, token)
+        x.setId(id)
+        x.setRendition("yadda")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 400)  
+
+        x = GetImage(host, port, token)
+        x.setId(id)
+        x.setSize(-1)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 400)  
+
+        x = DeleteImage(host, port, token, id)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = DeletePatient(host, port, token, patientid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = DeleteStation(host, port, token, stationid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = DeleteClinic(host, port, token, clinicid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
     def testDeleteImage(self):
         x = CreateClinic(host, port, token, "Ensenada", "02/05/2016", "02/06/2016")
         ret = x.send(timeout=30)
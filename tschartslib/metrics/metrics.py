@@ -0,0 +1,114 @@
+#(C) Copyright Syd Logan 2026
+#(C) Copyright Thousand Smiles Foundation 2026
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#
+#You may obtain a copy of the License at
+#http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+
+'''
+unit tests for metrics application. Assumes django server is up
+and running on the specified host and port.
+'''
+
+import unittest
+import getopt, sys
+
+from tschartslib.service.serviceapi import ServiceAPI
+from tschartslib.tscharts.tscharts import Login
+from tschartslib.clinic.clinic import CreateClinic, GetAllClinics, DeleteClinic
+
+class GetMetrics(ServiceAPI):
+    def __init__(self, host, port, token):
+        super(GetMetrics, self).__init__()
+        
+        self.setHttpMethod("GET")
+        self.setHost(host)
+        self.setPort(port)
+        self.setToken(token)
+        self.setHeader("Accept", "text/plain")
+        self.setURL("tscharts/v1/metrics/")
+
+class TestTSMetrics(unittest.TestCase):
+
+    def setUp(self):
+        login = Login(host, port, username, password)
+        ret = login.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertTrue("token" in ret[1])
+        global token
+        token = ret[1]["token"]
+
+    def testGetMetrics(self):
+        # with no clinics, GET clinic is a 404, so create one
+
+        x = CreateClinic(host, port, token, "Ensenada", "02/05/2016", "02/06/2016")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertTrue("id" in ret[1])
+        clinicid = int(ret[1]["id"])
+
+        x = GetAllClinics(host, port, token)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = GetMetrics(host, port, token)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertTrue(x.getResponseHeader("Content-Type").startswith("text/plain"))
+        text = x.getResponseContent().decode("utf-8")
+        self.assertTrue("# TYPE tscharts_requests_total counter" in text)
+        self.assertTrue('tscharts_requests_total{route="/tscharts/v1/clinic/",method="GET",status="200"}' in text)
+        self.assertTrue('tscharts_request_db_queries_count{route="/tscharts/v1/clinic/",method="GET"}' in text)
+        self.assertTrue('tscharts_request_duration_seconds_bucket{route="/tscharts/v1/clinic/",method="GET",le="+Inf"}' in text)
+        self.assertTrue('tscharts_requests_total{route="/tscharts/v1/clinic/",method="POST",status="200"}' in text)
+
+        x = DeleteClinic(host, port, token, clinicid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+    def testGetMetricsNotAuthenticated(self):
+        x = GetMetrics(host, port, None)
+        ret = x.send(timeout=30)
+        self.assertTrue(ret[0] in [401, 403])
+
+def usage():
+    print("metrics [-h host] [-p port] [-u username] [-w password]") 
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "h:p:u:w:")
+    except getopt.GetoptError as err:
+        print(str(err))
+        usage()
+        sys.exit(2)
+    global host
+    host = "127.0.0.1"
+    global port
+    port = 8000
+    global username
+    username = None
+    global password
+    password = None
+    for o, a in opts:
+        if o == "-h":
+            host = a
+        elif o == "-p":
+            port = int(a)
+        elif o == "-u":
+            username = a
+        elif o == "-w":
+            password = a
+        else:   
+            assert False, "unhandled option"
+    unittest.main(argv=[sys.argv[0]])
+
+if __name__ == "__main__":
+    main()
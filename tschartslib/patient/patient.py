@@ -131,6 +131,46 @@ class GetPatient(ServiceAPI):
             base += "gender={}".format(self._gender)
             hasQArgs = True 
 
+        if not self._clinic == None:
+            if not hasQArgs:
+                base += "?"
+            else:
+                base += "&"
+            base += "clinic={}".format(self._clinic)
+            hasQArgs = True 
+
+        if not self._registered == None:
+            if not hasQArgs:
+                base += "?"
+            else:
+                base += "&"
+            base += "registered={}".format(self._registered)
+            hasQArgs = True 
+
+        if not self._offset == None:
+            if not hasQArgs:
+                base += "?"
+            else:
+                base += "&"
+            base += "offset={}".format(self._offset)
+            hasQArgs = True 
+
+        if not self._limit == None:
+            if not hasQArgs:
+                base += "?"
+            else:
+                base += "&"
+            base += "limit={}".format(self._limit)
+            hasQArgs = True 
+
+        if not self._summary == None:
+            if not hasQArgs:
+                base += "?"
+            else:
+                base += "&"
+            base += "summary={}".format("true" if self._summary else "false")
+            hasQArgs = True 
+
         self.setURL(base)
 
     def __init__(self, host, port, token):
@@ -149,6 +189,11 @@ class GetPatient(ServiceAPI):
         self._curp = None
         self._oldid = None
         self._exact = None
+        self._clinic = None
+        self._registered = None
+        self._offset = None
+        self._limit = None
+        self._summary = None
         self.makeURL();
 
     def setId(self, id):
@@ -187,6 +232,26 @@ class GetPatient(ServiceAPI):
         self._dob = val;
         self.makeURL()
 
+    def setClinic(self, val):
+        self._clinic = val
+        self.makeURL()
+
+    def setRegistered(self, val):
+        self._registered = val
+        self.makeURL()
+
+    def setOffset(self, val):
+        self._offset = val
+        self.makeURL()
+
+    def setLimit(self, val):
+        self._limit = val
+        self.makeURL()
+
+    def setSummary(self, val):
+        self._summary = val
+        self.makeURL()
+
 class DeletePatient(ServiceAPI):
     def __init__(self, host, port, token, id):
         super(DeletePatient, self).__init__()
@@ -1029,6 +1094,152 @@ class TestTSPatient(unittest.TestCase):
         if len(ids):
             self.assertTrue("failed to remove items {}".format(ids) == None)
 
+    def testSearchPatientByName(self):
+        ids = []
+
+        data = {}
+        data["paternal_last"] = "Gonzalez"
+        data["maternal_last"] = "Qwertyuiop"
+        data["first"] = u"Mar\u00eda"
+        data["middle"] = ""
+        data["suffix"] = ""
+        data["prefix"] = ""
+        data["dob"] = "04/01/1962"
+        data["gender"] = "Female"
+        data["street1"] = "1234 First Ave"
+        data["street2"] = ""
+        data["city"] = "Ensenada"
+        data["colonia"] = ""
+        data["state"] = u"Baja California"
+        data["phone1"] = "1-111-111-1111"
+        data["phone2"] = ""
+        data["email"] = "patient@example.com"
+        data["emergencyfullname"] = "Maria Sanchez"
+        data["emergencyphone"] = "1-222-222-2222"
+        data["emergencyemail"] = "maria.sanchez@example.com"
+        data["curp"] = "QWER-620401"
+        data["oldid"] = 9999
+
+        x = CreatePatient(host, port, token, data)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        ids.append(ret[1]["id"])
+        mariaid = ret[1]["id"]
+
+        data["paternal_last"] = "Qwertyuiopx"
+        data["maternal_last"] = "Lopez"
+        data["first"] = "Jose"
+        data["curp"] = "QWER-620402"
+        x = CreatePatient(host, port, token, data)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        ids.append(ret[1]["id"])
+        joseid = ret[1]["id"]
+
+        # exact match ranks before prefix match
+
+        x = GetPatient(host, port, token)
+        x.setName("qwertyuiop")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertTrue(ret[1].index(mariaid) < ret[1].index(joseid))
+
+        # accents and case are ignored, every word must match
+
+        x = GetPatient(host, port, token)
+        x.setName("MARIA qwertyuiop")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertTrue(mariaid in ret[1])
+        self.assertFalse(joseid in ret[1])
+
+        # middle of a word, and a misspelling
+
+        x = GetPatient(host, port, token)
+        x.setName("rtyuiopx")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertTrue(ret[1][0] == joseid)
+
+        x = GetPatient(host, port, token)
+        x.setName("qwertyuiop gonzales")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertTrue(mariaid in ret[1])
+
+        # CURP
+
+        x = GetPatient(host, port, token)
+        x.setName("qwer-620402")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertTrue(ret[1][0] == joseid)
+
+        # paging and summaries
+
+        x = GetPatient(host, port, token)
+        x.setName("qwertyuiop")
+        x.setLimit(1)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertEqual(ret[1], [mariaid])
+
+        x.setOffset(1)
+        x.setSummary(True)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertEqual(len(ret[1]), 1)
+        self.assertEqual(ret[1][0]["id"], joseid)
+        self.assertEqual(ret[1][0]["first"], "Jose")
+        self.assertEqual(ret[1][0]["dob"], "04/01/1962")
+        self.assertEqual(ret[1][0]["gender"], "Female")
+
+        x.setOffset(1000000)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertEqual(ret[1], [])
+
+        x = GetPatient(host, port, token)
+        x.setName("qwertyuiop")
+        x.setLimit(0)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 400)
+
+        x = GetPatient(host, port, token)
+        x.setName("qwertyuiop")
+        x.setOffset("xyz")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 400)
+
+        x = GetPatient(host, port, token)
+        x.setName("zxcvbnmzxcvbnm")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 404)
+
+        # the index follows updates
+
+        data["paternal_last"] = "Asdfghjklx"
+        x = UpdatePatient(host, port, token, joseid, data)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = GetPatient(host, port, token)
+        x.setName("asdfghjklx")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertEqual(ret[1], [joseid])
+
+        x = GetPatient(host, port, token)
+        x.setName("qwertyuiopx")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertFalse(joseid in ret[1])
+
+        for x in ids:
+            x = DeletePatient(host, port, token, x)
+            ret = x.send(timeout=30)
+            self.assertEqual(ret[0], 200)
+
     def testGetAllPatients(self):
         ids = []
 
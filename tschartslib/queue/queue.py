@@ -136,6 +136,36 @@ class TestTSQueue(unittest.TestCase):
         ret = x.send(timeout=30)
         self.assertEqual(ret[0], 200)
 
+    def testGetQueuesServiceTimes(self):
+        x = GetQueue(host, port, token)
+        x.setClinic(clinicid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        for q in ret[1]["queues"]:
+            self.assertTrue("avgservicetime" in q)
+            self.assertTrue("p50servicetime" in q)
+            self.assertTrue("p90servicetime" in q)
+
+    def testGetQueuesNotModified(self):
+        x = GetQueue(host, port, token)
+        x.setClinic(clinicid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        etag = x.getResponseHeader("ETag")
+        self.assertTrue(etag != None)
+
+        x.setHeader("If-None-Match", etag)
+        ret = x.send(timeout=30)
+        if ret[0] == 200:
+            # scheduler updated the queues in between, etag must differ
+            self.assertNotEqual(x.getResponseHeader("ETag"), etag)
+        else:
+            self.assertEqual(ret[0], 304)
+
+        x.setHeader("If-None-Match", '"stale"')
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
     def testGetQueuesForBadClinic(self):
         x = GetQueue(host, port, token)
         x.setClinic(9999)
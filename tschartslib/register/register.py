@@ -25,7 +25,7 @@ import time
 
 from tschartslib.service.serviceapi import ServiceAPI
 from tschartslib.tscharts.tscharts import Login, Logout
-from tschartslib.patient.patient import CreatePatient, DeletePatient
+from tschartslib.patient.patient import CreatePatient, GetPatient, DeletePatient
 from tschartslib.clinic.clinic import CreateClinic, DeleteClinic
 
 class CreateRegistration(ServiceAPI):
@@ -829,6 +829,129 @@ class TestTSRegistration(unittest.TestCase):
         ret = x.send(timeout=30)
         self.assertEqual(ret[0], 200)
 
+    def testGetRegisteredPatients(self):
+        x = CreateClinic(host, port, token, "Ensenada", "02/05/2016", "02/06/2016")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        clinicid = int(ret[1]["id"])
+
+        data = {}
+
+        data["curp"] = "123456abcdefg"
+        data["paternal_last"] = "abcd1234"
+        data["maternal_last"] = "yyyyyy"
+        data["first"] = "zzzzzzz"
+        data["middle"] = ""
+        data["suffix"] = "Jr."
+        data["prefix"] = ""
+        data["dob"] = "04/01/1962"
+        data["gender"] = "Female"
+        data["street1"] = "1234 First Ave"
+        data["street2"] = ""
+        data["city"] = "Ensenada"
+        data["colonia"] = ""
+        data["state"] = u"Baja California"
+        data["phone1"] = "1-111-111-1111"
+        data["phone2"] = ""
+        data["email"] = "patient@example.com"
+        data["emergencyfullname"] = "Maria Sanchez"
+        data["emergencyphone"] = "1-222-222-2222"
+        data["emergencyemail"] = "maria.sanchez@example.com"
+
+        patientids = []
+        registrationids = []
+        for i in range(0, 3):
+            data["first"] = "zzzzzzz{}".format(i)
+            x = CreatePatient(host, port, token, data)
+            ret = x.send(timeout=30)
+            self.assertEqual(ret[0], 200)
+            patientids.append(int(ret[1]["id"]))
+
+        # the first two are registered, and the second checked out
+
+        for i in range(0, 2):
+            x = CreateRegistration(host, port, token, patient=patientids[i], clinic=clinicid)
+            ret = x.send(timeout=30)
+            self.assertEqual(ret[0], 200)
+            registrationids.append(int(ret[1]["id"]))
+
+        x = UpdateRegistration(host, port, token, registrationids[1])
+        x.setState("Checked Out")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = GetPatient(host, port, token)
+        x.setClinic(clinicid)
+        x.setRegistered("any")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertEqual(ret[1], patientids[0:2])
+
+        x.setRegistered("Checked In")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertEqual(ret[1], [patientids[0]])
+
+        x.setRegistered("Checked Out")
+        x.setSummary(True)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertEqual(len(ret[1]), 1)
+        self.assertEqual(ret[1][0]["id"], patientids[1])
+        self.assertEqual(ret[1][0]["first"], "zzzzzzz1")
+        self.assertEqual(ret[1][0]["curp"], "123456abcdefg")
+
+        x.setRegistered("any")
+        x.setLimit(1)
+        x.setOffset(1)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertEqual(len(ret[1]), 1)
+        self.assertEqual(ret[1][0]["id"], patientids[1])
+
+        # other search terms combine with the registration filter
+
+        x = GetPatient(host, port, token)
+        x.setClinic(clinicid)
+        x.setRegistered("any")
+        x.setFirstName("zzzzzzz0")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertEqual(ret[1], [patientids[0]])
+
+        x = GetPatient(host, port, token)
+        x.setClinic(clinicid)
+        x.setRegistered("any")
+        x.setFirstName("zzzzzzz2")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 404)
+
+        x = GetPatient(host, port, token)
+        x.setClinic(clinicid)
+        x.setRegistered("foo")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 400)
+
+        x = GetPatient(host, port, token)
+        x.setClinic(9999)
+        x.setRegistered("any")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 404)
+
+        for id in registrationids:
+            x = DeleteRegistration(host, port, token, id)
+            ret = x.send(timeout=30)
+            self.assertEqual(ret[0], 200)
+
+        x = DeleteClinic(host, port, token, clinicid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        for id in patientids:
+            x = DeletePatient(host, port, token, id)
+            ret = x.send(timeout=30)
+            self.assertEqual(ret[0], 200)
+
 def usage():
     print("register [-h host] [-p port] [-u username] [-w password]") 
 
@@ -88,6 +88,14 @@ class GetRoutingSlip(ServiceAPI):
             base += "category={}".format(self._category)
             hasQArgs = True
 
+        if not self._expand == None:
+            if not hasQArgs:
+                base += "?"
+            else:
+                base += "&"
+            base += "expand={}".format(self._expand)
+            hasQArgs = True
+
         self.setURL(base)
 
     def __init__(self, host, port, token):
@@ -105,6 +113,7 @@ class GetRoutingSlip(ServiceAPI):
         self._clinic = None
         self._category = None
         self._id = None
+        self._expand = None
 
     def setCategory(self, val):
         self._category = val
@@ -122,6 +131,10 @@ class GetRoutingSlip(ServiceAPI):
         self._id = id
         self.makeURL()
 
+    def setExpand(self, expand):
+        self._expand = expand
+        self.makeURL()
+
 class UpdateRoutingSlip(ServiceAPI):
     def __init__(self, host, port, token, id, category):
         super(UpdateRoutingSlip, self).__init__()
@@ -1055,6 +1068,127 @@ class TestTSRoutingSlipEntry(unittest.TestCase):
         global token
         token = ret[1]["token"]
 
+    def testGetRoutingSlipExpanded(self):
+        x = CreateClinic(host, port, token, "Ensenada", "02/05/2016", "02/06/2016")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertTrue("id" in ret[1])
+        clinicid = int(ret[1]["id"])
+
+        data = {}
+        data["paternal_last"] = "abcd1234"
+        data["maternal_last"] = "yyyyyy"
+        data["first"] = "zzzzzzz"
+        data["middle"] = ""
+        data["suffix"] = "Jr."
+        data["prefix"] = ""
+        data["dob"] = "04/01/1962"
+        data["gender"] = "Female"
+        data["street1"] = "1234 First Ave"
+        data["street2"] = ""
+        data["city"] = "Ensenada"
+        data["colonia"] = ""
+        data["state"] = u"Baja California"
+        data["phone1"] = "1-111-111-1111"
+        data["phone2"] = ""
+        data["email"] = "patient@example.com"
+        data["emergencyfullname"] = "Maria Sanchez"
+        data["emergencyphone"] = "1-222-222-2222"
+        data["emergencyemail"] = "maria.sanchez@example.com"
+
+        x = CreatePatient(host, port, token, data)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        patientid = int(ret[1]["id"])
+
+        stationids = []
+        for name in ["ENT", "Dental"]:
+            x = CreateStation(host, port, token, name)
+            ret = x.send(timeout=30)
+            self.assertEqual(ret[0], 200)
+            stationids.append(int(ret[1]["id"]))
+
+        x = CreateRoutingSlip(host, port, token)
+        x.setClinic(clinicid)
+        x.setPatient(patientid)
+        x.setCategory("New Cleft")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        routingslipid = int(ret[1]["id"])
+
+        entryids = []
+        for stationid in stationids:
+            x = CreateRoutingSlipEntry(host, port, token)
+            x.setRoutingSlip(routingslipid)
+            x.setStation(stationid)
+            ret = x.send(timeout=30)
+            self.assertEqual(ret[0], 200)
+            entryids.append(int(ret[1]["id"]))
+
+        x = GetRoutingSlip(host, port, token)
+        x.setId(routingslipid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertEqual(ret[1]["routing"], entryids)
+        self.assertTrue("entries" not in ret[1])
+
+        x.setExpand("entries")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertEqual(ret[1]["routing"], entryids)
+        self.assertEqual([y["id"] for y in ret[1]["entries"]], entryids)
+        for i in range(len(entryids)):
+            entry = ret[1]["entries"][i]
+            self.assertEqual(entry["routingslip"], routingslipid)
+            self.assertEqual(entry["station"], stationids[i])
+            self.assertEqual(entry["state"], "New")
+            self.assertTrue("order" in entry)
+            self.assertTrue("returntoclinicstation" in entry)
+
+        x = GetRoutingSlip(host, port, token)
+        x.setClinic(clinicid)
+        x.setExpand("entries")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertEqual(len(ret[1]), 1)
+        self.assertEqual([y["id"] for y in ret[1][0]["entries"]], entryids)
+
+        x = GetRoutingSlip(host, port, token)
+        x.setClinic(clinicid)
+        x.setPatient(patientid)
+        x.setExpand("entries")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertEqual([y["id"] for y in ret[1]["entries"]], entryids)
+
+        x = GetRoutingSlip(host, port, token)
+        x.setId(routingslipid)
+        x.setExpand("everything")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 400)
+
+        for routingslipentryid in entryids:
+            x = DeleteRoutingSlipEntry(host, port, token, routingslipentryid)
+            ret = x.send(timeout=30)
+            self.assertEqual(ret[0], 200)
+
+        for stationid in stationids:
+            x = DeleteStation(host, port, token, stationid)
+            ret = x.send(timeout=30)
+            self.assertEqual(ret[0], 200)
+
+        x = DeleteRoutingSlip(host, port, token, routingslipid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = DeleteClinic(host, port, token, clinicid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = DeletePatient(host, port, token, patientid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
     def testCreateRoutingSlipEntry(self):
         x = CreateClinic(host, port, token, "Ensenada", "02/05/2016", "02/06/2016")
         ret = x.send(timeout=30)
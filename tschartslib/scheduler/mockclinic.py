@@ -205,8 +205,8 @@ def checkinWorker(clinicstationid, mockclinic):
                                 r.setState("in")
                                 ret = r.send(timeout=30)
                                 if ret[0] == 200:
-                                    # do some work
-                                    t = randint(120, 180)
+                                    # do some work, slower stations have larger service factors
+                                    t = int(randint(120, 180) * mockclinic.getClinicStationServiceFactor(clinicstationid))
                                     print("checkinWorker: clinicstation {} starting work on patient {} for {} seconds".format(clinicstationid, entry["patient"], t))
                                     time.sleep(t)
 
@@ -253,6 +253,7 @@ def checkinWorker(clinicstationid, mockclinic):
                                             ret = y.send(timeout=30)
                                             if ret[0] == 200:
                                                 print("checkinWorker: set clinicstation {} active state to False".format(clinicstationid))
+                                                mockclinic.recordCheckout(clinicstationid)
                                             else:
                                                 print("checkinWorker: failed to set clinicstation active to false {}".format(ret[0]))
                                         else:
@@ -289,6 +290,10 @@ class MockClinic:
         self._patientids = []
         self._routingslipids = []
         self._routingslipentryids = []
+        self._clinicstationfactors = {}
+        self._checkouts = {}
+        self._checkoutLock = threading.Lock()
+        self._startTime = None
 
         self._categories = ["New Cleft", "Dental", "Returning Cleft", "Ortho", "Hearing Aids", "Ears", "Other"]
         self._doReturnToClinicStation = False 
@@ -317,6 +322,7 @@ class MockClinic:
         # service for some random duration, then checkouts while there are still
         # patients waiting to be seen
         threads = []
+        self._startTime = time.time()
         for x in self._clinicstationids:
             t = threading.Thread(target=checkinWorker, args=(x,self,))
             t.daemon = True
@@ -324,6 +330,21 @@ class MockClinic:
             threads.append(t)
         return threads
 
+    def getClinicStationServiceFactor(self, clinicstationid):
+        return self._clinicstationfactors.get(clinicstationid, 1.0)
+
+    def recordCheckout(self, clinicstationid):
+        # report throughput, used to compare scheduler assignment policies
+
+        self._checkoutLock.acquire()
+        try:
+            self._checkouts[clinicstationid] = self._checkouts.get(clinicstationid, 0) + 1
+            total = sum(self._checkouts.values())
+            elapsed = (time.time() - self._startTime) / 60.0
+            print("throughput: {} patients checked out in {:.1f} minutes, {:.1f} per hour, by clinicstation {}".format(total, elapsed, total * 60 / max(elapsed, 1), self._checkouts))
+        finally:
+            self._checkoutLock.release()
+
     def simulateAway(self):
         t = threading.Thread(target=awayWorker, args=(self,))
         t.daemon = True
@@ -402,7 +423,7 @@ class MockClinic:
             retval = int(ret[1]["id"])
         return retval
 
-    def createClinicStation(self, clinicid, stationid, name):
+    def createClinicStation(self, clinicid, stationid, name, servicefactor=1.0):
         retval = None        
         away = False
         active = False
@@ -414,6 +435,7 @@ class MockClinic:
         else:
             self._clinicstationids.append(int(ret[1]["id"]))
             retval = int(ret[1]["id"])
+            self._clinicstationfactors[retval] = servicefactor
         return retval
 
     def createPatient(self, data):
@@ -659,7 +681,7 @@ class MockClinic:
             elif y["name"] == "Surgery Screening":
                 self._surgery = station
             for z in y["stations"]:
-                self.createClinicStation(clinic, station, (z["name"], z["name_es"]))
+                self.createClinicStation(clinic, station, (z["name"], z["name_es"]), z.get("servicefactor", 1.0))
     
     def getXray(self):
         return self._xray
@@ -26,6 +26,10 @@ class ServiceAPI(object):
         self._token = None
         self._url = None
         self._payload = {}
+        self._body = None
+        self._headers = {}
+        self._responseHeaders = {}
+        self._responseContent = None
 
     def setHost(self, host):
         self._host = host
@@ -63,6 +67,32 @@ class ServiceAPI(object):
     def getPayload(self):
         return self._payload
 
+    def setBody(self, body):
+        # raw request body, sent instead of the JSON payload
+
+        self._body = body
+
+    def getBody(self):
+        return self._body
+
+    def setHeader(self, name, value):
+        self._headers[name] = value
+
+    def getHeaders(self):
+        return self._headers
+
+    def setResponseHeaders(self, headers):
+        self._responseHeaders = headers
+
+    def getResponseHeader(self, name):
+        return self._responseHeaders.get(name, None)
+
+    def setResponseContent(self, content):
+        self._responseContent = content
+
+    def getResponseContent(self):
+        return self._responseContent
+
     def getPayloadAsJSON(self):
         return json.dumps(OrderedDict(self.getPayload()))
 
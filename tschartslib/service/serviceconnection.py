@@ -77,6 +77,7 @@ class ServiceConnection():
     headers = {"Content-Type": "application/json"}
     if request.getToken():
         headers["Authorization"] = "Token {}".format(request.getToken())
+    headers.update(request.getHeaders())
     timeout = False
 
     isGet = False
@@ -94,7 +95,9 @@ class ServiceConnection():
 
     auth = self.getAuth()
 
-    payload = request.getPayloadAsJSON().encode("utf-8")
+    payload = request.getBody()
+    if payload == None:
+        payload = request.getPayloadAsJSON().encode("utf-8")
     proto = "http"
     if request.getPort() == 443:
         proto = "https"
@@ -124,6 +127,9 @@ class ServiceConnection():
     if timeout:
         r = RequestObj() 
         r.status_code = 500
+    else:
+        request.setResponseHeaders(r.headers)
+        request.setResponseContent(r.content)
 
     json_data = json.loads("{}")
     if r.status_code == 200:
@@ -85,6 +85,17 @@ class GetStateChange(ServiceAPI):
             base += "clinicstation={}".format(self._clinicstation)
             hasQArgs = True
 
+        for name, value in (("start", self._start), ("end", self._end), 
+                            ("state", self._state), ("limit", self._limit),
+                            ("cursor", self._cursor), ("columns", self._columns)):
+            if not value == None:
+                if not hasQArgs:
+                    base += "?"
+                else:
+                    base += "&"
+                base += "{}={}".format(name, value)
+                hasQArgs = True
+
         self.setURL(base)
 
     def __init__(self, host, port, token, id=None):
@@ -102,6 +113,12 @@ class GetStateChange(ServiceAPI):
         self._clinic = None
         self._clinicstation = None
         self._id = None
+        self._start = None
+        self._end = None
+        self._state = None
+        self._limit = None
+        self._cursor = None
+        self._columns = None
 
     def setClinicStation(self, clinic_station):
         self._clinicstation = clinic_station
@@ -119,6 +136,30 @@ class GetStateChange(ServiceAPI):
         self._id = id
         self.makeURL()
 
+    def setStart(self, start):
+        self._start = start
+        self.makeURL()
+
+    def setEnd(self, end):
+        self._end = end
+        self.makeURL()
+
+    def setState(self, state):
+        self._state = state
+        self.makeURL()
+
+    def setLimit(self, limit):
+        self._limit = limit
+        self.makeURL()
+
+    def setCursor(self, cursor):
+        self._cursor = cursor
+        self.makeURL()
+
+    def setColumns(self, columns):
+        self._columns = "true" if columns else "false"
+        self.makeURL()
+
 class DeleteStateChange(ServiceAPI):
     def __init__(self, host, port, token, id):
         super(DeleteStateChange, self).__init__()
@@ -752,6 +793,175 @@ class TestTSStateChange(unittest.TestCase):
         ret = x.send(timeout=30)
         self.assertEqual(ret[0], 200)
 
+    def testGetStateChangeTimeline(self):
+
+        x = CreateClinic(host, port, token, "Ensenada", "02/05/2016", "02/06/2016")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        clinicid = int(ret[1]["id"])
+
+        stationids = []
+        clinicstationids = []
+        for name in ("ENT", "Dental"):
+            x = CreateStation(host, port, token, name)
+            ret = x.send(timeout=30)
+            self.assertEqual(ret[0], 200)
+            stationids.append(int(ret[1]["id"]))
+
+            x = CreateClinicStation(host, port, token, clinicid, stationids[-1])
+            ret = x.send(timeout=30)
+            self.assertEqual(ret[0], 200)
+            clinicstationids.append(int(ret[1]["id"]))
+
+        data = {}
+        data["paternal_last"] = "abcd1234"
+        data["maternal_last"] = "yyyyyy"
+        data["first"] = "zzzzzzz"
+        data["middle"] = ""
+        data["suffix"] = "Jr."
+        data["prefix"] = ""
+        data["dob"] = "04/01/1962"
+        data["gender"] = "Female"
+        data["street1"] = "1234 First Ave"
+        data["street2"] = ""
+        data["city"] = "Ensenada"
+        data["colonia"] = ""
+        data["state"] = u"Baja California"
+        data["phone1"] = "1-111-111-1111"
+        data["phone2"] = ""
+        data["email"] = "patient@example.com"
+        data["emergencyfullname"] = "Maria Sanchez"
+        data["emergencyphone"] = "1-222-222-2222"
+        data["emergencyemail"] = "maria.sanchez@example.com"
+
+        x = CreatePatient(host, port, token, data)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        patientid = int(ret[1]["id"])
+
+        # in and out of each clinicstation
+
+        statechangeids = []
+        for clinicstationid in clinicstationids:
+            for state in ("in", "out"):
+                x = CreateStateChange(host, port, token)
+                x.setClinicStation(clinicstationid)
+                x.setPatient(patientid)
+                x.setState(state)
+                ret = x.send(timeout=30)
+                self.assertEqual(ret[0], 200)
+                statechangeids.append(int(ret[1]["id"]))
+
+        # the clinic timeline is ordered by time, across clinicstations
+
+        x = GetStateChange(host, port, token)
+        x.setClinic(clinicid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertEqual([y["id"] for y in ret[1]], statechangeids)
+
+        x.setState("out")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertEqual([y["id"] for y in ret[1]], [statechangeids[1], statechangeids[3]])
+
+        x.setState("foo")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 400)
+
+        x.clearArgs()
+        x.setClinic(clinicid)
+        x.setPatient(patientid)
+        x.setEnd("01/01/2000")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 404)
+
+        x.setEnd(None)
+        x.setStart("01/01/2000")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertEqual(len(ret[1]), 4)
+
+        x.setStart("xyz")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 400)
+
+        # pages of 3, following the cursor
+
+        x.clearArgs()
+        x.setClinic(clinicid)
+        x.setLimit(3)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertEqual([y["id"] for y in ret[1]["statechanges"]], statechangeids[0:3])
+        self.assertTrue(ret[1]["next"] != None)
+
+        x.setCursor(ret[1]["next"])
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        self.assertEqual([y["id"] for y in ret[1]["statechanges"]], statechangeids[3:])
+        self.assertEqual(ret[1]["next"], None)
+
+        x.setCursor("notacursor")
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 400)
+
+        x.setCursor(None)
+        x.setLimit(0)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 400)
+
+        # columns
+
+        x.clearArgs()
+        x.setClinic(clinicid)
+        x.setColumns(True)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+        columns = ret[1]["statechanges"]
+        self.assertEqual(columns["id"], statechangeids)
+        self.assertEqual(columns["clinicstation"], [clinicstationids[0], clinicstationids[0], clinicstationids[1], clinicstationids[1]])
+        self.assertEqual(columns["patient"], [patientid] * 4)
+        self.assertEqual(columns["state"], ["in", "out", "in", "out"])
+        self.assertEqual(len(columns["time"]), 4)
+        self.assertEqual(ret[1]["next"], None)
+
+        # clinic and clinicstation, or patient alone, are illegal
+
+        x.clearArgs()
+        x.setClinic(clinicid)
+        x.setClinicStation(clinicstationids[0])
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 400)
+
+        x.clearArgs()
+        x.setPatient(patientid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 400)
+
+        for id in statechangeids:
+            x = DeleteStateChange(host, port, token, id)
+            ret = x.send(timeout=30)
+            self.assertEqual(ret[0], 200)
+
+        for id in clinicstationids:
+            x = DeleteClinicStation(host, port, token, id)
+            ret = x.send(timeout=30)
+            self.assertEqual(ret[0], 200)
+
+        for id in stationids:
+            x = DeleteStation(host, port, token, id)
+            ret = x.send(timeout=30)
+            self.assertEqual(ret[0], 200)
+
+        x = DeleteClinic(host, port, token, clinicid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
+        x = DeletePatient(host, port, token, patientid)
+        ret = x.send(timeout=30)
+        self.assertEqual(ret[0], 200)
+
 def usage():
     print("statechange [-h host] [-p port] [-u username] [-w password]") 
 
@@ -79,3 +79,6 @@ class Vaccine(models.Model):
     dtap_ipv_hib_hepb_date = models.DateTimeField(null=True)
     mmvr = models.BooleanField(default = False) #Measles, mumps, rubella, and varicella vaccines
     mmvr_date = models.DateTimeField(null=True)
+
+    class Meta:
+        index_together = [["patient", "clinic"]]
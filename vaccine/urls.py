@@ -14,9 +14,10 @@
 #limitations under the License.
 
 from django.conf.urls import url
-from vaccine.views import VaccineView
+from vaccine.views import VaccineView, VaccineBulkView
 
 urlpatterns = [
     url(r'^$', VaccineView.as_view()),
+    url(r'^bulk/$', VaccineBulkView.as_view()),
     url(r'^([0-9]+)/$', VaccineView.as_view()),
 ]
@@ -26,6 +26,7 @@ from django.core import serializers
 from django.http import HttpResponse, HttpResponseForbidden, HttpResponseBadRequest, HttpResponseServerError, HttpResponseNotFound
 
 from common.decorators import *
+from common.bulk import BulkView
 
 import sys
 import numbers
@@ -453,3 +454,8 @@ class VaccineView(APIView):
             vaccine.delete()
 
         return Response({})
+
+class VaccineBulkView(BulkView):
+    chartView = VaccineView
+    model = Vaccine
+    references = (("clinic", Clinic), ("patient", Patient))
@@ -51,3 +51,6 @@ class XRay(models.Model):
     )
 
     teeth = models.BigIntegerField(default = 0)
+
+    class Meta:
+        index_together = [["patient", "clinic"]]
@@ -14,9 +14,10 @@
 #limitations under the License.
 
 from django.conf.urls import url
-from xray.views import XRayView
+from xray.views import XRayView, XRayBulkView
 
 urlpatterns = [
     url(r'^$', XRayView.as_view()),
+    url(r'^bulk/$', XRayBulkView.as_view()),
     url(r'^([0-9]+)/$', XRayView.as_view()),
 ]
@@ -26,6 +26,7 @@ from django.core import serializers
 from django.http import HttpResponse, HttpResponseForbidden, HttpResponseBadRequest, HttpResponseServerError, HttpResponseNotFound
 
 from common.decorators import *
+from common.bulk import BulkView
 
 import sys
 import numbers
@@ -383,3 +384,8 @@ class XRayView(APIView):
             xray.delete()
 
         return Response({})
+
+class XRayBulkView(BulkView):
+    chartView = XRayView
+    model = XRay
+    references = (("clinic", Clinic), ("patient", Patient))